@@ -1,76 +1,242 @@
 """
 Script should be called by the 'ingestion_pipeline_trigger.sh' script in the same dir.
+
+The configs, the database clients and the DAOs built on them are created on the first invocation,
+and kept at module level, so later invocations on the same (warm) host reuse them, along with
+their connection pools, the credential's cached tokens and the seen-url cache. Only the objects
+that hold state of a single run, i.e. the fetchers and their pending checkpoints, are created per run.
+
+Each data source named in the IngestionConfig gets a fetcher of its own, from the FetcherFactory
+registry, which only imports the modules of the configured sources. The sources are ingested
+concurrently, each within its own time budget, and a source that fails, to be created or to run,
+doesn't stop the others.
 """
+import logging
+import os
+import threading
 
-def run_ingestion_pipeline():
-    ################TEMP DEBUG (then put it back above)####################
-    import logging
-    logging.info("The run ingestion pipeline function has been triggered.")
-    try:
-        import os
+from azure.cosmos import CosmosClient
+from pymongo import MongoClient
 
-        from azure.cosmos import CosmosClient
-        from azure.identity import DefaultAzureCredential
-        from pymongo import MongoClient
+from config_managers.configs_manager import ConfigsManager
+from config_managers.credentials import get_credential
+from data_accessors.datastores.abstract import (AlertsDAO, IndicatorIndexDAO,
+                                                NearDuplicateIndexDAO,
+                                                StreamCheckpointsDAO, TriageStagingDAO)
+from data_accessors.datastores.alerts import (AlertsDAOCosmos, AlertsDAOMongo,
+                                              CosmosConfig, MongoConfig)
+from data_accessors.datastores.checkpoints import (StreamCheckpointsDAOCosmos,
+                                                   StreamCheckpointsDAOFile,
+                                                   StreamCheckpointsDAOMongo,
+                                                   StreamCheckpointsDAOWithFallback)
+from data_accessors.datastores.indicator_index import (IndicatorIndexDAOCosmos,
+                                                       IndicatorIndexDAOMongo)
+from data_accessors.datastores.near_duplicate_index import (NearDuplicateIndexDAOCosmos,
+                                                            NearDuplicateIndexDAOMongo)
+from data_accessors.datastores.processing_queue import (ProcessingQueueConfig,
+                                                        ProcessingQueuePublisher,
+                                                        create_processing_queue_producer)
+from data_accessors.datastores.seen_url_cache import (CachedAlertsDAO, SeenUrlCache,
+                                                      SeenUrlCacheConfig)
+from data_accessors.datastores.triage_staging import (TriageStagingDAOCosmos,
+                                                      TriageStagingDAOMongo)
+from data_accessors.fetchers import FetcherFactory
+from data_accessors.fetchers.abstract import DataFetcher
+from data_accessors.fetchers.http_transport import HttpTransport
+from pipelines.ingestion import IngestionConfig, IngestionResult, ingest_sources
+from processors.alert_tagger.tag_alert import TaggerConfig, TaxonomyTagger, get_tagger
+from processors.indicator_extractor.extract_indicators import IndicatorExtractor
+from processors.near_duplicate_detector.detect_near_duplicates import (NearDuplicateConfig,
+                                                                       NearDuplicateDetector)
+from telemetry.metrics import MetricsRegistry
 
-        from config_managers.configs_manager import ConfigsManager
-        from data_accessors.datastores.alerts import (AlertsDAOCosmos, AlertsDAOMongo,
-                                                      CosmosConfig, MongoConfig)
-        from data_accessors.fetchers import FetcherFactory
-        from data_accessors.fetchers.feedly import FeedlyConfig
+# Created by the first invocation on this host, see _get_datastores().
+_datastores_lock = threading.Lock()
+_alerts_db: AlertsDAO | None = None
+_checkpoints_db: StreamCheckpointsDAO | None = None
+_triage_staging_db: TriageStagingDAO | None = None
+_indicator_index_db: IndicatorIndexDAO | None = None
+_near_duplicate_index_db: NearDuplicateIndexDAO | None = None
+_seen_url_cache: SeenUrlCache | None = None
+_processing_queue: ProcessingQueuePublisher | None = None
+# Holds no state of its own, so is shared by every invocation.
+_indicator_extractor = IndicatorExtractor()
 
-        from models.alerts_table_document import AlertDocument
 
-        logging.debug("CHECKING THAT LOGGING.DEBUG WORKS IN THE FUNCTION.")
+def _get_datastores() -> tuple[AlertsDAO, StreamCheckpointsDAO, TriageStagingDAO, IndicatorIndexDAO, NearDuplicateIndexDAO, SeenUrlCache, ProcessingQueuePublisher]:
+    """
+    Returns the alerts, checkpoints, triage staging, indicator index and near-duplicate index DAOs, the
+    seen-url cache and the processing queue publisher, creating them and the clients they share on the
+    first call. Later calls return the same objects.
 
+    Returns:
+        tuple[AlertsDAO, StreamCheckpointsDAO, TriageStagingDAO, IndicatorIndexDAO, NearDuplicateIndexDAO, SeenUrlCache, ProcessingQueuePublisher]:
+            The DAOs, the seen-url cache and the processing queue publisher.
+    """
+    global _alerts_db, _checkpoints_db, _triage_staging_db, _indicator_index_db, _near_duplicate_index_db, _seen_url_cache, _processing_queue
+    with _datastores_lock: # Invocations may run concurrently on the same host.
+        if _alerts_db is None:
+            # ToDo: At some point replace the ConfigsManager approach with dependency injection?
+            config_manager = ConfigsManager() # Loads configs from environment variables, keyvault secrets, and config files.
 
-        # ToDo: At some point replace the ConfigsManager approach with dependency injection?
-        config_manager = ConfigsManager() # Loads configs from environment variables, keyvault secrets, and config files.
+            # Create connection to the main data store.
+            if os.getenv("IS_LOCAL") == "True": # CosmosDB local emulator won't run on Mac M1, so I use MongoDB for local development.
+                mongo_config: MongoConfig = config_manager.retrieve_config(MongoConfig)
+                mongo_client = MongoClient(mongo_config.host, mongo_config.port)
+                alerts_db = AlertsDAOMongo(mongo_config, mongo_client)
+                checkpoints_db = StreamCheckpointsDAOMongo(mongo_config, mongo_client)
+                triage_staging_db = TriageStagingDAOMongo(mongo_config, mongo_client)
+                indicator_index_db = IndicatorIndexDAOMongo(mongo_config, mongo_client)
+                near_duplicate_index_db = NearDuplicateIndexDAOMongo(mongo_config, mongo_client)
+            else:
+                # For Azure deployments, use managed identity to authenticate with CosmosDB.
+                cosmos_config: CosmosConfig = config_manager.retrieve_config(CosmosConfig)
+                cosmos_client = CosmosClient(cosmos_config.url, credential=get_credential())
+                alerts_db = AlertsDAOCosmos(cosmos_config, cosmos_client)
+                if cosmos_config.debug_list_databases: # Enumerates every database and container, so off by default.
+                    alerts_db.debug_list_all_dbs_and_cols()
+                checkpoints_db = StreamCheckpointsDAOCosmos(cosmos_config, cosmos_client)
+                triage_staging_db = TriageStagingDAOCosmos(cosmos_config, cosmos_client)
+                indicator_index_db = IndicatorIndexDAOCosmos(cosmos_config, cosmos_client)
+                near_duplicate_index_db = NearDuplicateIndexDAOCosmos(cosmos_config, cosmos_client)
 
-        # Instantiate a dao for the Feedly data source.
-        feedly_config: FeedlyConfig = config_manager.retrieve_config(FeedlyConfig)
-        feedly_fetcher = FetcherFactory.create_connection(feedly_config)
+            if _seen_url_cache is None:
+                _seen_url_cache = SeenUrlCache(config_manager.retrieve_config(SeenUrlCacheConfig))
+            processing_queue_config: ProcessingQueueConfig = config_manager.retrieve_config(ProcessingQueueConfig)
+            processing_queue = ProcessingQueuePublisher(
+                create_processing_queue_producer(
+                    processing_queue_config,
+                    credential=get_credential() if processing_queue_config.backend == "azure" else None
+                ),
+                processing_queue_config
+            )
+            # Set last, so that if creating any of them fails, the next invocation tries again.
+            _checkpoints_db = checkpoints_db
+            _triage_staging_db = triage_staging_db
+            _indicator_index_db = indicator_index_db
+            _near_duplicate_index_db = near_duplicate_index_db
+            _processing_queue = processing_queue
+            _alerts_db = alerts_db
+        return _alerts_db, _checkpoints_db, _triage_staging_db, _indicator_index_db, _near_duplicate_index_db, _seen_url_cache, _processing_queue
 
-        # Create connection to the main data store.
-        if os.getenv("IS_LOCAL") == "True": # CosmosDB local emulator won't run on Mac M1, so I use MongoDB for local development.
-            mongo_config: MongoConfig = config_manager.retrieve_config(MongoConfig)
-            mongo_client = MongoClient(mongo_config.host, mongo_config.port)
-            alerts_db = AlertsDAOMongo(mongo_config, mongo_client)
-        else:
-            # For Azure deployments, use managed identity to authenticate with CosmosDB.
-            cosmos_config: CosmosConfig = config_manager.retrieve_config(CosmosConfig)
-            cosmos_client = CosmosClient(cosmos_config.url, credential=DefaultAzureCredential())
-            alerts_db = AlertsDAOCosmos(cosmos_config, cosmos_client)
-            alerts_db.debug_list_all_dbs_and_cols()
+
+def reset_datastores():
+    """Drops the DAOs and clients created by earlier invocations. Primarily used for testing and measuring cold starts."""
+    global _alerts_db, _checkpoints_db, _triage_staging_db, _indicator_index_db, _near_duplicate_index_db, _seen_url_cache, _processing_queue
+    with _datastores_lock:
+        _alerts_db = None
+        _checkpoints_db = None
+        _triage_staging_db = None
+        _indicator_index_db = None
+        _near_duplicate_index_db = None
+        _seen_url_cache = None
+        _processing_queue = None
+
+
+def _create_fetcher(source: str, checkpoints_db: StreamCheckpointsDAO) -> DataFetcher:
+    """
+    Creates the fetcher of a data source, which fetches from where the last run got to.
+
+    Args:
+        source (str): The name of the data source, as registered with FetcherFactory.
+        checkpoints_db (StreamCheckpointsDAO): The checkpoints db, shared by every data source.
+
+    Returns:
+        DataFetcher: The fetcher of the data source.
+    """
+    config_class, _dao_class = FetcherFactory.load_classes(source)
+    config = ConfigsManager().retrieve_config(config_class)
+    config.refresh_access_token() # The config is kept across runs, the token may have been rotated since.
+    checkpoints = StreamCheckpointsDAOWithFallback(checkpoints_db, StreamCheckpointsDAOFile(config.checkpoint_file_path))
+    return FetcherFactory.create_connection(config, checkpoints=checkpoints)
+
+
+def run_ingestion_pipeline():
+    logging.info("The run ingestion pipeline function has been triggered.")
+    metrics = MetricsRegistry()
+    metrics.clear() # Drop anything recorded outside a run, so the summary only covers this run.
+    cold_start = _alerts_db is None
+    source_results: dict[str, IngestionResult] = {}
+    fetchers: dict[str, DataFetcher] = {}
+    try:
+        with metrics.span("ingestion.setup"):
+            ingestion_config: IngestionConfig = ConfigsManager().retrieve_config(IngestionConfig)
+            alerts_db, checkpoints_db, triage_staging_db, indicator_index_db, near_duplicate_index_db, seen_url_cache, processing_queue = _get_datastores()
+            # Put the seen-url cache in front of the alerts db, so most duplicates are skipped without a db lookup.
+            alerts_db = CachedAlertsDAO(alerts_db, seen_url_cache)
+
+            # A source whose fetcher can't be created, e.g. as its token can't be read, is skipped for this run.
+            for source in ingestion_config.source_names():
+                try:
+                    fetchers[source] = _create_fetcher(source, checkpoints_db)
+                except Exception as e:
+                    logging.error("Failed to create the fetcher of data source %s, so it is skipped: %s", source, e)
+                    metrics.increment("ingestion.source_failures", source=source, reason="setup")
+                    source_results[source] = IngestionResult(error=str(e) or type(e).__name__)
+            # Per run, as it also compares the alerts of the run with each other, whichever source they come from.
+            near_duplicate_detector = NearDuplicateDetector(near_duplicate_index_db, ConfigsManager().retrieve_config(NearDuplicateConfig))
+            # Compiled once per host, and again only once the taxonomy file changes. Without it, the alerts are ingested untagged.
+            alert_tagger: TaxonomyTagger | None = None
+            try:
+                alert_tagger = get_tagger(ConfigsManager().retrieve_config(TaggerConfig).taxonomy_path)
+            except Exception as e:
+                logging.error("Failed to load the tag taxonomy, so the alerts of this run are not tagged: %s", e)
+                metrics.increment("ingestion.tagger_failures")
     except Exception as e:
         logging.error('Error in the run_ingestion_pipeline function: %s', e)
         raise e
-    #################################################
 
-    logging.info("We got past the setup stage of the function.")
+    logging.info("We got past the setup stage of the function (%s start), ingesting %s.", "cold" if cold_start else "warm", list(fetchers))
 
-    # Fetch recent articles from Feedly.
-    alerts_all_streams: list[AlertDocument] = feedly_fetcher.fetch_alerts()
+    # Stream recent alerts from every source into the db(s) concurrently, page by page, with the indicators of compromise
+    # they mention, the taxonomy entries they are tagged with and the story they are part of, indexing the new ones by
+    # indicator, and, unless they are near duplicates of earlier ones, staging them for the triage portal and publishing
+    # them to the processing queue for summarization. Each source's checkpoints are only moved on once its alerts are
+    # safely stored.
+    source_results.update(ingest_sources(
+        fetchers,
+        alerts_db,
+        time_budgets={source: ingestion_config.time_budget(source) for source in fetchers},
+        grace_seconds=ingestion_config.grace_seconds,
+        triage_staging_db=triage_staging_db,
+        processing_queue=processing_queue,
+        indicator_extractor=_indicator_extractor,
+        alert_tagger=alert_tagger,
+        indicator_index_db=indicator_index_db,
+        near_duplicate_detector=near_duplicate_detector
+    ))
+    seen_url_cache.save()
+    logging.info("Seen-url cache stats: %s", seen_url_cache.get_stats())
 
-    # Save the alerts to db(s).
-    new_alerts_counter: int = 0
-    for alert in alerts_all_streams:
-        # Add to main alerts db.
-        inserted_id = alerts_db.add_alert_if_not_duplicate(alert)
-
-        # If alert was added for first time, also add to triage staging db, for easy rendering for the frontend.
-        if inserted_id:
-            logging.info("Added alert with id: %s", inserted_id)
-            # ToDo: HERE use the inserted id to add to the triage staging db.
-            new_alerts_counter += 1
+    for source, result in source_results.items():
+        new_alerts_counter: int = len(result.inserted_ids)
+        if result.error is not None:
+            logging.error("Data source %s failed: %s", source, result.error)
+        elif new_alerts_counter > 0:
+            logging.info("Added %s new alerts from %s to the main database.", new_alerts_counter, source)
+            logging.info("%s alerts from %s were already present in the main database (based on the publisher's source url) so were skipped.", result.fetched_count - new_alerts_counter, source)
         else:
-            logging.debug("Alert with publication_source_url %s already exists in the main database.", alert.publication_source_url) # Access the source dict object for debugging.
-    
-    if new_alerts_counter > 0:
-        logging.info("Added %s new alerts to the main database.", new_alerts_counter)
-        logging.info("%s alerts were already present in the main database (based on the publisher's source url) so were skipped.", len(alerts_all_streams) - new_alerts_counter)
-    else:
-        logging.info("No new alerts detected since last refresh.")
+            logging.info("No new alerts detected from %s since last refresh.", source)
+
+    # One structured record per run, with where the time, bytes and request units went.
+    results = list(source_results.values())
+    metrics.log_summary(
+        "ingestion_run",
+        cold_start=cold_start,
+        fetched=sum(result.fetched_count for result in results),
+        inserted=sum(len(result.inserted_ids) for result in results),
+        staged=sum(len(result.staged_ids) for result in results),
+        near_duplicates=sum(len(result.near_duplicate_ids) for result in results),
+        queued=sum(len(result.queued_ids) for result in results),
+        queue_messages=sum(result.queued_messages for result in results),
+        indexed_indicators=sum(result.indexed_indicators for result in results),
+        sources={
+            source: {"fetched": result.fetched_count, "inserted": len(result.inserted_ids), "timed_out": result.timed_out, "error": result.error}
+            for source, result in source_results.items()
+        },
+        seen_url_cache=seen_url_cache.get_stats(),
+        http_hosts=HttpTransport.shared().get_stats()
+    )
+    if source_results and all(result.error is not None for result in results):
+        raise RuntimeError(f"Every data source failed: { {source: result.error for source, result in source_results.items()} }")
     # ToDo: Update the unit tests to reflect new structure.
-    # Add new alerts to the processing queue.
-    #### use 'inserted_ids' for this.
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""
+Fetches the Recorded Future alerts triggered in the last hours, through RecordedFutureDAO, and
+writes them to a JSON Lines file (one raw alert per line) as each page arrives, so that the
+script's memory use stays bounded whatever the number of alerts.
+
+Run from the repository root, with the API token in the environment:
+
+    RECORDED_FUTURE_API_TOKEN=... PYTHONPATH=src python scripts/fetch_recorded_future_alerts.py --hours-ago 24
+"""
+import argparse
+import json
+import os
+import sys
+
+from data_accessors.fetchers.recorded_future import RecordedFutureConfig, RecordedFutureDAO
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream the Recorded Future alerts to a JSON Lines file.')
+    parser.add_argument('--output', default='alerts.jsonl', help='File the alerts are written to, one per line.')
+    parser.add_argument('--hours-ago', type=int, default=24, help='How far back to fetch alerts, in hours.')
+    parser.add_argument('--page-size', type=int, default=1000, help='Number of alerts fetched per request.')
+    parser.add_argument('--max-concurrency', type=int, default=4, help='Maximum number of pages fetched concurrently.')
+    parser.add_argument('--max-alerts', type=int, default=100_000, help='Maximum number of alerts fetched.')
+    args = parser.parse_args()
+
+    os.environ.setdefault('IS_LOCAL', 'True') # Read the token from RECORDED_FUTURE_API_TOKEN, not the keyvault.
+    config = RecordedFutureConfig(
+        hours_ago=args.hours_ago,
+        page_size=args.page_size,
+        max_concurrency=args.max_concurrency,
+        max_alerts=args.max_alerts
+    )
+    if not config.api_token:
+        sys.exit('Set RECORDED_FUTURE_API_TOKEN to your Recorded Future API token.')
+
+    alert_count = 0
+    with open(args.output, 'w') as f:
+        for raw_page in RecordedFutureDAO(config).iter_raw_pages():
+            for raw_alert in raw_page:
+                f.write(json.dumps(raw_alert) + '\n')
+            alert_count += len(raw_page)
+            print(f'Fetched {alert_count} alerts so far.')
+
+    print(f'Total alerts fetched: {alert_count}')
+    print(f'Alerts saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Measures the startup latency of the ingestion function app: the time to import ingestion_pipeline,
+as the Functions host does when it loads function_app.py, and the time of the setup stage of
+each invocation, i.e. creating (or reusing) the configs, database clients and DAOs.
+
+Each mode is measured in a fresh interpreter, so the first invocation is a genuine cold start:
+    reuse    Clients are created by the first invocation and reused by later ones, as deployed.
+    rebuild  Clients are recreated by every invocation, as before they were kept at module level.
+
+Run from the root of the repository, with the environment variables of the app set, e.g.
+    set -a; source tests/unit/.env.test; set +a
+    python scripts/measure_ingestion_cold_start.py --invocations 5 --mongomock
+
+With IS_LOCAL=True the app connects to MongoDB; --mongomock replaces it with an in-memory
+MongoDB for machines without a MongoDB server. Otherwise it connects to Cosmos DB, with the
+Azure credentials of the environment.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PYTHONPATH = [os.path.join(ROOT_DIR, "src"), os.path.join(ROOT_DIR, "alerts-ingestion-func-app")]
+MODES = ["rebuild", "reuse"]
+
+
+def measure(mode: str, invocations: int, mongomock: bool) -> dict:
+    """
+    Measures the startup latency in this interpreter, which should not have imported the app yet.
+
+    Args:
+        mode (str): One of MODES, see the module docstring.
+        invocations (int): Number of invocations to time the setup stage of.
+        mongomock (bool): Replace the MongoDB client of the app with an in-memory one.
+
+    Returns:
+        dict: The 'import_ms' of ingestion_pipeline, and the 'setup_ms' of each invocation.
+    """
+    start = time.perf_counter()
+    import ingestion_pipeline
+    import_ms = (time.perf_counter() - start) * 1000
+
+    if mongomock:
+        from mongomock import MongoClient as MongomockClient
+        ingestion_pipeline.MongoClient = MongomockClient
+        os.environ.setdefault("PROCESSING_QUEUE_BACKEND", "memory") # No storage account either.
+
+    setup_ms = []
+    for _ in range(invocations):
+        if mode == "rebuild":
+            ingestion_pipeline.reset_datastores()
+        start = time.perf_counter()
+        ingestion_pipeline._get_datastores()
+        setup_ms.append((time.perf_counter() - start) * 1000)
+    return {"import_ms": round(import_ms, 1), "setup_ms": [round(ms, 1) for ms in setup_ms]}
+
+
+def measure_in_subprocess(mode: str, invocations: int, mongomock: bool) -> dict:
+    """Runs measure() in a fresh interpreter, and returns its result."""
+    command = [sys.executable, os.path.abspath(__file__), "--child", mode, "--invocations", str(invocations)]
+    if mongomock:
+        command.append("--mongomock")
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(PYTHONPATH + [os.environ.get("PYTHONPATH", "")])}
+    completed = subprocess.run(command, env=env, cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invocations", type=int, default=3, help="Invocations to time per mode.")
+    parser.add_argument("--mongomock", action="store_true", help="Use an in-memory MongoDB, with IS_LOCAL=True.")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.invocations, args.mongomock)))
+        return
+
+    print(f"{'mode':<10}{'import ms':>12}{'first setup ms':>16}{'later setup ms (mean)':>24}")
+    for mode in MODES:
+        result = measure_in_subprocess(mode, args.invocations, args.mongomock)
+        later = result["setup_ms"][1:]
+        later_mean = round(sum(later) / len(later), 1) if later else "-"
+        print(f"{mode:<10}{result['import_ms']:>12}{result['setup_ms'][0]:>16}{later_mean:>24}")
+
+
+if __name__ == "__main__":
+    main()
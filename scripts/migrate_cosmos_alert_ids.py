@@ -0,0 +1,121 @@
+"""
+One-off migration of the Cosmos DB alerts container to the layout of the 'point_read' storage mode
+of AlertsDAOCosmos: partitioned on '/aggregator_platform', with each alert's alert_key as its id.
+
+The partition key of a Cosmos container cannot be changed, so every alert is copied from the
+source container to a new target container, created if it does not exist. Alerts that map to
+the same alert key, i.e. variants of the same url stored before alert keys were introduced,
+are collapsed into the first one copied. The source container is left untouched.
+
+The migration is idempotent, so it can be re-run after a failure: alerts already in the target
+container are skipped. Once it has completed, point the app at the new container:
+    COSMOS_ALERTS_CONTAINER_ID=<target container>
+    COSMOS_ALERTS_CONTAINER_PARTITION_KEY=/aggregator_platform
+    COSMOS_ALERTS_STORAGE_MODE=point_read
+and change cosmosDbAlertsContainerId and cosmosDbAlertsContainerPartitionKey of the infra
+parameters to match, before deleting the source container.
+
+Run from the root of the repository, with the COSMOS_* environment variables of the app set:
+    PYTHONPATH=src python scripts/migrate_cosmos_alert_ids.py --target-container alerts_v2 [--dry-run]
+"""
+import argparse
+import logging
+from dataclasses import dataclass
+
+from azure.cosmos import ContainerProxy, CosmosClient, PartitionKey, exceptions
+
+from config_managers.credentials import get_credential
+from data_accessors.datastores.alerts import POINT_READ_PARTITION_KEY, CosmosConfig
+from models.alert_key import derive_alert_key
+
+logging.basicConfig(level=logging.INFO)
+
+
+@dataclass
+class MigrationResult:
+    """
+    Attributes:
+        read_count: Number of alerts read from the source container.
+        copied_count: Number of alerts written to the target container.
+        duplicate_count: Number of alerts skipped, as an alert with the same key was already in the target container.
+    """
+    read_count: int = 0
+    copied_count: int = 0
+    duplicate_count: int = 0
+
+
+def to_point_read_item(item: dict) -> dict:
+    """
+    Returns the alert item in the layout of the 'point_read' storage mode: with its alert_key as
+    its id, derived from its publication_source_url if it was stored without one, and without
+    the system properties Cosmos adds to every item (e.g. '_rid', '_etag').
+    """
+    alert_key = item.get("alert_key") or derive_alert_key(item["publication_source_url"])
+    migrated_item = {key: value for key, value in item.items() if not key.startswith("_")}
+    migrated_item["id"] = alert_key
+    migrated_item["alert_key"] = alert_key
+    return migrated_item
+
+
+def migrate_alerts(source: ContainerProxy, target: ContainerProxy, dry_run: bool = False) -> MigrationResult:
+    """
+    Copies every alert of the source container to the target container, see the module docstring.
+
+    Args:
+        source (ContainerProxy): The current alerts container.
+        target (ContainerProxy): The new alerts container, partitioned on '/aggregator_platform'.
+        dry_run (bool): Only count the alerts that would be copied, without writing anything.
+
+    Returns:
+        MigrationResult: The number of alerts read, copied and skipped as duplicates.
+    """
+    result = MigrationResult()
+    migrated_keys: set[str] = set()
+    for item in source.query_items(query="SELECT * FROM c", enable_cross_partition_query=True): # Streamed page by page.
+        result.read_count += 1
+        migrated_item = to_point_read_item(item)
+        if migrated_item["id"] in migrated_keys:
+            result.duplicate_count += 1
+            continue
+        migrated_keys.add(migrated_item["id"])
+        if dry_run:
+            result.copied_count += 1
+            continue
+        try:
+            target.create_item(body=migrated_item)
+            result.copied_count += 1
+        except exceptions.CosmosResourceExistsError: # Copied by a previous, interrupted run.
+            result.duplicate_count += 1
+        if result.read_count % 1000 == 0:
+            logging.info("Migrated %d alerts so far.", result.read_count)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-container", required=True, help="ID of the new alerts container.")
+    parser.add_argument("--source-container", help="ID of the current alerts container. Defaults to COSMOS_ALERTS_CONTAINER_ID.")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the alerts that would be copied.")
+    args = parser.parse_args()
+
+    cosmos_config = CosmosConfig()
+    client = CosmosClient(cosmos_config.url, credential=get_credential())
+    database = client.get_database_client(cosmos_config.alerts_database_id)
+    source = database.get_container_client(args.source_container or cosmos_config.alerts_container_id)
+    if args.dry_run:
+        target = None
+    else:
+        target = database.create_container_if_not_exists(
+            id=args.target_container,
+            partition_key=PartitionKey(path=POINT_READ_PARTITION_KEY)
+        )
+
+    result = migrate_alerts(source, target, dry_run=args.dry_run)
+    logging.info(
+        "%s %d alerts: %d copied, %d skipped as duplicates.",
+        "Dry run read" if args.dry_run else "Read", result.read_count, result.copied_count, result.duplicate_count
+    )
+
+
+if __name__ == "__main__":
+    main()
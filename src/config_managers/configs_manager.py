@@ -1,15 +1,27 @@
 import logging
 import os
+import threading
 
-import yaml
 from pydantic_settings import BaseSettings
 
-from data_accessors.datastores.alerts import CosmosConfig, MongoConfig
-from data_accessors.fetchers.feedly import FeedlyConfig
-
-CONFIGS = [
-    FeedlyConfig,
-    CosmosConfig
+# The configs that can be retrieved, by the module and name of their class, so that loading the configs
+# manager doesn't import the modules defining them, nor the layers above it they belong to. A module is only
+# imported by the code using its config, which passes the class to retrieve_config().
+CONFIGS: list[tuple[str, str]] = [
+    ("pipelines.ingestion", "IngestionConfig"),
+    ("data_accessors.datastores.alerts", "CosmosConfig"),
+    ("data_accessors.datastores.seen_url_cache", "SeenUrlCacheConfig"),
+    ("data_accessors.datastores.processing_queue", "ProcessingQueueConfig"),
+    ("processors.alert_summarizer.worker", "SummarizationConfig"),
+    ("processors.alert_tagger.tag_alert", "TaggerConfig"),
+    ("processors.near_duplicate_detector.detect_near_duplicates", "NearDuplicateConfig"),
+    # The data sources, see FetcherFactory.REGISTRY.
+    ("data_accessors.fetchers.feedly", "FeedlyConfig"),
+    ("data_accessors.fetchers.recorded_future", "RecordedFutureConfig"),
+]
+# Only used for local development, see _config_classes().
+LOCAL_CONFIGS: list[tuple[str, str]] = [
+    ("data_accessors.datastores.alerts", "MongoConfig"),
 ]
 
 class ConfigsManager:
@@ -18,9 +30,11 @@ class ConfigsManager:
     
     Configuration data is stored as environment variables.
     
-    Configs from both sources are loaded upon initialisation and stored
-    as a instance variable on the singleton object throughout the application
-    lifecycle.
+    Each config is loaded lazily, on the first retrieve_config() of its class, so a code path
+    only pays for (and only needs the environment variables, files and secrets of) the configs
+    it uses. Loaded configs are stored by class on the singleton object throughout the
+    application lifecycle. A config that can tell when its source files have changed, by
+    implementing is_stale(), is reloaded on the next retrieve_config() after they did.
 
     """
     _instance = None
@@ -30,36 +44,36 @@ class ConfigsManager:
         logging.info("Entered the __new__ method.")
         if cls._instance is None:
             cls._instance = super(ConfigsManager, cls).__new__(cls)
-            cls._instance.configs = []
-            cls._instance._initialize_configs()
+            cls._instance.configs = {}
+            cls._instance._lock = threading.Lock()
         return cls._instance
     
     @classmethod
     def reset(cls):
         """Primary used for testing to avoid state leakage"""
         cls._instance = None
-        # ToDo: Here reload the configs by calling __new__ again or smt?
         # ToDo: Change the tests to use this as well
 
-    # ToDo: Document how the value checking is done with environment variables using pydantic_settings
-    def _initialize_configs(self):
-        logging.info("Entered the initialize_configs method.")
-        logging.info(f"CONFIGS: {CONFIGS}")
-        for config_class in CONFIGS:
-            try:
-                self.configs.append(config_class()) # The config classes are initialized with env vars, using pydantic_settings internally for validation and null-checks.
-                logging.info(f"Loaded configuration for {config_class.__name__}.")
-            except Exception as e:
-                logging.error(f"Failed to load configuration for {config_class.__name__}.")
-                logging.error(e)
-                raise e
-        
+    @staticmethod
+    def _config_classes() -> list[tuple[str, str]]:
+        config_classes = list(CONFIGS)
         if os.getenv("IS_LOCAL") == "True": # Since the CosmosDB emulator is buggy on M1 Macs, I use MongoDB for local development.
-            self.configs.append(MongoConfig())
-                
+            config_classes.extend(LOCAL_CONFIGS)
+        return config_classes
+
+    # ToDo: Document how the value checking is done with environment variables using pydantic_settings
+    def _load_config(self, config_class: type[BaseSettings]) -> BaseSettings:
+        try:
+            config_instance = config_class() # The config classes are initialized with env vars, using pydantic_settings internally for validation and null-checks.
+            logging.info(f"Loaded configuration for {config_class.__name__}.")
+            return config_instance
+        except Exception as e:
+            logging.error(f"Failed to load configuration for {config_class.__name__}.")
+            logging.error(e)
+            raise e
 
     # Accessor methods
-    def retrieve_config(self, config_class: BaseSettings):
+    def retrieve_config(self, config_class: type[BaseSettings]) -> BaseSettings:
         """
         Returns the configuration settings for a data access object.
 
@@ -68,16 +82,30 @@ class ConfigsManager:
                 The class of the configuration object to retrieve.
 
         Returns:        
-            The populated configuration instance of the config_class,
-            using the values that were initialised at application startup.
+            The populated configuration instance of the config_class, loaded on the first
+            call for the class, or again if its source files changed since.
         """
-        for config_instance in self.configs:
-            if isinstance(config_instance, config_class):
-                return config_instance
-        # Update this error message to be better and more informative.
-        raise ValueError(
-            f"Configuration of type {config_class} "
-            "could not be found in the loaded configurations. "
-            "Please ensure all environment variables are set correctly, "
-            "then re-run the pipeline app."
-        )
\ No newline at end of file
+        config_instance = self.configs.get(config_class)
+        if config_instance is not None and not self._is_stale(config_instance):
+            return config_instance
+        if (config_class.__module__, config_class.__qualname__) not in self._config_classes():
+            # Update this error message to be better and more informative.
+            raise ValueError(
+                f"Configuration of type {config_class} "
+                "could not be found in the loaded configurations. "
+                "Please ensure all environment variables are set correctly, "
+                "then re-run the pipeline app."
+            )
+        with self._lock: # So concurrent callers don't load the same config twice.
+            config_instance = self.configs.get(config_class)
+            if config_instance is None or self._is_stale(config_instance):
+                if config_instance is not None:
+                    logging.info(f"Reloading configuration for {config_class.__name__}, as its source files changed.")
+                config_instance = self._load_config(config_class)
+                self.configs[config_class] = config_instance
+            return config_instance
+
+    @staticmethod
+    def _is_stale(config_instance: BaseSettings) -> bool:
+        is_stale = getattr(config_instance, "is_stale", None)
+        return is_stale is not None and is_stale()
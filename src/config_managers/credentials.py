@@ -0,0 +1,54 @@
+import logging
+import threading
+
+from azure.core.credentials import TokenCredential
+from azure.identity import DefaultAzureCredential
+
+
+class CredentialProvider:
+    """
+    Singleton provider of the one Azure credential shared by every Azure client of the application.
+
+    DefaultAzureCredential probes its chain of credentials (environment, managed identity, CLI, ...)
+    on first use, then caches the access tokens it gets until shortly before they expire. Sharing
+    one instance means the chain is only probed once per process, and the Cosmos and Key Vault
+    clients reuse each other's tokens where the scopes match.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(CredentialProvider, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._credential = None
+        return cls._instance
+
+    @classmethod
+    def reset(cls):
+        """Primarily used for testing to avoid state leakage."""
+        cls._instance = None
+
+    def get_credential(self) -> TokenCredential:
+        """Returns the shared credential, creating it on the first call."""
+        with self._lock:
+            if self._credential is None:
+                self._credential = DefaultAzureCredential() # Use Azure managed identity to allow intra-resource access, without keys.
+            return self._credential
+
+    def invalidate(self):
+        """
+        Drops the shared credential and its cached tokens, e.g. after a request was refused with
+        an authentication error, so the next get_credential() probes the chain again.
+
+        The old credential is not closed: clients created with it, e.g. the cached Cosmos client
+        and queue client, keep using it to refresh their tokens, and a closed credential can't
+        send requests any more. It is released once no client holds it.
+        """
+        with self._lock:
+            credential, self._credential = self._credential, None
+        if credential is not None:
+            logging.warning("Invalidated the shared Azure credential.")
+
+def get_credential() -> TokenCredential:
+    """Returns the credential shared by every Azure client of the application, see CredentialProvider."""
+    return CredentialProvider().get_credential()
@@ -1,37 +1,188 @@
+import json
 import logging
 import os
+import threading
+import time
+from dataclasses import dataclass
 
-from azure.identity import DefaultAzureCredential
+from azure.core.exceptions import ClientAuthenticationError, ResourceNotFoundError
 from azure.keyvault.secrets import SecretClient
+from pydantic import conint
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from config_managers.credentials import CredentialProvider
+
+
+class SecretsManagerConfig(BaseSettings):
+    """
+    Configuration for the in-process cache of Key Vault secrets.
+
+    Attributes:
+        model_config (SettingsConfigDict): Environment variable format for the configuration.
+        cache_ttl_seconds (int): How long a secret is served from the cache after it was fetched. 0 disables the cache.
+        refresh_ahead_seconds (int): How long before a cached secret expires it is refreshed in the background.
+        local_vault_path (str): If set, secrets are read from this JSON file instead of Key Vault, see LocalSecretClient.
+    """
+    model_config: SettingsConfigDict = SettingsConfigDict(env_prefix="SECRETS_")
+    cache_ttl_seconds: conint(ge=0) = 3600
+    refresh_ahead_seconds: conint(ge=0) = 300
+    local_vault_path: str = ''
+
+
+@dataclass
+class LocalSecret:
+    """A secret of a LocalSecretClient, with the same 'name' and 'value' attributes as a KeyVaultSecret."""
+    name: str
+    value: str
+
+
+class LocalSecretClient:
+    """
+    Local stand-in for the Key Vault SecretClient, for development and tests without Azure access.
+
+    Secrets are read from a JSON file mapping each secret name to its value, e.g.
+        {"feedly-access-token": "abababab"}
+    The file is re-read on every call, so editing it behaves like rotating a secret in Key Vault.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def get_secret(self, name: str) -> LocalSecret:
+        with open(self.file_path, 'r', encoding='utf-8') as file:
+            secrets = json.load(file)
+        if name not in secrets:
+            raise ResourceNotFoundError(f"Secret '{name}' not found in the local vault at {self.file_path}.")
+        return LocalSecret(name=name, value=secrets[name])
+
+
+@dataclass
+class _CachedSecret:
+    value: str
+    refresh_at: float # After this time the secret is refreshed in the background, while still being served.
+    expires_at: float # After this time the secret is no longer served, and is fetched again on access.
 
 
 class SecretsManager:
     """
     Singleton class to manage the lifetime of the Azure KeyVault client across the application.
-    
-    Secrets are accessed dynamically from the KeyVault using the Azure SDK, and are not cached in memory.
 
+    Secrets are cached in memory for 'cache_ttl_seconds' after they were fetched. Once a cached secret
+    is within 'refresh_ahead_seconds' of expiring, the next access still returns it, but also starts
+    fetching it again in the background, so secrets in regular use are never fetched on the caller's
+    thread. If a background refresh fails the cached value is served until it expires.
+
+    If Key Vault refuses a request with an authentication error, the cache and the shared credential
+    are dropped, and the request is retried once with a new credential. Callers whose own requests
+    are refused with a secret, e.g. a rotated API token, can drop it with invalidate().
     """
     _instance = None
 
-    def __new__(cls):
+    def __new__(cls, config: SecretsManagerConfig | None = None):
         if cls._instance is None:
             cls._instance = super(SecretsManager, cls).__new__(cls)
+            cls._instance.config = config or SecretsManagerConfig()
             cls._instance.keyvault_client = None
+            cls._instance._clock = time.monotonic
+            cls._instance._lock = threading.Lock()
+            cls._instance._cache = {}
+            cls._instance._refreshing = set()
+            cls._instance.stats = {"hits": 0, "misses": 0, "background_refreshes": 0, "auth_failures": 0}
             cls._instance._initialize_keyvault_client()
         return cls._instance
-    
-    def _initialize_keyvault_client(self):
+
+    @classmethod
+    def reset(cls):
+        """Primarily used for testing to avoid state leakage."""
+        cls._instance = None
+
+    def _create_keyvault_client(self) -> SecretClient | LocalSecretClient:
+        if self.config.local_vault_path:
+            return LocalSecretClient(self.config.local_vault_path)
         key_vault_name = os.getenv("KeyVault")
         if key_vault_name is None:
             raise ValueError("KeyVault environment variable not set")
         key_vault_url = f"https://{key_vault_name}.vault.azure.net/"
+        return SecretClient(vault_url=key_vault_url, credential=CredentialProvider().get_credential())
+
+    def _initialize_keyvault_client(self):
+        self.keyvault_client = self._create_keyvault_client()
+
+    def get_secret_value(self, secret_name: str) -> str:
+        """
+        Returns the value of a secret, from the cache if it was fetched less than 'cache_ttl_seconds' ago.
+
+        Args:
+            secret_name (str): Name of the secret in the Key Vault.
+
+        Returns:
+            str: The value of the secret.
+        """
+        now = self._clock()
+        with self._lock:
+            cached = self._cache.get(secret_name)
+            if cached is not None and now < cached.expires_at:
+                self.stats["hits"] += 1
+                refresh = now >= cached.refresh_at and secret_name not in self._refreshing
+                if refresh:
+                    self._refreshing.add(secret_name)
+            else:
+                self.stats["misses"] += 1
+                cached, refresh = None, False
+        if cached is None:
+            return self._fetch_secret(secret_name)
+        if refresh:
+            threading.Thread(target=self._refresh_secret, args=(secret_name,), name=f"secret-refresh-{secret_name}", daemon=True).start()
+        return cached.value
+
+    def invalidate(self, secret_name: str | None = None):
+        """
+        Drops a secret from the cache, so the next access fetches it from Key Vault.
+
+        Args:
+            secret_name (str | None): Name of the secret to drop. None drops every cached secret.
+        """
+        with self._lock:
+            if secret_name is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(secret_name, None)
+
+    def get_stats(self) -> dict[str, int]:
+        """Returns the cache counters, to see how many Key Vault requests the cache saved."""
+        with self._lock:
+            return dict(self.stats)
 
-        credential = DefaultAzureCredential() # Use Azure managed identity to allow intra-resource access, without keys.
-        keyvault_client = SecretClient(vault_url=key_vault_url, credential=credential)
-        self.keyvault_client = keyvault_client
+    def _fetch_secret(self, secret_name: str) -> str:
+        """Fetches a secret from Key Vault and caches it, retrying once with a new credential on an authentication error."""
+        try:
+            value = self.keyvault_client.get_secret(secret_name).value
+        except ClientAuthenticationError as e:
+            logging.warning("Key Vault refused the request for secret '%s' (%s), retrying with a new credential.", secret_name, e)
+            with self._lock:
+                self.stats["auth_failures"] += 1
+            self.invalidate()
+            CredentialProvider().invalidate()
+            self._initialize_keyvault_client()
+            value = self.keyvault_client.get_secret(secret_name).value
+        if self.config.cache_ttl_seconds > 0:
+            fetched_at = self._clock()
+            with self._lock:
+                self._cache[secret_name] = _CachedSecret(
+                    value=value,
+                    refresh_at=fetched_at + max(0, self.config.cache_ttl_seconds - self.config.refresh_ahead_seconds),
+                    expires_at=fetched_at + self.config.cache_ttl_seconds
+                )
+        return value
 
-    def get_secret_value(self, secret_name: str):
-        return self.keyvault_client.get_secret(secret_name).value
-        
-                
+    def _refresh_secret(self, secret_name: str):
+        """Fetches a cached secret again, in a background thread. On failure the cached value is served until it expires."""
+        try:
+            self._fetch_secret(secret_name)
+            with self._lock:
+                self.stats["background_refreshes"] += 1
+        except Exception as e:
+            logging.warning("Background refresh of secret '%s' failed, serving the cached value until it expires: %s", secret_name, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(secret_name)
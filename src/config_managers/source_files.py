@@ -0,0 +1,43 @@
+import os
+import threading
+
+import yaml
+
+# Parsed YAML files, keyed by path, with the version of the file they were parsed from.
+_parsed_files: dict[str, tuple[tuple[int, int], dict]] = {}
+_parsed_files_lock = threading.Lock()
+
+
+def file_version(path: str) -> tuple[int, int]:
+    """
+    Returns the version of a file, i.e. its modification time in nanoseconds and its size,
+    which changes whenever the file is edited or replaced.
+
+    Raises:
+        FileNotFoundError: If there is no file at path.
+    """
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_yaml(path: str) -> tuple[dict, tuple[int, int]]:
+    """
+    Returns the parsed contents of a YAML file, only parsing it again if it changed since the last call.
+    The returned dict is shared between callers, so it must not be modified.
+
+    Args:
+        path (str): Path of the YAML file.
+
+    Returns:
+        tuple[dict, tuple[int, int]]: The parsed file, and the version of the file it was parsed from, see file_version().
+    """
+    version = file_version(path)
+    with _parsed_files_lock:
+        cached = _parsed_files.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1], version
+    with open(path, 'r') as file:
+        parsed = yaml.safe_load(file)
+    with _parsed_files_lock:
+        _parsed_files[path] = (version, parsed)
+    return parsed, version
@@ -1,5 +1,10 @@
 from abc import ABC, abstractmethod
+from typing import Iterator
+
 from models.alerts_table_document import AlertDocument
+from models.near_duplicate_entry import NearDuplicateEntry
+from models.stream_checkpoint import StreamCheckpoint
+from models.triage_table_entity import TriageStagingEntity, TriageStagingFilter, TriageStagingPage
 
 class AlertsDAO(ABC):
     """
@@ -10,6 +15,40 @@ class AlertsDAO(ABC):
     def add_alert_if_not_duplicate(self, alert: AlertDocument):
         pass
 
+    @abstractmethod
+    def add_alerts_if_not_duplicate(self, alerts: list[AlertDocument]) -> list:
+        pass
+
+    @abstractmethod
+    def add_alerts(self, alerts: list[AlertDocument]) -> list:
+        """Adds alerts already known not to be in the db, without checking for duplicates first."""
+        pass
+
+    @abstractmethod
+    def iter_alert_keys(self) -> Iterator[str]:
+        """Yields the alert_key of every alert in the db."""
+        pass
+
+    @abstractmethod
+    def claim_alerts_for_summarization(self, batch_size: int, claim_timeout_seconds: float) -> list[dict]:
+        """
+        Moves up to batch_size alerts whose summarization has not started, or whose claim is older than
+        claim_timeout_seconds (i.e. the worker that claimed them died), to IN_PROGRESS, and returns their
+        stored documents. Concurrent callers never claim the same alert.
+        """
+        pass
+
+    @abstractmethod
+    def update_alert_fields(self, document: dict, fields: dict):
+        """
+        Sets the given fields of a stored alert, without rewriting the rest of it.
+
+        Args:
+            document (dict): The stored alert, as returned by claim_alerts_for_summarization.
+            fields (dict): The values to set, by field path, with nested fields dotted, e.g. 'summary_data.status'.
+        """
+        pass
+
 
 
 class TriageStagingDAO(ABC):
@@ -18,13 +57,114 @@ class TriageStagingDAO(ABC):
     """
     
     @abstractmethod
-    def add_staging_entity_if_not_exists(self, triage_staging: dict):
+    def add_staging_entity_if_not_exists(self, triage_staging: TriageStagingEntity):
+        pass
+
+    @abstractmethod
+    def add_staging_entities_if_not_exist(self, triage_stagings: list[TriageStagingEntity]) -> list[str]:
+        """
+        Adds the entities in bulk, skipping those whose id is already present, and returns the ids of those added.
+        If any were added, the version of the collection is incremented.
+        """
+        pass
+
+    @abstractmethod
+    def get_staging_entities_page(
+            self,
+            page_size: int,
+            continuation_token: str | None = None,
+            filters: TriageStagingFilter | None = None
+        ) -> TriageStagingPage:
+        """
+        Returns a page of entities, newest first, read in order over an index on their timestamp.
+
+        Args:
+            page_size (int): Maximum number of entities in the page.
+            continuation_token (str | None): The continuation_token of the previous page, or None for the first page.
+            filters (TriageStagingFilter | None): Only list the entities matching these filters. Must be the same for every page.
+
+        Raises:
+            ValueError: If the continuation token is malformed, e.g. made up or truncated by the client.
+        """
+        pass
+
+    @abstractmethod
+    def get_version(self) -> int:
+        """Returns the version of the collection, which is incremented whenever entities are added. 0 if none ever were."""
+        pass
+
+
+class IndicatorIndexDAO(ABC):
+    """
+    Abstract base class for the reverse index of indicators of compromise to the alerts mentioning them,
+    for a specific database DAO implementation.
+    """
+
+    @abstractmethod
+    def add_alerts_indicators(self, alerts: list[AlertDocument]) -> int:
+        """
+        Adds the alert_key of each alert to the index entries of its indicators, creating the entries
+        that don't exist yet. Adding an alert that is already indexed is a no-op.
+
+        Returns:
+            int: The number of distinct indicators whose entry was written.
+        """
+        pass
+
+    @abstractmethod
+    def find_alert_keys(self, indicator: str) -> list[str]:
+        """
+        Returns the alert_key of every alert mentioning an indicator, in the order they were indexed,
+        or an empty list if none does. The indicator must be normalized, see normalize_indicator.
+        """
+        pass
+
+
+class NearDuplicateIndexDAO(ABC):
+    """
+    Abstract base class for the LSH index of the alerts' MinHash signatures, used to find near duplicates,
+    for a specific database DAO implementation.
+    """
+
+    @abstractmethod
+    def find_candidates(self, band_keys: list[str], limit: int) -> list[NearDuplicateEntry]:
+        """Returns up to limit entries falling into any of the LSH buckets, each once, in no particular order."""
+        pass
+
+    @abstractmethod
+    def add_entries(self, entries: list[NearDuplicateEntry], retention_seconds: int) -> list[str]:
+        """
+        Adds the entries, skipping those of alerts already indexed, and returns the alert_key of those added.
+        The entries expire after retention_seconds, so the index only holds the stories of the recent past.
+        """
+        pass
+
+
+class ProcessingQueueProducer(ABC):
+    """
+    Abstract base class for the producer side of the processing queue, for a specific queue implementation.
+    """
+
+    @abstractmethod
+    def send_message(self, content: str):
+        """Sends a serialized ProcessingQueueMessage to the queue."""
         pass
 
     @abstractmethod
-    def add_staging_entities_if_not_exist(self, triage_stagings: list[dict]) -> list[int]:
+    def get_depth(self) -> int:
+        """Returns the (approximate) number of messages waiting on the queue."""
         pass
 
+
+class StreamCheckpointsDAO(ABC):
+    """
+    Abstract base class for StreamCheckpoints DAO for a specific database DAO implementation.
+    """
+
     @abstractmethod
-    def get_all_staging_entities(self):
-        pass
\ No newline at end of file
+    def get_checkpoint(self, stream_id: str) -> StreamCheckpoint | None:
+        pass
+
+    @abstractmethod
+    def save_checkpoint(self, checkpoint: StreamCheckpoint):
+        pass
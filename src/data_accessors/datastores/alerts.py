@@ -1,12 +1,24 @@
 import logging
+import time
+import uuid
+from typing import Callable, Iterator, Literal
 
+from azure.core import MatchConditions
 from azure.cosmos import CosmosClient, PartitionKey, exceptions
 from pydantic import constr
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
 
 from data_accessors.datastores.abstract import AlertsDAO
+from models.alert_key import derive_alert_key
 from models.alerts_table_document import AlertDocument
+from models.enums import SummarizationStatus
+from telemetry import metrics
+
+
+# Partition key path of the alerts container in the 'point_read' storage mode of AlertsDAOCosmos.
+POINT_READ_PARTITION_KEY = "/aggregator_platform"
 
 
 # ToDo: Add type hints to the methods in the AlertsDAO class.
@@ -20,12 +32,20 @@ class MongoConfig(BaseSettings):
         port (int): The port number on which the MongoDB server is listening.
         database (str): The name of the database to connect to.
         alerts_collection (str): The name of the collection to use for alerts.
+        checkpoints_collection_id (str): The name of the collection to use for the fetchers' stream checkpoints.
+        triage_staging_collection_id (str): The name of the collection to use for the triage portal's staging entities.
+        indicator_index_collection_id (str): The name of the collection to use for the reverse index of indicators to alerts.
+        near_duplicate_index_collection_id (str): The name of the collection to use for the near-duplicate index of the alerts.
     """
     model_config: SettingsConfigDict = SettingsConfigDict(env_prefix="MONGO_")
     host: constr(min_length=1)
     port: int
     alerts_database_id: constr(min_length=1)
     alerts_collection_id: constr(min_length=1)
+    checkpoints_collection_id: constr(min_length=1) = "stream_checkpoints"
+    triage_staging_collection_id: constr(min_length=1) = "triage_staging"
+    indicator_index_collection_id: constr(min_length=1) = "indicator_index"
+    near_duplicate_index_collection_id: constr(min_length=1) = "near_duplicate_index"
 
 
 class CosmosConfig(BaseSettings):
@@ -34,9 +54,23 @@ class CosmosConfig(BaseSettings):
     alerts_database_id: constr(min_length=1)
     alerts_container_id: constr(min_length=1)
     alerts_container_partition_key: constr(min_length=1)
+    # 'query' looks up duplicates with cross-partition queries, and works with any container layout.
+    # 'point_read' requires a container partitioned on '/aggregator_platform' whose items all have
+    # their alert_key as id, see scripts/migrate_cosmos_alert_ids.py, and looks up duplicates by id.
+    alerts_storage_mode: Literal["query", "point_read"] = "query"
+    checkpoints_container_id: constr(min_length=1) = "stream_checkpoints" # Partitioned on '/id'.
+    triage_staging_container_id: constr(min_length=1) = "triage_staging" # Partitioned on '/aggregatorPlatform'.
+    indicator_index_container_id: constr(min_length=1) = "indicator_index" # Partitioned on '/id'.
+    near_duplicate_index_container_id: constr(min_length=1) = "near_duplicate_index" # Partitioned on '/id', with TTL on.
+    debug_list_databases: bool = False # Log every database and container on startup, which costs a request per database.
     url: str = '' # ToDo: Might be better to initialise with '= field(init=False)' rather than empty str, and then set in post_init as I am. Look into this.
 
     def model_post_init(self, __context):
+        if self.alerts_storage_mode == "point_read" and self.alerts_container_partition_key != POINT_READ_PARTITION_KEY:
+            raise ValueError(
+                f"The 'point_read' alerts storage mode requires the alerts container to be partitioned on "
+                f"'{POINT_READ_PARTITION_KEY}', not '{self.alerts_container_partition_key}'."
+            )
         self.url = f"https://{self.name}.documents.azure.com:443/"
 
 
@@ -59,6 +93,11 @@ class AlertsDAOMongo(AlertsDAO):
         self.client = client
         self.db = self.client[config.alerts_database_id]
         self.collection = self.db[config.alerts_collection_id]
+        # Alerts are keyed on their alert_key, so the primary key makes the db itself reject duplicates,
+        # and the upserts below are safe even when two ingestion runs overlap. The unique url index also
+        # catches alerts stored before alert keys were introduced. Creating an existing index is a no-op.
+        self.collection.create_index("publication_source_url", unique=True)
+        self.collection.create_index("summary_data.status") # For the summarization worker to find unclaimed alerts.
 
     def _add_alert(self, alert: dict): # pragma: no cover
         return self.collection.insert_one(alert).inserted_id
@@ -68,24 +107,104 @@ class AlertsDAOMongo(AlertsDAO):
     def add_alert_if_not_duplicate(self, alert: AlertDocument):
         """
         Adds an alert to the collection only if it does not already exist.
-        The publication_source_url is either the 'canonicalUrl', or, if not
-        present, the 'alternate.href' field from the alert data.
-        See https://developers.feedly.com/reference/articlejson for details.
+        Duplicates are detected by the alert_key, the hash of the canonical publication_source_url.
+        See models.alert_key for details.
         
         Args:
             alert (dict): The alert data to be added.
         
         Returns:
-            The identifier of the inserted alert, generated by the db,
-            or None if the alert already exists.
+            The identifier (alert key) of the inserted alert, or None if the alert already exists.
+        """
+        inserted_ids = self.add_alerts_if_not_duplicate([alert])
+        return inserted_ids[0] if inserted_ids else None
+
+    def add_alerts_if_not_duplicate(self, alerts: list[AlertDocument]) -> list:
+        """
+        Adds a page of alerts to the collection in a single round trip, skipping any whose
+        alert_key is already present, either in the db or earlier in the same page.
+
+        Each alert is written as an upsert on its alert_key, used as the document '_id', that
+        only sets fields on insert ($setOnInsert), so existing documents are never modified
+        and the duplicate check is a lookup on the primary key. The writes are unordered, so
+        a failure on one alert does not stop the rest of the page.
+
+        Args:
+            alerts (list[AlertDocument]): The alerts to be added, typically one fetch page.
+
+        Returns:
+            The identifiers (alert keys) of the inserted alerts, in the order of the input.
+        """
+        alerts_by_key: dict[str, AlertDocument] = {}
+        for alert in alerts:
+            alerts_by_key.setdefault(alert.alert_key, alert) # Keep the first of any repeats within the page.
+        unique_alerts: list[AlertDocument] = list(alerts_by_key.values())
+        if not unique_alerts:
+            return []
+        operations = [
+            UpdateOne(
+                {"_id": alert.alert_key},
+                {"$setOnInsert": alert.to_dict(without_id=True)}, # The '_id' is set from the filter on insert.
+                upsert=True
+            )
+            for alert in unique_alerts
+        ]
+        try:
+            upserted_ids: dict = self.collection.bulk_write(operations, ordered=False).upserted_ids
+        except BulkWriteError as e:
+            # A duplicate key error means a concurrent run inserted the same alert first, or an alert stored
+            # before alert keys were introduced has the same url, so the alert is a duplicate.
+            unexpected_errors = [error for error in e.details["writeErrors"] if error["code"] != 11000]
+            if unexpected_errors:
+                raise
+            upserted_ids = {upsert["index"]: upsert["_id"] for upsert in e.details["upserted"]}
+        logging.debug("%d of %d alerts in page were already present in the database.", len(unique_alerts) - len(upserted_ids), len(unique_alerts))
+        return [upserted_ids[index] for index in sorted(upserted_ids)]
+
+    def add_alerts(self, alerts: list[AlertDocument]) -> list:
         """
+        Adds alerts already known not to be in the collection. The writes are the same
+        upserts as add_alerts_if_not_duplicate, which need no separate duplicate check,
+        so a wrongly classified alert is still never stored twice.
+        """
+        return self.add_alerts_if_not_duplicate(alerts)
 
-        def _source_url_already_present(publication_source_url):
-            return bool(self.collection.find_one({"publication_source_url": publication_source_url}))
+    def iter_alert_keys(self) -> Iterator[str]:
+        """
+        Yields the alert_key of every alert in the collection. Alerts stored before alert keys
+        were introduced have their key derived from their publication_source_url.
+        """
+        for doc in self.collection.find({}, {"alert_key": 1, "publication_source_url": 1, "_id": 0}):
+            yield doc.get("alert_key") or derive_alert_key(doc["publication_source_url"])
 
-        if not _source_url_already_present(alert.publication_source_url): # Check if the url of the alert is already present in the db.
-            alert_dict = alert.to_dict(without_id=True) # Exclude the id field, so it is auto-generated by the db.
-            return self._add_alert(alert_dict)
+    def claim_alerts_for_summarization(self, batch_size: int, claim_timeout_seconds: float) -> list[dict]:
+        """
+        Claims a batch of alerts for summarization in three round trips, whatever the batch size: the ids of
+        up to batch_size claimable alerts are read, those still claimable are moved to IN_PROGRESS with a
+        single update tagged with a new claim id, and the alerts carrying that claim id are read back.
+        An alert claimed by a concurrent worker in between no longer matches the update, so is skipped.
+        """
+        now = time.time()
+        claimable = {"$or": [
+            {"summary_data.status": SummarizationStatus.NOT_STARTED.value},
+            {"summary_data.status": SummarizationStatus.IN_PROGRESS.value, "summary_data.claimed_at": {"$lt": now - claim_timeout_seconds}},
+        ]}
+        candidate_ids = [doc["_id"] for doc in self.collection.find(claimable, {"_id": 1}).limit(batch_size)]
+        if not candidate_ids:
+            return []
+        claim_id = uuid.uuid4().hex
+        self.collection.update_many(
+            {"$and": [{"_id": {"$in": candidate_ids}}, claimable]},
+            {"$set": {
+                "summary_data.status": SummarizationStatus.IN_PROGRESS.value,
+                "summary_data.claim_id": claim_id,
+                "summary_data.claimed_at": now,
+            }}
+        )
+        return list(self.collection.find({"summary_data.claim_id": claim_id}))
+
+    def update_alert_fields(self, document: dict, fields: dict):
+        self.collection.update_one({"_id": document["_id"]}, {"$set": fields})
         
 
 # ToDo: SORT OUT BOTH METHODS...
@@ -104,57 +223,215 @@ class AlertsDAOMongo(AlertsDAO):
                 print(f"    Collection size: {db[collection_name].count_documents({})}")
 
 class AlertsDAOCosmos(AlertsDAO):
+    """
+    Data Access Object (DAO) for managing alert notifications from multiple sources,
+    stored in a Cosmos DB container, with each alert's alert_key as its item id.
+
+    In the default 'query' storage mode, duplicates are looked up with a cross-partition query
+    per batch, which also matches alerts stored before alert keys were introduced. In the
+    'point_read' mode, the container is partitioned on the aggregator platform, so each alert's
+    (partition key, id) pair is known up front: possible duplicates are checked with a 1 RU
+    point read, and alerts known to be new are created directly, a 409 Conflict meaning that
+    the alert was a duplicate after all.
+    """
+    # Max number of alerts looked up by a single query, to keep each query well
+    # within the Cosmos query size limits.
+    KEY_LOOKUP_CHUNK_SIZE = 100
+
     def __init__(self, config: CosmosConfig, client: CosmosClient):
         self.container_partition_key = config.alerts_container_partition_key
+        self.storage_mode = config.alerts_storage_mode
         self.client = client
         self.database = self.client.get_database_client(config.alerts_database_id)
         self.container = self.database.get_container_client(config.alerts_container_id)
 
-    def _check_if_source_url_present(self, publication_source_url):
-        """ 
-        Checks Cosmos DB to see if the publication source URL already exists there.
-        The URL is functionally a unique identifier for the alert.
-        If it does exist, adding another alert with the same URL would be a duplicate.
+    @staticmethod
+    def _record_request_charge(operation: str, headers) -> None:
+        """Records the request units (RUs) a Cosmos call cost, from its 'x-ms-request-charge' response header."""
+        metrics.increment("cosmos.requests", operation=operation)
+        metrics.increment("cosmos.request_charge", float((headers or {}).get("x-ms-request-charge", 0)), operation=operation)
+
+    def _request_charge_hook(self, operation: str) -> Callable:
+        """Returns a Cosmos response_hook that records the request charge of every response, e.g. every page of a query."""
+        return lambda headers, _result: self._record_request_charge(operation, headers)
+
+    def _find_present_alert_keys(self, alerts: list[AlertDocument]) -> set[str]:
         """
-        query = "SELECT * FROM c WHERE c.publication_source_url = @url"
-        parameters = [{"name": "@url", "value": publication_source_url}]
-    
-        items = list(self.container.query_items(
-            query=query,
-            parameters=parameters,
-            enable_cross_partition_query=True  # This may be required if partition key is not part of the query
-        ))
+        Returns the alert keys of the given alerts that already exist in Cosmos DB.
 
-        if items:
-            return True
-        return False
+        Alerts are stored with their alert_key as the item id, so the lookup is on the indexed id,
+        done in chunks with one query per chunk rather than one per alert. Alerts stored before
+        alert keys were introduced are matched on their publication_source_url instead.
+        Only the matching fields are projected, so no full documents are materialized.
+        """
+        present_keys: set[str] = set()
+        query = (
+            "SELECT c.alert_key, c.publication_source_url FROM c "
+            "WHERE ARRAY_CONTAINS(@keys, c.id) OR ARRAY_CONTAINS(@urls, c.publication_source_url)"
+        )
+        for start in range(0, len(alerts), self.KEY_LOOKUP_CHUNK_SIZE):
+            chunk = alerts[start:start + self.KEY_LOOKUP_CHUNK_SIZE]
+            items = self.container.query_items(
+                query=query,
+                parameters=[
+                    {"name": "@keys", "value": [alert.alert_key for alert in chunk]},
+                    {"name": "@urls", "value": [alert.publication_source_url for alert in chunk]},
+                ],
+                enable_cross_partition_query=True,
+                response_hook=self._request_charge_hook("query_alert_keys")
+            )
+            present_keys.update(item.get("alert_key") or derive_alert_key(item["publication_source_url"]) for item in items)
+        return present_keys
 
+    def _is_present(self, alert: AlertDocument) -> bool:
+        """Checks whether the alert is in the container with a point read of its id, in the 'point_read' storage mode."""
+        try:
+            self.container.read_item(
+                item=alert.alert_key,
+                partition_key=alert.aggregator_platform.value,
+                response_hook=self._request_charge_hook("read_alert")
+            )
+        except exceptions.CosmosResourceNotFoundError as e:
+            self._record_request_charge("read_alert", getattr(e, "headers", None))
+            return False
+        return True
 
     def add_alert_if_not_duplicate(self, alert: AlertDocument):
         """
         Adds an alert to the collection only if it does not already exist.
-        The publication_source_url is either the 'canonicalUrl', or, if not
-        present, the 'alternate.href' field from the alert data.
-        See https://developers.feedly.com/reference/articlejson for details.
+        Duplicates are detected by the alert_key, the hash of the canonical publication_source_url.
+        See models.alert_key for details.
         
         Args:
             alert (dict): The alert data to be added.
         
         Returns:
-            The identifier of the inserted alert, generated by the db,
-            or None if the alert already exists.
-        """
-        # ToDo: Find a better way to test this etc.
-        is_duplicate: bool = self._check_if_source_url_present(alert.publication_source_url)
-        if not is_duplicate:
-            alert_dict = alert.to_dict(without_id=True) # Exclude the id field, so it is auto-generated by the db.  # paritionkey should be 'aggregatorPlatformName' and id should be 'contentPublicationUrl'
-            cosmos_item = self.container.create_item( # Upon successful creation, the whole item is returned from cosmos by default.
-                body=alert_dict,
-                enable_automatic_id_generation=True 
-            )
+            The identifier (alert key) of the inserted alert, or None if the alert already exists.
+        """
+        inserted_ids = self.add_alerts_if_not_duplicate([alert])
+        return inserted_ids[0] if inserted_ids else None
+
+    def add_alerts_if_not_duplicate(self, alerts: list[AlertDocument]) -> list:
+        """
+        Adds a batch of alerts to the container, skipping any whose alert_key is already
+        present, either in the db or earlier in the same batch.
+
+        The duplicate check for the whole batch is done up front, with _find_present_alert_keys
+        in the 'query' storage mode, or a point read per alert in the 'point_read' mode, so
+        only the misses cost a write.
+
+        Args:
+            alerts (list[AlertDocument]): The alerts to be added, typically one fetch batch.
+
+        Returns:
+            The identifiers (alert keys) of the inserted alerts, in the order of the input.
+        """
+        alerts_by_key: dict[str, AlertDocument] = {}
+        for alert in alerts:
+            alerts_by_key.setdefault(alert.alert_key, alert) # Keep the first of any repeats, e.g. the same article in two streams.
+        unique_alerts: list[AlertDocument] = list(alerts_by_key.values())
+        if self.storage_mode == "point_read":
+            present_keys = {alert.alert_key for alert in unique_alerts if self._is_present(alert)}
+        else:
+            present_keys = self._find_present_alert_keys(unique_alerts)
+        return self.add_alerts([alert for alert in unique_alerts if alert.alert_key not in present_keys])
+
+    def add_alerts(self, alerts: list[AlertDocument]) -> list:
+        """
+        Adds alerts already known not to be in the container, e.g. by a seen-url cache,
+        without querying for duplicates first. The item id is the alert_key, so an alert
+        that is in the container after all is rejected by Cosmos, and skipped.
+
+        Returns:
+            The identifiers (alert keys) of the inserted alerts, in the order of the input.
+        """
+        inserted_ids: list = []
+        for alert in alerts:
+            try:
+                cosmos_item = self.container.create_item(
+                    body={**alert.to_dict(without_id=True), "id": alert.alert_key},
+                    response_hook=self._request_charge_hook("create_alert")
+                )
+            except exceptions.CosmosResourceExistsError as e: # Conflicts are charged too.
+                self._record_request_charge("create_alert", getattr(e, "headers", None))
+                logging.debug("Alert %s is already present in the database.", alert.alert_key)
+                continue
             if cosmos_item:
-                return cosmos_item['id']
-        return None
+                inserted_ids.append(cosmos_item['id'])
+        return inserted_ids
+
+    def iter_alert_keys(self) -> Iterator[str]:
+        """
+        Yields the alert_key of every alert in the container, projecting only the key fields.
+        Alerts stored before alert keys were introduced have their key derived from their url.
+        """
+        if self.storage_mode == "point_read": # Every id is an alert key.
+            yield from self.container.query_items(
+                query="SELECT VALUE c.id FROM c",
+                enable_cross_partition_query=True,
+                response_hook=self._request_charge_hook("iter_alert_keys")
+            )
+            return
+        for item in self.container.query_items(
+            query="SELECT c.alert_key, c.publication_source_url FROM c",
+            enable_cross_partition_query=True,
+            response_hook=self._request_charge_hook("iter_alert_keys")
+        ):
+            yield item.get("alert_key") or derive_alert_key(item["publication_source_url"])
+
+    def _partition_key_value(self, item: dict):
+        """Returns the value of the container's partition key in the item, e.g. item['aggregator_platform'] for '/aggregator_platform'."""
+        value = item
+        for name in self.container_partition_key.strip("/").split("/"):
+            value = value.get(name) if isinstance(value, dict) else None
+        return value
+
+    def claim_alerts_for_summarization(self, batch_size: int, claim_timeout_seconds: float) -> list[dict]:
+        """
+        Claims a batch of alerts for summarization: up to batch_size claimable alerts are read with one
+        query, and each is moved to IN_PROGRESS with a patch conditional on its etag, so an alert that a
+        concurrent worker claimed in between fails with 412 Precondition Failed, and is skipped.
+        """
+        now = time.time()
+        candidates = self.container.query_items(
+            query=(
+                "SELECT TOP @batch_size * FROM c WHERE c.summary_data.status = @not_started "
+                "OR (c.summary_data.status = @in_progress AND c.summary_data.claimed_at < @stale_before)"
+            ),
+            parameters=[
+                {"name": "@batch_size", "value": batch_size},
+                {"name": "@not_started", "value": SummarizationStatus.NOT_STARTED.value},
+                {"name": "@in_progress", "value": SummarizationStatus.IN_PROGRESS.value},
+                {"name": "@stale_before", "value": now - claim_timeout_seconds},
+            ],
+            enable_cross_partition_query=True,
+            response_hook=self._request_charge_hook("query_summarization_candidates")
+        )
+        claimed: list[dict] = []
+        for item in candidates:
+            try:
+                claimed.append(self.container.patch_item(
+                    item=item["id"],
+                    partition_key=self._partition_key_value(item),
+                    patch_operations=[
+                        {"op": "set", "path": "/summary_data/status", "value": SummarizationStatus.IN_PROGRESS.value},
+                        {"op": "set", "path": "/summary_data/claimed_at", "value": now},
+                    ],
+                    etag=item["_etag"],
+                    match_condition=MatchConditions.IfNotModified,
+                    response_hook=self._request_charge_hook("claim_alert")
+                ))
+            except exceptions.CosmosAccessConditionFailedError: # Claimed by another worker.
+                continue
+        return claimed
+
+    def update_alert_fields(self, document: dict, fields: dict):
+        self.container.patch_item(
+            item=document["id"],
+            partition_key=self._partition_key_value(document),
+            patch_operations=[{"op": "set", "path": "/" + name.replace(".", "/"), "value": value} for name, value in fields.items()],
+            response_hook=self._request_charge_hook("update_alert_fields")
+        )
 
 
 
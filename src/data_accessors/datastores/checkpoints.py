@@ -0,0 +1,123 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from azure.cosmos import CosmosClient, exceptions
+from pymongo import MongoClient
+
+from data_accessors.datastores.abstract import StreamCheckpointsDAO
+from data_accessors.datastores.alerts import CosmosConfig, MongoConfig
+from models.stream_checkpoint import StreamCheckpoint
+
+
+class StreamCheckpointsDAOMongo(StreamCheckpointsDAO):
+    """
+    Data Access Object (DAO) for the fetchers' stream checkpoints, stored in a MongoDB
+    collection alongside the alerts, with one document per stream keyed by the stream ID.
+    """
+
+    def __init__(self, config: MongoConfig, client: MongoClient):
+        self.client = client
+        self.db = self.client[config.alerts_database_id]
+        self.collection = self.db[config.checkpoints_collection_id]
+
+    def get_checkpoint(self, stream_id: str) -> StreamCheckpoint | None:
+        checkpoint_dict = self.collection.find_one({"_id": stream_id}, {"_id": 0})
+        return StreamCheckpoint.from_dict(checkpoint_dict) if checkpoint_dict else None
+
+    def save_checkpoint(self, checkpoint: StreamCheckpoint):
+        self.collection.replace_one({"_id": checkpoint.stream_id}, checkpoint.to_dict(), upsert=True)
+
+
+class StreamCheckpointsDAOCosmos(StreamCheckpointsDAO):
+    """
+    Data Access Object (DAO) for the fetchers' stream checkpoints, stored in a Cosmos DB
+    container alongside the alerts, partitioned on '/id'.
+
+    Stream IDs can contain characters that are not allowed in Cosmos item IDs (e.g. '/'),
+    so the item ID is a hash of the stream ID, and the stream ID is stored as a field.
+    """
+
+    def __init__(self, config: CosmosConfig, client: CosmosClient):
+        self.client = client
+        self.database = self.client.get_database_client(config.alerts_database_id)
+        self.container = self.database.get_container_client(config.checkpoints_container_id)
+
+    @staticmethod
+    def _item_id(stream_id: str) -> str:
+        return hashlib.sha256(stream_id.encode("utf-8")).hexdigest()
+
+    def get_checkpoint(self, stream_id: str) -> StreamCheckpoint | None:
+        item_id = self._item_id(stream_id)
+        try:
+            item = self.container.read_item(item=item_id, partition_key=item_id) # Point read, 1 RU.
+        except exceptions.CosmosResourceNotFoundError:
+            return None
+        return StreamCheckpoint.from_dict(item)
+
+    def save_checkpoint(self, checkpoint: StreamCheckpoint):
+        self.container.upsert_item(body={"id": self._item_id(checkpoint.stream_id), **checkpoint.to_dict()})
+
+
+class StreamCheckpointsDAOFile(StreamCheckpointsDAO):
+    """
+    Stream checkpoints stored in a local JSON file, mapping each stream ID to its checkpoint.
+    Used as the fallback when the database is unavailable, and for running without a database.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+
+    def _read_all(self) -> dict:
+        if not os.path.exists(self.file_path):
+            return {}
+        with open(self.file_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def get_checkpoint(self, stream_id: str) -> StreamCheckpoint | None:
+        with self._lock:
+            checkpoint_dict = self._read_all().get(stream_id)
+        return StreamCheckpoint.from_dict(checkpoint_dict) if checkpoint_dict else None
+
+    def save_checkpoint(self, checkpoint: StreamCheckpoint):
+        with self._lock:
+            checkpoints = self._read_all()
+            checkpoints[checkpoint.stream_id] = checkpoint.to_dict()
+            os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+            temp_path = f"{self.file_path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(checkpoints, file)
+            os.replace(temp_path, self.file_path) # Atomic, so a crash mid-write can't corrupt the checkpoints.
+
+
+class StreamCheckpointsDAOWithFallback(StreamCheckpointsDAO):
+    """
+    Stream checkpoints stored in the database, with a local file as the fallback.
+
+    Every checkpoint is also written to the fallback, so that when the database cannot be
+    reached the last known position of each stream is still available locally. Database
+    errors are logged rather than raised, as losing a checkpoint only costs re-fetching.
+    """
+
+    def __init__(self, primary: StreamCheckpointsDAO, fallback: StreamCheckpointsDAO):
+        self.primary = primary
+        self.fallback = fallback
+
+    def get_checkpoint(self, stream_id: str) -> StreamCheckpoint | None:
+        try:
+            checkpoint = self.primary.get_checkpoint(stream_id)
+            if checkpoint is not None:
+                return checkpoint
+        except Exception as e:
+            logging.warning('Failed to read the checkpoint of stream "%s" from the database, using the local fallback: %s', stream_id, e)
+        return self.fallback.get_checkpoint(stream_id)
+
+    def save_checkpoint(self, checkpoint: StreamCheckpoint):
+        self.fallback.save_checkpoint(checkpoint)
+        try:
+            self.primary.save_checkpoint(checkpoint)
+        except Exception as e:
+            logging.warning('Failed to save the checkpoint of stream "%s" to the database, saved to the local fallback only: %s', checkpoint.stream_id, e)
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from azure.cosmos import CosmosClient, exceptions
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from data_accessors.datastores.abstract import IndicatorIndexDAO
+from data_accessors.datastores.alerts import CosmosConfig, MongoConfig
+from models.alerts_table_document import AlertDocument
+from telemetry import metrics
+
+
+def group_alert_keys_by_indicator(alerts: list[AlertDocument]) -> dict[str, tuple[str, list[str]]]:
+    """Returns each indicator of the alerts, mapped to its type and the alert_key of every alert mentioning it."""
+    grouped: dict[str, tuple[str, list[str]]] = {}
+    for alert in alerts:
+        if alert.indicators is None: # Not extracted.
+            continue
+        for indicator_type, value in alert.indicators.items():
+            alert_keys = grouped.setdefault(value, (indicator_type, []))[1]
+            if alert.alert_key not in alert_keys:
+                alert_keys.append(alert.alert_key)
+    return grouped
+
+
+class IndicatorIndexDAOMongo(IndicatorIndexDAO):
+    """
+    Data Access Object (DAO) for the reverse index of indicators to alerts, stored in a MongoDB
+    collection alongside the alerts, with one document per indicator, keyed by the normalized
+    indicator as '_id', holding its type and the alert_key of every alert mentioning it.
+    """
+
+    def __init__(self, config: MongoConfig, client: MongoClient):
+        self.client = client
+        self.db = self.client[config.alerts_database_id]
+        self.collection = self.db[config.indicator_index_collection_id]
+
+    def add_alerts_indicators(self, alerts: list[AlertDocument]) -> int:
+        """
+        Adds the alerts to the index with one unordered bulk write of upserts, one per distinct indicator,
+        each adding the keys of its alerts with $addToSet, so re-indexing an alert leaves its entries as they are.
+        """
+        grouped = group_alert_keys_by_indicator(alerts)
+        if not grouped:
+            return 0
+        operations = [
+            UpdateOne(
+                {"_id": value},
+                {"$setOnInsert": {"type": indicator_type}, "$addToSet": {"alert_keys": {"$each": alert_keys}}},
+                upsert=True
+            )
+            for value, (indicator_type, alert_keys) in grouped.items()
+        ]
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Two concurrent upserts of the same new indicator, the loser fails with a duplicate key error,
+            # and is retried now that the document exists, so becomes a plain update.
+            failed_indexes = [error["index"] for error in e.details.get("writeErrors", [])]
+            if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+                raise e
+            self.collection.bulk_write([operations[index] for index in failed_indexes], ordered=False)
+        return len(grouped)
+
+    def find_alert_keys(self, indicator: str) -> list[str]:
+        document = self.collection.find_one({"_id": indicator}, {"alert_keys": 1})
+        return document["alert_keys"] if document else []
+
+
+class IndicatorIndexDAOCosmos(IndicatorIndexDAO):
+    """
+    Data Access Object (DAO) for the reverse index of indicators to alerts, stored in a Cosmos DB
+    container alongside the alerts, partitioned on '/id', with one item per indicator.
+
+    Indicators (e.g. urls) can contain characters that are not allowed in Cosmos item IDs, so the
+    item ID is a hash of the normalized indicator, which is stored as a field, and looking up the
+    alerts of an indicator is a point read.
+
+    Alerts are added to an entry with a patch that appends their keys, conditional on none of them
+    being there already, so an entry is written in one request, however big it has grown.
+    """
+    # ToDo: Split the entries of ubiquitous indicators (e.g. 'microsoft.com') before they reach the 2MB item size limit.
+    # Max number of operations in a Cosmos patch.
+    PATCH_OPERATIONS_LIMIT = 10
+
+    def __init__(self, config: CosmosConfig, client: CosmosClient, max_concurrency: int = 8):
+        """
+        Args:
+            config (CosmosConfig): Configuration of the Cosmos DB account.
+            client (CosmosClient): Client of the Cosmos DB account.
+            max_concurrency (int): Maximum number of index entries written concurrently.
+        """
+        self.client = client
+        self.database = self.client.get_database_client(config.alerts_database_id)
+        self.container = self.database.get_container_client(config.indicator_index_container_id)
+        self.max_concurrency = max_concurrency
+
+    @staticmethod
+    def _item_id(indicator: str) -> str:
+        return hashlib.sha256(indicator.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _request_charge_hook(operation: str) -> Callable:
+        """Returns a Cosmos response_hook that records the request units (RUs) of every response."""
+        def record_request_charge(headers, _result):
+            metrics.increment("cosmos.requests", operation=operation)
+            metrics.increment("cosmos.request_charge", float((headers or {}).get("x-ms-request-charge", 0)), operation=operation)
+        return record_request_charge
+
+    def add_alerts_indicators(self, alerts: list[AlertDocument]) -> int:
+        grouped = group_alert_keys_by_indicator(alerts)
+        if not grouped:
+            return 0
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            # Consumed so that the first error, if any, is raised.
+            list(executor.map(lambda entry: self._add_indicator(entry[0], *entry[1]), grouped.items()))
+        return len(grouped)
+
+    def _add_indicator(self, indicator: str, indicator_type: str, alert_keys: list[str]):
+        item_id = self._item_id(indicator)
+        while alert_keys:
+            chunk = alert_keys[:self.PATCH_OPERATIONS_LIMIT]
+            try:
+                self.container.patch_item(
+                    item=item_id,
+                    partition_key=item_id,
+                    patch_operations=[{"op": "add", "path": "/alert_keys/-", "value": alert_key} for alert_key in chunk],
+                    filter_predicate="FROM c WHERE " + " AND ".join(
+                        f"NOT ARRAY_CONTAINS(c.alert_keys, {json.dumps(alert_key)})" for alert_key in chunk
+                    ),
+                    response_hook=self._request_charge_hook("patch_indicator")
+                )
+            except exceptions.CosmosResourceNotFoundError: # First alert mentioning the indicator.
+                try:
+                    self.container.create_item(
+                        body={"id": item_id, "value": indicator, "type": indicator_type, "alert_keys": alert_keys},
+                        response_hook=self._request_charge_hook("create_indicator")
+                    )
+                    return
+                except exceptions.CosmosResourceExistsError: # Created concurrently by another writer, patch it instead.
+                    continue
+            except exceptions.CosmosAccessConditionFailedError:
+                # Some of the alerts are already indexed, e.g. by a retried run, so only add the others.
+                item = self.container.read_item(item=item_id, partition_key=item_id, response_hook=self._request_charge_hook("read_indicator"))
+                indexed_keys = set(item.get("alert_keys", []))
+                logging.debug("Indicator %s already lists %d of the alerts being indexed.", indicator, len(indexed_keys.intersection(alert_keys)))
+                alert_keys = [alert_key for alert_key in alert_keys if alert_key not in indexed_keys]
+                continue
+            alert_keys = alert_keys[self.PATCH_OPERATIONS_LIMIT:]
+
+    def find_alert_keys(self, indicator: str) -> list[str]:
+        item_id = self._item_id(indicator)
+        try:
+            item = self.container.read_item(item=item_id, partition_key=item_id, response_hook=self._request_charge_hook("read_indicator")) # Point read, 1 RU.
+        except exceptions.CosmosResourceNotFoundError:
+            return []
+        return item.get("alert_keys", [])
@@ -0,0 +1,103 @@
+import datetime
+from typing import Callable
+
+from azure.cosmos import CosmosClient, exceptions
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from data_accessors.datastores.abstract import NearDuplicateIndexDAO
+from data_accessors.datastores.alerts import CosmosConfig, MongoConfig
+from models.near_duplicate_entry import NearDuplicateEntry
+from telemetry import metrics
+
+
+class NearDuplicateIndexDAOMongo(NearDuplicateIndexDAO):
+    """
+    Data Access Object (DAO) for the near-duplicate index, stored in a MongoDB collection alongside
+    the alerts, with one document per alert, keyed by its alert_key as '_id'.
+
+    The band keys of the documents are covered by a multikey index, so finding the entries of a
+    page's buckets is one indexed query, however many alerts are indexed. Documents are removed
+    by a TTL index once they expire.
+    """
+
+    def __init__(self, config: MongoConfig, client: MongoClient):
+        self.client = client
+        self.db = self.client[config.alerts_database_id]
+        self.collection = self.db[config.near_duplicate_index_collection_id]
+        self.collection.create_index("band_keys")
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def find_candidates(self, band_keys: list[str], limit: int) -> list[NearDuplicateEntry]:
+        if not band_keys:
+            return []
+        documents = self.collection.find({"band_keys": {"$in": band_keys}}, {"_id": 0, "expires_at": 0}).limit(limit)
+        return [NearDuplicateEntry.from_dict(document) for document in documents]
+
+    def add_entries(self, entries: list[NearDuplicateEntry], retention_seconds: int) -> list[str]:
+        """Adds the entries with one unordered bulk write of upserts keyed on their alert_key, which leave indexed alerts as they are."""
+        if not entries:
+            return []
+        expires_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=retention_seconds)
+        operations = [
+            UpdateOne({"_id": entry.alert_key}, {"$setOnInsert": {**entry.to_dict(), "expires_at": expires_at}}, upsert=True)
+            for entry in entries
+        ]
+        try:
+            upserted_ids = self.collection.bulk_write(operations, ordered=False).upserted_ids
+        except BulkWriteError as e: # Indexed concurrently by another run.
+            if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+                raise e
+            upserted_ids = {upsert["index"]: upsert["_id"] for upsert in e.details.get("upserted", [])}
+        return [upserted_ids[index] for index in sorted(upserted_ids)]
+
+
+class NearDuplicateIndexDAOCosmos(NearDuplicateIndexDAO):
+    """
+    Data Access Object (DAO) for the near-duplicate index, stored in a Cosmos DB container alongside
+    the alerts, partitioned on '/id', with one item per alert, its alert_key as item id.
+
+    The entries of a page's buckets are found with one query, served by the range index on the
+    band keys, and items are removed by Cosmos once their 'ttl' has passed, which requires the
+    container to have TTL turned on (a default TTL of -1), see infra/main.bicep.
+    """
+
+    def __init__(self, config: CosmosConfig, client: CosmosClient):
+        self.client = client
+        self.database = self.client.get_database_client(config.alerts_database_id)
+        self.container = self.database.get_container_client(config.near_duplicate_index_container_id)
+
+    @staticmethod
+    def _request_charge_hook(operation: str) -> Callable:
+        """Returns a Cosmos response_hook that records the request units (RUs) of every response."""
+        def record_request_charge(headers, _result):
+            metrics.increment("cosmos.requests", operation=operation)
+            metrics.increment("cosmos.request_charge", float((headers or {}).get("x-ms-request-charge", 0)), operation=operation)
+        return record_request_charge
+
+    def find_candidates(self, band_keys: list[str], limit: int) -> list[NearDuplicateEntry]:
+        if not band_keys:
+            return []
+        items = self.container.query_items(
+            query=(
+                "SELECT TOP @limit c.alert_key, c.cluster_id, c.signature, c.band_keys, c.indexed_at FROM c "
+                "WHERE EXISTS(SELECT VALUE b FROM b IN c.band_keys WHERE ARRAY_CONTAINS(@band_keys, b))"
+            ),
+            parameters=[{"name": "@limit", "value": limit}, {"name": "@band_keys", "value": band_keys}],
+            enable_cross_partition_query=True,
+            response_hook=self._request_charge_hook("query_near_duplicate_candidates")
+        )
+        return [NearDuplicateEntry.from_dict(item) for item in items]
+
+    def add_entries(self, entries: list[NearDuplicateEntry], retention_seconds: int) -> list[str]:
+        added_keys: list[str] = []
+        for entry in entries:
+            try:
+                self.container.create_item(
+                    body={"id": entry.alert_key, **entry.to_dict(), "ttl": retention_seconds},
+                    response_hook=self._request_charge_hook("create_near_duplicate_entry")
+                )
+            except exceptions.CosmosResourceExistsError: # Indexed concurrently by another run.
+                continue
+            added_keys.append(entry.alert_key)
+        return added_keys
@@ -0,0 +1,267 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from itertools import groupby
+from typing import Callable, Literal
+
+from pydantic import confloat, conint
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from data_accessors.datastores.abstract import ProcessingQueueProducer
+from models.alerts_table_document import AlertDocument
+from models.processing_queue_message import ProcessingQueueMessage
+from telemetry import metrics
+
+try: # Optional: only the 'azure' backend needs it, so local runs and tests don't.
+    from azure.storage.queue import QueueClient, TextBase64EncodePolicy
+except ImportError: # pragma: no cover
+    QueueClient = None
+    TextBase64EncodePolicy = None
+
+
+class ProcessingQueueConfig(BaseSettings):
+    """
+    Configuration of the processing queue, which feeds newly ingested alerts to the processors.
+
+    Attributes:
+        model_config (SettingsConfigDict): Environment variable format for the configuration.
+        backend (str): 'azure' for an Azure Storage Queue, 'file' for a local JSON lines file,
+            or 'memory' for an in-process queue. Defaults to 'file' when IS_LOCAL, 'azure' otherwise.
+        account_name (str): The storage account of the Azure Storage Queue. Required by the 'azure' backend.
+        queue_name (str): The name of the Azure Storage Queue.
+        file_path (str): The file of the 'file' backend.
+        batch_size (int): Maximum number of alerts referenced by one message.
+        max_message_bytes (int): Maximum size of a serialized message. Messages are base64 encoded on
+            Azure Storage Queues, which take at most 64 KiB, so 48 KiB before encoding.
+        max_depth (int): Number of waiting messages above which the producer stops sending,
+            until the processors have caught up.
+        backpressure_poll_seconds (float): How often the depth of a full queue is read again.
+        backpressure_timeout_seconds (float): How long the producer waits for a full queue to drain before giving up.
+    """
+    model_config: SettingsConfigDict = SettingsConfigDict(env_prefix="PROCESSING_QUEUE_")
+    backend: Literal["azure", "file", "memory"] | None = None # Set in post_init, unless set in the environment.
+    account_name: str = ''
+    queue_name: str = "alert-processing"
+    file_path: str = os.path.join(tempfile.gettempdir(), 'processing_queue.jsonl')
+    batch_size: conint(ge=1) = 100
+    max_message_bytes: conint(ge=256) = 48 * 1024
+    max_depth: conint(ge=1) = 10_000
+    backpressure_poll_seconds: confloat(gt=0) = 5.0
+    backpressure_timeout_seconds: confloat(ge=0) = 120.0
+
+    def model_post_init(self, __context):
+        if self.backend is None:
+            self.backend = "file" if os.getenv("IS_LOCAL") == "True" else "azure"
+
+    @property
+    def account_url(self) -> str:
+        return f"https://{self.account_name}.queue.core.windows.net"
+
+
+class ProcessingQueueProducerAzure(ProcessingQueueProducer):
+    """
+    Producer for an Azure Storage Queue. Messages are base64 encoded, as expected by
+    Azure Functions queue triggers.
+    """
+
+    def __init__(self, config: ProcessingQueueConfig, credential):
+        if not config.account_name:
+            raise ValueError("The 'azure' processing queue backend requires the storage account of the queue, PROCESSING_QUEUE_ACCOUNT_NAME.")
+        if QueueClient is None:
+            raise ImportError("The 'azure' processing queue backend requires the 'azure-storage-queue' package.")
+        self.client = QueueClient(
+            account_url=config.account_url,
+            queue_name=config.queue_name,
+            credential=credential,
+            message_encode_policy=TextBase64EncodePolicy()
+        )
+
+    def send_message(self, content: str):
+        self.client.send_message(content)
+
+    def get_depth(self) -> int:
+        return self.client.get_queue_properties().approximate_message_count
+
+
+class ProcessingQueueProducerMemory(ProcessingQueueProducer):
+    """
+    In-process stand-in for the processing queue, for local runs and tests. The messages can
+    be read back with receive_messages().
+    """
+
+    def __init__(self):
+        self._messages: deque[str] = deque()
+        self._lock = threading.Lock()
+
+    def send_message(self, content: str):
+        with self._lock:
+            self._messages.append(content)
+
+    def get_depth(self) -> int:
+        with self._lock:
+            return len(self._messages)
+
+    def receive_messages(self, max_messages: int = 32) -> list[ProcessingQueueMessage]:
+        """Removes and returns up to max_messages messages, oldest first."""
+        with self._lock:
+            contents = [self._messages.popleft() for _ in range(min(max_messages, len(self._messages)))]
+        return [ProcessingQueueMessage.from_json(content) for content in contents]
+
+
+class ProcessingQueueProducerFile(ProcessingQueueProducer):
+    """
+    Local-file stand-in for the processing queue, for running without Azure: each message is
+    appended to a JSON lines file, and can be read back with receive_messages().
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+
+    def _read_lines(self) -> list[str]:
+        if not os.path.exists(self.file_path):
+            return []
+        with open(self.file_path, 'r', encoding='utf-8') as file:
+            return [line for line in file.read().splitlines() if line]
+
+    def send_message(self, content: str):
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+            with open(self.file_path, 'a', encoding='utf-8') as file:
+                file.write(content + "\n")
+
+    def get_depth(self) -> int:
+        with self._lock:
+            return len(self._read_lines())
+
+    def receive_messages(self, max_messages: int = 32) -> list[ProcessingQueueMessage]:
+        """Removes and returns up to max_messages messages, oldest first."""
+        with self._lock:
+            lines = self._read_lines()
+            temp_path = f"{self.file_path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                file.writelines(line + "\n" for line in lines[max_messages:])
+            os.replace(temp_path, self.file_path)
+        return [ProcessingQueueMessage.from_json(line) for line in lines[:max_messages]]
+
+
+def create_processing_queue_producer(config: ProcessingQueueConfig, credential=None) -> ProcessingQueueProducer:
+    """
+    Returns the producer of the configured backend.
+
+    Args:
+        config (ProcessingQueueConfig): The configuration of the queue.
+        credential: The Azure credential of the 'azure' backend, e.g. from config_managers.credentials.get_credential().
+    """
+    if config.backend == "azure":
+        return ProcessingQueueProducerAzure(config, credential)
+    if config.backend == "file":
+        return ProcessingQueueProducerFile(config.file_path)
+    return ProcessingQueueProducerMemory()
+
+
+class ProcessingQueuePublisher:
+    """
+    Publishes newly ingested alerts to the processing queue, as compact ProcessingQueueMessages
+    that reference up to batch_size alerts of one platform, and no more than max_message_bytes.
+
+    Applies backpressure: once the queue holds max_depth messages, publishing waits for the
+    processors to drain it, polling its depth every backpressure_poll_seconds. The depth is
+    only read again when the count of messages sent since it was last read could have taken
+    the queue over max_depth, rather than before every message.
+
+    One publisher can be shared by concurrent ingestion runs: its lock only guards the estimated
+    depth, so a run waiting for the queue to drain doesn't hold up the others' sends.
+    """
+
+    def __init__(
+            self,
+            producer: ProcessingQueueProducer,
+            config: ProcessingQueueConfig | None = None,
+            sleep: Callable[[float], None] = time.sleep,
+            clock: Callable[[], float] = time.monotonic
+        ):
+        """
+        Args:
+            producer (ProcessingQueueProducer): The queue to send the messages to.
+            config (ProcessingQueueConfig | None): Batching and backpressure settings. Defaults to the environment's.
+            sleep (Callable[[float], None]): Waits for the given number of seconds, replaceable for tests.
+            clock (Callable[[], float]): Source of the current time in seconds, replaceable for tests.
+        """
+        self.producer = producer
+        self.config = config or ProcessingQueueConfig()
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._estimated_depth: int | None = None
+
+    def _batches(self, aggregator_platform: str, alert_keys: list[str]) -> list[ProcessingQueueMessage]:
+        """Splits the alert keys into messages of at most batch_size keys and max_message_bytes."""
+        empty_size = len(ProcessingQueueMessage(aggregator_platform, []).to_json())
+        messages: list[ProcessingQueueMessage] = []
+        batch: list[str] = []
+        batch_size = empty_size
+        for alert_key in alert_keys:
+            key_size = len(json.dumps(alert_key)) + 1 # With its separator.
+            if batch and (len(batch) >= self.config.batch_size or batch_size + key_size > self.config.max_message_bytes):
+                messages.append(ProcessingQueueMessage(aggregator_platform, batch))
+                batch, batch_size = [], empty_size
+            batch.append(alert_key)
+            batch_size += key_size
+        if batch:
+            messages.append(ProcessingQueueMessage(aggregator_platform, batch))
+        return messages
+
+    def _wait_for_capacity(self):
+        """
+        Returns once the queue has room for another message, counting the message in the estimated depth.
+        The queue is waited on without holding the lock.
+
+        Raises:
+            TimeoutError: If the queue was still full after backpressure_timeout_seconds.
+        """
+        with self._lock:
+            if self._estimated_depth is not None and self._estimated_depth < self.config.max_depth:
+                self._estimated_depth += 1
+                return
+        started_at = self._clock()
+        depth = self.producer.get_depth()
+        while depth >= self.config.max_depth:
+            waited = self._clock() - started_at
+            if waited >= self.config.backpressure_timeout_seconds:
+                raise TimeoutError(f"The processing queue still held {depth} messages after waiting {waited:.0f}s for it to drain.")
+            logging.info("The processing queue holds %d messages, waiting for the processors to catch up.", depth)
+            metrics.increment("processing_queue.backpressure_waits")
+            self._sleep(self.config.backpressure_poll_seconds)
+            depth = self.producer.get_depth()
+        with self._lock:
+            self._estimated_depth = depth + 1
+
+    def publish_alerts(self, alerts: list[AlertDocument]) -> int:
+        """
+        Sends messages referencing the alerts, grouped by platform.
+
+        Args:
+            alerts (list[AlertDocument]): The newly ingested alerts.
+
+        Returns:
+            int: The number of messages sent.
+
+        Raises:
+            TimeoutError: If the queue stayed full for longer than backpressure_timeout_seconds.
+        """
+        by_platform = sorted(alerts, key=lambda alert: alert.aggregator_platform.value)
+        sent = 0
+        for platform, platform_alerts in groupby(by_platform, key=lambda alert: alert.aggregator_platform.value):
+            for message in self._batches(platform, [alert.alert_key for alert in platform_alerts]):
+                self._wait_for_capacity()
+                content = message.to_json()
+                self.producer.send_message(content)
+                sent += 1
+                metrics.increment("processing_queue.bytes", len(content))
+        metrics.increment("processing_queue.messages", sent)
+        return sent
@@ -0,0 +1,251 @@
+import hashlib
+import logging
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Iterator
+
+from pydantic import confloat, conint
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from data_accessors.datastores.abstract import AlertsDAO
+from models.alerts_table_document import AlertDocument
+
+
+class SeenUrlCacheConfig(BaseSettings):
+    """
+    Configuration for the seen-url cache in front of the alerts db.
+
+    Attributes:
+        model_config (SettingsConfigDict): Environment variable format for the configuration.
+        lru_size (int): Maximum number of urls kept in the in-memory LRU of the warm instance.
+        bloom_capacity (int): Number of stored urls the Bloom filter is sized for.
+        bloom_error_rate (float): Target false positive rate of the Bloom filter, at capacity.
+        bloom_file_path (str): Where the Bloom filter is persisted between instances.
+        rebuild_interval_seconds (int): How old the Bloom filter can get before it is rebuilt from the db.
+    """
+    model_config: SettingsConfigDict = SettingsConfigDict(env_prefix="SEEN_URL_CACHE_")
+    lru_size: conint(ge=0) = 100_000
+    bloom_capacity: conint(ge=1) = 1_000_000
+    bloom_error_rate: confloat(gt=0, lt=1) = 0.01
+    bloom_file_path: str = os.path.join(tempfile.gettempdir(), 'seen_url_bloom.bin')
+    rebuild_interval_seconds: conint(ge=0) = 24 * 3600
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter of strings.
+
+    Membership tests can return false positives, at roughly the configured error rate once
+    'capacity' items have been added, but never false negatives.
+    """
+    _HEADER = struct.Struct("<QIQd") # size_bits, hash_count, count, built_at
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size_bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.size_bits + 7) // 8)
+        self.count = 0
+        self.built_at = time.time()
+
+    def _positions(self, key: str) -> Iterator[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        for i in range(self.hash_count): # Double hashing, see Kirsch & Mitzenmacher.
+            yield (h1 + i * h2) % self.size_bits
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def save(self, file_path: str):
+        """Writes the filter to file_path, atomically."""
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(self._HEADER.pack(self.size_bits, self.hash_count, self.count, self.built_at))
+            file.write(self.bits)
+        os.replace(temp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path: str) -> "BloomFilter":
+        with open(file_path, "rb") as file:
+            size_bits, hash_count, count, built_at = cls._HEADER.unpack(file.read(cls._HEADER.size))
+            bits = bytearray(file.read())
+        if len(bits) != (size_bits + 7) // 8:
+            raise ValueError(f"Bloom filter file {file_path} is truncated.")
+        bloom_filter = cls.__new__(cls)
+        bloom_filter.size_bits, bloom_filter.hash_count = size_bits, hash_count
+        bloom_filter.bits, bloom_filter.count, bloom_filter.built_at = bits, count, built_at
+        return bloom_filter
+
+
+class SeenUrlCache:
+    """
+    Cache of the urls already stored in the alerts db, tracked by their alert_key, so that all
+    variants of a url (see models.alert_key) are treated as the same url.
+
+    It combines an in-memory LRU of recently seen keys, which survives across invocations on
+    a warm function instance, with a Bloom filter of every stored key, which is persisted to
+    a file and periodically rebuilt from the db. A key in the LRU is definitely stored, a key
+    not in the Bloom filter is definitely new, and anything else is probably stored and has
+    to be checked against the db.
+
+    Keep one instance per process and wrap each run's AlertsDAO with it, see CachedAlertsDAO.
+    """
+
+    def __init__(self, config: SeenUrlCacheConfig | None = None):
+        self.config = config or SeenUrlCacheConfig()
+        self._lru: OrderedDict[str, None] = OrderedDict()
+        self.bloom_filter: BloomFilter | None = None
+        self.lock = threading.Lock()
+        self.stats: dict[str, int] = {
+            "lru_hits": 0, # Known duplicates, skipped without a db call.
+            "bloom_negatives": 0, # Definitely new, inserted without a duplicate check.
+            "bloom_positives": 0, # Probably duplicates, checked against the db.
+            "bloom_false_positives": 0, # Checked against the db, but turned out to be new.
+        }
+
+    def needs_rebuild(self) -> bool:
+        """Returns True if there is no Bloom filter yet, or it is older than the rebuild interval."""
+        if self.bloom_filter is None and os.path.exists(self.config.bloom_file_path):
+            try:
+                self.bloom_filter = BloomFilter.load(self.config.bloom_file_path)
+                logging.info("Loaded the seen-url Bloom filter of %d alert keys from %s.", self.bloom_filter.count, self.config.bloom_file_path)
+            except (OSError, ValueError, struct.error) as e:
+                logging.warning("Failed to load the seen-url Bloom filter, it will be rebuilt: %s", e)
+        if self.bloom_filter is None:
+            return True
+        return time.time() - self.bloom_filter.built_at > self.config.rebuild_interval_seconds
+
+    def rebuild(self, stored_alert_keys: Iterable[str]):
+        """Replaces the Bloom filter with one built from every key in stored_alert_keys, and persists it."""
+        start = time.perf_counter()
+        bloom_filter = BloomFilter(self.config.bloom_capacity, self.config.bloom_error_rate)
+        for alert_key in stored_alert_keys: # Streamed, so the keys are never all in memory at once.
+            bloom_filter.add(alert_key)
+        with self.lock:
+            self.bloom_filter = bloom_filter
+        self.save()
+        logging.info("Rebuilt the seen-url Bloom filter from %d stored alert keys in %.2f seconds.", bloom_filter.count, time.perf_counter() - start)
+        if bloom_filter.count > self.config.bloom_capacity:
+            logging.warning(
+                "The alerts db holds more urls (%d) than the seen-url Bloom filter is sized for (%d), so more urls "
+                "will need a db check. Raise SEEN_URL_CACHE_BLOOM_CAPACITY.", bloom_filter.count, self.config.bloom_capacity
+            )
+
+    def save(self):
+        """Persists the Bloom filter, so new instances start with it."""
+        with self.lock:
+            if self.bloom_filter is not None:
+                self.bloom_filter.save(self.config.bloom_file_path)
+
+    def classify(self, alerts: list[AlertDocument]) -> tuple[list[AlertDocument], list[AlertDocument]]:
+        """
+        Splits alerts into those that are definitely new and those that are probably stored,
+        dropping alerts that are definitely stored, and repeats within the list.
+
+        Returns:
+            tuple[list[AlertDocument], list[AlertDocument]]: The definitely new and the probably stored alerts.
+        """
+        definitely_new: list[AlertDocument] = []
+        probably_stored: list[AlertDocument] = []
+        classified_keys: set[str] = set()
+        with self.lock:
+            for alert in alerts:
+                alert_key = alert.alert_key
+                if alert_key in classified_keys:
+                    continue
+                classified_keys.add(alert_key)
+                if alert_key in self._lru:
+                    self._lru.move_to_end(alert_key)
+                    self.stats["lru_hits"] += 1
+                elif self.bloom_filter is not None and alert_key in self.bloom_filter:
+                    self.stats["bloom_positives"] += 1
+                    probably_stored.append(alert)
+                else:
+                    self.stats["bloom_negatives"] += 1
+                    definitely_new.append(alert)
+        return definitely_new, probably_stored
+
+    def mark_stored(self, alert_keys: Iterable[str]):
+        """Records that the alerts with the given keys are now in the db."""
+        with self.lock:
+            for alert_key in alert_keys:
+                if self.bloom_filter is not None:
+                    self.bloom_filter.add(alert_key)
+                if self.config.lru_size:
+                    self._lru[alert_key] = None
+                    self._lru.move_to_end(alert_key)
+            while len(self._lru) > self.config.lru_size:
+                self._lru.popitem(last=False)
+
+    def get_stats(self) -> dict[str, int]:
+        """Returns the hit/miss counters, to see how many db lookups the cache saved."""
+        with self.lock:
+            return dict(self.stats)
+
+
+class CachedAlertsDAO(AlertsDAO):
+    """
+    AlertsDAO that puts a SeenUrlCache in front of another AlertsDAO, so that only alerts the
+    cache cannot rule in or out cost a duplicate check against the db.
+    """
+
+    def __init__(self, alerts_db: AlertsDAO, seen_url_cache: SeenUrlCache):
+        """
+        Args:
+            alerts_db (AlertsDAO): The DAO of the alerts db to wrap.
+            seen_url_cache (SeenUrlCache): The cache, rebuilt from alerts_db here if it is missing or stale.
+        """
+        self.alerts_db = alerts_db
+        self.seen_url_cache = seen_url_cache
+        if self.seen_url_cache.needs_rebuild():
+            self.seen_url_cache.rebuild(self.alerts_db.iter_alert_keys())
+
+    def add_alert_if_not_duplicate(self, alert: AlertDocument):
+        inserted_ids = self.add_alerts_if_not_duplicate([alert])
+        return inserted_ids[0] if inserted_ids else None
+
+    def add_alerts_if_not_duplicate(self, alerts: list[AlertDocument]) -> list:
+        """
+        Adds the alerts that are not already in the db. Alerts the cache knows are stored are
+        skipped, alerts it knows are new are inserted directly, and the rest are checked
+        against the db by the wrapped DAO.
+
+        Returns:
+            The identifiers of the inserted alerts.
+        """
+        definitely_new, probably_stored = self.seen_url_cache.classify(alerts)
+        inserted_ids: list = []
+        if definitely_new:
+            inserted_ids.extend(self.alerts_db.add_alerts(definitely_new))
+        if probably_stored:
+            verified_new_ids = self.alerts_db.add_alerts_if_not_duplicate(probably_stored)
+            with self.seen_url_cache.lock:
+                self.seen_url_cache.stats["bloom_false_positives"] += len(verified_new_ids)
+            inserted_ids.extend(verified_new_ids)
+        self.seen_url_cache.mark_stored(alert.alert_key for alert in definitely_new + probably_stored)
+        return inserted_ids
+
+    def add_alerts(self, alerts: list[AlertDocument]) -> list:
+        inserted_ids = self.alerts_db.add_alerts(alerts)
+        self.seen_url_cache.mark_stored(alert.alert_key for alert in alerts)
+        return inserted_ids
+
+    def iter_alert_keys(self) -> Iterator[str]:
+        return self.alerts_db.iter_alert_keys()
+
+    def claim_alerts_for_summarization(self, batch_size: int, claim_timeout_seconds: float) -> list[dict]:
+        return self.alerts_db.claim_alerts_for_summarization(batch_size, claim_timeout_seconds)
+
+    def update_alert_fields(self, document: dict, fields: dict):
+        self.alerts_db.update_alert_fields(document, fields)
@@ -0,0 +1,263 @@
+import base64
+import json
+import logging
+from itertools import groupby
+from typing import Callable
+
+from azure.cosmos import CosmosClient, exceptions
+from pymongo import DESCENDING, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from data_accessors.datastores.abstract import TriageStagingDAO
+from data_accessors.datastores.alerts import CosmosConfig, MongoConfig
+from models.triage_table_entity import TriageStagingEntity, TriageStagingFilter, TriageStagingPage
+from telemetry import metrics
+
+
+class TriageStagingDAOMongo(TriageStagingDAO):
+    """
+    Data Access Object (DAO) for the triage portal's staging entities, stored in a MongoDB
+    collection alongside the alerts, with each entity's id (its alert's alert_key) as '_id'.
+
+    Pages are read newest first with keyset pagination over a (timestamp, _id) index: the
+    continuation token holds the sort key of the last entity of the page, and the next page
+    starts just after it, so every page costs the same however deep into the collection it is.
+
+    The version of the collection is kept in a separate '<collection>_meta' collection, so
+    it never shows up in listings.
+    """
+
+    def __init__(self, config: MongoConfig, client: MongoClient):
+        self.client = client
+        self.db = self.client[config.alerts_database_id]
+        self.collection = self.db[config.triage_staging_collection_id]
+        self.meta_collection = self.db[f"{config.triage_staging_collection_id}_meta"]
+        self.collection.create_index([("timestamp", DESCENDING), ("_id", DESCENDING)])
+
+    @staticmethod
+    def _filters_query(filters: TriageStagingFilter | None) -> dict:
+        if filters is None:
+            return {}
+        query = {}
+        if filters.platform is not None:
+            query["aggregatorPlatform"] = filters.platform
+        if filters.tag is not None:
+            query["category"] = filters.tag # Matches any element of the array.
+        if filters.status is not None:
+            query["status"] = filters.status
+        if filters.published_after is not None:
+            query.setdefault("timestamp", {})["$gte"] = filters.published_after
+        if filters.published_before is not None:
+            query.setdefault("timestamp", {})["$lt"] = filters.published_before
+        return query
+
+    @staticmethod
+    def _encode_continuation_token(entity: TriageStagingEntity) -> str:
+        return base64.urlsafe_b64encode(json.dumps([entity.timestamp, entity.id]).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decode_continuation_token(continuation_token: str) -> tuple[str, str]:
+        try:
+            timestamp, entity_id = json.loads(base64.urlsafe_b64decode(continuation_token.encode("ascii")))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid continuation token: {continuation_token}") from e
+        # Anything but strings, e.g. {"$ne": null}, would be read as query operators by the keyset query.
+        if not isinstance(timestamp, str) or not isinstance(entity_id, str):
+            raise ValueError(f"Invalid continuation token: {continuation_token}")
+        return timestamp, entity_id
+
+    def add_staging_entity_if_not_exists(self, triage_staging: TriageStagingEntity):
+        inserted_ids = self.add_staging_entities_if_not_exist([triage_staging])
+        return inserted_ids[0] if inserted_ids else None
+
+    def add_staging_entities_if_not_exist(self, triage_stagings: list[TriageStagingEntity]) -> list[str]:
+        """
+        Adds the entities with one unordered bulk write of upserts keyed on their id, so entities
+        already present (e.g. written by a retried run) are left as they are.
+
+        Returns:
+            list[str]: The ids of the entities that were added.
+        """
+        if not triage_stagings:
+            return []
+        operations = [
+            UpdateOne({"_id": entity.id}, {"$setOnInsert": entity.to_dict()}, upsert=True)
+            for entity in triage_stagings
+        ]
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            upserted_ids = result.upserted_ids
+        except BulkWriteError as e: # Two concurrent upserts of the same id, one of them loses with a duplicate key error.
+            upserted_ids = {upsert["index"]: upsert["_id"] for upsert in e.details.get("upserted", [])}
+            if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+                raise e
+        if upserted_ids:
+            self._increment_version()
+        return [upserted_ids[index] for index in sorted(upserted_ids)]
+
+    def _increment_version(self):
+        self.meta_collection.update_one({"_id": "version"}, {"$inc": {"value": 1}}, upsert=True)
+
+    def get_version(self) -> int:
+        document = self.meta_collection.find_one({"_id": "version"})
+        return document["value"] if document else 0
+
+    def get_staging_entities_page(
+            self,
+            page_size: int,
+            continuation_token: str | None = None,
+            filters: TriageStagingFilter | None = None
+        ) -> TriageStagingPage:
+        query = self._filters_query(filters)
+        if continuation_token:
+            timestamp, entity_id = self._decode_continuation_token(continuation_token)
+            keyset = {"$or": [{"timestamp": {"$lt": timestamp}}, {"timestamp": timestamp, "_id": {"$lt": entity_id}}]}
+            query = {"$and": [query, keyset]} if query else keyset
+        # One extra entity is read to know whether there is a next page.
+        documents = list(
+            self.collection.find(query)
+            .sort([("timestamp", DESCENDING), ("_id", DESCENDING)])
+            .limit(page_size + 1)
+        )
+        entities = [TriageStagingEntity.from_dict(document) for document in documents[:page_size]]
+        next_token = self._encode_continuation_token(entities[-1]) if len(documents) > page_size else None
+        return TriageStagingPage(entities=entities, continuation_token=next_token)
+
+
+class TriageStagingDAOCosmos(TriageStagingDAO):
+    """
+    Data Access Object (DAO) for the triage portal's staging entities, stored in a Cosmos DB
+    container alongside the alerts, partitioned on '/aggregatorPlatform', with each entity's
+    id (its alert's alert_key) as item id.
+
+    Entities are written in bulk with one transactional batch per platform and up to
+    BATCH_SIZE entities. Pages are read newest first with 'ORDER BY c.timestamp DESC', which
+    is served by the container's range index on timestamp, and Cosmos's own continuation tokens.
+
+    The version of the container is kept in an item of its own partition, META_PARTITION,
+    which listings exclude.
+    """
+    # Max number of operations in a Cosmos transactional batch.
+    BATCH_SIZE = 100
+    META_PARTITION = "_meta"
+    VERSION_ITEM_ID = "version"
+
+    def __init__(self, config: CosmosConfig, client: CosmosClient):
+        self.client = client
+        self.database = self.client.get_database_client(config.alerts_database_id)
+        self.container = self.database.get_container_client(config.triage_staging_container_id)
+
+    @staticmethod
+    def _request_charge_hook(operation: str) -> Callable:
+        """Returns a Cosmos response_hook that records the request units (RUs) of every response."""
+        def record_request_charge(headers, _result):
+            metrics.increment("cosmos.requests", operation=operation)
+            metrics.increment("cosmos.request_charge", float((headers or {}).get("x-ms-request-charge", 0)), operation=operation)
+        return record_request_charge
+
+    def add_staging_entity_if_not_exists(self, triage_staging: TriageStagingEntity):
+        if not self._create_staging_entity(triage_staging):
+            return None
+        self._increment_version()
+        return triage_staging.id
+
+    def _create_staging_entity(self, triage_staging: TriageStagingEntity) -> bool:
+        """Creates the entity, and returns False if it was already present."""
+        try:
+            self.container.create_item(body=triage_staging.to_dict(), response_hook=self._request_charge_hook("create_staging_entity"))
+        except exceptions.CosmosResourceExistsError: # Already staged, e.g. by a retried run.
+            return False
+        return True
+
+    def _increment_version(self):
+        try:
+            self.container.patch_item(
+                item=self.VERSION_ITEM_ID,
+                partition_key=self.META_PARTITION,
+                patch_operations=[{"op": "incr", "path": "/value", "value": 1}],
+                response_hook=self._request_charge_hook("increment_staging_version")
+            )
+        except exceptions.CosmosResourceNotFoundError: # First write to the container.
+            try:
+                self.container.create_item(body={"id": self.VERSION_ITEM_ID, "aggregatorPlatform": self.META_PARTITION, "value": 1})
+            except exceptions.CosmosResourceExistsError: # Created concurrently by another writer.
+                self._increment_version()
+
+    def get_version(self) -> int:
+        try:
+            item = self.container.read_item(
+                item=self.VERSION_ITEM_ID,
+                partition_key=self.META_PARTITION,
+                response_hook=self._request_charge_hook("read_staging_version")
+            ) # Point read, 1 RU.
+        except exceptions.CosmosResourceNotFoundError:
+            return 0
+        return item["value"]
+
+    def add_staging_entities_if_not_exist(self, triage_stagings: list[TriageStagingEntity]) -> list[str]:
+        """
+        Adds the entities with a transactional batch of creates per platform and BATCH_SIZE entities.
+        A batch fails as a whole if any of its entities is already present, in which case its
+        entities are created one by one, skipping those that are present.
+
+        Returns:
+            list[str]: The ids of the entities that were added.
+        """
+        inserted_ids: list[str] = []
+        by_platform = sorted(triage_stagings, key=lambda entity: entity.aggregatorPlatform)
+        for platform, platform_entities in groupby(by_platform, key=lambda entity: entity.aggregatorPlatform):
+            platform_entities = list(platform_entities)
+            for start in range(0, len(platform_entities), self.BATCH_SIZE):
+                batch = platform_entities[start:start + self.BATCH_SIZE]
+                try:
+                    self.container.execute_item_batch(
+                        batch_operations=[("create", (entity.to_dict(),)) for entity in batch],
+                        partition_key=platform,
+                        response_hook=self._request_charge_hook("batch_create_staging_entities")
+                    )
+                    inserted_ids.extend(entity.id for entity in batch)
+                except exceptions.CosmosBatchOperationError as e:
+                    logging.info("Batch of %d staging entities failed (%s), adding them one by one.", len(batch), e.status_code)
+                    for entity in batch:
+                        if self._create_staging_entity(entity):
+                            inserted_ids.append(entity.id)
+        if inserted_ids:
+            self._increment_version()
+        return inserted_ids
+
+    def get_staging_entities_page(
+            self,
+            page_size: int,
+            continuation_token: str | None = None,
+            filters: TriageStagingFilter | None = None
+        ) -> TriageStagingPage:
+        conditions = ["c.aggregatorPlatform != @meta_partition"]
+        parameters = [{"name": "@meta_partition", "value": self.META_PARTITION}]
+        filters = filters or TriageStagingFilter()
+        for value, condition, name in [
+            (filters.platform, "c.aggregatorPlatform = @platform", "@platform"),
+            (filters.tag, "ARRAY_CONTAINS(c.category, @tag)", "@tag"),
+            (filters.status, "c.status = @status", "@status"),
+            (filters.published_after, "c.timestamp >= @published_after", "@published_after"),
+            (filters.published_before, "c.timestamp < @published_before", "@published_before"),
+        ]:
+            if value is not None:
+                conditions.append(condition)
+                parameters.append({"name": name, "value": value})
+        pages = self.container.query_items(
+            query=(
+                "SELECT c.id, c.publicationSourceUrl, c.aggregatorPlatform, c.title, c.category, c.timestamp, c.status "
+                f"FROM c WHERE {' AND '.join(conditions)} ORDER BY c.timestamp DESC"
+            ),
+            parameters=parameters,
+            enable_cross_partition_query=True,
+            max_item_count=page_size,
+            response_hook=self._request_charge_hook("query_staging_entities")
+        ).by_page(continuation_token)
+        try:
+            entities = [TriageStagingEntity.from_dict(item) for item in next(pages, [])]
+        except exceptions.CosmosHttpResponseError as e:
+            if continuation_token is not None and e.status_code == 400: # Cosmos refused the continuation token.
+                raise ValueError(f"Invalid continuation token: {continuation_token}") from e
+            raise e
+        return TriageStagingPage(entities=entities, continuation_token=pages.continuation_token)
@@ -1,14 +1,33 @@
+import importlib
 import logging
+from dataclasses import dataclass
 
 from pydantic import BaseModel
 
 from .abstract import DataFetcher
-from .feedly import FeedlyConfig, FeedlyDAO
 
 # ToDo: Do better type-hinting for the data_source_config param etc.
-# ToDo: Add better documentation explaining the purpose of this class,
-# and how it can be used to initialize different fetcher clients in a
-# polymorphic way.
+
+
+@dataclass(frozen=True)
+class FetcherRegistration:
+    """
+    Where the config and DAO classes of a data source are defined, by name, so that the module is
+    only imported when the data source is used.
+
+    Attributes:
+        module: The module defining both classes, e.g. 'data_accessors.fetchers.feedly'.
+        config_class: The name of the pydantic settings class of the data source.
+        dao_class: The name of the DataFetcher subclass of the data source.
+    """
+    module: str
+    config_class: str
+    dao_class: str
+
+    def load(self) -> tuple[type[BaseModel], type[DataFetcher]]:
+        """Imports the module, if it hasn't been yet, and returns the config and DAO classes."""
+        module = importlib.import_module(self.module)
+        return getattr(module, self.config_class), getattr(module, self.dao_class)
 
 
 class FetcherFactory:
@@ -16,29 +35,73 @@ class FetcherFactory:
     Factory class to initialize fetcher clients.
 
     Using this factory, you can loop through a configuration list of different
-    data sources and initialize the corresponding fetcher client, dynamically.
-    
+    data sources and initialize the corresponding fetcher client, dynamically,
+    e.g. the ingestion pipeline creates one fetcher for each of the sources
+    named in its IngestionConfig.
+
+    The data sources are registered by module and class names, rather than by
+    class, so each fetcher module (and its dependencies) is only imported once
+    its data source is used, and adding sources doesn't slow down the cold start
+    of the others. The DAO of a config is found with one dict lookup, by the
+    module and name of its class, without importing anything.
+
     Currently supported data sources:
     - Feedly
+    - Recorded Future
     """
     ## Class Variables and Methods ##
-    # Define the mapping of data source types to their configurations and clients
-    CLASS_MAP = {
-        "Feedly": { "config_class": FeedlyConfig, "dao_class": FeedlyDAO },
+    # Define the mapping of data source names to where their configurations and clients are defined.
+    REGISTRY: dict[str, FetcherRegistration] = {
+        "Feedly": FetcherRegistration("data_accessors.fetchers.feedly", "FeedlyConfig", "FeedlyDAO"),
+        "Recorded Future": FetcherRegistration("data_accessors.fetchers.recorded_future", "RecordedFutureConfig", "RecordedFutureDAO"),
         # Add other data sources here
     }
 
+    _SOURCE_BY_CONFIG_CLASS: dict[tuple[str, str], str] = {
+        (registration.module, registration.config_class): source for source, registration in REGISTRY.items()
+    }
+
     allowed_config_types = [
-        class_objects["config_class"] for class_objects in CLASS_MAP.values()
+        f"{registration.module}.{registration.config_class}" for registration in REGISTRY.values()
     ]
 
     @classmethod
-    def create_connection(cls, config_instance: BaseModel) -> DataFetcher:
+    def sources(cls) -> list[str]:
+        """Returns the names of the supported data sources."""
+        return list(cls.REGISTRY)
+
+    @classmethod
+    def source_of_config_class(cls, config_class: type) -> str | None:
+        """Returns the name of the data source configured by config_class, or None if it isn't a fetcher config."""
+        return cls._SOURCE_BY_CONFIG_CLASS.get((config_class.__module__, config_class.__qualname__))
+
+    @classmethod
+    def load_classes(cls, source: str) -> tuple[type[BaseModel], type[DataFetcher]]:
+        """
+        Returns the config and DAO classes of a data source, importing its module on the first call.
+
+        Args:
+            source: The name of the data source, one of sources().
+
+        Returns:
+            tuple[type[BaseModel], type[DataFetcher]]: The config class and the DAO class of the data source.
+
+        Raises:
+            ValueError: If the data source is unknown.
+        """
+        registration = cls.REGISTRY.get(source)
+        if registration is None:
+            raise ValueError(f"Unknown data source: {source!r}. Expected one of the supported data sources: {cls.sources()}")
+        return registration.load()
+
+    @classmethod
+    def create_connection(cls, config_instance: BaseModel, **dao_kwargs) -> DataFetcher:
         """
         Initialize and return the fetcher DAO for the specified data source.
 
         Args:
-            XXXX
+            config_instance: The populated configuration of the data source.
+            **dao_kwargs: Optional dependencies passed through to the fetcher DAO, e.g. a checkpoints store.
 
         Returns:
             object: An instance of the fetcher dao for a particular data source.
@@ -46,13 +109,13 @@ class FetcherFactory:
         Raises:
             ValueError: If the configuration type is unknown.
         """
-        for mapping_dict in cls.CLASS_MAP.values():
-            if type(config_instance) is mapping_dict["config_class"]:
-                dao_class = mapping_dict["dao_class"]
-                dao_instance = dao_class(config_instance)
-                return dao_instance
-        raise ValueError(
-            "Invalid config type. "
-            "Expected one of the supported configurations: "
-            f"{cls.allowed_config_types}"
-        )
\ No newline at end of file
+        source = cls.source_of_config_class(type(config_instance))
+        if source is None:
+            raise ValueError(
+                "Invalid config type. "
+                "Expected one of the supported configurations: "
+                f"{cls.allowed_config_types}"
+            )
+        _config_class, dao_class = cls.load_classes(source)
+        logging.debug("Creating the fetcher of data source %s.", source)
+        return dao_class(config_instance, **dao_kwargs)
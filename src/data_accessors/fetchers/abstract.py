@@ -1,4 +1,7 @@
 from abc import ABC, abstractmethod
+from typing import Iterator
+
+from models.alerts_table_document import AlertDocument
 
 
 class DataFetcher(ABC):
@@ -9,6 +12,11 @@ class DataFetcher(ABC):
     corresponding to the different data sources needing fetching. Each
     of these implementations should conform to the interface defined here
     for ease of interchangeability.
+
+    Implementations should send their requests through the shared
+    HttpTransport (see http_transport.py), rather than calling requests
+    directly, so that all fetchers share connection pooling, retries and
+    rate limiting.
     """
     
     @abstractmethod
@@ -17,4 +25,49 @@ class DataFetcher(ABC):
         Abstract method to fetch data from a data source.
         Must be implemented by subclasses.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def iter_raw_pages(self) -> Iterator[list]:
+        """
+        Yields the alerts of the data source one page at a time, in the source's raw format,
+        so that large fetches can be processed without holding every alert in memory.
+
+        The default implementation yields the whole of fetch_alerts as a single page, already
+        deserialized. Subclasses that fetch page by page should override this, together with
+        deserialize_page.
+        """
+        yield self.fetch_alerts()
+
+    def deserialize_page(self, raw_page: list) -> list[AlertDocument]:
+        """
+        Converts a page yielded by iter_raw_pages into AlertDocument objects.
+        The default implementation returns the page as is.
+        """
+        return raw_page
+
+    def iter_alert_pages(self) -> Iterator[list[AlertDocument]]:
+        """Yields the alerts of the data source one page at a time, as AlertDocument objects."""
+        for raw_page in self.iter_raw_pages():
+            yield self.deserialize_page(raw_page)
+
+    def mark_page_stored(self, raw_page: list):
+        """
+        Marks a page yielded by iter_raw_pages as stored, once its alerts have been persisted
+        (or dropped as duplicates), so that commit_checkpoints can save the progress it made.
+        Pages are marked in the order they were yielded. Pages that were yielded but never
+        marked, e.g. because the run stopped first, are fetched again by the next run.
+
+        Does nothing for data sources that do not support incremental fetches.
+
+        Args:
+            raw_page (list): The page, as yielded by iter_raw_pages.
+        """
+        pass
+
+    def commit_checkpoints(self):
+        """
+        Saves how far the last fetch got through the data source, up to the last page marked
+        stored, so that the next fetch only fetches newer alerts. Does nothing for data sources
+        that do not support incremental fetches.
+        """
+        pass
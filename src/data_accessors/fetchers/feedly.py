@@ -1,15 +1,25 @@
 import logging
 import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Iterator
 
-import requests
-import yaml
-from pydantic import constr, validator
+from pydantic import PrivateAttr, conint, constr, validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from .abstract import DataFetcher
+from .http_transport import HttpTransport
 from config_managers.secrets_manager import SecretsManager
+from config_managers.source_files import file_version, load_yaml
+from data_accessors.datastores.abstract import StreamCheckpointsDAO
 from models.alerts_table_document import AlertDocument, SummarizationInfo, TagsInfo
 from models.enums import AggregatorPlatform
+from models.stream_checkpoint import StreamCheckpoint
+from pipelines.stages import merge_iterators
+from telemetry import metrics
 
 logging.basicConfig(level=logging.INFO)
 
@@ -29,14 +39,20 @@ class FeedlyConfig(BaseSettings):
         feedly_sources (list[dict]): List of dictionaries, each containing a stream ID and the name of the feed associated with it.
         article_count (int): Number of articles to fetch from each stream.
         fetch_all (bool): If True, continue fetching until no more articles are available.
-        hours_ago (int): Unix timestamp to fetch articles newer than this time. None to ignore.
+        hours_ago (int): How far back to fetch articles from a stream that has no checkpoint yet, in hours.
+        max_concurrency (int): Maximum number of streams fetched concurrently. 1 fetches the streams sequentially.
+        checkpoint_file_path (str): Local file the stream checkpoints fall back to when the database is unavailable.
     """
     model_config: SettingsConfigDict = SettingsConfigDict(env_prefix="FEEDLY_")
     article_count: int
     fetch_all: bool
     hours_ago: int
+    max_concurrency: conint(ge=1) = 4
+    checkpoint_file_path: str = os.path.join(tempfile.gettempdir(), 'feedly_stream_checkpoints.json')
     feeds: str = '' # ToDo: Might be better to initialise with '= field(init=False)' rather than empty str, and then set in post_init as I am. Look into this.
     access_token: str = '' # ToDo: Might be better to initialise with '= field(init=False)' rather than empty str, and then set in post_init as I am. Look into this.
+    _sources_path: str = PrivateAttr(default='')
+    _sources_version: tuple[int, int] | None = PrivateAttr(default=None)
 
 
     def model_post_init(self, __context): # Override the default post_init method to load configs from file and secrets.
@@ -54,30 +70,63 @@ class FeedlyConfig(BaseSettings):
             alerts_config_path = os.getenv('ALERTS_CONFIG_PATH', 'alerts_sources.yaml') # Default to file in root of az func folder if not set.
             if not os.path.exists(alerts_config_path):
                 raise FileNotFoundError(f'Configuration file not found at path: {alerts_config_path}')
-            with open(alerts_config_path, 'r') as file:
-                config = yaml.safe_load(file)
+            config, self._sources_version = load_yaml(alerts_config_path) # Only re-parsed when the file has changed.
+            self._sources_path = alerts_config_path
             _validate_source_config(config)
-            self.feeds = config['feedly_sources']
-        def load_feedly_access_token():
-            if os.getenv("IS_LOCAL") == "True":
-                self.access_token = os.getenv("FEEDLY_ACCESS_TOKEN")
-                return
-            self.access_token = SecretsManager().get_secret_value('feedly-access-token')
+            self.feeds = [dict(feed) for feed in config['feedly_sources']] # Copied, as the parsed file is shared.
         load_ingestion_source_config()
-        load_feedly_access_token()
+        self.refresh_access_token()
         
         # use default azure authentication to get the access token from keyvault.
+
+    def is_stale(self) -> bool:
+        """Returns True if the alerts sources file changed, or was removed, since this config was loaded from it."""
+        try:
+            return file_version(self._sources_path) != self._sources_version
+        except FileNotFoundError:
+            return True
+
+    def refresh_access_token(self) -> str:
+        """
+        Reloads the access token, from the secrets manager's cache when deployed, so that a config
+        kept across runs picks up a rotated token once the cached secret expires.
+
+        Returns:
+            str: The access token.
+        """
+        if os.getenv("IS_LOCAL") == "True":
+            self.access_token = os.getenv("FEEDLY_ACCESS_TOKEN")
+        else:
+            self.access_token = SecretsManager().get_secret_value('feedly-access-token')
+        return self.access_token
     
 
 class FeedlyDAO(DataFetcher):
-    """Concrete implementation of DataFetcher to fetch data from Feedly."""
+    """
+    Concrete implementation of DataFetcher to fetch data from Feedly.
+
+    When given a checkpoints store, each stream is fetched incrementally: only articles newer
+    than the newest one fetched by a previous run are requested (Feedly's 'newerThan'), and
+    a window that was not fully paged through is resumed from its continuation. Streams with
+    no checkpoint yet are fetched from 'hours_ago' hours back. The checkpoint of a stream
+    moves forward with each of its pages marked stored, and is only saved by
+    commit_checkpoints(), so a run that stops part way through a stream resumes after its
+    last stored page.
+    """
 
-    def __init__(self, config: FeedlyConfig):
+    def __init__(
+            self,
+            config: FeedlyConfig,
+            transport: HttpTransport | None = None,
+            checkpoints: StreamCheckpointsDAO | None = None
+        ):
         """
         Initialize the FeedlyDAO with necessary parameters.
         
         Args:
             config (FeedlyConfig): Configuration object containing parameters for the Feedly client.
+            transport (HttpTransport | None): HTTP transport to send requests with. Defaults to the shared transport.
+            checkpoints (StreamCheckpointsDAO | None): Store of the per-stream checkpoints. None to fetch from 'hours_ago' on every run.
         
         """
         # Unpack the config object.
@@ -86,6 +135,13 @@ class FeedlyDAO(DataFetcher):
         self.article_count = config.article_count
         self.fetch_all = config.fetch_all
         self.hours_ago = config.hours_ago
+        self.max_concurrency = config.max_concurrency
+        self.transport = transport or HttpTransport.shared()
+        self.checkpoints = checkpoints
+        self._pending_checkpoints: dict[str, StreamCheckpoint] = {}
+        # The checkpoint each page yielded but not yet marked stored brings its stream to, by id of the page.
+        self._page_checkpoints: dict[int, tuple[list[dict], StreamCheckpoint]] = {}
+        self._pending_checkpoints_lock = threading.Lock()
 
         self.headers: dict = {'Authorization': f'Bearer {self.access_token}'}
         logging.debug('Access token: %s...%s', self.access_token[:2], self.access_token[-2:])
@@ -96,49 +152,126 @@ class FeedlyDAO(DataFetcher):
         Returns:
             list[AlertDocument]: Parsed data fetched from Feedly.
         """
-        # And then call fetch_articles() to get the articles.
+        self._log_feeds()
+
+        alerts_all_streams: list[AlertDocument] = []
+
+        # Fetch all articles from each pre-configured stream, with up to max_concurrency streams in flight at once.
+        # executor.map yields the results in the order of self.feeds, so the output is the same as a sequential fetch.
+        max_workers = max(1, min(self.max_concurrency, len(self.feeds)))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='feedly-stream') as executor:
+            for mapping, stream_alerts in zip(self.feeds, executor.map(self._fetch_articles_from_stream, self.feeds)):
+                alerts_all_streams.extend(stream_alerts)
+                logging.info('\n*After fetching all alerts from stream %s, the running total of alerts from all stream fetched is: %d*', mapping['feed_name'], len(alerts_all_streams))
+
+        logging.info('\n**After fetching all alerts from all streams, the final count of alerts fetched is: %d**\n', len(alerts_all_streams))
+        return alerts_all_streams
+
+    def iter_raw_pages(self) -> Iterator[list[dict]]:
+        """
+        Yields the raw Feedly articles one page at a time, from up to max_concurrency streams at once.
+        The pages of each stream are yielded in order, while pages of different streams are interleaved.
+
+        Yields:
+            list[dict]: The raw 'items' of one page of a stream.
+        """
+        self._log_feeds()
+        with self._pending_checkpoints_lock: # Pages of an earlier run that were never stored.
+            self._page_checkpoints.clear()
+        yield from merge_iterators(
+            [partial(self._iter_raw_pages_from_stream, mapping) for mapping in self.feeds],
+            max_workers=min(self.max_concurrency, len(self.feeds)),
+            queue_size=self.max_concurrency
+        )
+
+    def deserialize_page(self, raw_page: list[dict]) -> list[AlertDocument]:
+        """Deserializes a page yielded by iter_raw_pages into AlertDocument objects."""
+        return [self._deserialize_raw_alert(raw_alert) for raw_alert in raw_page]
+
+    def mark_page_stored(self, raw_page: list[dict]):
+        """Moves the checkpoint of the page's stream up to the page, see DataFetcher.mark_page_stored."""
+        with self._pending_checkpoints_lock:
+            page, checkpoint = self._page_checkpoints.pop(id(raw_page), (None, None))
+            if page is raw_page:
+                self._pending_checkpoints[checkpoint.stream_id] = checkpoint
+
+    def commit_checkpoints(self):
+        """Saves the checkpoints of the streams, up to their last pages marked stored since the last commit."""
+        if self.checkpoints is None:
+            return
+        with self._pending_checkpoints_lock:
+            pending_checkpoints = list(self._pending_checkpoints.values())
+            self._pending_checkpoints.clear()
+        for checkpoint in pending_checkpoints:
+            self.checkpoints.save_checkpoint(checkpoint)
+            logging.debug('Saved checkpoint for stream %s: %s', checkpoint.stream_id, checkpoint)
+
+    def _log_feeds(self):
         logging.info('Fetching data from Feedly, from the following feeds:')
         logging.info([mapping['feed_name'] for mapping in self.feeds])
         for i, mapping in enumerate(self.feeds):
             logging.info('%d. %s', i, mapping['feed_name'])
         logging.info('\n')
 
-        alerts_all_streams: list[AlertDocument] = []
+    def _get_checkpoint(self, stream_id: str) -> StreamCheckpoint:
+        """Returns the saved checkpoint of the stream, or an empty one if there is none or it can't be read."""
+        if self.checkpoints is not None:
+            try:
+                checkpoint = self.checkpoints.get_checkpoint(stream_id)
+                if checkpoint is not None:
+                    return checkpoint
+            except Exception as e:
+                logging.warning('Failed to read the checkpoint of stream %s, fetching from %d hours ago: %s', stream_id, self.hours_ago, e)
+        return StreamCheckpoint(stream_id=stream_id)
 
-        # Fetch all articles from each pre-configured stream.
-        for mapping in self.feeds:
-            stream_alerts: list[AlertDocument] = self._fetch_articles_from_stream(mapping)
-            alerts_all_streams.extend(stream_alerts)
-            logging.info('\n*After fetching all alerts from stream %s, the running total of alerts from all stream fetched is: %d*', mapping['feed_name'], len(alerts_all_streams))
+    def _fetch_articles_from_stream(self, stream_feed_mapping: dict[str, str]) -> list[AlertDocument]:
+        """
+        Fetch all articles from a stream, see _iter_raw_pages_from_stream.
 
-        logging.info('\n**After fetching all alerts from all streams, the final count of alerts fetched is: %d**\n', len(alerts_all_streams))
-        return alerts_all_streams
+        Parameters:
+        - stream_feed_mapping (dict[str, str]): Mapping of a Feedly stream ID to the name of the feed associatated with it.
 
-    def _fetch_articles_from_stream(
-            self,
-            stream_feed_mapping: dict[str, str],
-            fetch_all: bool = False,
-            last_timestamp: int | None = None
-        ) -> list[AlertDocument]:
+        Returns:
+        - list[AlertDocument]: A list of articles, each represented as a dictionary.
+        """
+        alert_docs: list[AlertDocument] = []
+        for raw_page in self._iter_raw_pages_from_stream(stream_feed_mapping):
+            alert_docs.extend(self.deserialize_page(raw_page))
+            self.mark_page_stored(raw_page) # The caller persists the alerts before committing the checkpoints.
+        return alert_docs
+
+    def _iter_raw_pages_from_stream(self, stream_feed_mapping: dict[str, str]) -> Iterator[list[dict]]:
         """
-        Fetch articles from a URL, optionally filtering by timestamp and handling pagination.
+        Fetch articles from a stream page by page, starting from the stream's checkpoint.
+
+        Only articles newer than the newest one fetched by a previous run are requested, or,
+        if the previous run stopped part way through a window, the window is resumed from its
+        continuation. A stream with no checkpoint is fetched from 'hours_ago' hours back.
+        With fetch_all, pages are fetched until no more articles are available, otherwise
+        only the first page is fetched. The checkpoint each page brings the stream to is
+        recorded, to be saved by commit_checkpoints once the page is marked stored.
     
         Parameters:
         - stream_feed_mapping (dict[str, str]): Mapping of a Feedly stream ID to the name of the feed associatated with it.
-        - fetch_all (bool): If True, continue fetching until no more articles are available.
-        - last_timestamp (int | None): Unix timestamp to fetch articles newer than this time. None to ignore.
     
-        Returns:
-        - list[AlertDocument]: A list of articles, each represented as a dictionary.
+        Yields:
+        - list[dict]: The raw articles of each page fetched.
         """
-
-        
+        start = time.perf_counter()
         feed_name: str = stream_feed_mapping['feed_name']
         stream_id: str = stream_feed_mapping['stream_id']
         stream_url: str = f'https://feedly.com/v3/streams/contents?streamId={stream_id}&count={self.article_count}'
 
-        all_alert_docs: list[dict] = []
-        continuation: str | None = None
+        checkpoint = self._get_checkpoint(stream_id)
+        if checkpoint.continuation is not None: # Resume the window the last run did not finish.
+            last_timestamp = checkpoint.newer_than
+        elif checkpoint.newest_published is not None:
+            last_timestamp = checkpoint.newest_published
+        else:
+            last_timestamp = int((time.time() - self.hours_ago * 3600) * 1000)
+        continuation: str | None = checkpoint.continuation
+        newest_published: int | None = checkpoint.newest_published
+        article_count: int = 0
 
         logging.info('Initializing fetch of articles from feed: "%s"', feed_name)
         logging.info('')
@@ -152,27 +285,43 @@ class FeedlyDAO(DataFetcher):
                 params['continuation'] = continuation
                 logging.debug('Fetching next batch of articles with continuation: %s', continuation)
 
-            response = requests.get(stream_url, headers=self.headers, params=params)
+            with metrics.span("feedly.request", stream=feed_name):
+                response = self.transport.get(stream_url, headers=self.headers, params=params)
             logging.debug('Response status code of batch request to feed: %s', response.status_code)
             response.raise_for_status()
             
             response_dict = response.json()
             raw_alerts = response_dict.get('items', [])
+            metrics.increment("feedly.pages", stream=feed_name)
+            metrics.increment("feedly.articles", len(raw_alerts), stream=feed_name)
+            metrics.increment("feedly.response_bytes", len(response.content), stream=feed_name)
             logging.info('Fetched batch of %d articles from feed: "%s"', len(raw_alerts), feed_name)
 
-            # Here is where I should parse the response_dict into AlertDocument objects.
-            alert_docs: list[AlertDocument] = [self._deserialize_raw_alert(raw_alert) for raw_alert in raw_alerts]
-
-            all_alert_docs.extend(alert_docs)
-            logging.info('Running total of articles fetched from feed "%s" is: %d articles', feed_name, len(all_alert_docs))
+            published_timestamps = [raw_alert['published'] for raw_alert in raw_alerts if raw_alert.get('published') is not None]
+            newest_published = max(published_timestamps + ([newest_published] if newest_published is not None else []), default=None)
+            article_count += len(raw_alerts)
             continuation = response_dict.get('continuation')
-            if not fetch_all or continuation is None:
+            with self._pending_checkpoints_lock:
+                # Until the window is fully fetched, the next run resumes it from the continuation.
+                self._page_checkpoints[id(raw_alerts)] = (raw_alerts, StreamCheckpoint(
+                    stream_id=stream_id,
+                    newest_published=newest_published,
+                    newer_than=last_timestamp if continuation is not None else None,
+                    continuation=continuation
+                ))
+            yield raw_alerts
+
+            logging.info('Running total of articles fetched from feed "%s" is: %d articles', feed_name, article_count)
+            if not self.fetch_all or continuation is None:
                 break
-        
-        logging.info('Finished fetching articles from feed "%s"', feed_name)
-        logging.info('Total number of articles fetched from feed %s is: %d articles', feed_name, len(all_alert_docs))
 
-        return all_alert_docs
+        elapsed = time.perf_counter() - start
+        metrics.observe("feedly.stream", elapsed, stream=feed_name)
+        logging.info('Finished fetching articles from feed "%s"', feed_name)
+        logging.info(
+            'Total number of articles fetched from feed %s is: %d articles, in %.2f seconds',
+            feed_name, article_count, elapsed
+        )
     
 
     def _deserialize_raw_alert(self, raw_alert: dict) -> AlertDocument:
@@ -193,12 +342,12 @@ class FeedlyDAO(DataFetcher):
             raise ValueError('Error: originId not found in raw alert data.')
         # ToDo: Remember to generate the ID in the alerts db, and use the returned ID when successful to store the alert in the triage db.
         aggregator_platform = AggregatorPlatform.FEEDLY
-        publication_source_url: str = raw_alert.get("canonicalUrl", raw_alert["alternate"][0]["href"]) # Error if both fields not present. # https://developers.feedly.com/reference/articlejson
+        publication_source_url: str = raw_alert.get("canonicalUrl") or raw_alert["alternate"][0]["href"] # Error if both fields not present. # https://developers.feedly.com/reference/articlejson
         alert_data: dict = raw_alert # Intentionally enforce no schema here.
-        publication_datetime: int = raw_alert["published"]
+        publication_timestamp: int = raw_alert["published"]
         return AlertDocument(
             aggregator_platform=aggregator_platform,
             publication_source_url=publication_source_url,
-            publication_datetime=publication_datetime,
+            publication_timestamp=publication_timestamp,
             alert_data=alert_data
         )
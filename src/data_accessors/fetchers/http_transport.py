@@ -0,0 +1,211 @@
+import email.utils
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import requests
+from pydantic import confloat, conint
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from requests.adapters import HTTPAdapter
+
+
+class HttpTransportConfig(BaseSettings):
+    """
+    Configuration for the HTTP transport shared by all fetchers.
+
+    Attributes:
+        model_config (SettingsConfigDict): Environment variable format for the configuration.
+        pool_maxsize (int): Maximum number of keep-alive connections kept open per host.
+        connect_timeout (float): Seconds to wait for a connection to be established.
+        read_timeout (float): Seconds to wait for the server to send a response.
+        max_retries (int): Maximum number of retries of a request after a retryable failure.
+        backoff_factor (float): Base delay in seconds of the exponential backoff between retries.
+        max_backoff (float): Upper bound in seconds of any single delay between retries, including Retry-After.
+        min_request_interval (float): Minimum seconds between two requests to the same host. 0 to disable.
+    """
+    model_config: SettingsConfigDict = SettingsConfigDict(env_prefix="HTTP_")
+    pool_maxsize: conint(ge=1) = 10
+    connect_timeout: confloat(gt=0) = 5.0
+    read_timeout: confloat(gt=0) = 30.0
+    max_retries: conint(ge=0) = 5
+    backoff_factor: confloat(ge=0) = 0.5
+    max_backoff: confloat(ge=0) = 60.0
+    min_request_interval: confloat(ge=0) = 0.0
+
+
+@dataclass
+class HostStats:
+    """Request counters and latencies for a single host, for monitoring."""
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    total_latency_seconds: float = 0.0
+    max_latency_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "total_latency_seconds": self.total_latency_seconds,
+            "mean_latency_seconds": self.total_latency_seconds / self.requests if self.requests else 0.0,
+            "max_latency_seconds": self.max_latency_seconds,
+        }
+
+
+class HttpTransport:
+    """
+    Pooled, retrying HTTP transport shared by the DataFetcher implementations.
+
+    A single requests.Session is reused for every request, so connections to a host are kept
+    alive and TLS handshakes are not paid per page. Responses are requested compressed, every
+    request has connect/read timeouts, and rate-limited or failed requests are retried with
+    exponential backoff, honouring the server's Retry-After header when present. Only requests
+    of idempotent methods are retried, unless the caller opts in, as a non-idempotent request
+    that timed out may have been acted on by the server already. Requests to the same host can
+    be spaced out with min_request_interval.
+
+    Use HttpTransport.shared() to get the process-wide instance, so that all fetchers share
+    the same connection pool and statistics.
+    """
+    RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+    _shared_instance = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, config: HttpTransportConfig | None = None):
+        """
+        Initialize the transport with its own session and connection pool.
+
+        Args:
+            config (HttpTransportConfig | None): Transport settings. Loaded from environment variables if None.
+        """
+        self.config = config or HttpTransportConfig()
+        self.timeout = (self.config.connect_timeout, self.config.read_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=self.config.pool_maxsize, max_retries=0) # Retries are handled in request(), to honour Retry-After.
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+
+        self._stats: dict[str, HostStats] = {}
+        self._stats_lock = threading.Lock()
+        self._next_request_time: dict[str, float] = {}
+        self._rate_limit_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "HttpTransport":
+        """Returns the process-wide transport, creating it on first use."""
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                cls._shared_instance = cls()
+            return cls._shared_instance
+
+    @classmethod
+    def reset_shared(cls):
+        """Primarily used for testing to avoid state leakage."""
+        with cls._shared_lock:
+            cls._shared_instance = None
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Sends a GET request. See request() for details."""
+        return self.request("GET", url, **kwargs)
+
+    def request(self, method: str, url: str, retry_non_idempotent: bool = False, **kwargs) -> requests.Response:
+        """
+        Sends a request, retrying connection errors, timeouts and retryable status codes.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The URL to request.
+            retry_non_idempotent (bool): Whether to also retry a request of a non-idempotent method, e.g. a POST
+                that is safe to replay. By default, such requests are sent once.
+            **kwargs: Passed through to requests.Session.request, e.g. headers and params.
+
+        Returns:
+            requests.Response: The final response. Once retries are exhausted, the last
+            response is returned as is, so the caller can still call raise_for_status().
+
+        Raises:
+            requests.ConnectionError, requests.Timeout: If the last attempt failed to get a response.
+        """
+        host = urlsplit(url).netloc
+        kwargs.setdefault("timeout", self.timeout)
+        max_retries = self.config.max_retries if retry_non_idempotent or method.upper() in self.IDEMPOTENT_METHODS else 0
+        attempt = 0
+        while True:
+            self._wait_for_rate_limit(host)
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(host, time.perf_counter() - start, failed=True)
+                if attempt >= max_retries:
+                    raise
+                delay = self._retry_delay(attempt, None)
+                logging.warning("Request to %s failed with %s, retrying in %.2f seconds.", host, type(e).__name__, delay)
+            else:
+                self._record(host, time.perf_counter() - start, failed=False)
+                if response.status_code not in self.RETRY_STATUS_CODES or attempt >= max_retries:
+                    return response
+                delay = self._retry_delay(attempt, response)
+                logging.warning("Request to %s returned status %s, retrying in %.2f seconds.", host, response.status_code, delay)
+            attempt += 1
+            with self._stats_lock:
+                self._stats[host].retries += 1
+            time.sleep(delay)
+
+    def _retry_delay(self, attempt: int, response: requests.Response | None) -> float:
+        """
+        Returns the seconds to wait before the next attempt: the Retry-After header of the
+        response if present, otherwise exponential backoff with jitter.
+        """
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    retry_at = email.utils.parsedate_to_datetime(retry_after) # HTTP-date form.
+                    delay = retry_at.timestamp() - time.time()
+                except (TypeError, ValueError): # Malformed, so fall back to the backoff.
+                    logging.warning("Ignoring malformed Retry-After header: %r", retry_after)
+                    delay = None
+            if delay is not None:
+                return min(self.config.max_backoff, max(0.0, delay))
+        backoff = self.config.backoff_factor * (2 ** attempt)
+        return min(self.config.max_backoff, backoff + random.uniform(0, self.config.backoff_factor))
+
+    def _wait_for_rate_limit(self, host: str):
+        """Blocks until at least min_request_interval has passed since the last request slot for the host."""
+        if not self.config.min_request_interval:
+            return
+        with self._rate_limit_lock: # Reserve the next slot under the lock, but sleep outside it.
+            now = time.monotonic()
+            request_time = max(now, self._next_request_time.get(host, now))
+            self._next_request_time[host] = request_time + self.config.min_request_interval
+        if request_time > now:
+            time.sleep(request_time - now)
+
+    def _record(self, host: str, latency_seconds: float, failed: bool):
+        with self._stats_lock:
+            host_stats = self._stats.setdefault(host, HostStats())
+            host_stats.requests += 1
+            host_stats.failures += int(failed)
+            host_stats.total_latency_seconds += latency_seconds
+            host_stats.max_latency_seconds = max(host_stats.max_latency_seconds, latency_seconds)
+
+    def get_stats(self) -> dict[str, dict]:
+        """
+        Returns the request counts and latencies of every host requested so far, for monitoring.
+
+        Returns:
+            dict[str, dict]: Mapping of host to its statistics, see HostStats.to_dict.
+        """
+        with self._stats_lock:
+            return {host: host_stats.to_dict() for host, host_stats in self._stats.items()}
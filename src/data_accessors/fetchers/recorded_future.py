@@ -0,0 +1,305 @@
+import datetime
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator
+
+from pydantic import conint, constr
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from .abstract import DataFetcher
+from .http_transport import HttpTransport
+from config_managers.secrets_manager import SecretsManager
+from data_accessors.datastores.abstract import StreamCheckpointsDAO
+from models.alerts_table_document import AlertDocument
+from models.enums import AggregatorPlatform
+from models.stream_checkpoint import StreamCheckpoint
+from telemetry import metrics
+
+# Where an alert is shown in the Recorded Future portal, for alerts whose data doesn't have the link.
+PORTAL_ALERT_URL = "https://app.recordedfuture.com/live/sc/notification/?id="
+
+
+class RecordedFutureConfig(BaseSettings):
+    """
+    Configuration for connecting to the Recorded Future alerts API.
+
+    Attributes:
+        model_config (SettingsConfigDict): Environment variable format for the configuration.
+        api_token (str): API token for authenticating with the Recorded Future API.
+        search_url (str): URL of the alert search endpoint.
+        fields (str): Comma-separated fields of each alert to fetch, stored as its alert_data. 'all' for every field,
+            rather than Recorded Future's default set.
+        page_size (int): Number of alerts fetched per request.
+        max_concurrency (int): Maximum number of pages fetched concurrently, once the total is known. 1 fetches them sequentially.
+        max_alerts (int): Maximum number of alerts fetched per run, the oldest first, so a large backlog is caught up over several runs.
+        hours_ago (int): How far back to fetch alerts on the first run, i.e. when there is no checkpoint yet, in hours.
+        checkpoint_file_path (str): Local file the checkpoint falls back to when the database is unavailable.
+    """
+    model_config: SettingsConfigDict = SettingsConfigDict(env_prefix="RECORDED_FUTURE_")
+    search_url: constr(min_length=1) = "https://api.recordedfuture.com/v2/alert/search"
+    fields: constr(min_length=1) = "all"
+    page_size: conint(ge=1, le=1000) = 100
+    max_concurrency: conint(ge=1) = 4
+    max_alerts: conint(ge=1) = 10_000
+    hours_ago: conint(ge=1) = 24
+    checkpoint_file_path: str = os.path.join(tempfile.gettempdir(), 'recorded_future_checkpoints.json')
+    api_token: str = '' # Set in post_init, from the environment or the keyvault.
+
+    def model_post_init(self, __context):
+        self.refresh_access_token()
+
+    def refresh_access_token(self) -> str:
+        """
+        Reloads the API token, from the secrets manager's cache when deployed, so that a config
+        kept across runs picks up a rotated token once the cached secret expires.
+
+        Returns:
+            str: The API token.
+        """
+        if os.getenv("IS_LOCAL") == "True":
+            self.api_token = os.getenv("RECORDED_FUTURE_API_TOKEN")
+        else:
+            self.api_token = SecretsManager().get_secret_value('recorded-future-api-token')
+        return self.api_token
+
+
+def _parse_timestamp(value: str) -> int:
+    """Returns an ISO 8601 timestamp, e.g. '2024-06-05T08:01:38.000Z', as a Unix timestamp in milliseconds."""
+    parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00")) # Python 3.10 doesn't parse the 'Z' suffix.
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+def _format_timestamp(timestamp_ms: int) -> str:
+    return datetime.datetime.fromtimestamp(timestamp_ms / 1000, tz=datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+class RecordedFutureDAO(DataFetcher):
+    """
+    Concrete implementation of DataFetcher to fetch the alerts triggered by the Recorded Future
+    alerting rules.
+
+    Each run fetches the alerts triggered in a closed window, from the end of the last run's
+    window (or 'hours_ago' hours back on the first run) to the start of the run, oldest first,
+    so alerts triggered while the run pages through the window don't shift the offsets. The
+    first page also gives the total in the window, after which the other pages are fetched
+    concurrently by offset, with up to max_concurrency requests in flight, and yielded in order,
+    so at most max_concurrency pages are held in memory however big the backlog is.
+
+    The checkpoint moves forward with each page marked stored, to the newest alert stored so
+    far, and to the end of the window once its last page is, and is only saved by
+    commit_checkpoints(), so a run that stops part way through the window resumes after its
+    last stored page.
+    """
+    CHECKPOINT_STREAM_ID = "recorded_future:alerts"
+
+    def __init__(
+            self,
+            config: RecordedFutureConfig,
+            transport: HttpTransport | None = None,
+            checkpoints: StreamCheckpointsDAO | None = None,
+            clock=time.time
+        ):
+        """
+        Initialize the RecordedFutureDAO with necessary parameters.
+
+        Args:
+            config (RecordedFutureConfig): Configuration object containing parameters for the Recorded Future client.
+            transport (HttpTransport | None): HTTP transport to send requests with. Defaults to the shared transport.
+            checkpoints (StreamCheckpointsDAO | None): Store of the checkpoint. None to fetch from 'hours_ago' on every run.
+            clock (Callable[[], float]): Returns the current time as a Unix timestamp in seconds.
+        """
+        self.search_url = config.search_url
+        self.fields = config.fields
+        self.page_size = config.page_size
+        self.max_concurrency = config.max_concurrency
+        self.max_alerts = config.max_alerts
+        self.hours_ago = config.hours_ago
+        self.transport = transport or HttpTransport.shared()
+        self.checkpoints = checkpoints
+        self.clock = clock
+        self._pending_checkpoint: StreamCheckpoint | None = None
+        # The checkpoint each page yielded but not yet marked stored brings the window to, by id of the page.
+        self._page_checkpoints: dict[int, tuple[list[dict], StreamCheckpoint]] = {}
+        self._page_checkpoints_lock = threading.Lock() # Pages are marked stored from the thread storing them.
+
+        self.headers: dict = {'X-RFToken': config.api_token or '', 'Content-Type': 'application/json'}
+
+    def fetch_alerts(self) -> list[AlertDocument]:
+        """
+        Fetches every alert of the window at once. Prefer iter_raw_pages for large backlogs.
+
+        Returns:
+            list[AlertDocument]: Parsed alerts fetched from Recorded Future.
+        """
+        alerts: list[AlertDocument] = []
+        for raw_page in self.iter_raw_pages():
+            alerts.extend(self.deserialize_page(raw_page))
+            self.mark_page_stored(raw_page) # The caller persists the alerts before committing the checkpoint.
+        return alerts
+
+    def _window_start(self) -> int:
+        if self.checkpoints is not None:
+            try:
+                checkpoint = self.checkpoints.get_checkpoint(self.CHECKPOINT_STREAM_ID)
+                if checkpoint is not None and checkpoint.newest_published is not None:
+                    return checkpoint.newest_published
+            except Exception as e:
+                logging.warning('Failed to read the Recorded Future checkpoint, fetching from %d hours ago: %s', self.hours_ago, e)
+        return int((self.clock() - self.hours_ago * 3600) * 1000)
+
+    def _page_limit(self, offset: int) -> int:
+        """Returns the number of alerts requested from offset on, shortening the last page before max_alerts to end there."""
+        return min(self.page_size, self.max_alerts - offset)
+
+    def _fetch_page(self, window: str, offset: int) -> tuple[list[dict], int | None]:
+        """Returns the alerts of the window from offset on, and the total number of alerts in the window, if the response has it."""
+        limit = self._page_limit(offset)
+        params = {'fields': self.fields, 'triggered': window, 'orderby': 'triggered', 'direction': 'asc', 'limit': limit, 'offset': offset}
+        with metrics.span("recorded_future.request"):
+            response = self.transport.get(self.search_url, headers=self.headers, params=params)
+        response.raise_for_status()
+        response_dict = response.json()
+        data = response_dict.get('data') or {}
+        raw_alerts = data.get('results', data.get('items')) or []
+        total = (response_dict.get('counts') or {}).get('total')
+        metrics.increment("recorded_future.pages")
+        metrics.increment("recorded_future.alerts", len(raw_alerts))
+        metrics.increment("recorded_future.response_bytes", len(response.content))
+        logging.info('Fetched %d Recorded Future alerts from offset %d.', len(raw_alerts), offset)
+        return raw_alerts, total
+
+    def iter_raw_pages(self) -> Iterator[list[dict]]:
+        """
+        Yields the raw Recorded Future alerts of the window one page at a time, oldest first.
+
+        Yields:
+            list[dict]: The raw alerts of one page.
+        """
+        start = time.perf_counter()
+        window_start, window_end = self._window_start(), int(self.clock() * 1000)
+        window = f"[{_format_timestamp(window_start)},{_format_timestamp(window_end)}]"
+        logging.info('Fetching the Recorded Future alerts triggered in %s.', window)
+
+        with self._page_checkpoints_lock: # Pages of an earlier run that were never stored.
+            self._page_checkpoints.clear()
+        raw_alerts, total = self._fetch_page(window, 0)
+        fetched_count = len(raw_alerts)
+        newest_triggered = self._newest_triggered(raw_alerts, None)
+        self._record_page_checkpoint(raw_alerts, 0, total, newest_triggered, window_end)
+        yield raw_alerts
+
+        if total is None: # No total in the response, so fall back to paging until a short page.
+            offsets = None
+        else:
+            offsets = iter(range(self.page_size, min(total, self.max_alerts), self.page_size))
+        if len(raw_alerts) == self.page_size and fetched_count < self.max_alerts:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='recorded-future-page') as executor:
+                in_flight: deque[tuple[int, Future]] = deque()
+                next_offset = self.page_size
+
+                def submit_next() -> bool:
+                    nonlocal next_offset
+                    if offsets is not None:
+                        offset = next(offsets, None)
+                    elif not in_flight: # Sequential when the number of pages is unknown.
+                        offset = next_offset if next_offset < self.max_alerts else None
+                        next_offset += self.page_size
+                    else:
+                        return False
+                    if offset is None:
+                        return False
+                    in_flight.append((offset, executor.submit(self._fetch_page, window, offset)))
+                    return True
+
+                while len(in_flight) < self.max_concurrency and submit_next():
+                    pass
+                while in_flight:
+                    offset, future = in_flight.popleft()
+                    raw_alerts, _total = future.result()
+                    fetched_count += len(raw_alerts)
+                    newest_triggered = self._newest_triggered(raw_alerts, newest_triggered)
+                    self._record_page_checkpoint(raw_alerts, offset, total, newest_triggered, window_end)
+                    yield raw_alerts # Even if empty, so that its checkpoint is reached once it is marked stored.
+                    if offsets is None and len(raw_alerts) < self.page_size:
+                        break
+                    while len(in_flight) < self.max_concurrency and submit_next():
+                        pass
+
+        elapsed = time.perf_counter() - start
+        metrics.observe("recorded_future.fetch", elapsed)
+        logging.info('Fetched %d Recorded Future alerts (of %s in the window) in %.2f seconds.', fetched_count, total, elapsed)
+
+    def _record_page_checkpoint(self, raw_alerts: list[dict], offset: int, total: int | None, newest_triggered: int | None, window_end: int):
+        """
+        Records where the next run starts from once the page is stored: the end of the window after its last page,
+        or else the newest alert stored so far, e.g. when the window is cut short by max_alerts or the time budget.
+        """
+        limit = self._page_limit(offset)
+        end_of_window = len(raw_alerts) < limit or (total is not None and offset + len(raw_alerts) >= total)
+        next_start = window_end if end_of_window else newest_triggered
+        if next_start is not None:
+            checkpoint = StreamCheckpoint(stream_id=self.CHECKPOINT_STREAM_ID, newest_published=next_start)
+            with self._page_checkpoints_lock:
+                self._page_checkpoints[id(raw_alerts)] = (raw_alerts, checkpoint)
+
+    def _newest_triggered(self, raw_alerts: list[dict], newest_triggered: int | None) -> int | None:
+        for raw_alert in raw_alerts:
+            triggered = (raw_alert.get('log') or {}).get('triggered')
+            if triggered:
+                timestamp = _parse_timestamp(triggered)
+                newest_triggered = timestamp if newest_triggered is None else max(newest_triggered, timestamp)
+        return newest_triggered
+
+    def deserialize_page(self, raw_page: list[dict]) -> list[AlertDocument]:
+        """Deserializes a page yielded by iter_raw_pages into AlertDocument objects."""
+        return [self._deserialize_raw_alert(raw_alert) for raw_alert in raw_page]
+
+    def mark_page_stored(self, raw_page: list[dict]):
+        """Moves the checkpoint up to the page, see DataFetcher.mark_page_stored."""
+        with self._page_checkpoints_lock:
+            page, checkpoint = self._page_checkpoints.pop(id(raw_page), (None, None))
+            if page is raw_page:
+                self._pending_checkpoint = checkpoint
+
+    def commit_checkpoints(self):
+        """Saves how far the pages marked stored got through the window, so the next run starts from there."""
+        if self.checkpoints is None or self._pending_checkpoint is None:
+            return
+        self.checkpoints.save_checkpoint(self._pending_checkpoint)
+        logging.debug('Saved the Recorded Future checkpoint: %s', self._pending_checkpoint)
+        self._pending_checkpoint = None
+
+    def _deserialize_raw_alert(self, raw_alert: dict) -> AlertDocument:
+        """
+        Deserializes a raw alert dictionary into an AlertDocument object.
+
+        Args:
+            raw_alert (dict): A dictionary containing raw Recorded Future alert data.
+
+        Returns:
+            AlertDocument: An instance of AlertDocument containing the deserialized data.
+
+        Raises:
+            ValueError: If the alert has no id, or no trigger time.
+        """
+        if not raw_alert or not raw_alert.get('id'):
+            logging.error('Error: id not found in raw Recorded Future alert data.')
+            raise ValueError('Error: id not found in raw Recorded Future alert data.')
+        triggered = (raw_alert.get('log') or {}).get('triggered')
+        if not triggered:
+            raise ValueError(f"Error: trigger time not found in Recorded Future alert {raw_alert['id']}.")
+        alert_urls = raw_alert.get('url')
+        portal_url = alert_urls.get('portal') if isinstance(alert_urls, dict) else None
+        return AlertDocument(
+            aggregator_platform=AggregatorPlatform.RECORDED_FUTURE,
+            publication_source_url=portal_url or f"{PORTAL_ALERT_URL}{raw_alert['id']}",
+            publication_timestamp=_parse_timestamp(triggered),
+            alert_data=raw_alert # Intentionally enforce no schema here.
+        )
@@ -0,0 +1,66 @@
+""" Canonicalization of publication urls, and the deterministic alert keys derived from them. """
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track where a click came from, so never identify an article.
+TRACKING_QUERY_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid", "_hsenc", "_hsmi", "mkt_tok",
+})
+TRACKING_QUERY_PARAM_PREFIXES = ("utm_",)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_QUERY_PARAMS or name.startswith(TRACKING_QUERY_PARAM_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalizes a publication url, so that the variants an article is syndicated under map to the same string.
+
+    For http(s) urls: the scheme becomes https, the host is lowercased and loses any 'www.' prefix and
+    default port, tracking query parameters (e.g. 'utm_source') and the fragment are dropped, the remaining
+    query parameters are sorted, and any trailing slash is removed from the path. Anything that is not an
+    http(s) url, e.g. a Feedly 'originId' tag, or a malformed one, e.g. with a non-numeric port, is only
+    stripped of surrounding whitespace.
+
+    Args:
+        url (str): The url to canonicalize.
+
+    Returns:
+        str: The canonical form of the url.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError: # E.g. an invalid port or IPv6 address.
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return url
+
+    host = parts.hostname.lower().removeprefix("www.")
+    if ":" in host: # An IPv6 address, which hostname returns without its brackets.
+        host = f"[{host}]"
+    if port is not None and port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+    path = parts.path.rstrip("/")
+    query_params = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking_param(name))
+    return urlunsplit(("https", host, path, urlencode(query_params), ""))
+
+
+def derive_alert_key(publication_source_url: str) -> str:
+    """
+    Derives the deterministic key of an alert from its publication url.
+    Variants of the same url (see canonicalize_url) have the same key.
+
+    Args:
+        publication_source_url (str): The url of the original publication source.
+
+    Returns:
+        str: The hex SHA-256 hash of the canonical url.
+    """
+    return hashlib.sha256(canonicalize_url(publication_source_url).encode("utf-8")).hexdigest()
@@ -3,12 +3,15 @@ import json
 import logging
 
 from pydantic import constr
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass, field
+from .alert_key import derive_alert_key
 from .enums import SummarizationStatus, TaggingStatus, AggregatorPlatform
 
 
 """ Classes for the structured fields and subfields within the AlertDocument class. """
-@dataclass
+# The classes are slotted, as one instance of each is created per fetched article, so the
+# per-instance __dict__ would otherwise dominate their memory footprint.
+@dataclass(slots=True)
 class SummarizationInfo:
     """
     SummarizationInfo holds the summarization details of an alert, including
@@ -21,7 +24,10 @@ class SummarizationInfo:
     status: SummarizationStatus = SummarizationStatus.NOT_STARTED
     summary_text: str | None = None
 
-@dataclass
+    def to_dict(self) -> dict:
+        return {"status": self.status, "summary_text": self.summary_text}
+
+@dataclass(slots=True)
 class TagsInfo:
     """
     TagsInfo holds the tagging details of an alert, including
@@ -34,9 +40,47 @@ class TagsInfo:
     status: TaggingStatus = TaggingStatus.NOT_TAGGED
     tags: list[str] | None = None
 
+    def to_dict(self) -> dict:
+        return {"status": self.status, "tags": self.tags}
+
+
+@dataclass(slots=True)
+class IndicatorsInfo:
+    """
+    IndicatorsInfo holds the indicators of compromise (IOCs) mentioned in an alert's content,
+    each deduplicated, normalized (refanged, and lowercased except for CVE ids), and in order of
+    first mention.
+
+    Attributes:
+        ipv4: IPv4 addresses.
+        domains: Domain names, including the hosts of the urls.
+        urls: URLs.
+        md5: MD5 file hashes.
+        sha1: SHA-1 file hashes.
+        sha256: SHA-256 file hashes.
+        cves: CVE ids, e.g. 'CVE-2024-3400'.
+    """
+    ipv4: list[str] = field(default_factory=list)
+    domains: list[str] = field(default_factory=list)
+    urls: list[str] = field(default_factory=list)
+    md5: list[str] = field(default_factory=list)
+    sha1: list[str] = field(default_factory=list)
+    sha256: list[str] = field(default_factory=list)
+    cves: list[str] = field(default_factory=list)
+
+    def items(self) -> list[tuple[str, str]]:
+        """Returns every indicator as an (indicator type, value) pair, the type being the name of its field."""
+        return [(indicator_type, value) for indicator_type, values in self.to_dict().items() for value in values]
+
+    def to_dict(self) -> dict:
+        return {
+            "ipv4": self.ipv4, "domains": self.domains, "urls": self.urls,
+            "md5": self.md5, "sha1": self.sha1, "sha256": self.sha256, "cves": self.cves,
+        }
+
 
 # The main AlertDocument class that will hold the data and above typed fields.
-@dataclass
+@dataclass(slots=True)
 class AlertDocument:
     """
     AlertDocument defines the schema for storing all metadata related to an alert.
@@ -50,48 +94,75 @@ class AlertDocument:
             The URL of the original publication source. 
             Either the 'canonicalUrl', or the 'alternate.href' field from the alert data.
             See https://developers.feedly.com/reference/articlejson for details.
+        publicationTimestamp: The publication time, as a Unix timestamp in milliseconds.
         alertData: A dictionary containing the raw data of the alert from the aggregation platform.
         summaryData: An instance of SummarizationInfo containing summarization details.
         tagsData: A dictionary containing the tags associated with the alert.
+        indicators: An instance of IndicatorsInfo with the indicators of compromise mentioned in the alert.
+            None until they are extracted, as most fetched alerts are duplicates that are never stored.
+        clusterId: The alertKey of the first alert of the story this alert is part of, its own if it is the first.
+            None if the alert was not checked for near duplicates, e.g. as its text is too short.
+        duplicateOf: The alertKey of the most similar earlier alert, if this alert is a near duplicate of it,
+            e.g. the same vendor report syndicated under another url.
+        alertKey:
+            A deterministic key of the alert, the hash of the canonical publicationSourceUrl.
+            Derived on creation, and used by the alerts db to detect duplicates.
     """
     aggregator_platform: AggregatorPlatform
     publication_source_url: str
-    publication_datetime: int | str # Unix timestamp
+    publication_timestamp: int # Unix timestamp in milliseconds.
     alert_data: dict # Using Dict to store raw, unstructured data. # ToDo: Don't enforce a schema here. Just store the raw data.
     summary_data: SummarizationInfo = field(default_factory=SummarizationInfo)
     tags_data: TagsInfo = field(default_factory=TagsInfo)
+    indicators: IndicatorsInfo | None = None
+    cluster_id: str | None = None
+    duplicate_of: str | None = None
+    alert_key: str = '' # Initialise empty as derived from the publication_source_url.
     id: str = '' # Initialise empty as generated by the db.
+    _publication_datetime: str | None = field(default=None, init=False, repr=False, compare=False) # Cache of the formatted timestamp.
 
     def __post_init__(self):
-        timestamp_ms = self.publication_datetime
-        timestamp_s = timestamp_ms / 1000
-        dt = datetime.datetime.fromtimestamp(timestamp_s)
-        dt_str = dt.strftime('%Y-%m-%d %H:%M:%S')
-        self.publication_datetime = dt_str
+        if not self.alert_key:
+            self.alert_key = derive_alert_key(self.publication_source_url)
 
+    @property
+    def publication_datetime(self) -> str:
+        """
+        The publication time formatted as 'YYYY-MM-DD HH:MM:SS', in local time.
+        Formatted on first access only, as most fetched alerts are duplicates that are never stored.
+        """
+        if self._publication_datetime is None:
+            dt = datetime.datetime.fromtimestamp(self.publication_timestamp / 1000)
+            self._publication_datetime = dt.strftime('%Y-%m-%d %H:%M:%S')
+        return self._publication_datetime
 
-    def to_dict(self, without_id: bool = False):
+    def to_dict(self, without_id: bool = False) -> dict:
         """
-        Convert the dataclass instance to a dictionary.
+        Convert the dataclass instance to a dictionary, as stored in the db.
         Exclude 'id' field in order to get the db to auto-generate it.
 
+        The conversion is shallow: the raw alert_data and the tags list are shared with
+        this instance rather than copied, so the dictionary must not be mutated.
+
         Args:
             without_id: A boolean flag to exclude the 'id' field from dict.
         """
-        try:
-            alert_dict = asdict(self)
-        except Exception as e:
-            logging.error(f"Error converting AlertDocument to dict: {e}")
-            raise type(e)(f"Error converting AlertDocument to dict: {e}").with_traceback(e.__traceback__)
-        
-        if without_id:
-            if 'id' in alert_dict:
-                del alert_dict['id']
-        
+        alert_dict = {
+            "aggregator_platform": self.aggregator_platform,
+            "publication_source_url": self.publication_source_url,
+            "publication_datetime": self.publication_datetime,
+            "alert_data": self.alert_data,
+            "summary_data": self.summary_data.to_dict(),
+            "tags_data": self.tags_data.to_dict(),
+            "indicators": (self.indicators if self.indicators is not None else IndicatorsInfo()).to_dict(),
+            "cluster_id": self.cluster_id,
+            "duplicate_of": self.duplicate_of,
+            "alert_key": self.alert_key,
+        }
+        if not without_id:
+            alert_dict["id"] = self.id
         return alert_dict
         
 
-        
-
 # ToDo: Think this is a great use-case for subclassing.
 # Make different fields etc for Feedly and other etc. Only if they actually have different needs in the end though.
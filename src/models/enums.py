@@ -4,6 +4,7 @@ from enum import Enum
 class AggregatorPlatform(str, Enum):
     "Multiple inheritance from Enum, and str so serializable."
     FEEDLY = "Feedly"
+    RECORDED_FUTURE = "Recorded Future"
 
 class SummarizationStatus(str, Enum):
     "Multiple inheritance from Enum, and str so serializable."
@@ -11,9 +12,18 @@ class SummarizationStatus(str, Enum):
     IN_PROGRESS = "In Progress"
     COMPLETED = "Completed"
     FAILED = "Failed"
+    SKIPPED = "Skipped" # Near duplicates, whose story is summarized with the first alert of their cluster.
 
 class TaggingStatus(str, Enum):
     "Multiple inheritance from Enum, and str so serializable."
     NOT_TAGGED = "Not Tagged"
     PARTIALLY_TAGGED = "Partially Tagged"
-    FULLY_TAGGED = "Fully Tagged"
\ No newline at end of file
+    FULLY_TAGGED = "Fully Tagged"
+
+
+class TriageStatus(str, Enum):
+    "Multiple inheritance from Enum, and str so serializable."
+    NEW = "New"
+    IN_REVIEW = "In Review"
+    SUBMITTED = "Submitted"
+    DISMISSED = "Dismissed"
@@ -0,0 +1,44 @@
+import base64
+import struct
+from dataclasses import dataclass
+
+
+@dataclass
+class NearDuplicateEntry:
+    """
+    NearDuplicateEntry is an alert's entry in the near-duplicate index, with the MinHash signature of
+    its text and the LSH buckets it falls into, so that later alerts of the same story can find it.
+
+    Attributes:
+        alert_key: The alert_key of the alert.
+        cluster_id: The cluster_id of the alert, i.e. the alert_key of the first alert of its story.
+        signature: The MinHash signature of the alert's text, unsigned 32 bit integers.
+        band_keys: The key of the LSH bucket of each band of the signature.
+        indexed_at: When the alert was indexed, as a Unix timestamp in seconds.
+    """
+    alert_key: str
+    cluster_id: str
+    signature: tuple[int, ...]
+    band_keys: list[str]
+    indexed_at: float
+
+    def to_dict(self) -> dict:
+        """The entry as stored, with the signature packed into a base64 string, about a third of the size of a list of numbers."""
+        return {
+            "alert_key": self.alert_key,
+            "cluster_id": self.cluster_id,
+            "signature": base64.b64encode(struct.pack(f"<{len(self.signature)}I", *self.signature)).decode("ascii"),
+            "band_keys": self.band_keys,
+            "indexed_at": self.indexed_at,
+        }
+
+    @classmethod
+    def from_dict(cls, entry_dict: dict) -> "NearDuplicateEntry":
+        packed = base64.b64decode(entry_dict["signature"])
+        return cls(
+            alert_key=entry_dict["alert_key"],
+            cluster_id=entry_dict["cluster_id"],
+            signature=struct.unpack(f"<{len(packed) // 4}I", packed),
+            band_keys=list(entry_dict["band_keys"]),
+            indexed_at=entry_dict["indexed_at"]
+        )
@@ -1,21 +1,45 @@
-from dataclasses import dataclass
+import json
+import time
+from dataclasses import dataclass, field
 
-from pydantic import BaseModel, constr
 
-
-# ToDo: Document the data fields as part of the docstring properly,
-#    rather than inline.
 @dataclass
 class ProcessingQueueMessage:
     """
-    ProcessingQueueItem represents the structure of the data that is sent from
-    a given fetcher class to the processing queue, where it will have additional
-    processing done on it. Note that the structure of the json 'alert' object
-    from each fetcher will differ, and it is the responsibility of the fetcher
-    to convert the data into this structure before sending it to the processing.
+    ProcessingQueueMessage represents a message on the processing queue, telling the
+    downstream processors (summarization, tagging) which newly ingested alerts to work on.
+
+    The message only carries references to the alerts, never their raw alert_data, so it
+    stays small whatever the size of the articles: the processors read the alerts they
+    need from the alerts db. Each message covers a batch of alerts of one platform, which
+    is also the partition of the alerts in a Cosmos container in 'point_read' storage mode.
+
+    Attributes:
+        aggregator_platform: The platform the alerts were aggregated from, an AggregatorPlatform value.
+        alert_keys: The alert keys of the alerts, i.e. their ids in the alerts db.
+        enqueued_at: When the message was created, as a Unix timestamp in seconds.
     """
-    alert_text: constr(1) # This field should always contain text, from the ingestion pipeline.
-    alert_summary: str # This field often starts off empty, at the beginning of the processing pipeline.
-    alert_tags: dict # Begins pipeline as the empty dict.
-    # Think about other fields that the user will want to see. Maybe ask as well in meeting.
-    # Most of them will be the same for the 
+    aggregator_platform: str
+    alert_keys: list[str]
+    enqueued_at: int = field(default_factory=lambda: int(time.time()))
+
+    def to_json(self) -> str:
+        """Serializes the message compactly, with short field names, as sent on the queue."""
+        return json.dumps(
+            {"p": self.aggregator_platform, "k": self.alert_keys, "t": self.enqueued_at},
+            separators=(",", ":")
+        )
+
+    @classmethod
+    def from_json(cls, content: str) -> "ProcessingQueueMessage":
+        """
+        Parses a message serialized by to_json.
+
+        Raises:
+            ValueError: If the content is not a processing queue message.
+        """
+        try:
+            message = json.loads(content)
+            return cls(aggregator_platform=message["p"], alert_keys=list(message["k"]), enqueued_at=message["t"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid processing queue message: {content[:100]!r}") from e
@@ -0,0 +1,27 @@
+from dataclasses import asdict, dataclass
+
+
+@dataclass
+class StreamCheckpoint:
+    """
+    StreamCheckpoint records how far a fetcher has got through a single source stream,
+    so that the next ingestion run only asks the source for articles it has not seen.
+
+    Attributes:
+        stream_id: The identifier of the stream at the source, e.g. a Feedly stream ID.
+        newest_published: The newest 'published' timestamp (Unix ms) fetched from the stream so far.
+        newer_than: The lower bound (Unix ms) of the fetch window that is still being paged through,
+            if the last run stopped before the end of it. None once the window has been fully fetched.
+        continuation: The continuation token to resume the unfinished window from, if any.
+    """
+    stream_id: str
+    newest_published: int | None = None
+    newer_than: int | None = None
+    continuation: str | None = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, checkpoint_dict: dict) -> "StreamCheckpoint":
+        return cls(**{name: checkpoint_dict.get(name) for name in cls.__dataclass_fields__})
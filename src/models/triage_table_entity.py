@@ -1,4 +1,8 @@
-from dataclasses import dataclass
+import datetime
+from dataclasses import asdict, dataclass, fields
+
+from models.alerts_table_document import AlertDocument
+from models.enums import TriageStatus
 
 @dataclass
 class TriageStagingEntity:
@@ -6,7 +10,7 @@ class TriageStagingEntity:
     TriageStagingEntity represents an individual record in the 'TriageStaging' database
     (or collection, if non-relational). This entity holds data extracted and consolidated
     from various threat intelligence sources. Each entity includes details such as the
-    platform of aggregation, source URL, content title, categories associated with the 
+    platform of aggregation, source URL, content title, categories associated with the
     threat, and the timestamp of data aggregation.
 
     These entities are utilized by the frontend of the Threat Intelligence Triage Portal,
@@ -14,16 +18,78 @@ class TriageStagingEntity:
     summarization, categorization, or submitting to Azure Devops as a work item.
 
     Attributes:
-        id: An identifier unique to each entity.
+        id: An identifier unique to each entity, the alert_key of the alert it was projected from.
         aggregatorPlatform: The platform or service where the data was aggregated.
         publicationSourceUrl: The URL of the original publication source.
         title: The title of the content or report.
         category: A list of categories or tags associated with the content.
-        timestamp: The date and time when the content was published or aggregated.
+        timestamp: The date and time when the content was published, in UTC, as 'YYYY-MM-DD HH:MM:SS',
+            so that it sorts chronologically as a string.
+        status: Where the entity is in the triage process, a TriageStatus value.
     """
-    id: str # Have a unique id but perform the update based ... # Take this from the other table I think (the main one...)
+    id: str # The alert_key of the alert in the main alerts table, so each alert has at most one entity.
     publicationSourceUrl: str
     aggregatorPlatform: str
     title: str
     category: list
     timestamp: str
+    status: str = TriageStatus.NEW.value
+
+    @classmethod
+    def from_alert(cls, alert: AlertDocument) -> "TriageStagingEntity":
+        """
+        Projects an alert to the few fields the triage portal lists, without its raw payload.
+        The categories are the alert's tags once tagged, and the aggregator's keywords until then.
+        """
+        tags = alert.tags_data.tags if alert.tags_data else None
+        return cls(
+            id=alert.alert_key,
+            publicationSourceUrl=alert.publication_source_url,
+            aggregatorPlatform=alert.aggregator_platform.value,
+            title=alert.alert_data.get("title", ""),
+            category=list(tags or alert.alert_data.get("keywords") or []),
+            timestamp=datetime.datetime.fromtimestamp(alert.publication_timestamp / 1000, tz=datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        )
+
+    @classmethod
+    def from_dict(cls, document: dict) -> "TriageStagingEntity":
+        """
+        Builds an entity from a stored document, ignoring any fields the database added (e.g. '_id', '_etag'),
+        with the default of any field added after the document was stored.
+        """
+        return cls(**{field.name: document[field.name] for field in fields(cls) if field.name in document})
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class TriageStagingPage:
+    """
+    A page of triage staging entities, newest first.
+
+    Attributes:
+        entities: The entities of the page.
+        continuation_token: Opaque token to pass back to get the next page, or None if this is the last page.
+    """
+    entities: list[TriageStagingEntity]
+    continuation_token: str | None = None
+
+
+@dataclass
+class TriageStagingFilter:
+    """
+    Filters of a listing of triage staging entities. Every filter that is set must match.
+
+    Attributes:
+        platform: Only entities of this aggregator platform.
+        tag: Only entities with this category.
+        status: Only entities with this TriageStatus value.
+        published_after: Only entities published at or after this time, as 'YYYY-MM-DD[ HH:MM:SS]'.
+        published_before: Only entities published before this time, as 'YYYY-MM-DD[ HH:MM:SS]'.
+    """
+    platform: str | None = None
+    tag: str | None = None
+    status: str | None = None
+    published_after: str | None = None
+    published_before: str | None = None
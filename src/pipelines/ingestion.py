@@ -0,0 +1,329 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+
+from pydantic import conint, constr
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from data_accessors.datastores.abstract import AlertsDAO, IndicatorIndexDAO, TriageStagingDAO
+from data_accessors.datastores.processing_queue import ProcessingQueuePublisher
+from data_accessors.fetchers import FetcherFactory
+from data_accessors.fetchers.abstract import DataFetcher
+from models.alerts_table_document import AlertDocument
+from models.near_duplicate_entry import NearDuplicateEntry
+from models.triage_table_entity import TriageStagingEntity
+from pipelines.stages import run_bounded_stages
+from processors.alert_tagger.tag_alert import TaxonomyTagger
+from processors.indicator_extractor.extract_indicators import IndicatorExtractor
+from processors.near_duplicate_detector.detect_near_duplicates import NearDuplicateDetector
+from telemetry import metrics
+
+
+class IngestionConfig(BaseSettings):
+    """
+    Configuration of the ingestion runs.
+
+    Attributes:
+        model_config (SettingsConfigDict): Environment variable format for the configuration.
+        sources (str): Comma-separated names of the data sources to ingest, as registered with FetcherFactory,
+            e.g. 'Feedly,Recorded Future'.
+        time_budget_seconds (int): How long each source may fetch for in a run. Once it is spent, the source
+            stops fetching new pages, and the pages already fetched are written.
+        source_time_budgets (dict[str, int]): Time budgets of particular sources, by source name, overriding
+            time_budget_seconds, e.g. INGESTION_SOURCE_TIME_BUDGETS='{"Recorded Future": 120}'.
+        grace_seconds (int): How long a source is waited for past its time budget, to finish the request in flight
+            and write the pages it fetched, before it is cancelled.
+    """
+    model_config: SettingsConfigDict = SettingsConfigDict(env_prefix="INGESTION_")
+    sources: constr(min_length=1) = "Feedly"
+    time_budget_seconds: conint(ge=1) = 240 # Within the 5 minute default timeout of the function app, with the grace period.
+    source_time_budgets: dict[str, conint(ge=1)] = {}
+    grace_seconds: conint(ge=0) = 30
+
+    def model_post_init(self, __context):
+        unknown_sources = [source for source in self.source_names() + list(self.source_time_budgets) if source not in FetcherFactory.REGISTRY]
+        if unknown_sources:
+            raise ValueError(f"Unknown data sources: {unknown_sources}. Expected some of the supported data sources: {FetcherFactory.sources()}")
+
+    def source_names(self) -> list[str]:
+        """Returns the names of the data sources to ingest, in the configured order, without duplicates."""
+        return list(dict.fromkeys(source.strip() for source in self.sources.split(",") if source.strip()))
+
+    def time_budget(self, source: str) -> int:
+        """Returns how long the data source may fetch for in a run, in seconds."""
+        return self.source_time_budgets.get(source, self.time_budget_seconds)
+
+
+@dataclass
+class IngestionResult:
+    """
+    Summary of an ingestion run.
+
+    Attributes:
+        fetched_count: Number of alerts fetched from the data source.
+        inserted_ids: Identifiers of the alerts that were new, and so were added to the alerts db.
+        staged_ids: Identifiers of the triage staging entities added for the new alerts.
+        near_duplicate_ids: Identifiers of the new alerts that are near duplicates of earlier ones, so were
+            neither staged nor queued.
+        queued_ids: Identifiers of the new alerts referenced by the messages sent to the processing queue.
+        queued_messages: Number of messages sent to the processing queue.
+        indexed_indicators: Number of indicator index entries written for the new alerts, counted once per page.
+        stage_durations: Seconds spent on each page by each stage (fetch, deserialize, dedup, extract, tag, cluster, write).
+        timed_out: Whether the data source ran out of its time budget, so some of its alerts were left for the next run.
+        error: Why the run of the data source failed, if it did, in which case its checkpoints were not committed.
+    """
+    fetched_count: int = 0
+    inserted_ids: list = field(default_factory=list)
+    staged_ids: list = field(default_factory=list)
+    near_duplicate_ids: list = field(default_factory=list)
+    queued_ids: list = field(default_factory=list)
+    queued_messages: int = 0
+    indexed_indicators: int = 0
+    stage_durations: dict[str, list[float]] = field(default_factory=dict)
+    timed_out: bool = False
+    error: str | None = None
+
+
+def ingest_alerts(
+        fetcher: DataFetcher,
+        alerts_db: AlertsDAO,
+        queue_size: int = 2,
+        triage_staging_db: TriageStagingDAO | None = None,
+        processing_queue: ProcessingQueuePublisher | None = None,
+        indicator_extractor: IndicatorExtractor | None = None,
+        alert_tagger: TaxonomyTagger | None = None,
+        indicator_index_db: IndicatorIndexDAO | None = None,
+        near_duplicate_detector: NearDuplicateDetector | None = None,
+        time_budget_seconds: float | None = None,
+        cancel: threading.Event | None = None
+    ) -> IngestionResult:
+    """
+    Streams the alerts of a data source into the alerts db, one page at a time.
+
+    The run is split into the bounded stages fetch -> deserialize -> dedup -> [extract ->] [tag ->] [cluster ->] write
+    (see run_bounded_stages), so memory stays flat however many alerts the source has, and db
+    writes of one page overlap with fetching the next. Each page is marked stored with the fetcher
+    once it is through the write stage, or dropped before it, so the fetcher's checkpoints never
+    get ahead of the alerts actually stored, e.g. when the time budget stops the run part way.
+
+    Args:
+        fetcher (DataFetcher): The data source to fetch alerts from.
+        alerts_db (AlertsDAO): The alerts db to add the new alerts to.
+        queue_size (int): Maximum number of pages waiting between two stages.
+        triage_staging_db (TriageStagingDAO | None): If given, a triage staging entity is added for each new alert,
+            in bulk per page, in the write stage.
+        processing_queue (ProcessingQueuePublisher | None): If given, the new alerts of each page are published to
+            the processing queue, in the write stage, so a full queue slows the run down. If the queue stays full
+            past its timeout, or publishing fails, the rest of the run's alerts are not published, and are left for
+            the processors to find by their NOT_STARTED status.
+        indicator_extractor (IndicatorExtractor | None): If given, the indicators of compromise of each alert are
+            extracted into its indicators field before it is stored, in an extract stage of their own.
+        alert_tagger (TaxonomyTagger | None): If given, each alert is tagged with the taxonomy entries it mentions, into
+            its tags_data field, before it is stored and staged for triage, in a tag stage of its own.
+        indicator_index_db (IndicatorIndexDAO | None): If given along with indicator_extractor, the new alerts of
+            each page are added to the reverse index of their indicators, in the write stage.
+        near_duplicate_detector (NearDuplicateDetector | None): If given, each alert is checked against the near-duplicate
+            index, in a cluster stage of its own, and the new alerts are added to the index in the write stage. New alerts
+            that are near duplicates of earlier ones are stored, but neither staged for triage nor queued for processing.
+        time_budget_seconds (float | None): If given, no more pages are fetched once this long has passed, and the run
+            ends once the pages already fetched are written. The page being fetched when the budget runs out is finished
+            first, so the fetcher's requests should have timeouts of their own.
+        cancel (threading.Event | None): If given, setting it stops the run early, once the page being fetched and the
+            pages being processed by each stage are finished. The pages waiting between stages are dropped, and so
+            are left for the next run, as they are never marked stored.
+
+    Returns:
+        IngestionResult: The number of alerts fetched, and the identifiers of those inserted, staged and queued.
+    """
+    result = IngestionResult()
+    seen_alert_keys: set[str] = set()
+    publishing = processing_queue is not None
+    # Near-duplicate index entries of the alerts between the cluster and write stages, by alert_key.
+    pending_entries: dict[str, NearDuplicateEntry] = {}
+
+    def dedup(alerts: list[AlertDocument]) -> list[AlertDocument] | None:
+        # Drop alerts already seen earlier in this run, e.g. the same article in two streams.
+        # Duplicates of alerts stored by previous runs are dropped by the db in the write stage.
+        result.fetched_count += len(alerts)
+        unseen_alerts: list[AlertDocument] = []
+        for alert in alerts:
+            if alert.alert_key not in seen_alert_keys:
+                seen_alert_keys.add(alert.alert_key)
+                unseen_alerts.append(alert)
+        return unseen_alerts or None
+
+    def extract(alerts: list[AlertDocument]) -> list[AlertDocument]:
+        indicator_extractor.extract_alerts(alerts)
+        return alerts
+
+    def tag(alerts: list[AlertDocument]) -> list[AlertDocument]:
+        alert_tagger.tag_alerts(alerts)
+        return alerts
+
+    def cluster(alerts: list[AlertDocument]) -> list[AlertDocument]:
+        for entry in near_duplicate_detector.assign_clusters(alerts):
+            pending_entries[entry.alert_key] = entry
+        return alerts
+
+    def write(alerts: list[AlertDocument]) -> list | None:
+        nonlocal publishing
+        page_entries = [pending_entries.pop(alert.alert_key) for alert in alerts if alert.alert_key in pending_entries]
+        inserted_ids = alerts_db.add_alerts_if_not_duplicate(alerts)
+        for inserted_id in inserted_ids:
+            logging.info("Added alert with id: %s", inserted_id)
+        result.inserted_ids.extend(inserted_ids)
+        if not inserted_ids:
+            return None
+        inserted_keys = set(inserted_ids)
+        inserted_alerts = [alert for alert in alerts if alert.alert_key in inserted_keys]
+        if near_duplicate_detector is not None:
+            near_duplicate_detector.index_entries([entry for entry in page_entries if entry.alert_key in inserted_keys])
+            result.near_duplicate_ids.extend(alert.alert_key for alert in inserted_alerts if alert.duplicate_of is not None)
+        if indicator_index_db is not None and indicator_extractor is not None:
+            result.indexed_indicators += indicator_index_db.add_alerts_indicators(inserted_alerts)
+        # Near duplicates are left out of triage and processing, their story is already there with the first alert of their cluster.
+        inserted_alerts = [alert for alert in inserted_alerts if alert.duplicate_of is None]
+        if not inserted_alerts:
+            return None
+        if triage_staging_db is not None:
+            staging_entities = [TriageStagingEntity.from_alert(alert) for alert in inserted_alerts]
+            result.staged_ids.extend(triage_staging_db.add_staging_entities_if_not_exist(staging_entities))
+        if publishing:
+            try:
+                result.queued_messages += processing_queue.publish_alerts(inserted_alerts)
+                result.queued_ids.extend(alert.alert_key for alert in inserted_alerts)
+            except Exception as e:
+                # The alerts are stored by now, so failing the run would leave its checkpoints behind, and the alerts
+                # would be skipped as already stored by the next run. Unpublished alerts are left for the processors to
+                # find by their NOT_STARTED status instead.
+                logging.warning("Stopped publishing new alerts to the processing queue for this run: %s", e)
+                metrics.increment("ingestion.publish_failures")
+                publishing = False
+        return None
+
+    def carrying_raw_page(name: str, stage_function, last: bool):
+        # Each item is the (raw page, output of the previous stage) pair, so the write stage knows which page
+        # to mark stored. Pages dropped by a stage are passed on as (raw page, None), to be marked in order too.
+        def run_stage(item: tuple[list, list | None]):
+            raw_page, page = item
+            if page is not None:
+                page = stage_function(page)
+            if not last:
+                return raw_page, page
+            fetcher.mark_page_stored(raw_page)
+            return None
+        return name, run_stage
+
+    def iter_raw_pages():
+        raw_pages = fetcher.iter_raw_pages()
+        deadline = None if time_budget_seconds is None else time.monotonic() + time_budget_seconds
+        try:
+            for raw_page in raw_pages:
+                yield raw_page, raw_page
+                if deadline is not None and time.monotonic() >= deadline:
+                    logging.warning("Stopped fetching after the time budget of %s seconds, the rest is left for the next run.", time_budget_seconds)
+                    result.timed_out = True
+                    return
+        finally:
+            if hasattr(raw_pages, 'close'): # So the fetcher stops its own requests in flight.
+                raw_pages.close()
+
+    stages = [("deserialize", fetcher.deserialize_page), ("dedup", dedup)]
+    if indicator_extractor is not None:
+        stages.append(("extract", extract))
+    if alert_tagger is not None:
+        stages.append(("tag", tag))
+    if near_duplicate_detector is not None:
+        stages.append(("cluster", cluster))
+    stages.append(("write", write))
+    stages = [carrying_raw_page(name, stage_function, last=index == len(stages) - 1) for index, (name, stage_function) in enumerate(stages)]
+
+    with metrics.span("ingestion.run"):
+        run_bounded_stages(
+            iter_raw_pages(),
+            stages,
+            queue_size=queue_size,
+            durations=result.stage_durations,
+            source_name="fetch",
+            stop=cancel
+        )
+
+    for stage, durations in result.stage_durations.items():
+        for seconds in durations:
+            metrics.observe("ingestion.stage", seconds, stage=stage)
+    metrics.increment("ingestion.fetched", result.fetched_count)
+    metrics.increment("ingestion.inserted", len(result.inserted_ids))
+    metrics.increment("ingestion.staged", len(result.staged_ids))
+    metrics.increment("ingestion.near_duplicates", len(result.near_duplicate_ids))
+    metrics.increment("ingestion.queued", len(result.queued_ids))
+    metrics.increment("ingestion.indexed_indicators", result.indexed_indicators)
+    return result
+
+
+def ingest_sources(
+        fetchers: dict[str, DataFetcher],
+        alerts_db: AlertsDAO,
+        time_budgets: dict[str, float] | None = None,
+        grace_seconds: float = 30,
+        **ingest_kwargs
+    ) -> dict[str, IngestionResult]:
+    """
+    Ingests several data sources concurrently, each with ingest_alerts in a thread of its own, into the same dbs.
+
+    Each source is isolated from the others: it stops fetching once its own time budget is spent, its checkpoints
+    are committed as soon as its own alerts are stored, and if it fails, or is still running past its time budget
+    and the grace period, it is reported in its result and the others carry on regardless. A source that overruns
+    is cancelled, and waited for until its request in flight and the page it is writing are finished, so nothing
+    is left running once this returns. The checkpoints of the pages it stored by then are still committed.
+
+    Args:
+        fetchers (dict[str, DataFetcher]): The fetchers of the data sources, by source name.
+        alerts_db (AlertsDAO): The alerts db to add the new alerts to.
+        time_budgets (dict[str, float] | None): How long each source may fetch for, by source name. Sources
+            without one are not limited.
+        grace_seconds (float): How long a source is waited for past its time budget, to write what it fetched.
+        **ingest_kwargs: The other arguments of ingest_alerts, shared by every source, e.g. the triage staging db.
+
+    Returns:
+        dict[str, IngestionResult]: The result of each source, by source name, in the order of fetchers.
+    """
+    time_budgets = time_budgets or {}
+
+    def run_source(source: str, fetcher: DataFetcher, cancel: threading.Event) -> IngestionResult:
+        with metrics.span("ingestion.source", source=source):
+            result = ingest_alerts(fetcher, alerts_db, time_budget_seconds=time_budgets.get(source), cancel=cancel, **ingest_kwargs)
+        fetcher.commit_checkpoints() # Only the pages of the source that are safely stored are checkpointed.
+        return result
+
+    results: dict[str, IngestionResult] = {}
+    if not fetchers:
+        return results
+    start = time.monotonic()
+    cancels = {source: threading.Event() for source in fetchers}
+    with ThreadPoolExecutor(max_workers=len(fetchers), thread_name_prefix='ingest-source') as executor:
+        futures = {source: executor.submit(run_source, source, fetcher, cancels[source]) for source, fetcher in fetchers.items()}
+        for source, future in futures.items():
+            time_budget = time_budgets.get(source)
+            timeout = None if time_budget is None else max(0.0, start + time_budget + grace_seconds - time.monotonic())
+            try:
+                results[source] = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                logging.error("Data source %s is still running %s seconds past its time budget, so is cancelled.", source, grace_seconds)
+                metrics.increment("ingestion.source_failures", source=source, reason="timeout")
+                cancels[source].set()
+                try:
+                    result = future.result() # Once its request in flight and the page it is writing are finished.
+                except Exception as e:
+                    logging.error("Cancelled data source %s failed, its checkpoints were not committed: %s", source, e)
+                    result = IngestionResult(error=str(e) or type(e).__name__)
+                result.timed_out = True
+                result.error = result.error or f"Cancelled {grace_seconds} seconds past its time budget of {time_budget} seconds."
+                results[source] = result
+            except Exception as e:
+                logging.error("Ingesting data source %s failed, its checkpoints were not committed: %s", source, e)
+                metrics.increment("ingestion.source_failures", source=source, reason="error")
+                results[source] = IngestionResult(error=str(e) or type(e).__name__)
+    return results
@@ -0,0 +1,197 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
+
+# Marks the end of the items flowing through a queue.
+_END = object()
+
+# How often a blocked put/get re-checks whether the pipeline has been stopped, in seconds.
+_POLL_INTERVAL = 0.1
+
+
+def _put_unless_stopped(items: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Puts the item on the bounded queue, waiting for space. Returns False if stopped first."""
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get_unless_stopped(items: queue.Queue, stop: threading.Event) -> Any:
+    """Gets the next item from the queue, waiting for one. Returns _END if stopped first."""
+    while not stop.is_set():
+        try:
+            return items.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            continue
+    return _END
+
+
+def run_bounded_stages(
+        source: Iterable,
+        stages: list[tuple[str, Callable[[Any], Any]]],
+        queue_size: int = 2,
+        durations: dict[str, list[float]] | None = None,
+        source_name: str = 'source',
+        stop: threading.Event | None = None
+    ) -> list:
+    """
+    Runs the items of source through each of the stages in turn, like a shell pipeline.
+
+    The source and every stage run in their own thread, connected by queues that hold at most
+    queue_size items. A stage that gets ahead of the next one blocks until there is space, so
+    only a few items are in memory at once however many the source produces, and the stages
+    overlap, e.g. db writes of one page happen while the next page is being fetched.
+
+    Args:
+        source: The items to process, e.g. a generator of fetched pages.
+        stages: The stages as (name, function) pairs, in order. Each function takes one item and
+            returns the item to pass on to the next stage, or None to drop it.
+        queue_size: Maximum number of items waiting between two stages.
+        durations: If given, the seconds spent producing each item of the source and processing
+            each item in each stage are appended to durations[name], excluding time spent waiting
+            on the queues between stages.
+        source_name: The name the source's durations are recorded under.
+        stop: If given, setting it stops the pipeline early, without an error: the items the source and
+            the stages are working on are finished, and the items waiting between stages are dropped.
+            It is also set when the source or a stage fails.
+
+    Returns:
+        list: The non-None outputs of the last stage, in order.
+
+    Raises:
+        Exception: The first exception raised by the source or any stage, after all stages have stopped.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    if stop is None:
+        stop = threading.Event()
+    errors: list[BaseException] = []
+    results: list = []
+    if durations is not None: # Created up front, so each thread only ever appends to its own list.
+        for name in [source_name] + [name for name, _ in stages]:
+            durations.setdefault(name, [])
+
+    def record(name: str, start: float):
+        if durations is not None:
+            durations[name].append(time.perf_counter() - start)
+
+    def run_source():
+        items = iter(source)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+                record(source_name, start)
+                if not _put_unless_stopped(queues[0], item, stop):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put_unless_stopped(queues[0], _END, stop)
+            if hasattr(items, 'close'): # Let generator sources clean up, e.g. if a later stage failed.
+                items.close()
+
+    def run_stage(index: int, name: str, stage_function: Callable[[Any], Any]):
+        in_queue = queues[index]
+        out_queue = queues[index + 1] if index + 1 < len(stages) else None
+        try:
+            while True:
+                item = _get_unless_stopped(in_queue, stop)
+                if item is _END:
+                    return
+                start = time.perf_counter()
+                output = stage_function(item)
+                record(name, start)
+                if output is None:
+                    continue
+                if out_queue is None:
+                    results.append(output)
+                elif not _put_unless_stopped(out_queue, output, stop):
+                    return
+        except BaseException as e:
+            logging.error('Stage "%s" of the pipeline failed: %s', name, e)
+            errors.append(e)
+            stop.set()
+        finally:
+            if out_queue is not None:
+                _put_unless_stopped(out_queue, _END, stop)
+
+    threads = [threading.Thread(target=run_source, name='stage-source', daemon=True)]
+    threads += [
+        threading.Thread(target=run_stage, args=(index, name, stage_function), name=f'stage-{name}', daemon=True)
+        for index, (name, stage_function) in enumerate(stages)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return results
+
+
+def merge_iterators(
+        iterator_factories: list[Callable[[], Iterable]],
+        max_workers: int,
+        queue_size: int = 2
+    ) -> Iterator:
+    """
+    Runs several iterators concurrently, yielding their items as they are produced.
+
+    Each iterator runs on a bounded thread pool of max_workers threads, and pushes its items
+    onto a shared queue of at most queue_size items. The items of any one iterator are yielded
+    in order, while the items of different iterators are interleaved.
+
+    Args:
+        iterator_factories: Functions that each create one of the iterators to run.
+        max_workers: Maximum number of iterators running at once.
+        queue_size: Maximum number of produced items waiting to be yielded.
+
+    Yields:
+        The items of all the iterators.
+
+    Raises:
+        Exception: The first exception raised by any of the iterators. The others are stopped.
+    """
+    items = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    iterator_done = object()
+
+    def produce(iterator_factory: Callable[[], Iterable]):
+        if stop.is_set(): # The consumer stopped before this iterator got a thread.
+            return
+        try:
+            for item in iterator_factory():
+                if not _put_unless_stopped(items, (item, None), stop):
+                    return
+        except Exception as e:
+            _put_unless_stopped(items, (None, e), stop)
+        finally:
+            _put_unless_stopped(items, (iterator_done, None), stop)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='merge-iterators') as executor:
+        for iterator_factory in iterator_factories:
+            executor.submit(produce, iterator_factory)
+        try:
+            remaining = len(iterator_factories)
+            while remaining:
+                item, error = items.get()
+                if error is not None:
+                    raise error
+                if item is iterator_done:
+                    remaining -= 1
+                    continue
+                yield item
+        finally:
+            stop.set() # Also reached if the consumer stops early, so the producers don't block forever.
@@ -0,0 +1,69 @@
+import math
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+
+# Words too common to say anything about what a sentence is about.
+STOP_WORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself just may me might more most must my no nor not now of off on once
+only or other our ours out over own said same she should so some such than that the their theirs them then there
+these they this those through to too under until up us very was we were what when where which while who whom why
+will with would you your yours
+""".split())
+
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+_WORD_PATTERN = re.compile(r"[a-z0-9][a-z0-9\-]*")
+
+
+class Summarizer(ABC):
+    """
+    Abstract base class for the summarization backends of the summarization worker.
+    """
+
+    @abstractmethod
+    def summarize(self, title: str, text: str) -> str:
+        """Returns the summary of an alert, from its title and its plain text."""
+        pass
+
+
+class ExtractiveSummarizer(Summarizer):
+    """
+    Local extractive summarizer, which needs no network or model: the summary is made of the
+    max_sentences sentences of the text that best cover its most frequent content words (and
+    the words of the title, which are weighted up), in the order they appear in the text.
+    """
+
+    def __init__(self, max_sentences: int = 3, title_weight: float = 2.0):
+        """
+        Args:
+            max_sentences (int): Number of sentences in a summary.
+            title_weight (float): How much more a word of the title counts than a word of the text.
+        """
+        self.max_sentences = max_sentences
+        self.title_weight = title_weight
+
+    @staticmethod
+    def _words(text: str) -> list[str]:
+        return [word for word in _WORD_PATTERN.findall(text.lower()) if word not in STOP_WORDS]
+
+    def summarize(self, title: str, text: str) -> str:
+        sentences = [sentence.strip() for sentence in _SENTENCE_PATTERN.split(text) if sentence.strip()]
+        if len(sentences) <= self.max_sentences:
+            return " ".join(sentences)
+
+        frequencies = Counter(self._words(text))
+        for word in set(self._words(title)):
+            frequencies[word] = frequencies.get(word, 0) * self.title_weight + self.title_weight
+        top_frequency = max(frequencies.values(), default=1)
+
+        def score(sentence: str) -> float:
+            words = self._words(sentence)
+            if not words:
+                return 0.0
+            # Normalized by the log of the length, so long sentences don't win on length alone.
+            return sum(frequencies[word] / top_frequency for word in words) / math.log2(len(words) + 1)
+
+        ranked = sorted(range(len(sentences)), key=lambda index: score(sentences[index]), reverse=True)
+        return " ".join(sentences[index] for index in sorted(ranked[:self.max_sentences]))
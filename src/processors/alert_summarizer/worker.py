@@ -0,0 +1,222 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+from pydantic import confloat, conint
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from data_accessors.datastores.abstract import AlertsDAO
+from models.enums import SummarizationStatus
+from processors.alert_summarizer.summarizers import ExtractiveSummarizer, Summarizer
+from processors.alert_text import alert_text
+from telemetry import metrics
+
+
+class SummarizationConfig(BaseSettings):
+    """
+    Configuration of the summarization worker.
+
+    Attributes:
+        model_config (SettingsConfigDict): Environment variable format for the configuration.
+        batch_size (int): Number of alerts claimed at a time.
+        max_workers (int): Number of alerts summarized (and written back) concurrently.
+        cache_size (int): Number of summaries kept in the cache, by content hash. 0 disables the cache.
+        max_sentences (int): Number of sentences in a summary of the default, extractive, summarizer.
+        claim_timeout_seconds (float): How long an alert can stay IN_PROGRESS before another worker
+            assumes the one that claimed it died, and claims it again.
+    """
+    model_config: SettingsConfigDict = SettingsConfigDict(env_prefix="SUMMARIZATION_")
+    batch_size: conint(ge=1) = 50
+    max_workers: conint(ge=1) = 4
+    cache_size: conint(ge=0) = 10_000
+    max_sentences: conint(ge=1) = 3
+    claim_timeout_seconds: confloat(gt=0) = 900.0
+
+
+class SummaryCache:
+    """
+    Thread-safe LRU cache of summaries, keyed by the hash of the content they summarize, so
+    the same article syndicated under several urls is only summarized once.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._summaries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_hash(title: str, text: str) -> str:
+        return hashlib.sha256(f"{title}\n{text}".encode("utf-8")).hexdigest()
+
+    def get(self, content_hash: str) -> str | None:
+        with self._lock:
+            summary = self._summaries.get(content_hash)
+            if summary is not None:
+                self._summaries.move_to_end(content_hash)
+            return summary
+
+    def put(self, content_hash: str, summary: str):
+        if self.max_size == 0:
+            return
+        with self._lock:
+            self._summaries[content_hash] = summary
+            self._summaries.move_to_end(content_hash)
+            while len(self._summaries) > self.max_size:
+                self._summaries.popitem(last=False)
+
+
+@dataclass
+class SummarizationBatchStats:
+    """
+    What a batch of the summarization worker did.
+
+    Attributes:
+        claimed: Number of alerts claimed.
+        completed: Number of alerts whose summary was written back.
+        failed: Number of alerts whose summarization or write failed, and were marked FAILED.
+        cache_hits: Number of alerts whose summary came from the cache, or from another alert of the batch with the same content.
+        seconds: Wall-clock duration of the batch, claim included.
+    """
+    claimed: int = 0
+    completed: int = 0
+    failed: int = 0
+    cache_hits: int = 0
+    seconds: float = 0.0
+
+    @property
+    def alerts_per_second(self) -> float:
+        return self.claimed / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def cache_hit_rate(self) -> float:
+        return self.cache_hits / self.claimed if self.claimed else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            **asdict(self),
+            "seconds": round(self.seconds, 3),
+            "alerts_per_second": round(self.alerts_per_second, 2),
+            "cache_hit_rate": round(self.cache_hit_rate, 3),
+        }
+
+
+class SummarizationWorker:
+    """
+    Summarizes the alerts whose summarization has not started, a batch at a time.
+
+    Each batch is claimed from the alerts db (moving it to IN_PROGRESS, so concurrent workers
+    never summarize the same alert), grouped by content hash, and each distinct content that is
+    not in the cache is summarized once, on a bounded pool of max_workers threads. The status
+    and summary of each alert are then written back with a partial update of its summary_data,
+    COMPLETED, or FAILED if its summarization or write raised.
+    """
+
+    def __init__(
+            self,
+            alerts_db: AlertsDAO,
+            summarizer: Summarizer | None = None,
+            config: SummarizationConfig | None = None,
+            cache: SummaryCache | None = None,
+            clock: Callable[[], float] = time.perf_counter
+        ):
+        """
+        Args:
+            alerts_db (AlertsDAO): The alerts db to claim the alerts from and write their summaries to.
+            summarizer (Summarizer | None): The summarization backend. Defaults to the local ExtractiveSummarizer.
+            config (SummarizationConfig | None): Batch, pool and cache sizes. Defaults to the environment's.
+            cache (SummaryCache | None): The summary cache, which can be shared by several workers. Defaults to a new one.
+            clock (Callable[[], float]): Source of the current time in seconds, replaceable for tests.
+        """
+        self.alerts_db = alerts_db
+        self.config = config or SummarizationConfig()
+        self.summarizer = summarizer or ExtractiveSummarizer(max_sentences=self.config.max_sentences)
+        self.cache = cache or SummaryCache(self.config.cache_size)
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=self.config.max_workers, thread_name_prefix="summarizer")
+
+    def _write_back(self, document: dict, summary: str | None, stats: SummarizationBatchStats, lock: threading.Lock):
+        status = SummarizationStatus.COMPLETED if summary is not None else SummarizationStatus.FAILED
+        try:
+            self.alerts_db.update_alert_fields(document, {"summary_data.status": status.value, "summary_data.summary_text": summary})
+        except Exception as e:
+            logging.error("Failed to write back the summary of alert %s: %s", document.get("alert_key"), e)
+            status = SummarizationStatus.FAILED
+        with lock:
+            if status == SummarizationStatus.COMPLETED:
+                stats.completed += 1
+            else:
+                stats.failed += 1
+
+    def _summarize_group(self, content_hash: str, title: str, text: str, documents: list[dict], stats: SummarizationBatchStats, lock: threading.Lock):
+        """Summarizes one distinct content, unless it is cached, and writes the summary back to every alert that has it."""
+        summary = self.cache.get(content_hash)
+        cached = summary is not None
+        if not cached:
+            try:
+                summary = self.summarizer.summarize(title, text)
+                self.cache.put(content_hash, summary)
+            except Exception as e:
+                logging.error("Failed to summarize alert %s: %s", documents[0].get("alert_key"), e)
+        with lock:
+            stats.cache_hits += len(documents) if cached else len(documents) - 1
+        for document in documents:
+            self._write_back(document, summary, stats, lock)
+
+    def run_batch(self) -> SummarizationBatchStats:
+        """
+        Claims and summarizes a batch of alerts.
+
+        Returns:
+            SummarizationBatchStats: What the batch did, with its throughput and cache hit rate. 'claimed' is 0 if there was nothing to summarize.
+        """
+        started_at = self._clock()
+        stats = SummarizationBatchStats()
+        lock = threading.Lock()
+        documents = self.alerts_db.claim_alerts_for_summarization(self.config.batch_size, self.config.claim_timeout_seconds)
+        stats.claimed = len(documents)
+
+        groups: dict[str, tuple[str, str, list[dict]]] = {}
+        for document in documents:
+            alert_data = document.get("alert_data") or {}
+            title = alert_data.get("title") or ""
+            text = alert_text(alert_data) or title
+            content_hash = SummaryCache.content_hash(title, text)
+            groups.setdefault(content_hash, (title, text, []))[2].append(document)
+
+        wait([
+            self._executor.submit(self._summarize_group, content_hash, title, text, group_documents, stats, lock)
+            for content_hash, (title, text, group_documents) in groups.items()
+        ])
+        stats.seconds = self._clock() - started_at
+
+        if stats.claimed:
+            logging.info("Summarization batch: %s", stats.to_dict())
+            metrics.increment("summarization.alerts", stats.completed, status="completed")
+            metrics.increment("summarization.alerts", stats.failed, status="failed")
+            metrics.increment("summarization.cache_hits", stats.cache_hits)
+            metrics.observe("summarization.batch", stats.seconds)
+        return stats
+
+    def run(self, max_batches: int | None = None) -> list[SummarizationBatchStats]:
+        """
+        Runs batches until there is nothing left to summarize, or max_batches batches were run.
+
+        Returns:
+            list[SummarizationBatchStats]: The stats of each batch that claimed alerts.
+        """
+        batches: list[SummarizationBatchStats] = []
+        while max_batches is None or len(batches) < max_batches:
+            stats = self.run_batch()
+            if not stats.claimed:
+                break
+            batches.append(stats)
+        return batches
+
+    def close(self):
+        """Shuts the worker pool down, once the running batch is done."""
+        self._executor.shutdown(wait=True)
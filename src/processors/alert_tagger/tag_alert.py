@@ -0,0 +1,218 @@
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from config_managers.source_files import load_yaml
+from models.alerts_table_document import AlertDocument, TagsInfo
+from models.enums import TaggingStatus
+from processors.alert_text import alert_text, has_full_content, tokenize
+
+# Never a word, so never part of a pattern.
+_TEXT_BREAK = "\n"
+
+
+class TaggerConfig(BaseSettings):
+    """
+    Configuration of the alert tagger.
+
+    Attributes:
+        model_config (SettingsConfigDict): Environment variable format for the configuration.
+        taxonomy_path (str): The YAML taxonomy, mapping each category to its entries, each with a 'name' and optional 'aliases'.
+    """
+    model_config: SettingsConfigDict = SettingsConfigDict(env_prefix="TAGGER_")
+    taxonomy_path: str = 'tag_taxonomy.yaml' # Default to file in root of az func folder if not set.
+
+
+@dataclass(frozen=True, slots=True)
+class TaxonomyTerm:
+    """
+    An entry of the taxonomy.
+
+    Attributes:
+        category: The category of the entry, e.g. 'threat_actors'.
+        name: The canonical name of the entry, which is the tag it is matched as.
+    """
+    category: str
+    name: str
+
+
+class TokenAutomaton:
+    """
+    Aho-Corasick automaton over words rather than characters, so that every pattern of a
+    text is found in one pass over its words, whatever the number of patterns, and patterns
+    only ever match whole words.
+
+    Each state is a node of the trie of the patterns, with a goto table from the next word to
+    the next state, a failure link to the state of the longest proper suffix of its path that
+    is also a trie path, and the ids of the patterns ending there, including those of the
+    states along its failure links, merged in when the automaton is built.
+    """
+
+    def __init__(self, patterns: Iterable[tuple[tuple[str, ...], int]]):
+        """
+        Args:
+            patterns (Iterable[tuple[tuple[str, ...], int]]): The patterns, as their words, each with its id.
+        """
+        self.goto: list[dict[str, int]] = [{}]
+        self.outputs: list[tuple[int, ...]] = [()]
+        for words, pattern_id in patterns:
+            state = 0
+            for word in words:
+                next_state = self.goto[state].get(word)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][word] = next_state
+                    self.goto.append({})
+                    self.outputs.append(())
+                state = next_state
+            if pattern_id not in self.outputs[state]:
+                self.outputs[state] += (pattern_id,)
+
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values()) # States at depth 1 fail to the root.
+        while queue: # Breadth first, so the failure link of every shallower state is already set.
+            state = queue.popleft()
+            for word, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and word not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(word, 0)
+                self.outputs[next_state] += tuple(
+                    pattern_id for pattern_id in self.outputs[self.fail[next_state]] if pattern_id not in self.outputs[next_state]
+                )
+
+    @property
+    def state_count(self) -> int:
+        return len(self.goto)
+
+    def iter_matches(self, words: list[str]) -> Iterator[tuple[int, int]]:
+        """Yields (index of the last word, pattern id) of every occurrence of a pattern in the words, in order."""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        state = 0
+        for index, word in enumerate(words):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            for pattern_id in outputs[state]:
+                yield index, pattern_id
+
+
+class TaxonomyTagger:
+    """
+    Tags alerts with the entries of a taxonomy (threat actors, malware families, products,
+    sectors, ...) whose name or one of whose aliases appears in their title or content.
+
+    The names and aliases of every entry are compiled into a single TokenAutomaton, so tagging
+    an alert costs one tokenization and one pass over its words, however big the taxonomy is.
+    Use get_tagger() to compile each taxonomy file once per process.
+    """
+
+    def __init__(self, taxonomy: dict[str, list[dict]]):
+        """
+        Args:
+            taxonomy (dict[str, list[dict]]): Each category, mapped to its entries, each with a 'name' and optional 'aliases'.
+
+        Raises:
+            ValueError: If the taxonomy does not have this structure.
+        """
+        if not isinstance(taxonomy, dict):
+            raise ValueError("The taxonomy must map each category to a list of entries.")
+        self.terms: list[TaxonomyTerm] = []
+        patterns: list[tuple[tuple[str, ...], int]] = []
+        for category, entries in taxonomy.items():
+            for entry in entries or []:
+                if not isinstance(entry, dict) or not entry.get("name"):
+                    raise ValueError(f"Invalid entry {entry!r} in category '{category}', expected a 'name' and optional 'aliases'.")
+                term_id = len(self.terms)
+                self.terms.append(TaxonomyTerm(category=category, name=str(entry["name"])))
+                for surface_form in [entry["name"], *(entry.get("aliases") or [])]:
+                    words = tuple(tokenize(str(surface_form)))
+                    if not words:
+                        logging.warning("Skipping alias %r of '%s', which has no words.", surface_form, entry["name"])
+                        continue
+                    patterns.append((words, term_id))
+        self.pattern_count = len(patterns)
+        self.automaton = TokenAutomaton(patterns)
+
+    @classmethod
+    def from_file(cls, path: str) -> "TaxonomyTagger":
+        taxonomy, _version = load_yaml(path)
+        return cls(taxonomy)
+
+    def match_text(self, *texts: str) -> list[TaxonomyTerm]:
+        """Returns the entries appearing in any of the texts, each once, in the order they first appear."""
+        words: list[str] = []
+        for text in texts:
+            if words:
+                words.append(_TEXT_BREAK) # So that no pattern spans the end of one text and the start of the next.
+            words.extend(tokenize(text))
+        term_ids = dict.fromkeys(pattern_id for _index, pattern_id in self.automaton.iter_matches(words))
+        return [self.terms[term_id] for term_id in term_ids]
+
+    def tag(self, title: str, content: str, full_content: bool = True) -> TagsInfo:
+        """
+        Tags a text, e.g. of an alert.
+
+        Args:
+            title (str): The title.
+            content (str): The plain text content.
+            full_content (bool): Whether content is the whole article, rather than a (truncated) summary.
+
+        Returns:
+            TagsInfo: The names of the entries appearing in the title or content, FULLY_TAGGED if the whole
+                article was tagged, PARTIALLY_TAGGED if only its title and summary were available.
+        """
+        terms = self.match_text(title, content)
+        return TagsInfo(
+            status=TaggingStatus.FULLY_TAGGED if full_content else TaggingStatus.PARTIALLY_TAGGED,
+            tags=[term.name for term in terms]
+        )
+
+    def tag_alert(self, alert: AlertDocument) -> TagsInfo:
+        return self.tag(alert.alert_data.get("title") or "", alert_text(alert.alert_data), has_full_content(alert.alert_data))
+
+    def tag_alerts(self, alerts: Iterable[AlertDocument], apply: bool = True) -> list[TagsInfo]:
+        """
+        Tags a batch of alerts.
+
+        Args:
+            alerts (Iterable[AlertDocument]): The alerts to tag.
+            apply (bool): Whether to also set the tags as the tags_data of each alert.
+
+        Returns:
+            list[TagsInfo]: The tags of each alert, in the order of the input.
+        """
+        results = []
+        for alert in alerts:
+            tags_info = self.tag_alert(alert)
+            if apply:
+                alert.tags_data = tags_info
+            results.append(tags_info)
+        return results
+
+
+# Compiled taggers, keyed by taxonomy path, with the version of the file they were compiled from.
+_taggers: dict[str, tuple[tuple[int, int], TaxonomyTagger]] = {}
+_taggers_lock = threading.Lock()
+
+
+def get_tagger(taxonomy_path: str) -> TaxonomyTagger:
+    """
+    Returns the tagger of a taxonomy file, compiled on the first call in the process, and
+    compiled again only if the file has changed since.
+    """
+    taxonomy, version = load_yaml(taxonomy_path)
+    with _taggers_lock:
+        cached = _taggers.get(taxonomy_path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        tagger = TaxonomyTagger(taxonomy)
+        _taggers[taxonomy_path] = (version, tagger)
+    logging.info("Compiled the taxonomy %s: %d entries, %d names and aliases, %d automaton states.",
+                 taxonomy_path, len(tagger.terms), tagger.pattern_count, tagger.automaton.state_count)
+    return tagger
@@ -0,0 +1,61 @@
+""" The text of an alert, extracted from the raw data of its aggregator platform, as processed by the processors. """
+import html
+import re
+
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+# The values of the attributes of tags that link to other resources, quoted or not.
+_LINK_ATTRIBUTE_PATTERN = re.compile(r"""<[^>]*?\s(?:href|src)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", re.IGNORECASE)
+# Words are runs of letters and digits, so 'Log4j', 'LockBit-3.0' and 'PAN-OS' tokenize the same
+# whatever punctuation or whitespace separates their parts.
+_TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+# Fields of the raw alert data holding the article's HTML, most complete first.
+# See https://developers.feedly.com/reference/articlejson for details.
+FULL_CONTENT_FIELDS = ("fullContent", "content")
+SUMMARY_FIELD = "summary"
+
+
+def html_to_text(content: str) -> str:
+    """Strips the tags from an HTML fragment, and collapses its whitespace."""
+    text = _TAG_PATTERN.sub(" ", content or "")
+    return " ".join(html.unescape(text).split())
+
+
+def html_link_targets(content: str) -> list[str]:
+    """Returns the href and src attribute values of the tags of an HTML fragment, which html_to_text drops, in order."""
+    return [html.unescape(next(value for value in match.groups() if value is not None)) for match in _LINK_ATTRIBUTE_PATTERN.finditer(content or "")]
+
+
+def tokenize(text: str) -> list[str]:
+    """Returns the lowercased words of a text."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _field_html(alert_data: dict, field_name: str) -> str | None:
+    value = alert_data.get(field_name)
+    return value.get("content") if isinstance(value, dict) else value
+
+
+def has_full_content(alert_data: dict) -> bool:
+    """Whether the raw alert data has the article's content, rather than only its title and a (truncated) summary."""
+    return any(_field_html(alert_data, field_name) for field_name in FULL_CONTENT_FIELDS)
+
+
+def alert_text(alert_data: dict) -> str:
+    """
+    Returns the text of an alert, from the raw data of its aggregator platform:
+    the longest of the full content, the content and the summary, as plain text.
+    """
+    candidates = [_field_html(alert_data, field_name) for field_name in FULL_CONTENT_FIELDS + (SUMMARY_FIELD,)]
+    return max((html_to_text(candidate) for candidate in candidates if candidate), key=len, default="")
+
+
+def alert_link_targets(alert_data: dict) -> list[str]:
+    """
+    Returns the targets of the links and embedded resources of an alert's HTML, from the raw data of its aggregator
+    platform, each once, e.g. the url of '<a href="...">here</a>', which is not part of its text.
+    """
+    targets: dict[str, None] = {}
+    for field_name in FULL_CONTENT_FIELDS + (SUMMARY_FIELD,):
+        targets.update(dict.fromkeys(html_link_targets(_field_html(alert_data, field_name))))
+    return list(targets)
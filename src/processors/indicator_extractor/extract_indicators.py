@@ -0,0 +1,190 @@
+import ipaddress
+import re
+from typing import Iterable
+from urllib.parse import urlsplit, urlunsplit
+
+from models.alerts_table_document import AlertDocument, IndicatorsInfo
+from processors.alert_text import alert_link_targets, alert_text
+
+# Defanged forms of the separators of indicators, as written in threat intel articles so that
+# they can't be clicked, e.g. 'hxxps://evil[.]com' or '198.51.100[.]7'.
+_DOT = r"(?:\[\.\]|\(\.\)|\{\.\}|\[dot\]|\(dot\)|\.)"
+_COLON_SLASHES = r"(?:\[://\]|\[:\]//|://)"
+_SCHEME = r"(?:h(?:tt|xx|\[xx\])ps?|f(?:t|x)p)"
+_OCTET = r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+_LABEL = r"[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?"
+
+# All the indicator types in a single pattern, so an alert's text is scanned once, whatever the
+# number of types. Where two alternatives could match at the same position, the first one wins,
+# so a url is matched whole rather than as the domain of its host.
+_INDICATOR_PATTERN = re.compile(
+    rf"""
+    (?P<url>{_SCHEME}{_COLON_SLASHES}[^\s<>"'`]+)
+    | (?<![\w-])(?P<cve>cve-\d{{4}}-\d{{4,7}})(?!\d)
+    | (?<![a-z0-9])(?P<hash>[a-f0-9]{{64}}|[a-f0-9]{{40}}|[a-f0-9]{{32}})(?![a-z0-9])
+    | (?<![\w.\]])(?P<ipv4>{_OCTET}{_DOT}{_OCTET}{_DOT}{_OCTET}{_DOT}{_OCTET})(?!\w|{_DOT}\d)
+    | (?<![\w.\-\]])(?P<domain>(?:{_LABEL}{_DOT})+[a-z]{{2,24}})(?![\w-])
+    """,
+    re.IGNORECASE | re.VERBOSE
+)
+_DEFANGED_DOT_PATTERN = re.compile(r"\[\.\]|\(\.\)|\{\.\}|\[dot\]|\(dot\)", re.IGNORECASE)
+_DEFANGED_SCHEME_PATTERN = re.compile(r"^(?:h(?:xx|\[xx\])p(s?)|fxp)(?=\[?:)", re.IGNORECASE)
+_DEFANGED_COLON_SLASHES_PATTERN = re.compile(r"\[://\]|\[:\]//")
+_CVE_PATTERN = re.compile(r"cve-\d{4}-\d{4,7}", re.IGNORECASE)
+_HASH_TYPES = {32: "md5", 40: "sha1", 64: "sha256"}
+# Punctuation that ends a sentence or encloses a url rather than being part of it.
+_URL_TRAILING_CHARACTERS = ".,;:!?'\")]}"
+
+# Top level domains of the domains that are extracted even when written plainly (defanged domains
+# always are), which leaves out those that are more often file extensions, e.g. 'zip', 'py' or 'sh'.
+# ToDo: Load the full list from the IANA root zone, and rank the ambiguous ones by context instead.
+TOP_LEVEL_DOMAINS = frozenset("""
+    com net org info biz gov edu mil int arpa io co ai app dev xyz top site online club shop store live tech cloud
+    icu vip pro me tv cc ws su onion link click space website fun host press news blog email support services
+    ru cn uk de fr nl eu jp kr kp in br au ca us ua by kz ir iq sy tw hk sg vn id th ph pk bd tr il it es ch se
+    no fi dk cz ro hu bg gr pt at be ie nz za mx ar cl pe ve ng ke eg ma sa ae qa kw om lb jo af uz tj az am ge
+    lt lv ee sk si hr ba cy lu is to tk ml ga cf gq nu
+""".split())
+
+
+def _refang(value: str) -> str:
+    value = _DEFANGED_DOT_PATTERN.sub(".", value)
+    value = _DEFANGED_COLON_SLASHES_PATTERN.sub("://", value)
+    return _DEFANGED_SCHEME_PATTERN.sub(lambda match: f"http{match.group(1)}" if match.group(0)[0] in "hH" else "ftp", value)
+
+
+def _is_ipv4(value: str) -> bool:
+    try:
+        ipaddress.IPv4Address(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _public_ipv4(value: str) -> str | None:
+    """Returns the address, or None if it is not a public one (e.g. private, loopback or documentation), so not an indicator."""
+    try:
+        address = ipaddress.IPv4Address(value)
+    except ValueError:
+        return None
+    return str(address) if address.is_global else None
+
+
+def _normalize_url(value: str) -> tuple[str, str | None]:
+    """Returns the refanged url with its scheme and host lowercased, and its host."""
+    value = _refang(value)
+    while value and value[-1] in _URL_TRAILING_CHARACTERS:
+        # Only strip closing brackets that are not part of the url, e.g. of a wiki style '/Foo_(bar)' path.
+        closing = value[-1]
+        opening = {")": "(", "]": "[", "}": "{"}.get(closing)
+        if opening and value.count(opening) >= value.count(closing):
+            break
+        value = value[:-1]
+    try:
+        parts = urlsplit(value)
+        host = parts.hostname
+    except ValueError: # E.g. an invalid port or IPv6 address.
+        return value, None
+    if not host:
+        return value, None
+    netloc = parts.netloc.rsplit("@", 1)
+    netloc[-1] = netloc[-1].lower()
+    return urlunsplit((parts.scheme.lower(), "@".join(netloc), parts.path, parts.query, parts.fragment)), host.lower()
+
+
+def normalize_indicator(value: str) -> str:
+    """
+    Returns the form an indicator is stored under: refanged, and lowercased, except for CVE ids
+    which are uppercased, and the path and query of urls which are left as they are.
+    """
+    value = value.strip()
+    if _CVE_PATTERN.fullmatch(value):
+        return value.upper()
+    if re.match(_SCHEME + _COLON_SLASHES, value, re.IGNORECASE):
+        return _normalize_url(value)[0]
+    return _refang(value).lower()
+
+
+class IndicatorExtractor:
+    """
+    Extracts the indicators of compromise (IPv4 addresses, domains, urls, MD5/SHA-1/SHA-256 file
+    hashes and CVE ids) mentioned in alerts, whether written plainly or defanged.
+
+    Every type is matched by a single precompiled pattern, so the text of an alert is scanned
+    once, and only the matches are refanged and normalized.
+    """
+
+    def __init__(self, max_indicators_per_type: int = 500):
+        """
+        Args:
+            max_indicators_per_type (int): Maximum number of indicators of each type kept per alert, the first
+                mentioned, so that articles listing thousands of hashes don't bloat their alert document.
+        """
+        self.max_indicators_per_type = max_indicators_per_type
+
+    def extract(self, *texts: str) -> IndicatorsInfo:
+        """
+        Extracts the indicators of some plain texts, e.g. the title and content of an alert.
+
+        Returns:
+            IndicatorsInfo: The indicators, each once, in the order they are first mentioned.
+        """
+        found: dict[str, dict[str, None]] = {indicator_type: {} for indicator_type in IndicatorsInfo.__dataclass_fields__}
+
+        def add(indicator_type: str, value: str):
+            values = found[indicator_type]
+            if len(values) < self.max_indicators_per_type:
+                values[value] = None
+
+        for text in texts:
+            for match in _INDICATOR_PATTERN.finditer(text or ""):
+                indicator_type, value = match.lastgroup, match.group(match.lastgroup)
+                if indicator_type == "url":
+                    url, host = _normalize_url(value)
+                    if host is None:
+                        continue
+                    if _is_ipv4(host):
+                        ipv4 = _public_ipv4(host)
+                        if ipv4 is None:
+                            continue
+                        add("ipv4", ipv4)
+                    elif "." in host:
+                        add("domains", host)
+                    add("urls", url)
+                elif indicator_type == "cve":
+                    add("cves", value.upper())
+                elif indicator_type == "hash":
+                    add(_HASH_TYPES[len(value)], value.lower())
+                elif indicator_type == "ipv4":
+                    ipv4 = _public_ipv4(_refang(value))
+                    if ipv4 is not None:
+                        add("ipv4", ipv4)
+                else:
+                    domain = _refang(value).lower()
+                    if domain != value.lower() or domain.rsplit(".", 1)[-1] in TOP_LEVEL_DOMAINS:
+                        add("domains", domain)
+        return IndicatorsInfo(**{indicator_type: list(values) for indicator_type, values in found.items()})
+
+    def extract_alert(self, alert: AlertDocument) -> IndicatorsInfo:
+        """Extracts the indicators of an alert's title and text, and of the targets of its links, which its text leaves out."""
+        alert_data = alert.alert_data
+        return self.extract(alert_data.get("title") or "", alert_text(alert_data), " ".join(alert_link_targets(alert_data)))
+
+    def extract_alerts(self, alerts: Iterable[AlertDocument], apply: bool = True) -> list[IndicatorsInfo]:
+        """
+        Extracts the indicators of a batch of alerts.
+
+        Args:
+            alerts (Iterable[AlertDocument]): The alerts to extract the indicators of.
+            apply (bool): Whether to also set the indicators as the indicators of each alert.
+
+        Returns:
+            list[IndicatorsInfo]: The indicators of each alert, in the order of the input.
+        """
+        results = []
+        for alert in alerts:
+            indicators = self.extract_alert(alert)
+            if apply:
+                alert.indicators = indicators
+            results.append(indicators)
+        return results
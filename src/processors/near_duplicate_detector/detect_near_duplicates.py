@@ -0,0 +1,193 @@
+import hashlib
+import struct
+import sys
+import time
+from array import array
+from typing import Callable
+
+from pydantic import confloat, conint
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from data_accessors.datastores.abstract import NearDuplicateIndexDAO
+from models.alerts_table_document import AlertDocument
+from models.enums import SummarizationStatus
+from models.near_duplicate_entry import NearDuplicateEntry
+from processors.alert_text import alert_text, tokenize
+
+
+class NearDuplicateConfig(BaseSettings):
+    """
+    Configuration of the near-duplicate detection of alerts.
+
+    With b bands of r rows, two alerts whose texts have a Jaccard similarity of s share a bucket
+    with probability 1 - (1 - s^r)^b, so the defaults (16 bands of 8 rows) find ~95% of the pairs
+    at the default similarity threshold of 0.8, ~99.99% at 0.9, and only ~6% at 0.5.
+
+    Attributes:
+        model_config (SettingsConfigDict): Environment variable format for the configuration.
+        permutation_count (int): Length of the MinHash signatures.
+        band_count (int): Number of LSH bands the signatures are split into. Must divide permutation_count.
+        shingle_size (int): Number of words per shingle, the units the similarity of two texts is measured in.
+        min_words (int): Alerts with fewer words, e.g. a title and a one line summary, are too short to compare, so are skipped.
+        similarity_threshold (float): Estimated Jaccard similarity above which an alert is a near duplicate of an earlier one.
+        max_candidates_per_alert (int): Maximum number of indexed alerts compared with each new alert.
+        retention_days (int): How long alerts stay in the index, i.e. how far apart two copies of a story can be published.
+        seed (int): Seed of the permutations. Signatures computed with different seeds or lengths can't be compared,
+            so changing it (or permutation_count, band_count or shingle_size) starts a new index in effect.
+    """
+    model_config: SettingsConfigDict = SettingsConfigDict(env_prefix="NEAR_DUPLICATES_")
+    permutation_count: conint(ge=1) = 128
+    band_count: conint(ge=1) = 16
+    shingle_size: conint(ge=1) = 4
+    min_words: conint(ge=1) = 50
+    similarity_threshold: confloat(gt=0, le=1) = 0.8
+    max_candidates_per_alert: conint(ge=1) = 50
+    retention_days: conint(ge=1) = 30
+    seed: int = 1
+
+    def model_post_init(self, __context):
+        if self.permutation_count % self.band_count:
+            raise ValueError(f"The band_count ({self.band_count}) must divide the permutation_count ({self.permutation_count}).")
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures of texts, whose proportion of equal positions estimates the
+    Jaccard similarity of the sets of word shingles of the texts, and their LSH band keys.
+
+    Rather than computing permutation_count hash functions of each shingle one by one, each
+    shingle is hashed once with SHAKE-128, whose output can be as long as needed, into one 32 bit
+    value per position, and the minimum of each position is taken over a packed array, so all
+    the arithmetic runs in C. This is ~5x faster than universal hashing in Python.
+    """
+
+    def __init__(self, permutation_count: int = 128, band_count: int = 16, shingle_size: int = 4, seed: int = 1):
+        self.permutation_count = permutation_count
+        self.band_count = band_count
+        self.rows_per_band = permutation_count // band_count
+        self.shingle_size = shingle_size
+        self._seed = seed.to_bytes(8, "little", signed=True)
+
+    def shingles(self, words: list[str]) -> set[bytes]:
+        """Returns the word shingles of a text, or its only shingle if it is shorter than one."""
+        size = self.shingle_size
+        return {" ".join(words[start:start + size]).encode("utf-8") for start in range(max(1, len(words) - size + 1))}
+
+    def signature(self, words: list[str]) -> tuple[int, ...]:
+        seed, digest_size, count = self._seed, 4 * self.permutation_count, self.permutation_count
+        values = array("I", b"".join([hashlib.shake_128(seed + shingle).digest(digest_size) for shingle in self.shingles(words)]))
+        if sys.byteorder == "big": # The digests are read as little endian everywhere, so signatures are portable.
+            values.byteswap()
+        return tuple([min(values[position::count]) for position in range(count)])
+
+    def band_keys(self, signature: tuple[int, ...]) -> list[str]:
+        """Returns the key of the LSH bucket of each band of a signature, prefixed with the band, so bands never share buckets."""
+        rows = self.rows_per_band
+        return [
+            f"{band:x}:" + hashlib.blake2b(struct.pack(f"<{rows}I", *signature[band * rows:(band + 1) * rows]), digest_size=8).hexdigest()
+            for band in range(self.band_count)
+        ]
+
+
+def estimate_similarity(signature: tuple[int, ...], other: tuple[int, ...]) -> float:
+    """Returns the Jaccard similarity of two texts, estimated from their MinHash signatures."""
+    if len(signature) != len(other): # Computed with another configuration.
+        return 0.0
+    return sum(value == other_value for value, other_value in zip(signature, other)) / len(signature)
+
+
+class NearDuplicateDetector:
+    """
+    Detects alerts that are near duplicates of earlier ones, e.g. a vendor report syndicated by
+    several news sites under different urls, which the alert_key can't catch.
+
+    Each alert's text gets a MinHash signature, split into LSH bands. The alerts indexed in the
+    same bucket as any band of a new alert are its candidates, which are found with one indexed
+    lookup per page, so the cost of checking an alert doesn't grow with the size of the index,
+    and the most similar candidate is its original if their estimated similarity is over the
+    threshold.
+
+    Create one per ingestion run: alerts of the run are also compared with the earlier alerts
+    of the run, whether or not they have been indexed yet.
+    """
+
+    def __init__(
+            self,
+            index_db: NearDuplicateIndexDAO,
+            config: NearDuplicateConfig | None = None,
+            clock: Callable[[], float] = time.time
+        ):
+        self.index_db = index_db
+        self.config = config or NearDuplicateConfig()
+        self.hasher = MinHasher(self.config.permutation_count, self.config.band_count, self.config.shingle_size, self.config.seed)
+        self.clock = clock
+        self._run_buckets: dict[str, list[NearDuplicateEntry]] = {}
+
+    def assign_clusters(self, alerts: list[AlertDocument]) -> list[NearDuplicateEntry]:
+        """
+        Sets the cluster_id of each alert long enough to compare, and, if it is a near duplicate of an earlier
+        alert, its duplicate_of, and its summarization status to SKIPPED, as its story is summarized with the
+        first alert of the cluster.
+
+        Args:
+            alerts (list[AlertDocument]): A page of alerts, not stored yet.
+
+        Returns:
+            list[NearDuplicateEntry]: The index entries of the alerts that were compared, to be added to
+                the index with index_entries once the alerts are stored.
+        """
+        signed_alerts = []
+        for alert in alerts:
+            words = tokenize(f"{alert.alert_data.get('title') or ''}\n{alert_text(alert.alert_data)}")
+            if len(words) < self.config.min_words:
+                continue
+            signature = self.hasher.signature(words)
+            signed_alerts.append((alert, signature, self.hasher.band_keys(signature)))
+        if not signed_alerts:
+            return []
+
+        page_band_keys = list(dict.fromkeys(key for _alert, _signature, band_keys in signed_alerts for key in band_keys))
+        buckets: dict[str, list[NearDuplicateEntry]] = {}
+        for entry in self.index_db.find_candidates(page_band_keys, limit=self.config.max_candidates_per_alert * len(signed_alerts)):
+            for key in entry.band_keys:
+                buckets.setdefault(key, []).append(entry)
+
+        entries = []
+        now = self.clock()
+        for alert, signature, band_keys in signed_alerts:
+            original, similarity = self._most_similar(alert.alert_key, signature, band_keys, buckets)
+            if original is not None and similarity >= self.config.similarity_threshold:
+                alert.duplicate_of = original.alert_key
+                alert.cluster_id = original.cluster_id
+                alert.summary_data.status = SummarizationStatus.SKIPPED
+            else:
+                alert.duplicate_of = None
+                alert.cluster_id = alert.alert_key
+            entry = NearDuplicateEntry(alert.alert_key, alert.cluster_id, signature, band_keys, now)
+            entries.append(entry)
+            for key in band_keys: # So later alerts of the run find it before it is indexed.
+                self._run_buckets.setdefault(key, []).append(entry)
+        return entries
+
+    def _most_similar(
+            self,
+            alert_key: str,
+            signature: tuple[int, ...],
+            band_keys: list[str],
+            buckets: dict[str, list[NearDuplicateEntry]]
+        ) -> tuple[NearDuplicateEntry | None, float]:
+        best_entry, best_similarity = None, 0.0
+        compared = {alert_key} # An alert already stored, e.g. re-fetched, is in the index itself.
+        for key in band_keys:
+            for candidate in buckets.get(key, []) + self._run_buckets.get(key, []):
+                if candidate.alert_key in compared or len(compared) > self.config.max_candidates_per_alert:
+                    continue
+                compared.add(candidate.alert_key)
+                similarity = estimate_similarity(signature, candidate.signature)
+                if similarity > best_similarity:
+                    best_entry, best_similarity = candidate, similarity
+        return best_entry, best_similarity
+
+    def index_entries(self, entries: list[NearDuplicateEntry]) -> list[str]:
+        """Adds the entries of stored alerts to the index, and returns the alert_key of those added."""
+        return self.index_db.add_entries(entries, retention_seconds=self.config.retention_days * 24 * 3600)
@@ -0,0 +1,170 @@
+import functools
+import json
+import logging
+import threading
+import time
+from typing import Callable
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Returns the value below which the given fraction of values fall (nearest rank)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+def _metric_key(name: str, labels: dict) -> str:
+    """Formats a metric name and its labels as a single key, e.g. 'feedly.pages{stream=CERTs}'."""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{label}={value}" for label, value in sorted(labels.items())) + "}"
+
+
+class Span:
+    """
+    Times a block of code, or every call of a function, and records the duration in the metrics registry.
+    If the block raises, '<name>.errors' is also incremented.
+
+    Usable as a context manager:
+        with span("feedly.request", stream=feed_name):
+            ...
+    or as a decorator:
+        @span("summarizer.batch")
+        def summarize_batch(...):
+    """
+
+    def __init__(self, name: str, labels: dict, registry: "MetricsRegistry | None" = None):
+        self.name = name
+        self.labels = labels
+        self._registry = registry
+        self._start: float | None = None
+
+    @property
+    def registry(self) -> "MetricsRegistry":
+        # Looked up on use rather than on creation, so decorators applied at import time
+        # record to the current registry even after MetricsRegistry.reset().
+        return self._registry or MetricsRegistry()
+
+    def __enter__(self) -> "Span":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.registry.observe(self.name, time.perf_counter() - self._start, **self.labels)
+        if exc_type is not None:
+            self.registry.increment(f"{self.name}.errors", **self.labels)
+        return False
+
+    def __call__(self, function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Span(self.name, self.labels, self._registry): # A new span per call, so concurrent calls don't share a start time.
+                return function(*args, **kwargs)
+        return wrapper
+
+
+class MetricsRegistry:
+    """
+    Singleton registry of the metrics of a run, shared by every component of the application.
+
+    Metrics are either counters, which are summed (e.g. pages fetched, Cosmos request units),
+    or timings, of which the count, total, p50, p99 and max are reported. Each metric can have
+    labels, e.g. the stream a page was fetched from, which are recorded as separate series.
+    All methods are thread-safe.
+
+    At the end of a run, log_summary() emits all the metrics as one structured log record,
+    and clears them for the next run.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(MetricsRegistry, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._counters = {}
+            cls._instance._timings = {}
+        return cls._instance
+
+    @classmethod
+    def reset(cls):
+        """Primarily used for testing to avoid state leakage."""
+        cls._instance = None
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """Adds value to the counter name."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Records a duration of the timing name."""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._timings.setdefault(key, []).append(seconds)
+
+    def span(self, name: str, **labels) -> Span:
+        """Returns a Span recording to this registry, see Span."""
+        return Span(name, labels, self)
+
+    def clear(self):
+        """Drops all the metrics recorded so far."""
+        with self._lock:
+            self._counters = {}
+            self._timings = {}
+
+    def summary(self) -> dict:
+        """
+        Returns all the metrics recorded so far.
+
+        Returns:
+            dict: The 'counters', mapping each key to its value, and the 'timings', mapping each key
+            to the count, and the total, p50, p99 and max duration in milliseconds.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {key: list(durations) for key, durations in self._timings.items()}
+        return {
+            "counters": {key: round(value, 3) for key, value in sorted(counters.items())},
+            "timings": {
+                key: {
+                    "count": len(durations),
+                    "total_ms": round(sum(durations) * 1000, 2),
+                    "p50_ms": round(percentile(durations, 0.50) * 1000, 2),
+                    "p99_ms": round(percentile(durations, 0.99) * 1000, 2),
+                    "max_ms": round(max(durations) * 1000, 2),
+                }
+                for key, durations in sorted(timings.items())
+            },
+        }
+
+    def log_summary(self, event: str, **fields) -> dict:
+        """
+        Logs the summary of the run as a single JSON record, and clears the metrics.
+
+        Args:
+            event (str): Name of the run, e.g. 'ingestion_run', to find the records by.
+            **fields: Further fields of the record, e.g. the number of alerts inserted.
+
+        Returns:
+            dict: The record that was logged.
+        """
+        record = {"event": event, **fields, **self.summary()}
+        logging.info(json.dumps(record, default=str))
+        self.clear()
+        return record
+
+
+def span(name: str, **labels) -> Span:
+    """Returns a Span recording to the application's metrics registry, see Span."""
+    return Span(name, labels)
+
+
+def increment(name: str, value: float = 1, **labels):
+    """Adds value to the counter name of the application's metrics registry."""
+    MetricsRegistry().increment(name, value, **labels)
+
+
+def observe(name: str, seconds: float, **labels):
+    """Records a duration of the timing name in the application's metrics registry."""
+    MetricsRegistry().observe(name, seconds, **labels)
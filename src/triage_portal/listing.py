@@ -0,0 +1,244 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import Callable, Mapping
+
+from pydantic import confloat, conint
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from data_accessors.datastores.abstract import TriageStagingDAO
+from models.enums import TriageStatus
+from models.triage_table_entity import TriageStagingEntity, TriageStagingFilter
+
+# Fields of the staging entities that a listing can be projected to. 'id' is always included.
+LISTABLE_FIELDS = tuple(entity_field.name for entity_field in fields(TriageStagingEntity))
+
+
+class TriageListingConfig(BaseSettings):
+    """
+    Configuration of the alerts listing of the triage portal.
+
+    Attributes:
+        model_config (SettingsConfigDict): Environment variable format for the configuration.
+        default_page_size (int): Number of alerts per page when the request does not set 'pageSize'.
+        max_page_size (int): Largest 'pageSize' a request can ask for.
+        cache_size (int): Number of responses kept in the server-side cache. 0 disables the cache.
+        version_check_interval_seconds (float): How long the version of the staging collection is reused
+            before it is read again, i.e. how stale a listing can be after new alerts were staged.
+    """
+    model_config: SettingsConfigDict = SettingsConfigDict(env_prefix="TRIAGE_LISTING_")
+    default_page_size: conint(ge=1) = 50
+    max_page_size: conint(ge=1) = 200
+    cache_size: conint(ge=0) = 256
+    version_check_interval_seconds: confloat(ge=0) = 1.0
+
+
+def _parse_timestamp(name: str, value: str) -> str:
+    """Validates a 'YYYY-MM-DD' or 'YYYY-MM-DD[T ]HH:MM:SS' query parameter, and returns it in the stored timestamp format."""
+    for input_format in ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            return datetime.strptime(value, input_format).strftime('%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid '{name}' {value!r}, expected 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS'.")
+
+
+@dataclass(frozen=True)
+class ListingQuery:
+    """
+    A validated request for a page of the alerts listing.
+
+    Attributes:
+        page_size: Maximum number of alerts in the page.
+        continuation_token: The continuationToken of the previous page, or None for the first page.
+        filters: Only list the alerts matching these filters.
+        fields: The fields of each alert to return.
+    """
+    page_size: int
+    continuation_token: str | None = None
+    filters: TriageStagingFilter = field(default_factory=TriageStagingFilter)
+    fields: tuple[str, ...] = LISTABLE_FIELDS
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, str], config: TriageListingConfig) -> "ListingQuery":
+        """
+        Builds a query from the query parameters of a request: 'pageSize', 'continuationToken',
+        'platform', 'tag', 'status', 'publishedAfter', 'publishedBefore' and 'fields' (comma-separated).
+
+        Raises:
+            ValueError: If a parameter is invalid, with a message that can be returned to the client.
+        """
+        page_size = params.get("pageSize") or str(config.default_page_size)
+        if not page_size.isdigit() or not 1 <= int(page_size) <= config.max_page_size:
+            raise ValueError(f"Invalid 'pageSize' {page_size!r}, expected an integer from 1 to {config.max_page_size}.")
+
+        status = params.get("status") or None
+        if status is not None and status not in {triage_status.value for triage_status in TriageStatus}:
+            raise ValueError(f"Invalid 'status' {status!r}, expected one of {[triage_status.value for triage_status in TriageStatus]}.")
+
+        projected_fields = LISTABLE_FIELDS
+        if params.get("fields"):
+            requested_fields = [name.strip() for name in params["fields"].split(",") if name.strip()]
+            unknown_fields = set(requested_fields) - set(LISTABLE_FIELDS)
+            if unknown_fields:
+                raise ValueError(f"Unknown fields {sorted(unknown_fields)}, expected some of {list(LISTABLE_FIELDS)}.")
+            projected_fields = tuple(name for name in LISTABLE_FIELDS if name == "id" or name in requested_fields)
+
+        published_after, published_before = params.get("publishedAfter"), params.get("publishedBefore")
+        return cls(
+            page_size=int(page_size),
+            continuation_token=params.get("continuationToken") or None,
+            filters=TriageStagingFilter(
+                platform=params.get("platform") or None,
+                tag=params.get("tag") or None,
+                status=status,
+                published_after=_parse_timestamp("publishedAfter", published_after) if published_after else None,
+                published_before=_parse_timestamp("publishedBefore", published_before) if published_before else None
+            ),
+            fields=projected_fields
+        )
+
+    def cache_key(self) -> str:
+        """Returns a key identifying the query, the same for any two requests that list the same alerts."""
+        return json.dumps([self.page_size, self.continuation_token, self.filters.__dict__, self.fields], sort_keys=True)
+
+
+@dataclass
+class ListingResponse:
+    """
+    The HTTP response of a listing request, independent of the web framework serving it.
+
+    Attributes:
+        status_code: 200, 304 if the client's copy is current, or 400 if the request was invalid.
+        body: The JSON body, empty for a 304.
+        headers: The response headers, including 'ETag' and 'Cache-Control'.
+    """
+    status_code: int
+    body: bytes
+    headers: dict[str, str]
+
+
+class AlertsListingService:
+    """
+    Paginated, filterable listing of the alerts staged for triage.
+
+    Every response carries a strong ETag made of the version of the staging collection, which
+    is incremented whenever the ingestion run stages new alerts, and a hash of the query. A client
+    polling with 'If-None-Match' gets a bodiless 304 without a database query for as long as no
+    new alerts were staged. Responses are also kept in an LRU cache keyed by query, which is
+    cleared when the version changes, so repeated listings of the same page cost no database query.
+    """
+
+    def __init__(
+            self,
+            staging_db: TriageStagingDAO,
+            config: TriageListingConfig | None = None,
+            clock: Callable[[], float] = time.monotonic
+        ):
+        """
+        Args:
+            staging_db (TriageStagingDAO): The store of the staged alerts.
+            config (TriageListingConfig | None): Page sizes and cache settings. Defaults to the environment's.
+            clock (Callable[[], float]): Source of the current time in seconds, replaceable for tests.
+        """
+        self.staging_db = staging_db
+        self.config = config or TriageListingConfig()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        self._version_checked_at = 0.0
+        self._cache: OrderedDict[str, tuple[str, bytes]] = OrderedDict()
+        self.stats = {"requests": 0, "not_modified": 0, "cache_hits": 0, "queries": 0, "invalid": 0}
+
+    def _current_version(self) -> int:
+        """Returns the version of the staging collection, read at most once per version_check_interval_seconds."""
+        now = self._clock()
+        with self._lock:
+            if self._version is not None and now - self._version_checked_at < self.config.version_check_interval_seconds:
+                return self._version
+        version = self.staging_db.get_version()
+        with self._lock:
+            if version != self._version:
+                self._cache.clear() # Every cached page may now be missing new alerts.
+            self._version, self._version_checked_at = version, now
+        return version
+
+    @staticmethod
+    def _etag(version: int, query: ListingQuery) -> str:
+        return f'"{version}-{hashlib.sha256(query.cache_key().encode("utf-8")).hexdigest()[:16]}"'
+
+    @staticmethod
+    def _matches(if_none_match: str | None, etag: str) -> bool:
+        if not if_none_match:
+            return False
+        # Weak comparison (RFC 9110 13.1.2), as proxies and browsers send back a 'W/' ETag once they have compressed the response.
+        return any(candidate.strip().removeprefix("W/") in (etag, "*") for candidate in if_none_match.split(","))
+
+    def _headers(self, etag: str) -> dict[str, str]:
+        # 'no-cache' lets clients keep the response, but makes them revalidate it with its ETag on every use.
+        return {"ETag": etag, "Cache-Control": "no-cache", "Content-Type": "application/json"}
+
+    def _invalid(self, error: ValueError) -> ListingResponse:
+        with self._lock:
+            self.stats["invalid"] += 1
+        return ListingResponse(400, json.dumps({"error": str(error)}).encode("utf-8"), {"Content-Type": "application/json"})
+
+    def list_alerts(self, params: Mapping[str, str], if_none_match: str | None = None) -> ListingResponse:
+        """
+        Returns a page of the staged alerts, newest first, see ListingQuery.from_params for the parameters.
+
+        Args:
+            params (Mapping[str, str]): The query parameters of the request.
+            if_none_match (str | None): The 'If-None-Match' header of the request, if any.
+
+        Returns:
+            ListingResponse: The page as JSON, with 'items', 'continuationToken' and 'version', or a 304 or 400.
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+        try:
+            query = ListingQuery.from_params(params, self.config)
+        except ValueError as e:
+            return self._invalid(e)
+
+        version = self._current_version()
+        etag = self._etag(version, query)
+        if self._matches(if_none_match, etag):
+            with self._lock:
+                self.stats["not_modified"] += 1
+            return ListingResponse(304, b"", self._headers(etag))
+
+        cache_key = query.cache_key()
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None and cached[0] == etag:
+                self._cache.move_to_end(cache_key)
+                self.stats["cache_hits"] += 1
+                return ListingResponse(200, cached[1], self._headers(etag))
+
+        try:
+            page = self.staging_db.get_staging_entities_page(query.page_size, query.continuation_token, query.filters)
+        except ValueError as e: # A malformed continuationToken, which only the store can tell.
+            return self._invalid(e)
+        body = json.dumps({
+            "items": [{name: getattr(entity, name) for name in query.fields} for entity in page.entities],
+            "continuationToken": page.continuation_token,
+            "version": version,
+        }).encode("utf-8")
+        with self._lock:
+            self.stats["queries"] += 1
+            if self.config.cache_size > 0:
+                self._cache[cache_key] = (etag, body)
+                self._cache.move_to_end(cache_key)
+                while len(self._cache) > self.config.cache_size:
+                    self._cache.popitem(last=False)
+        return ListingResponse(200, body, self._headers(etag))
+
+    def get_stats(self) -> dict[str, int]:
+        """Returns the request counters, to see how many database queries the ETags and the cache saved."""
+        with self._lock:
+            return dict(self.stats)
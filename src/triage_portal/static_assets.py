@@ -0,0 +1,220 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import posixpath
+import threading
+from dataclasses import dataclass, field
+from typing import Mapping
+
+from pydantic import conint
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+try: # Listed in the portal's requirements, but optional here: without it, assets are only precompressed with gzip.
+    import brotli
+except ImportError: # pragma: no cover
+    brotli = None
+
+# Media types worth compressing, on top of every 'text/*' type.
+COMPRESSIBLE_MIMETYPES = {"application/javascript", "application/json", "image/svg+xml", "application/xml"}
+# Suffixes of the ETags of the precompressed variants, as a strong ETag must differ between content codings.
+ENCODING_ETAG_SUFFIXES = {"br": "-br", "gzip": "-gz"}
+
+
+class StaticAssetsConfig(BaseSettings):
+    """
+    Configuration of the static assets of the triage portal frontend.
+
+    Attributes:
+        model_config (SettingsConfigDict): Environment variable format for the configuration.
+        root_dir (str): Directory of the frontend, as deployed to the function app.
+        max_age_seconds (int): How long browsers can reuse an asset without revalidating it. HTML is always revalidated.
+        min_compress_bytes (int): Assets smaller than this are served uncompressed.
+        excluded_names (list[str]): Files and directories of root_dir that are never served.
+    """
+    model_config: SettingsConfigDict = SettingsConfigDict(env_prefix="TRIAGE_STATIC_")
+    root_dir: str = os.path.join(os.getenv('HOME', ''), 'site', 'wwwroot', 'frontend')
+    max_age_seconds: conint(ge=0) = 3600
+    min_compress_bytes: conint(ge=0) = 512
+    excluded_names: list[str] = ["node_modules", "package.json", "package-lock.json"]
+
+
+@dataclass(slots=True)
+class StaticAsset:
+    """
+    A frontend file, loaded with its precompressed variants.
+
+    Attributes:
+        path: Path of the asset relative to the frontend root, with '/' separators.
+        content: The file's bytes.
+        content_type: The 'Content-Type' to serve it with.
+        etag: Strong ETag of the uncompressed content, derived from its hash. See encoding_etag for the variants'.
+        encodings: The precompressed variants, keyed by content coding ('br', 'gzip'), if smaller than content.
+    """
+    path: str
+    content: bytes
+    content_type: str
+    etag: str
+    encodings: dict[str, bytes] = field(default_factory=dict)
+
+    def encoding_etag(self, coding: str | None) -> str:
+        """Returns the strong ETag of the variant in the content coding, None for the uncompressed content."""
+        return self.etag if coding is None else f'{self.etag[:-1]}{ENCODING_ETAG_SUFFIXES[coding]}"'
+
+    def etags(self) -> set[str]:
+        """Returns the ETags of the asset in every coding it is served in."""
+        return {self.encoding_etag(coding) for coding in (None, *self.encodings)}
+
+
+@dataclass
+class AssetResponse:
+    """
+    The HTTP response for an asset, independent of the web framework serving it.
+
+    Attributes:
+        status_code: 200, 304 if the client's copy is current, 400 for an invalid path, or 404.
+        body: The (possibly compressed) asset, empty for a 304.
+        headers: The response headers.
+    """
+    status_code: int
+    body: bytes
+    headers: dict[str, str]
+
+
+def _is_compressible(content_type: str) -> bool:
+    mimetype = content_type.split(";")[0]
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def _accepted_encodings(accept_encoding: str | None) -> set[str]:
+    """Returns the content codings an 'Accept-Encoding' header accepts, i.e. those without 'q=0'."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = params.strip().removeprefix("q=") if params.strip().startswith("q=") else "1"
+        try:
+            if float(quality) > 0:
+                accepted.add(coding.strip().lower())
+        except ValueError:
+            continue
+    return accepted
+
+
+def normalize_asset_path(path: str | None) -> str | None:
+    """
+    Returns the asset path of a request route, relative to the frontend root, or None if it could
+    escape the root (e.g. '..' segments, absolute or Windows paths). '' and directories map to their 'index.html'.
+    """
+    path = (path or "").strip()
+    if "\\" in path or "\x00" in path or path.startswith("/") or ":" in path:
+        return None
+    segments = path.split("/")
+    if any(segment == ".." for segment in segments):
+        return None
+    normalized = posixpath.normpath(path) if path else ""
+    if normalized in ("", "."):
+        return "index.html"
+    return posixpath.join(normalized, "index.html") if path.endswith("/") else normalized
+
+
+class StaticAssetCache:
+    """
+    In-memory cache of the frontend's static assets, keyed by path.
+
+    Every file under the root is read once, on first use, along with its gzip (and, if the
+    'brotli' package is installed, brotli) variants, so requests never touch the disk. Each asset
+    is served with its media type, a strong ETag from its content hash (suffixed per content
+    coding), 'Cache-Control' and 'Vary: Accept-Encoding', and a request whose 'If-None-Match'
+    matches the ETag of any of its codings gets a bodiless 304.
+    Paths are looked up in the cache only, so a route can never reach a file outside the root.
+    """
+
+    def __init__(self, config: StaticAssetsConfig | None = None):
+        self.config = config or StaticAssetsConfig()
+        self._lock = threading.Lock()
+        self._assets: dict[str, StaticAsset] | None = None
+
+    def _load_asset(self, file_path: str, asset_path: str) -> StaticAsset:
+        with open(file_path, 'rb') as file:
+            content = file.read()
+        mimetype = mimetypes.guess_type(asset_path)[0] or "application/octet-stream"
+        content_type = f"{mimetype}; charset=utf-8" if mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES else mimetype
+        asset = StaticAsset(
+            path=asset_path,
+            content=content,
+            content_type=content_type,
+            etag=f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+        )
+        if _is_compressible(content_type) and len(content) >= self.config.min_compress_bytes:
+            variants = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)} # mtime=0 so the output only depends on the content.
+            if brotli is not None:
+                variants["br"] = brotli.compress(content, quality=11)
+            asset.encodings = {coding: variant for coding, variant in variants.items() if len(variant) < len(content)}
+        return asset
+
+    def load(self) -> dict[str, StaticAsset]:
+        """Reads every asset under the root into the cache, replacing what was loaded before."""
+        assets: dict[str, StaticAsset] = {}
+        excluded_names = set(self.config.excluded_names)
+        for dir_path, dir_names, file_names in os.walk(self.config.root_dir):
+            dir_names[:] = [name for name in dir_names if name not in excluded_names and not name.startswith(".")]
+            for file_name in file_names:
+                if file_name in excluded_names or file_name.startswith("."):
+                    continue
+                file_path = os.path.join(dir_path, file_name)
+                asset_path = os.path.relpath(file_path, self.config.root_dir).replace(os.sep, "/")
+                assets[asset_path] = self._load_asset(file_path, asset_path)
+        if brotli is None:
+            logging.warning("The 'brotli' package is not installed, so the static assets are only precompressed with gzip.")
+        logging.info("Loaded %d static assets (%d bytes) from %s.", len(assets), sum(len(asset.content) for asset in assets.values()), self.config.root_dir)
+        with self._lock:
+            self._assets = assets
+        return assets
+
+    def get_asset(self, asset_path: str) -> StaticAsset | None:
+        with self._lock:
+            assets = self._assets
+        if assets is None:
+            assets = self.load()
+        return assets.get(asset_path)
+
+    def serve(self, route_path: str | None, request_headers: Mapping[str, str] | None = None) -> AssetResponse:
+        """
+        Returns the response for a request of a frontend asset.
+
+        Args:
+            route_path (str | None): The path of the asset in the request's route, '' or None for index.html.
+            request_headers (Mapping[str, str] | None): The request's headers, for 'If-None-Match' and 'Accept-Encoding'.
+
+        Returns:
+            AssetResponse: The asset, in the best encoding the client accepts, or a 304, 400 or 404.
+        """
+        request_headers = request_headers or {}
+        asset_path = normalize_asset_path(route_path)
+        if asset_path is None:
+            return AssetResponse(400, b"Invalid path", {"Content-Type": "text/plain; charset=utf-8"})
+        asset = self.get_asset(asset_path)
+        if asset is None:
+            return AssetResponse(404, b"File not found", {"Content-Type": "text/plain; charset=utf-8"})
+
+        accepted = _accepted_encodings(request_headers.get("Accept-Encoding"))
+        coding = next((coding for coding in ("br", "gzip") if coding in asset.encodings and coding in accepted), None)
+        headers = {
+            "ETag": asset.encoding_etag(coding),
+            # HTML is revalidated on every load, so a deploy is picked up at once; its ETag makes that a cheap 304.
+            "Cache-Control": "no-cache" if asset.content_type.startswith("text/html") else f"public, max-age={self.config.max_age_seconds}",
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request_headers.get("If-None-Match")
+        if if_none_match:
+            # Weak comparison (RFC 9110 13.1.2): proxies that compress responses mark the ETags weak.
+            etags = asset.etags() | {"*"}
+            if any(candidate.strip().removeprefix("W/") in etags for candidate in if_none_match.split(",")):
+                return AssetResponse(304, b"", headers)
+
+        headers["Content-Type"] = asset.content_type
+        if coding is not None:
+            headers["Content-Encoding"] = coding
+            return AssetResponse(200, asset.encodings[coding], headers)
+        return AssetResponse(200, asset.content, headers)
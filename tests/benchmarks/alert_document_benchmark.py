@@ -0,0 +1,131 @@
+"""
+Micro-benchmark of the AlertDocument representation, against the plain dataclass it replaced.
+
+Measures, per document, the CPU time to create the documents and to serialize them with to_dict,
+and the memory held by the documents and by their serialized dicts.
+
+Run from the root of the repository:
+    PYTHONPATH=src python tests/benchmarks/alert_document_benchmark.py [--count 100000]
+"""
+import argparse
+import datetime
+import gc
+import json
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+
+from models.alert_key import derive_alert_key
+from models.alerts_table_document import AlertDocument
+from models.enums import AggregatorPlatform, SummarizationStatus, TaggingStatus
+
+
+# The previous representation, kept here only as the baseline to compare against.
+@dataclass
+class LegacySummarizationInfo:
+    status: SummarizationStatus = SummarizationStatus.NOT_STARTED
+    summary_text: str | None = None
+
+@dataclass
+class LegacyTagsInfo:
+    status: TaggingStatus = TaggingStatus.NOT_TAGGED
+    tags: list[str] | None = None
+
+@dataclass
+class LegacyAlertDocument:
+    aggregator_platform: AggregatorPlatform
+    publication_source_url: str
+    publication_datetime: int | str
+    alert_data: dict
+    summary_data: LegacySummarizationInfo = field(default_factory=LegacySummarizationInfo)
+    tags_data: LegacyTagsInfo = field(default_factory=LegacyTagsInfo)
+    alert_key: str = ''
+    id: str = ''
+
+    def __post_init__(self):
+        if not self.alert_key:
+            self.alert_key = derive_alert_key(self.publication_source_url)
+        dt = datetime.datetime.fromtimestamp(self.publication_datetime / 1000)
+        self.publication_datetime = dt.strftime('%Y-%m-%d %H:%M:%S')
+
+    def to_dict(self, without_id: bool = False):
+        alert_dict = asdict(self)
+        if without_id:
+            del alert_dict['id']
+        return alert_dict
+
+
+def load_raw_alerts(count: int) -> list[dict]:
+    """Returns count raw Feedly articles, copies of the unit test data with unique urls."""
+    with open('tests/unit/fake_feedly_data.json', 'r', encoding='utf-8') as file:
+        templates = json.load(file)
+    raw_alerts = []
+    for i in range(count):
+        raw_alert = json.loads(json.dumps(templates[i % len(templates)])) # Deep copy, so payloads are not shared.
+        raw_alert["originId"] = f"https://example.com/article/{i}"
+        raw_alerts.append(raw_alert)
+    return raw_alerts
+
+
+def create_documents(document_class, timestamp_field: str, raw_alerts: list[dict]) -> list:
+    return [
+        document_class(
+            aggregator_platform=AggregatorPlatform.FEEDLY,
+            publication_source_url=raw_alert["originId"],
+            alert_data=raw_alert,
+            **{timestamp_field: raw_alert["published"]}
+        )
+        for raw_alert in raw_alerts
+    ]
+
+
+def measure(document_class, timestamp_field: str, raw_alerts: list[dict]) -> dict:
+    """Returns the per-document CPU time (us) and memory (bytes) of creating and serializing documents."""
+    count = len(raw_alerts)
+
+    # CPU time, measured without tracemalloc, which slows down allocations.
+    gc.collect()
+    start = time.process_time()
+    documents = create_documents(document_class, timestamp_field, raw_alerts)
+    create_seconds = time.process_time() - start
+    start = time.process_time()
+    alert_dicts = [document.to_dict(without_id=True) for document in documents]
+    to_dict_seconds = time.process_time() - start
+    del documents, alert_dicts
+
+    # Memory held, excluding the raw payloads, which are allocated before tracing starts.
+    gc.collect()
+    tracemalloc.start()
+    documents = create_documents(document_class, timestamp_field, raw_alerts)
+    documents_memory = tracemalloc.get_traced_memory()[0]
+    alert_dicts = [document.to_dict(without_id=True) for document in documents]
+    alert_dicts_memory = tracemalloc.get_traced_memory()[0] - documents_memory
+    tracemalloc.stop()
+    del documents, alert_dicts
+
+    return {
+        "create_us": create_seconds / count * 1e6,
+        "to_dict_us": to_dict_seconds / count * 1e6,
+        "document_bytes": documents_memory / count,
+        "dict_bytes": alert_dicts_memory / count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100_000, help="Number of documents to create.")
+    args = parser.parse_args()
+
+    raw_alerts = load_raw_alerts(args.count)
+    legacy = measure(LegacyAlertDocument, "publication_datetime", raw_alerts)
+    current = measure(AlertDocument, "publication_timestamp", raw_alerts)
+
+    print(f"{args.count} documents, per document:")
+    print(f"{'':<16}{'legacy':>12}{'current':>12}{'saving':>10}")
+    for metric in legacy:
+        saving = 1 - current[metric] / legacy[metric] if legacy[metric] else 0
+        print(f"{metric:<16}{legacy[metric]:>12.1f}{current[metric]:>12.1f}{saving:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
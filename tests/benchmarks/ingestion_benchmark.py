@@ -0,0 +1,235 @@
+"""
+End-to-end benchmark of alerts ingestion: fetch -> deserialize -> dedup -> insert, as run by
+run_ingestion_pipeline, with the Feedly API replaced by synthetic streams (see synthetic_feedly.py).
+
+Each backend is benchmarked twice, once for throughput and stage latencies, and once with
+tracemalloc for peak memory, as tracing slows down every allocation. A backend fails if any
+of the budgets of IngestionBenchmarkConfig is exceeded. The real MongoDB backend is skipped
+when no MongoDB server is reachable.
+
+mongomock scans the whole collection on every write, so its write stage slows down as the
+collection grows. The default workload is kept small for it; use the real MongoDB backend,
+and a larger workload, to measure database throughput.
+
+Run from the root of the repository (not collected by a plain 'pytest tests' run):
+    PYTHONPATH=src python -m pytest -s tests/benchmarks/ingestion_benchmark.py
+
+The workload and budgets can be changed with environment variables, e.g.
+    INGESTION_BENCHMARK_ITEMS_PER_STREAM=10000 INGESTION_BENCHMARK_DUPLICATE_RATIO=0.5 INGESTION_BENCHMARK_MAX_PEAK_MEMORY_MB=256
+"""
+import json
+import time
+import tracemalloc
+from typing import Callable
+
+import pytest
+import yaml
+from mongomock import MongoClient as MongomockClient
+from pydantic import confloat, conint
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from synthetic_feedly import SyntheticFeedlyAdapter, SyntheticFeedlyStreams
+
+from data_accessors.datastores.abstract import AlertsDAO
+from data_accessors.datastores.alerts import AlertsDAOMongo, MongoConfig
+from data_accessors.datastores.seen_url_cache import CachedAlertsDAO, SeenUrlCache, SeenUrlCacheConfig
+from data_accessors.fetchers.feedly import FeedlyConfig, FeedlyDAO
+from data_accessors.fetchers.http_transport import HttpTransport
+from pipelines.ingestion import ingest_alerts
+from telemetry.metrics import percentile
+
+
+class IngestionBenchmarkConfig(BaseSettings):
+    """
+    Workload and budgets of the ingestion benchmark.
+
+    Attributes:
+        model_config (SettingsConfigDict): Environment variable format for the configuration.
+        stream_count (int): Number of synthetic Feedly streams.
+        items_per_stream (int): Number of articles in each stream.
+        page_size (int): Articles per page, i.e. FEEDLY_ARTICLE_COUNT.
+        payload_bytes (int): Approximate size of each article as JSON.
+        duplicate_ratio (float): Fraction of the articles that are duplicates of an earlier one.
+        max_concurrency (int): Streams fetched concurrently, i.e. FEEDLY_MAX_CONCURRENCY.
+        queue_size (int): Pages waiting between two stages of the pipeline.
+        min_articles_per_second (float): Budget for the throughput of a run.
+        max_stage_p99_ms (float): Budget for the p99 latency of processing a page, in every stage.
+        max_peak_memory_mb (float): Budget for the peak memory traced during a run.
+        mongo_host (str): Host of the real MongoDB server to benchmark against.
+        mongo_port (int): Port of the real MongoDB server to benchmark against.
+        report_path (str): If set, the reports of all backends are also written to this JSON file.
+    """
+    model_config: SettingsConfigDict = SettingsConfigDict(env_prefix="INGESTION_BENCHMARK_")
+    stream_count: conint(ge=1) = 4
+    items_per_stream: conint(ge=1) = 250
+    page_size: conint(ge=1) = 100
+    payload_bytes: conint(ge=0) = 2000
+    duplicate_ratio: confloat(ge=0, lt=1) = 0.2
+    max_concurrency: conint(ge=1) = 4
+    queue_size: conint(ge=1) = 2
+    min_articles_per_second: confloat(ge=0) = 300
+    max_stage_p99_ms: confloat(gt=0) = 500
+    max_peak_memory_mb: confloat(gt=0) = 64
+    mongo_host: str = "localhost"
+    mongo_port: int = 27017
+    report_path: str = ''
+
+
+def run_ingestion(
+        config: IngestionBenchmarkConfig,
+        streams: SyntheticFeedlyStreams,
+        feedly_config: FeedlyConfig,
+        alerts_db: AlertsDAO,
+        bloom_file_path: str
+    ):
+    """Runs one ingestion of the synthetic streams into alerts_db, wrapped with the seen-url cache as in the pipeline."""
+    transport = HttpTransport()
+    transport.session.mount("https://feedly.com", SyntheticFeedlyAdapter(streams))
+    fetcher = FeedlyDAO(feedly_config, transport=transport)
+    seen_url_cache = SeenUrlCache(SeenUrlCacheConfig(bloom_file_path=bloom_file_path))
+    return ingest_alerts(fetcher, CachedAlertsDAO(alerts_db, seen_url_cache), queue_size=config.queue_size)
+
+
+def benchmark_ingestion(
+        config: IngestionBenchmarkConfig,
+        feedly_config: FeedlyConfig,
+        streams: SyntheticFeedlyStreams,
+        alerts_db_factory: Callable[[], AlertsDAO],
+        tmp_path
+    ) -> dict:
+    """
+    Benchmarks ingestion of the synthetic streams into fresh alerts dbs from alerts_db_factory.
+
+    Returns:
+        dict: The report, with the throughput, per-stage p50/p99 latencies and peak memory of the run.
+    """
+    start = time.perf_counter()
+    result = run_ingestion(config, streams, feedly_config, alerts_db_factory(), str(tmp_path / "timed_bloom.bin"))
+    seconds = time.perf_counter() - start
+    assert result.fetched_count == streams.total_items
+    assert len(result.inserted_ids) == streams.unique_count() # Every duplicate, including url variants, is dropped.
+
+    tracemalloc.start()
+    run_ingestion(config, streams, feedly_config, alerts_db_factory(), str(tmp_path / "traced_bloom.bin"))
+    peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "articles": result.fetched_count,
+        "inserted": len(result.inserted_ids),
+        "seconds": round(seconds, 3),
+        "articles_per_second": round(result.fetched_count / seconds, 1),
+        "stages": {
+            name: {
+                "pages": len(durations),
+                "p50_ms": round(percentile(durations, 0.50) * 1000, 2),
+                "p99_ms": round(percentile(durations, 0.99) * 1000, 2),
+            }
+            for name, durations in result.stage_durations.items()
+        },
+        "peak_memory_mb": round(peak_memory_bytes / 2**20, 1),
+    }
+
+
+def check_budgets(config: IngestionBenchmarkConfig, report: dict) -> list[str]:
+    """Returns a description of every budget the report exceeds."""
+    violations = []
+    if report["articles_per_second"] < config.min_articles_per_second:
+        violations.append(f"throughput {report['articles_per_second']} articles/s is below {config.min_articles_per_second}")
+    for name, stage in report["stages"].items():
+        if stage["p99_ms"] > config.max_stage_p99_ms:
+            violations.append(f"p99 of stage '{name}' {stage['p99_ms']} ms is above {config.max_stage_p99_ms}")
+    if report["peak_memory_mb"] > config.max_peak_memory_mb:
+        violations.append(f"peak memory {report['peak_memory_mb']} MB is above {config.max_peak_memory_mb}")
+    return violations
+
+
+def print_report(backend: str, report: dict):
+    print(f"\n{backend}: {report['articles']} articles ({report['inserted']} new) in {report['seconds']} s, "
+          f"{report['articles_per_second']} articles/s, peak memory {report['peak_memory_mb']} MB")
+    print(f"  {'stage':<12}{'pages':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, stage in report["stages"].items():
+        print(f"  {name:<12}{stage['pages']:>8}{stage['p50_ms']:>10}{stage['p99_ms']:>10}")
+
+
+@pytest.fixture(scope="module")
+def benchmark_config():
+    return IngestionBenchmarkConfig()
+
+@pytest.fixture(scope="module")
+def reports(benchmark_config):
+    """Collects the report of every backend, and writes them to the report file at the end, if configured."""
+    reports = {}
+    yield reports
+    if benchmark_config.report_path:
+        with open(benchmark_config.report_path, 'w', encoding='utf-8') as file:
+            json.dump(reports, file, indent=2)
+
+@pytest.fixture(scope="function")
+def synthetic_streams(benchmark_config):
+    return SyntheticFeedlyStreams(
+        stream_count=benchmark_config.stream_count,
+        items_per_stream=benchmark_config.items_per_stream,
+        page_size=benchmark_config.page_size,
+        payload_bytes=benchmark_config.payload_bytes,
+        duplicate_ratio=benchmark_config.duplicate_ratio
+    )
+
+@pytest.fixture(scope="function")
+def feedly_config(benchmark_config, synthetic_streams, tmp_path, monkeypatch):
+    """FeedlyConfig of the synthetic streams, loaded the same way as in the function app."""
+    sources_path = tmp_path / "alerts_sources.yaml"
+    sources_path.write_text(yaml.safe_dump({"feedly_sources": synthetic_streams.feeds}))
+    monkeypatch.setenv("ALERTS_CONFIG_PATH", str(sources_path))
+    monkeypatch.setenv("IS_LOCAL", "True")
+    monkeypatch.setenv("FEEDLY_ACCESS_TOKEN", "benchmark")
+    return FeedlyConfig(
+        article_count=benchmark_config.page_size,
+        fetch_all=True,
+        hours_ago=24,
+        max_concurrency=benchmark_config.max_concurrency,
+        checkpoint_file_path=str(tmp_path / "checkpoints.json")
+    )
+
+@pytest.fixture(scope="function")
+def mongo_config(benchmark_config):
+    return MongoConfig(
+        host=benchmark_config.mongo_host,
+        port=benchmark_config.mongo_port,
+        alerts_database_id="threat_intelligence_benchmark",
+        alerts_collection_id="alerts"
+    )
+
+
+class TestIngestionBenchmark:
+    def test_mongomock(self, benchmark_config, feedly_config, synthetic_streams, mongo_config, reports, tmp_path):
+        def alerts_db_factory():
+            return AlertsDAOMongo(mongo_config, MongomockClient())
+
+        report = benchmark_ingestion(benchmark_config, feedly_config, synthetic_streams, alerts_db_factory, tmp_path)
+
+        reports["mongomock"] = report
+        print_report("mongomock", report)
+        assert not check_budgets(benchmark_config, report)
+
+    def test_mongodb(self, benchmark_config, feedly_config, synthetic_streams, mongo_config, reports, tmp_path):
+        client = MongoClient(mongo_config.host, mongo_config.port, serverSelectionTimeoutMS=1000)
+        try:
+            client.admin.command("ping")
+        except PyMongoError as e:
+            pytest.skip(f"No MongoDB server reachable at {mongo_config.host}:{mongo_config.port}: {e}")
+
+        def alerts_db_factory():
+            client.drop_database(mongo_config.alerts_database_id)
+            return AlertsDAOMongo(mongo_config, client)
+
+        try:
+            report = benchmark_ingestion(benchmark_config, feedly_config, synthetic_streams, alerts_db_factory, tmp_path)
+        finally:
+            client.drop_database(mongo_config.alerts_database_id)
+            client.close()
+
+        reports["mongodb"] = report
+        print_report("mongodb", report)
+        assert not check_budgets(benchmark_config, report)
@@ -0,0 +1,169 @@
+"""
+Generator of synthetic Feedly streams, served through a requests transport adapter so that
+fetchers can be benchmarked end to end without network access.
+
+The pages have the shape of the responses of https://developers.feedly.com/reference/streams-contents,
+with a configurable number of items per stream, size of each item, and ratio of duplicate articles.
+Items are generated on demand, page by page, so large streams never have to be held in memory.
+"""
+import json
+import random
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+
+HOSTS = ["securityaffairs.com", "www.bleepingcomputer.com", "thehackernews.com", "krebsonsecurity.com", "www.cisa.gov"]
+KEYWORDS = ["Security", "Hacking", "Malware", "Ransomware", "Vulnerability", "Phishing", "CVE", "Zero-day", "Threat Intelligence"]
+FILLER = "Threat actors exploited a critical vulnerability to gain initial access to the network. "
+
+
+class SyntheticFeedlyStreams:
+    """
+    Deterministic synthetic Feedly streams.
+
+    Every item has a global index across all streams. With probability duplicate_ratio an item
+    is a duplicate of a random earlier item, in any stream, republished under a variant of its
+    url (e.g. with tracking parameters, or http rather than https), as syndicated articles are.
+    """
+
+    def __init__(
+            self,
+            stream_count: int,
+            items_per_stream: int,
+            page_size: int,
+            payload_bytes: int = 2000,
+            duplicate_ratio: float = 0.0,
+            seed: int = 0
+        ):
+        """
+        Args:
+            stream_count (int): Number of streams.
+            items_per_stream (int): Number of items in each stream.
+            page_size (int): Maximum number of items per page.
+            payload_bytes (int): Approximate size of each item, serialized as JSON.
+            duplicate_ratio (float): Fraction of the items that are duplicates of an earlier item.
+            seed (int): Seed of the random choices, so runs are reproducible.
+        """
+        self.stream_ids = [f"enterprise/benchmark/category/stream-{i}" for i in range(stream_count)]
+        self.items_per_stream = items_per_stream
+        self.page_size = page_size
+        self.payload_bytes = payload_bytes
+        self.duplicate_ratio = duplicate_ratio
+        self.seed = seed
+        self.newest_published = int(time.time() * 1000)
+
+    @property
+    def feeds(self) -> list[dict[str, str]]:
+        """The streams, in the format of the 'feedly_sources' of the alerts sources config file."""
+        return [{"feed_name": f"Benchmark feed {i}", "stream_id": stream_id} for i, stream_id in enumerate(self.stream_ids)]
+
+    @property
+    def total_items(self) -> int:
+        return len(self.stream_ids) * self.items_per_stream
+
+    def _duplicate_of(self, index: int) -> int | None:
+        """Returns the index of the earlier item that item index duplicates, or None if it is unique."""
+        if index == 0:
+            return None
+        rng = random.Random(self.seed * 1_000_003 + index)
+        if rng.random() >= self.duplicate_ratio:
+            return None
+        return rng.randrange(index)
+
+    def _original_of(self, index: int) -> int:
+        while (duplicate_of := self._duplicate_of(index)) is not None:
+            index = duplicate_of
+        return index
+
+    def unique_count(self) -> int:
+        """Returns the number of distinct articles in all the streams, i.e. the number a run should store."""
+        return sum(self._duplicate_of(index) is None for index in range(self.total_items))
+
+    def _url(self, index: int) -> str:
+        original = self._original_of(index)
+        url = f"https://{HOSTS[original % len(HOSTS)]}/{2024 + original % 2}/article-{original}/"
+        if original == index:
+            return url
+        variant = index % 3 # Republished under a variant of the original url.
+        if variant == 0:
+            return f"{url}?utm_source=feedly&utm_medium=rss"
+        if variant == 1:
+            return url.replace("https://", "http://").rstrip("/")
+        return url
+
+    def item(self, index: int) -> dict:
+        """Returns the raw Feedly article with the given global index."""
+        url = self._url(index)
+        host = urlsplit(url).hostname
+        item = {
+            "id": f"synthetic-{self.seed}-{index}",
+            "originId": url,
+            "fingerprint": f"{index:08x}",
+            "language": "en",
+            "title": f"Synthetic threat intelligence article {index}",
+            "author": "Benchmark",
+            "keywords": KEYWORDS[index % len(KEYWORDS):] + KEYWORDS[:index % len(KEYWORDS)],
+            "published": self.newest_published - index * 1000,
+            "crawled": self.newest_published - index * 1000 + 500,
+            "origin": {"streamId": f"feed/https://{host}/feed", "title": host, "htmlUrl": f"https://{host}"},
+            "alternate": [{"href": url, "type": "text/html"}],
+            "visual": {"url": f"https://{host}/images/{index}.jpg", "width": 1200, "height": 630},
+            "summary": {"content": "", "direction": "ltr"},
+            "unread": True,
+        }
+        padding = max(0, self.payload_bytes - len(json.dumps(item)))
+        item["summary"]["content"] = (FILLER * (padding // len(FILLER) + 1))[:padding]
+        return item
+
+    def page(self, stream_id: str, continuation: str | None = None) -> dict:
+        """
+        Returns a page of a stream, in the format of the Feedly streams/contents API.
+
+        Args:
+            stream_id (str): The ID of the stream.
+            continuation (str | None): The continuation returned with the previous page, or None for the first page.
+        """
+        stream_index = self.stream_ids.index(stream_id)
+        offset = int(continuation) if continuation else 0
+        end = min(offset + self.page_size, self.items_per_stream)
+        first_index = stream_index * self.items_per_stream
+        page = {
+            "id": stream_id,
+            "updated": self.newest_published,
+            "items": [self.item(first_index + i) for i in range(offset, end)],
+        }
+        if end < self.items_per_stream:
+            page["continuation"] = str(end)
+        return page
+
+
+class SyntheticFeedlyAdapter(BaseAdapter):
+    """
+    requests transport adapter that serves SyntheticFeedlyStreams pages, so that the whole
+    HTTP client path, including JSON decoding of the response body, runs as in production.
+    Mount it on the session of the fetcher's transport, for 'https://feedly.com'.
+    """
+
+    def __init__(self, streams: SyntheticFeedlyStreams):
+        super().__init__()
+        self.streams = streams
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        query = parse_qs(urlsplit(request.url).query)
+        continuation = query.get("continuation", [None])[0]
+        body = json.dumps(self.streams.page(query["streamId"][0], continuation)).encode("utf-8")
+
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "application/json"
+        response.headers["Content-Length"] = str(len(body))
+        response._content = body
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,104 @@
+"""
+Benchmark of the alert tagger, against tagging with one regular expression per taxonomy name
+and alias, as a keyword tagger would.
+
+Builds a synthetic taxonomy of --terms entries, each with a name and two aliases, and --alerts
+synthetic alerts of about --words words, a few of which are taxonomy names. Measures the time
+to compile the taxonomy, and the per-alert time and throughput of tagging every alert with the
+batch API. The regex baseline is measured on a sample of the alerts only, as it is too slow to
+run on all of them, and its throughput is extrapolated.
+
+Run from the root of the repository:
+    PYTHONPATH=src python tests/benchmarks/tagger_benchmark.py [--terms 5000] [--alerts 100000]
+"""
+import argparse
+import random
+import re
+import time
+
+from models.alerts_table_document import AlertDocument
+from models.enums import AggregatorPlatform
+from processors.alert_tagger.tag_alert import TaxonomyTagger
+from processors.alert_text import alert_text
+
+CATEGORIES = ["threat_actors", "malware", "products", "sectors"]
+
+
+def random_word(rng: random.Random) -> str:
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9)))
+
+
+def build_taxonomy(term_count: int, rng: random.Random) -> dict[str, list[dict]]:
+    taxonomy: dict[str, list[dict]] = {category: [] for category in CATEGORIES}
+    for index in range(term_count):
+        name = f"{random_word(rng).capitalize()} {random_word(rng).capitalize()} {index}"
+        aliases = [f"{random_word(rng)}{index}", f"{random_word(rng)} {random_word(rng)} {index}"]
+        taxonomy[CATEGORIES[index % len(CATEGORIES)]].append({"name": name, "aliases": aliases})
+    return taxonomy
+
+
+def build_alerts(alert_count: int, word_count: int, taxonomy: dict[str, list[dict]], rng: random.Random) -> list[AlertDocument]:
+    vocabulary = [random_word(rng) for _ in range(5000)]
+    surface_forms = [form for entries in taxonomy.values() for entry in entries for form in [entry["name"], *entry["aliases"]]]
+    alerts = []
+    for index in range(alert_count):
+        words = rng.choices(vocabulary, k=word_count)
+        for _ in range(3): # A few mentions of the taxonomy per alert.
+            words[rng.randrange(word_count)] = rng.choice(surface_forms)
+        alerts.append(AlertDocument(
+            aggregator_platform=AggregatorPlatform.FEEDLY,
+            publication_source_url=f"https://example.com/article/{index}",
+            publication_timestamp=1717574498000,
+            alert_data={"title": " ".join(words[:10]), "content": {"content": f"<p>{' '.join(words[10:])}.</p>"}}
+        ))
+    return alerts
+
+
+def regex_tag(patterns: list[tuple[re.Pattern, str]], alert: AlertDocument) -> list[str]:
+    """The baseline: one case-insensitive whole-word regex search per name and alias."""
+    text = f"{alert.alert_data['title']}\n{alert_text(alert.alert_data)}"
+    return list(dict.fromkeys(name for pattern, name in patterns if pattern.search(text)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", type=int, default=5000, help="Number of taxonomy entries.")
+    parser.add_argument("--alerts", type=int, default=100_000, help="Number of alerts to tag.")
+    parser.add_argument("--words", type=int, default=150, help="Approximate number of words per alert.")
+    parser.add_argument("--baseline-sample", type=int, default=20, help="Number of alerts tagged with the regex baseline.")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    taxonomy = build_taxonomy(args.terms, rng)
+    alerts = build_alerts(args.alerts, args.words, taxonomy, rng)
+
+    start = time.perf_counter()
+    tagger = TaxonomyTagger(taxonomy)
+    compile_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = tagger.tag_alerts(alerts)
+    tag_seconds = time.perf_counter() - start
+
+    patterns = [
+        (re.compile(rf"\b{re.escape(form)}\b", re.IGNORECASE), entry["name"])
+        for entries in taxonomy.values() for entry in entries for form in [entry["name"], *entry["aliases"]]
+    ]
+    sample = alerts[:args.baseline_sample]
+    start = time.perf_counter()
+    baseline_results = [regex_tag(patterns, alert) for alert in sample]
+    baseline_seconds = time.perf_counter() - start
+
+    mismatches = sum(sorted(result.tags) != sorted(baseline) for result, baseline in zip(results, baseline_results))
+    tag_us = tag_seconds / len(alerts) * 1e6
+    baseline_us = baseline_seconds / len(sample) * 1e6
+    print(f"Taxonomy: {len(tagger.terms)} entries, {tagger.pattern_count} names and aliases, {tagger.automaton.state_count} automaton states, compiled in {compile_seconds * 1000:.0f} ms.")
+    print(f"Tagged {len(alerts)} alerts of ~{args.words} words, {sum(len(result.tags) for result in results) / len(results):.1f} tags per alert.")
+    print(f"{'':<12}{'us/alert':>12}{'alerts/s':>12}")
+    print(f"{'automaton':<12}{tag_us:>12.1f}{1e6 / tag_us:>12.0f}")
+    print(f"{'regex':<12}{baseline_us:>12.1f}{1e6 / baseline_us:>12.0f}   (on {len(sample)} alerts, {mismatches} tagged differently)")
+    print(f"Speedup: {baseline_us / tag_us:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
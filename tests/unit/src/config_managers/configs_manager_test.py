@@ -1,7 +1,11 @@
+import importlib
+
 import pytest
 
-from config_managers.configs_manager import ConfigsManager
+from config_managers.configs_manager import CONFIGS, LOCAL_CONFIGS, ConfigsManager
+from data_accessors.fetchers import FetcherFactory
 from data_accessors.datastores.alerts import MongoConfig, CosmosConfig
+from data_accessors.fetchers.feedly import FeedlyConfig
 
 class invalid_config_type:
     pass
@@ -24,4 +28,36 @@ class TestConfigsManager: # fake_config_manager is a fixture from conftest.py
         expected_error_message = f"Configuration of type {invalid_config_type} could not be found in the loaded configurations."
         with pytest.raises(ValueError) as exc_info:
             fake_config_manager.retrieve_config(invalid_config_type)
-        assert expected_error_message in str(exc_info.value)
\ No newline at end of file
+        assert expected_error_message in str(exc_info.value)
+
+    def test_registered_configs_exist(self):
+        """Test that every registered config class, including those of the data sources, is where it is registered."""
+        for module, class_name in CONFIGS + LOCAL_CONFIGS:
+            assert hasattr(importlib.import_module(module), class_name)
+        assert {(registration.module, registration.config_class) for registration in FetcherFactory.REGISTRY.values()} <= set(CONFIGS)
+
+    def test_configs_are_loaded_lazily(self, fake_config_manager: ConfigsManager, mocker):
+        """Test that only the retrieved config is loaded, and only once."""
+        load_config = mocker.spy(fake_config_manager, "_load_config")
+        assert fake_config_manager.configs == {}
+
+        cosmos_config = fake_config_manager.retrieve_config(CosmosConfig)
+
+        assert fake_config_manager.retrieve_config(CosmosConfig) is cosmos_config
+        assert list(fake_config_manager.configs) == [CosmosConfig]
+        load_config.assert_called_once_with(CosmosConfig)
+
+    def test_stale_config_is_reloaded(self, fake_config_manager: ConfigsManager, tmp_path, monkeypatch):
+        """Test that FeedlyConfig is reloaded once its sources file changes, and only then."""
+        sources_path = tmp_path / "alerts_sources.yaml"
+        sources_path.write_text("feedly_sources:\n  - feed_name: CERTs\n    stream_id: stream-1\n")
+        monkeypatch.setenv("ALERTS_CONFIG_PATH", str(sources_path))
+        feedly_config = fake_config_manager.retrieve_config(FeedlyConfig)
+        assert fake_config_manager.retrieve_config(FeedlyConfig) is feedly_config
+
+        sources_path.write_text("feedly_sources:\n  - feed_name: CERTs\n    stream_id: stream-1\n  - feed_name: News\n    stream_id: stream-2\n")
+
+        assert feedly_config.is_stale()
+        reloaded_config = fake_config_manager.retrieve_config(FeedlyConfig)
+        assert [feed["stream_id"] for feed in reloaded_config.feeds] == ["stream-1", "stream-2"]
+        assert not reloaded_config.is_stale()
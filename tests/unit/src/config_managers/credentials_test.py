@@ -0,0 +1,32 @@
+import pytest
+
+from config_managers import credentials
+from config_managers.credentials import CredentialProvider, get_credential
+
+
+@pytest.fixture(scope="function")
+def fake_credential_class(mocker):
+    """Replaces DefaultAzureCredential, so no credential chain is probed."""
+    CredentialProvider.reset()
+    yield mocker.patch.object(credentials, "DefaultAzureCredential")
+    CredentialProvider.reset()
+
+
+class TestCredentialProvider:
+    def test_credential_is_shared(self, fake_credential_class):
+        assert get_credential() is CredentialProvider().get_credential()
+        fake_credential_class.assert_called_once()
+
+    def test_invalidate_creates_new_credential(self, fake_credential_class, mocker):
+        first, second = mocker.MagicMock(), mocker.MagicMock()
+        fake_credential_class.side_effect = [first, second]
+        assert get_credential() is first
+
+        CredentialProvider().invalidate()
+
+        first.close.assert_not_called() # Still used by the clients created with it.
+        assert get_credential() is second
+
+    def test_invalidate_without_credential(self, fake_credential_class):
+        CredentialProvider().invalidate()
+        fake_credential_class.assert_not_called()
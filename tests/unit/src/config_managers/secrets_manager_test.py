@@ -0,0 +1,136 @@
+import json
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from azure.core.exceptions import ClientAuthenticationError, ResourceNotFoundError
+
+from config_managers.credentials import CredentialProvider
+from config_managers.secrets_manager import (LocalSecret, LocalSecretClient, SecretsManager,
+                                             SecretsManagerConfig)
+
+
+@pytest.fixture(scope="function")
+def local_vault_path(tmp_path):
+    """A local vault file with one secret."""
+    path = tmp_path / "vault.json"
+    path.write_text(json.dumps({"feedly-access-token": "token-1"}))
+    return path
+
+@pytest.fixture(scope="function")
+def secrets_manager(local_vault_path):
+    """SecretsManager backed by the local vault, with a clock the tests move forward by hand."""
+    SecretsManager.reset()
+    manager = SecretsManager(SecretsManagerConfig(cache_ttl_seconds=100, refresh_ahead_seconds=10, local_vault_path=str(local_vault_path)))
+    now = [0.0]
+    manager._clock = lambda: now[0]
+    manager.now = now
+    yield manager
+    SecretsManager.reset()
+
+
+def rotate_secret(local_vault_path, value: str):
+    local_vault_path.write_text(json.dumps({"feedly-access-token": value}))
+
+def wait_for_refresh():
+    for thread in threading.enumerate():
+        if thread.name.startswith("secret-refresh-"):
+            thread.join(timeout=5)
+
+
+class TestLocalSecretClient:
+    def test_get_secret(self, local_vault_path):
+        assert LocalSecretClient(str(local_vault_path)).get_secret("feedly-access-token") == LocalSecret("feedly-access-token", "token-1")
+
+    def test_missing_secret(self, local_vault_path):
+        with pytest.raises(ResourceNotFoundError):
+            LocalSecretClient(str(local_vault_path)).get_secret("missing")
+
+
+class TestSecretsManager:
+    def test_singleton(self, secrets_manager):
+        assert SecretsManager() is secrets_manager
+
+    def test_key_vault_name_required(self, monkeypatch):
+        monkeypatch.delenv("KeyVault", raising=False)
+        SecretsManager.reset()
+        with pytest.raises(ValueError, match="KeyVault environment variable not set"):
+            SecretsManager(SecretsManagerConfig())
+        SecretsManager.reset()
+
+    def test_secret_is_cached_until_it_expires(self, secrets_manager, local_vault_path):
+        assert secrets_manager.get_secret_value("feedly-access-token") == "token-1"
+        rotate_secret(local_vault_path, "token-2")
+
+        secrets_manager.now[0] = 50
+        assert secrets_manager.get_secret_value("feedly-access-token") == "token-1"
+
+        secrets_manager.now[0] = 100
+        assert secrets_manager.get_secret_value("feedly-access-token") == "token-2"
+        assert secrets_manager.get_stats() == {"hits": 1, "misses": 2, "background_refreshes": 0, "auth_failures": 0}
+
+    def test_secret_is_refreshed_in_background_before_it_expires(self, secrets_manager, local_vault_path):
+        secrets_manager.get_secret_value("feedly-access-token")
+        rotate_secret(local_vault_path, "token-2")
+
+        secrets_manager.now[0] = 95 # Within refresh_ahead_seconds of expiring.
+        assert secrets_manager.get_secret_value("feedly-access-token") == "token-1" # Served while it is refreshed.
+        wait_for_refresh()
+
+        secrets_manager.now[0] = 150 # Expired if it had not been refreshed.
+        assert secrets_manager.get_secret_value("feedly-access-token") == "token-2"
+        assert secrets_manager.get_stats()["background_refreshes"] == 1
+        assert secrets_manager.get_stats()["misses"] == 1
+
+    def test_failed_background_refresh_serves_cached_value(self, secrets_manager, local_vault_path):
+        secrets_manager.get_secret_value("feedly-access-token")
+        local_vault_path.write_text("not json")
+
+        secrets_manager.now[0] = 95
+        assert secrets_manager.get_secret_value("feedly-access-token") == "token-1"
+        wait_for_refresh()
+
+        secrets_manager.now[0] = 99
+        assert secrets_manager.get_secret_value("feedly-access-token") == "token-1"
+        assert secrets_manager.get_stats()["background_refreshes"] == 0
+
+    def test_invalidate(self, secrets_manager, local_vault_path):
+        secrets_manager.get_secret_value("feedly-access-token")
+        rotate_secret(local_vault_path, "token-2")
+
+        secrets_manager.invalidate("feedly-access-token")
+
+        assert secrets_manager.get_secret_value("feedly-access-token") == "token-2"
+
+    def test_cache_disabled(self, local_vault_path):
+        SecretsManager.reset()
+        manager = SecretsManager(SecretsManagerConfig(cache_ttl_seconds=0, local_vault_path=str(local_vault_path)))
+        manager.get_secret_value("feedly-access-token")
+        rotate_secret(local_vault_path, "token-2")
+
+        assert manager.get_secret_value("feedly-access-token") == "token-2"
+        SecretsManager.reset()
+
+    def test_auth_failure_retries_with_new_credential(self, secrets_manager, mocker):
+        refused_client = MagicMock()
+        refused_client.get_secret.side_effect = ClientAuthenticationError("Token expired")
+        secrets_manager.keyvault_client = refused_client
+        invalidate_credential = mocker.patch.object(CredentialProvider, "invalidate")
+
+        assert secrets_manager.get_secret_value("feedly-access-token") == "token-1" # From the recreated client.
+        invalidate_credential.assert_called_once()
+        assert isinstance(secrets_manager.keyvault_client, LocalSecretClient)
+        assert secrets_manager.get_stats()["auth_failures"] == 1
+
+    def test_auth_failure_drops_cache(self, secrets_manager, local_vault_path, mocker):
+        secrets_manager.get_secret_value("feedly-access-token")
+        rotate_secret(local_vault_path, "token-2")
+        mocker.patch.object(CredentialProvider, "invalidate")
+        refused_client = MagicMock()
+        refused_client.get_secret.side_effect = ClientAuthenticationError("Token expired")
+        secrets_manager.keyvault_client = refused_client
+
+        with pytest.raises(ResourceNotFoundError):
+            secrets_manager.get_secret_value("missing")
+
+        assert secrets_manager.get_secret_value("feedly-access-token") == "token-2"
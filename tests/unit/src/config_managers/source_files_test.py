@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from config_managers.source_files import file_version, load_yaml
+
+
+@pytest.fixture(scope="function")
+def yaml_path(tmp_path):
+    path = tmp_path / "sources.yaml"
+    path.write_text("feeds:\n  - a\n")
+    return str(path)
+
+
+class TestLoadYaml:
+    def test_unchanged_file_is_not_parsed_again(self, yaml_path, mocker):
+        parsed, version = load_yaml(yaml_path)
+        safe_load = mocker.patch("config_managers.source_files.yaml.safe_load")
+
+        assert load_yaml(yaml_path) == (parsed, version)
+        assert parsed == {"feeds": ["a"]}
+        safe_load.assert_not_called()
+
+    def test_changed_file_is_parsed_again(self, yaml_path):
+        _, version = load_yaml(yaml_path)
+        with open(yaml_path, 'w') as file:
+            file.write("feeds:\n  - a\n  - b\n")
+        os.utime(yaml_path, ns=(version[0] + 10**9, version[0] + 10**9)) # Coarse filesystem clocks.
+
+        parsed, new_version = load_yaml(yaml_path)
+
+        assert parsed == {"feeds": ["a", "b"]}
+        assert new_version == file_version(yaml_path) != version
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            load_yaml(str(tmp_path / "missing.yaml"))
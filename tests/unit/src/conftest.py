@@ -5,6 +5,8 @@ import pytest
 from dotenv import dotenv_values
 
 from config_managers.configs_manager import ConfigsManager
+from models.alerts_table_document import AlertDocument
+from models.enums import AggregatorPlatform
 
 
 @pytest.fixture(scope="module")
@@ -13,6 +15,22 @@ def fake_feedly_data():
     with open('tests/unit/fake_feedly_data.json', 'r', encoding='utf-8') as file:
         return json.load(file)
 
+@pytest.fixture(scope="function")
+def fake_alert_documents(fake_feedly_data):
+    """
+    Build AlertDocument objects from the mock alert data.
+    The mock data has no 'canonicalUrl' or 'alternate' fields, so the 'originId' is used as the source url.
+    """
+    return [
+        AlertDocument(
+            aggregator_platform=AggregatorPlatform.FEEDLY,
+            publication_source_url=raw_alert['originId'],
+            publication_timestamp=raw_alert['published'],
+            alert_data=raw_alert
+        )
+        for raw_alert in fake_feedly_data
+    ]
+
 # ToDo: At some point in the future maybe refactor all this to inject the ConfigsManager
 #       every time so that the config manager doesn't need to be reset in this way.
 
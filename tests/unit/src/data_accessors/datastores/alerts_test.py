@@ -4,11 +4,16 @@ from unittest.mock import Mock, patch
 
 import pydantic_core._pydantic_core as _pydantic_core
 import pytest
+from azure.cosmos import exceptions
 from mongomock import MongoClient
 from pydantic_settings import BaseSettings
 
 from config_managers.configs_manager import ConfigsManager
-from data_accessors.datastores.alerts import AlertsDAOMongo, MongoConfig
+from data_accessors.datastores.alerts import AlertsDAOCosmos, AlertsDAOMongo, CosmosConfig, MongoConfig
+from models.alert_key import derive_alert_key
+from models.alerts_table_document import AlertDocument
+from models.enums import AggregatorPlatform, SummarizationStatus
+from telemetry.metrics import MetricsRegistry
 
 # ToDo: Add unit tests for the other methods in the AlertsDAO class.
 #       e.g. .add_alert_if_not_duplicate etc
@@ -32,6 +37,13 @@ def fake_alerts_dao(fake_mongo_config, fake_mongo_client):
     return AlertsDAOMongo(config=fake_mongo_config, client=fake_mongo_client)
 
 
+@pytest.fixture(scope="function")
+def fake_cosmos_alerts_dao(fake_config_manager: ConfigsManager):
+    """Provides an AlertsDAOCosmos object whose container client is a Mock."""
+    cosmos_config = fake_config_manager.retrieve_config(CosmosConfig)
+    return AlertsDAOCosmos(config=cosmos_config, client=Mock())
+
+
 class TestMongoConfig:
     def test_mongo_config_initialization_valid_params(self, fake_mongo_config):
         """Test loading valid configuration using environment variables."""
@@ -53,8 +65,9 @@ class TestMongoConfig:
         import os
         for k,v in os.environ.items():
             print(k,v)
+        config_manager = ConfigsManager() # Configs are loaded, and validated, on first retrieval.
         with pytest.raises(_pydantic_core.ValidationError) as exc_info:
-            config_manager = ConfigsManager()
+            config_manager.retrieve_config(MongoConfig)
         assert expected_error_message in str(exc_info.value)
         ConfigsManager.reset()
     def test_mongo_config_initialization_invalid_string(self, load_env_vars, monkeypatch): # load_env_vars is a fixture from conftest.py
@@ -67,10 +80,11 @@ class TestMongoConfig:
         ConfigsManager.reset() # Singleton reset before and after to avoid state leakage.
         monkeypatch.setenv("MONGO_HOST", "") # Setting a required string value to the empty string
         expected_error_message = "String should have at least 1 character"
+        config_manager = ConfigsManager(
+            'tests/unit/data_accessors/config/fake_alerts_sources.yaml'
+        )
         with pytest.raises(_pydantic_core.ValidationError) as exc_info:
-            config_manager = ConfigsManager(
-                'tests/unit/data_accessors/config/fake_alerts_sources.yaml'
-            )
+            config_manager.retrieve_config(MongoConfig)
         assert expected_error_message in str(exc_info.value)
         ConfigsManager.reset()
 
@@ -123,4 +137,236 @@ class TestAlertsDAO:
             fake_alerts_dao.add_alert_if_not_duplicate(alert)
         all_alerts = fake_alerts_dao.get_all_alerts()
         assert len(all_alerts) == len(fake_feedly_data)
-        assert set(alert['title'] for alert in all_alerts) == set(item['title'] for item in fake_feedly_data)
\ No newline at end of file
+        assert set(alert['title'] for alert in all_alerts) == set(item['title'] for item in fake_feedly_data)
+
+class TestAlertsDAOBatch:
+    def test_mongo_add_alerts_if_not_duplicate(self, fake_alerts_dao, fake_alert_documents):
+        """Tests that a batch is only inserted once, and that repeats within a batch are skipped."""
+        batch = fake_alert_documents + fake_alert_documents[:2]
+        inserted_ids = fake_alerts_dao.add_alerts_if_not_duplicate(batch)
+        assert len(inserted_ids) == len(fake_alert_documents)
+        assert fake_alerts_dao.collection.count_documents({}) == len(fake_alert_documents)
+        assert fake_alerts_dao.add_alerts_if_not_duplicate(batch) == []
+
+    def test_cosmos_add_alerts_if_not_duplicate_inserts_only_misses(self, fake_cosmos_alerts_dao, fake_alert_documents):
+        """Tests that the batch lookup is a projected query on the alert keys, and that only keys not found are created."""
+        container = fake_cosmos_alerts_dao.container
+        present_alert = fake_alert_documents[0]
+        container.query_items.return_value = iter([{"alert_key": present_alert.alert_key, "publication_source_url": present_alert.publication_source_url}])
+        container.create_item.side_effect = lambda body, **kwargs: body
+
+        inserted_ids = fake_cosmos_alerts_dao.add_alerts_if_not_duplicate(fake_alert_documents + fake_alert_documents[1:2])
+
+        assert container.query_items.call_count == 1
+        query_kwargs = container.query_items.call_args.kwargs
+        assert query_kwargs['query'].startswith("SELECT c.alert_key, c.publication_source_url FROM c")
+        assert query_kwargs['parameters'][0]['value'] == [alert.alert_key for alert in fake_alert_documents]
+        assert inserted_ids == [alert.alert_key for alert in fake_alert_documents[1:]]
+        assert all(call.kwargs['body']['id'] == call.kwargs['body']['alert_key'] for call in container.create_item.call_args_list)
+
+    def test_cosmos_lookup_matches_alerts_stored_without_a_key(self, fake_cosmos_alerts_dao, fake_alert_documents):
+        """Tests that alerts stored before alert keys were introduced are matched on their url."""
+        container = fake_cosmos_alerts_dao.container
+        container.query_items.return_value = iter([{"publication_source_url": fake_alert_documents[0].publication_source_url}])
+        container.create_item.side_effect = lambda body, **kwargs: body
+
+        inserted_ids = fake_cosmos_alerts_dao.add_alerts_if_not_duplicate(fake_alert_documents[:2])
+
+        assert inserted_ids == [fake_alert_documents[1].alert_key]
+
+    def test_cosmos_add_alerts_skips_conflicts(self, fake_cosmos_alerts_dao, fake_alert_documents):
+        """Tests that an alert rejected by Cosmos as already existing is skipped, not raised."""
+        container = fake_cosmos_alerts_dao.container
+        conflicting_key = fake_alert_documents[0].alert_key
+        def create_item(body, **kwargs):
+            if body['id'] == conflicting_key:
+                raise exceptions.CosmosResourceExistsError(status_code=409, message="Conflict")
+            return body
+        container.create_item.side_effect = create_item
+
+        inserted_ids = fake_cosmos_alerts_dao.add_alerts(fake_alert_documents[:2])
+
+        assert inserted_ids == [fake_alert_documents[1].alert_key]
+
+    def test_cosmos_request_charges_are_recorded(self, fake_cosmos_alerts_dao, fake_alert_documents):
+        """Tests that the RU cost of every Cosmos call, including rejected creates, is recorded per operation."""
+        MetricsRegistry.reset()
+        container = fake_cosmos_alerts_dao.container
+        def query_items(response_hook, **kwargs):
+            response_hook({"x-ms-request-charge": "3.5"}, None)
+            return iter([])
+        def create_item(body, response_hook, **kwargs):
+            if body['id'] == fake_alert_documents[0].alert_key:
+                raise exceptions.CosmosResourceExistsError(status_code=409, message="Conflict", response=Mock(headers={"x-ms-request-charge": "1.2"}))
+            response_hook({"x-ms-request-charge": "6"}, body)
+            return body
+        container.query_items.side_effect = query_items
+        container.create_item.side_effect = create_item
+
+        fake_cosmos_alerts_dao.add_alerts_if_not_duplicate(fake_alert_documents[:3])
+
+        counters = MetricsRegistry().summary()["counters"]
+        MetricsRegistry.reset()
+        assert counters["cosmos.request_charge{operation=query_alert_keys}"] == 3.5
+        assert counters["cosmos.requests{operation=create_alert}"] == 3
+        assert counters["cosmos.request_charge{operation=create_alert}"] == pytest.approx(13.2)
+
+    def test_cosmos_key_lookup_is_chunked(self, fake_cosmos_alerts_dao, fake_alert_documents, monkeypatch):
+        """Tests that the key lookup is split into one query per chunk of alerts."""
+        monkeypatch.setattr(AlertsDAOCosmos, "KEY_LOOKUP_CHUNK_SIZE", 2)
+        container = fake_cosmos_alerts_dao.container
+        container.query_items.side_effect = lambda **kwargs: iter({"alert_key": key} for key in kwargs['parameters'][0]['value'])
+
+        inserted_ids = fake_cosmos_alerts_dao.add_alerts_if_not_duplicate(fake_alert_documents)
+
+        assert container.query_items.call_count == 3
+        assert inserted_ids == []
+        container.create_item.assert_not_called()
+
+    def test_mongo_creates_unique_source_url_index(self, fake_alerts_dao):
+        """Tests that the DAO creates the unique index that backs the bulk upserts."""
+        indexes = fake_alerts_dao.collection.index_information()
+        assert any(
+            index.get("unique") and index["key"] == [("publication_source_url", 1)]
+            for index in indexes.values()
+        )
+
+    def test_mongo_add_alerts_if_not_duplicate_is_single_bulk_write(self, fake_alerts_dao, fake_alert_documents, mocker):
+        """Tests that a page is written with one unordered bulk_write, and that only new ids are returned."""
+        fake_alerts_dao.add_alerts_if_not_duplicate(fake_alert_documents[:2])
+        bulk_write_spy = mocker.spy(fake_alerts_dao.collection, "bulk_write")
+
+        inserted_ids = fake_alerts_dao.add_alerts_if_not_duplicate(fake_alert_documents)
+
+        bulk_write_spy.assert_called_once()
+        assert bulk_write_spy.call_args.kwargs["ordered"] is False
+        assert len(inserted_ids) == len(fake_alert_documents) - 2
+        inserted_urls = {doc["publication_source_url"] for doc in fake_alerts_dao.collection.find({"_id": {"$in": inserted_ids}})}
+        assert inserted_urls == {alert.publication_source_url for alert in fake_alert_documents[2:]}
+
+    def test_mongo_keys_alerts_by_alert_key(self, fake_alerts_dao):
+        """Tests that alerts are stored under their alert key, so variants of a stored url are duplicates."""
+        original, variant = (
+            AlertDocument(
+                aggregator_platform=AggregatorPlatform.FEEDLY,
+                publication_source_url=url,
+                publication_timestamp=1714857600000,
+                alert_data={}
+            )
+            for url in ("https://example.com/article", "HTTP://www.Example.com/article/?utm_source=feedly")
+        )
+
+        assert fake_alerts_dao.add_alerts_if_not_duplicate([original]) == [original.alert_key]
+        assert fake_alerts_dao.add_alerts_if_not_duplicate([variant]) == []
+        assert list(fake_alerts_dao.iter_alert_keys()) == [original.alert_key]
+
+    def test_mongo_iter_alert_keys_derives_keys_of_legacy_alerts(self, fake_alerts_dao):
+        """Tests that alerts stored before alert keys were introduced still yield a key."""
+        fake_alerts_dao.collection.insert_one({"publication_source_url": "https://example.com/legacy/"})
+        assert list(fake_alerts_dao.iter_alert_keys()) == [derive_alert_key("https://example.com/legacy")]
+
+    def test_mongo_add_alert_if_not_duplicate(self, fake_alerts_dao, fake_alert_documents):
+        """Tests the single alert path, which is a page of one."""
+        assert fake_alerts_dao.add_alert_if_not_duplicate(fake_alert_documents[0]) is not None
+        assert fake_alerts_dao.add_alert_if_not_duplicate(fake_alert_documents[0]) is None
+
+
+@pytest.fixture(scope="function")
+def fake_point_read_cosmos_alerts_dao(fake_config_manager: ConfigsManager):
+    """Provides an AlertsDAOCosmos object in the 'point_read' storage mode, whose container client is a Mock."""
+    cosmos_config = fake_config_manager.retrieve_config(CosmosConfig).model_copy(
+        update={"alerts_storage_mode": "point_read", "alerts_container_partition_key": "/aggregator_platform"}
+    )
+    return AlertsDAOCosmos(config=cosmos_config, client=Mock())
+
+
+class TestAlertsDAOCosmosPointRead:
+    def test_config_requires_platform_partition_key(self, load_env_vars, monkeypatch): # load_env_vars is a fixture from conftest.py
+        monkeypatch.setenv("COSMOS_ALERTS_STORAGE_MODE", "point_read")
+        with pytest.raises(ValueError, match="partitioned on '/aggregator_platform'"):
+            CosmosConfig()
+        monkeypatch.setenv("COSMOS_ALERTS_CONTAINER_PARTITION_KEY", "/aggregator_platform")
+        assert CosmosConfig().alerts_storage_mode == "point_read"
+
+    def test_duplicates_are_checked_with_point_reads(self, fake_point_read_cosmos_alerts_dao, fake_alert_documents):
+        """Tests that each alert is looked up by its id and partition key, without any query, and only misses are created."""
+        container = fake_point_read_cosmos_alerts_dao.container
+        present_key = fake_alert_documents[0].alert_key
+        def read_item(item, partition_key, **kwargs):
+            if item != present_key:
+                raise exceptions.CosmosResourceNotFoundError(status_code=404, message="Not found")
+            return {"id": item}
+        container.read_item.side_effect = read_item
+        container.create_item.side_effect = lambda body, **kwargs: body
+
+        inserted_ids = fake_point_read_cosmos_alerts_dao.add_alerts_if_not_duplicate(fake_alert_documents)
+
+        container.query_items.assert_not_called()
+        assert {call.kwargs["partition_key"] for call in container.read_item.call_args_list} == {"Feedly"}
+        assert [call.kwargs["item"] for call in container.read_item.call_args_list] == [alert.alert_key for alert in fake_alert_documents]
+        assert inserted_ids == [alert.alert_key for alert in fake_alert_documents[1:]]
+
+    def test_iter_alert_keys_projects_the_ids(self, fake_point_read_cosmos_alerts_dao):
+        container = fake_point_read_cosmos_alerts_dao.container
+        container.query_items.return_value = iter(["key-1", "key-2"])
+
+        assert list(fake_point_read_cosmos_alerts_dao.iter_alert_keys()) == ["key-1", "key-2"]
+        assert container.query_items.call_args.kwargs["query"] == "SELECT VALUE c.id FROM c"
+
+
+class TestAlertsDAOSummarizationClaims:
+    def test_mongo_claims_each_alert_once(self, fake_alerts_dao, fake_alert_documents):
+        fake_alerts_dao.add_alerts_if_not_duplicate(fake_alert_documents)
+
+        first = fake_alerts_dao.claim_alerts_for_summarization(2, claim_timeout_seconds=900)
+        rest = fake_alerts_dao.claim_alerts_for_summarization(100, claim_timeout_seconds=900)
+
+        assert len(first) == 2
+        assert {doc["_id"] for doc in first}.isdisjoint(doc["_id"] for doc in rest)
+        assert len(first) + len(rest) == len(fake_alert_documents)
+        assert all(doc["summary_data"]["status"] == SummarizationStatus.IN_PROGRESS.value for doc in first + rest)
+        assert fake_alerts_dao.claim_alerts_for_summarization(100, claim_timeout_seconds=900) == []
+
+    def test_mongo_reclaims_alerts_of_a_dead_worker(self, fake_alerts_dao, fake_alert_documents):
+        fake_alerts_dao.add_alerts_if_not_duplicate(fake_alert_documents[:1])
+        claimed = fake_alerts_dao.claim_alerts_for_summarization(1, claim_timeout_seconds=900)
+        fake_alerts_dao.collection.update_one({"_id": claimed[0]["_id"]}, {"$set": {"summary_data.claimed_at": 0}})
+
+        assert [doc["_id"] for doc in fake_alerts_dao.claim_alerts_for_summarization(1, claim_timeout_seconds=900)] == [claimed[0]["_id"]]
+
+    def test_mongo_update_alert_fields_is_partial(self, fake_alerts_dao, fake_alert_documents):
+        fake_alerts_dao.add_alerts_if_not_duplicate(fake_alert_documents[:1])
+        document = fake_alerts_dao.claim_alerts_for_summarization(1, claim_timeout_seconds=900)[0]
+
+        fake_alerts_dao.update_alert_fields(document, {"summary_data.status": SummarizationStatus.COMPLETED.value, "summary_data.summary_text": "Summary."})
+
+        stored = fake_alerts_dao.collection.find_one({"_id": document["_id"]})
+        assert stored["summary_data"]["status"] == SummarizationStatus.COMPLETED.value
+        assert stored["summary_data"]["summary_text"] == "Summary."
+        assert stored["alert_data"] == document["alert_data"]
+
+    def test_cosmos_claims_with_conditional_patches(self, fake_point_read_cosmos_alerts_dao):
+        container = fake_point_read_cosmos_alerts_dao.container
+        container.query_items.return_value = iter([
+            {"id": "key-1", "aggregator_platform": "Feedly", "_etag": "etag-1"},
+            {"id": "key-2", "aggregator_platform": "Feedly", "_etag": "etag-2"},
+        ])
+        def patch_item(item, partition_key, patch_operations, etag, **kwargs):
+            if item == "key-2": # Claimed by another worker since the query.
+                raise exceptions.CosmosAccessConditionFailedError(status_code=412, message="Precondition failed")
+            return {"id": item, "aggregator_platform": partition_key}
+        container.patch_item.side_effect = patch_item
+
+        claimed = fake_point_read_cosmos_alerts_dao.claim_alerts_for_summarization(2, claim_timeout_seconds=900)
+
+        assert claimed == [{"id": "key-1", "aggregator_platform": "Feedly"}]
+        assert container.patch_item.call_args_list[0].kwargs["etag"] == "etag-1"
+        assert container.patch_item.call_args_list[0].kwargs["partition_key"] == "Feedly"
+
+    def test_cosmos_update_alert_fields_patches_nested_paths(self, fake_point_read_cosmos_alerts_dao):
+        container = fake_point_read_cosmos_alerts_dao.container
+
+        fake_point_read_cosmos_alerts_dao.update_alert_fields({"id": "key-1", "aggregator_platform": "Feedly"}, {"summary_data.summary_text": "Summary."})
+
+        assert container.patch_item.call_args.kwargs["patch_operations"] == [{"op": "set", "path": "/summary_data/summary_text", "value": "Summary."}]
+        assert container.patch_item.call_args.kwargs["partition_key"] == "Feedly"
@@ -0,0 +1,48 @@
+from unittest.mock import Mock
+
+import pytest
+from mongomock import MongoClient
+
+from config_managers.configs_manager import ConfigsManager
+from data_accessors.datastores.alerts import MongoConfig
+from data_accessors.datastores.checkpoints import (StreamCheckpointsDAOFile,
+                                                   StreamCheckpointsDAOMongo,
+                                                   StreamCheckpointsDAOWithFallback)
+from models.stream_checkpoint import StreamCheckpoint
+
+STREAM_ID = "enterprise/shell/category/064f55ca-d0b0-4d21-bd5f-328bc4bc10b6"
+
+
+@pytest.fixture(scope="function")
+def fake_mongo_checkpoints_dao(fake_config_manager: ConfigsManager): # fake_config_manager is a fixture from conftest.py
+    mongo_config = fake_config_manager.retrieve_config(MongoConfig)
+    return StreamCheckpointsDAOMongo(mongo_config, MongoClient(mongo_config.host, mongo_config.port))
+
+@pytest.fixture(scope="function")
+def fake_file_checkpoints_dao(tmp_path):
+    return StreamCheckpointsDAOFile(str(tmp_path / "checkpoints.json"))
+
+
+class TestStreamCheckpointsDAO:
+    @pytest.mark.parametrize("dao_fixture", ["fake_mongo_checkpoints_dao", "fake_file_checkpoints_dao"])
+    def test_save_and_get_checkpoint(self, dao_fixture, request):
+        checkpoints_dao = request.getfixturevalue(dao_fixture)
+        assert checkpoints_dao.get_checkpoint(STREAM_ID) is None
+
+        checkpoints_dao.save_checkpoint(StreamCheckpoint(stream_id=STREAM_ID, newest_published=1717574498000))
+        checkpoints_dao.save_checkpoint(StreamCheckpoint(stream_id=STREAM_ID, newest_published=1717599567000, newer_than=1717574498000, continuation="abc"))
+
+        assert checkpoints_dao.get_checkpoint(STREAM_ID) == StreamCheckpoint(
+            stream_id=STREAM_ID, newest_published=1717599567000, newer_than=1717574498000, continuation="abc"
+        )
+
+    def test_fallback_used_when_database_unavailable(self, fake_file_checkpoints_dao):
+        """Test that checkpoints are still saved and read locally when the database errors."""
+        failing_db = Mock()
+        failing_db.get_checkpoint.side_effect = ConnectionError("Database unavailable")
+        failing_db.save_checkpoint.side_effect = ConnectionError("Database unavailable")
+        checkpoints_dao = StreamCheckpointsDAOWithFallback(failing_db, fake_file_checkpoints_dao)
+
+        checkpoints_dao.save_checkpoint(StreamCheckpoint(stream_id=STREAM_ID, newest_published=1717574498000))
+
+        assert checkpoints_dao.get_checkpoint(STREAM_ID).newest_published == 1717574498000
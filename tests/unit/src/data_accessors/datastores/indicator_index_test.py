@@ -0,0 +1,105 @@
+from unittest.mock import Mock
+
+import pytest
+from azure.cosmos import exceptions
+from mongomock import MongoClient
+
+from config_managers.configs_manager import ConfigsManager
+from data_accessors.datastores.alerts import CosmosConfig, MongoConfig
+from data_accessors.datastores.indicator_index import (IndicatorIndexDAOCosmos,
+                                                       IndicatorIndexDAOMongo,
+                                                       group_alert_keys_by_indicator)
+from models.alerts_table_document import AlertDocument, IndicatorsInfo
+from models.enums import AggregatorPlatform
+
+
+def alert_with_indicators(index: int, **indicators) -> AlertDocument:
+    return AlertDocument(
+        aggregator_platform=AggregatorPlatform.FEEDLY,
+        publication_source_url=f"https://example.com/{index}",
+        publication_timestamp=1717574498000,
+        alert_data={},
+        indicators=IndicatorsInfo(**indicators)
+    )
+
+@pytest.fixture(scope="function")
+def fake_mongo_indicator_index_dao(fake_config_manager: ConfigsManager): # fake_config_manager is a fixture from conftest.py
+    mongo_config = fake_config_manager.retrieve_config(MongoConfig)
+    return IndicatorIndexDAOMongo(mongo_config, MongoClient(mongo_config.host, mongo_config.port))
+
+@pytest.fixture(scope="function")
+def fake_cosmos_indicator_index_dao(fake_config_manager: ConfigsManager):
+    """Provides an IndicatorIndexDAOCosmos object whose container client is a Mock."""
+    return IndicatorIndexDAOCosmos(fake_config_manager.retrieve_config(CosmosConfig), Mock(), max_concurrency=1)
+
+
+def test_group_alert_keys_by_indicator():
+    first = alert_with_indicators(1, domains=["evil.com"], cves=["CVE-2024-3400"])
+    second = alert_with_indicators(2, domains=["evil.com"])
+
+    assert group_alert_keys_by_indicator([first, second, first]) == {
+        "evil.com": ("domains", [first.alert_key, second.alert_key]),
+        "CVE-2024-3400": ("cves", [first.alert_key]),
+    }
+
+
+class TestIndicatorIndexDAOMongo:
+    def test_add_and_find(self, fake_mongo_indicator_index_dao):
+        first = alert_with_indicators(1, domains=["evil.com"], md5=["d41d8cd98f00b204e9800998ecf8427e"])
+        second = alert_with_indicators(2, domains=["evil.com"])
+
+        assert fake_mongo_indicator_index_dao.add_alerts_indicators([first]) == 2
+        assert fake_mongo_indicator_index_dao.add_alerts_indicators([second, first]) == 2
+
+        assert fake_mongo_indicator_index_dao.find_alert_keys("evil.com") == [first.alert_key, second.alert_key]
+        assert fake_mongo_indicator_index_dao.find_alert_keys("d41d8cd98f00b204e9800998ecf8427e") == [first.alert_key]
+        assert fake_mongo_indicator_index_dao.find_alert_keys("unknown.com") == []
+        assert fake_mongo_indicator_index_dao.collection.find_one({"_id": "evil.com"})["type"] == "domains"
+
+    def test_alerts_without_indicators(self, fake_mongo_indicator_index_dao):
+        assert fake_mongo_indicator_index_dao.add_alerts_indicators([alert_with_indicators(1)]) == 0
+
+
+class TestIndicatorIndexDAOCosmos:
+    def test_new_indicator_is_created(self, fake_cosmos_indicator_index_dao):
+        container = fake_cosmos_indicator_index_dao.container
+        container.patch_item.side_effect = exceptions.CosmosResourceNotFoundError(status_code=404, message="Not found")
+        alert = alert_with_indicators(1, cves=["CVE-2024-3400"])
+
+        fake_cosmos_indicator_index_dao.add_alerts_indicators([alert])
+
+        body = container.create_item.call_args.kwargs["body"]
+        assert body["id"] == IndicatorIndexDAOCosmos._item_id("CVE-2024-3400")
+        assert body["value"] == "CVE-2024-3400"
+        assert body["alert_keys"] == [alert.alert_key]
+
+    def test_existing_indicator_is_patched(self, fake_cosmos_indicator_index_dao):
+        container = fake_cosmos_indicator_index_dao.container
+        alerts = [alert_with_indicators(index, domains=["evil.com"]) for index in range(12)]
+
+        fake_cosmos_indicator_index_dao.add_alerts_indicators(alerts)
+
+        # A patch has at most 10 operations.
+        patches = [call.kwargs for call in container.patch_item.call_args_list]
+        assert [len(patch["patch_operations"]) for patch in patches] == [10, 2]
+        assert f'NOT ARRAY_CONTAINS(c.alert_keys, "{alerts[0].alert_key}")' in patches[0]["filter_predicate"]
+        container.create_item.assert_not_called()
+
+    def test_already_indexed_alerts_are_skipped(self, fake_cosmos_indicator_index_dao):
+        container = fake_cosmos_indicator_index_dao.container
+        indexed, new = alert_with_indicators(1, domains=["evil.com"]), alert_with_indicators(2, domains=["evil.com"])
+        container.patch_item.side_effect = [exceptions.CosmosAccessConditionFailedError(status_code=412, message="Precondition failed"), None]
+        container.read_item.return_value = {"alert_keys": [indexed.alert_key]}
+
+        fake_cosmos_indicator_index_dao.add_alerts_indicators([indexed, new])
+
+        retried_operations = container.patch_item.call_args_list[1].kwargs["patch_operations"]
+        assert [operation["value"] for operation in retried_operations] == [new.alert_key]
+
+    def test_find_alert_keys(self, fake_cosmos_indicator_index_dao):
+        container = fake_cosmos_indicator_index_dao.container
+        container.read_item.return_value = {"alert_keys": ["key-1"]}
+        assert fake_cosmos_indicator_index_dao.find_alert_keys("evil.com") == ["key-1"]
+
+        container.read_item.side_effect = exceptions.CosmosResourceNotFoundError(status_code=404, message="Not found")
+        assert fake_cosmos_indicator_index_dao.find_alert_keys("evil.com") == []
@@ -0,0 +1,62 @@
+from unittest.mock import Mock
+
+import pytest
+from azure.cosmos import exceptions
+from mongomock import MongoClient
+
+from config_managers.configs_manager import ConfigsManager
+from data_accessors.datastores.alerts import CosmosConfig, MongoConfig
+from data_accessors.datastores.near_duplicate_index import (NearDuplicateIndexDAOCosmos,
+                                                            NearDuplicateIndexDAOMongo)
+from models.near_duplicate_entry import NearDuplicateEntry
+
+
+def entry(alert_key: str, band_keys: list[str]) -> NearDuplicateEntry:
+    return NearDuplicateEntry(alert_key, alert_key, (1, 2, 3, 4), band_keys, indexed_at=1717574498.0)
+
+@pytest.fixture(scope="function")
+def fake_mongo_near_duplicate_index_dao(fake_config_manager: ConfigsManager): # fake_config_manager is a fixture from conftest.py
+    mongo_config = fake_config_manager.retrieve_config(MongoConfig)
+    return NearDuplicateIndexDAOMongo(mongo_config, MongoClient(mongo_config.host, mongo_config.port))
+
+@pytest.fixture(scope="function")
+def fake_cosmos_near_duplicate_index_dao(fake_config_manager: ConfigsManager):
+    """Provides a NearDuplicateIndexDAOCosmos object whose container client is a Mock."""
+    return NearDuplicateIndexDAOCosmos(fake_config_manager.retrieve_config(CosmosConfig), Mock())
+
+
+class TestNearDuplicateIndexDAOMongo:
+    def test_add_entries_and_find_candidates(self, fake_mongo_near_duplicate_index_dao):
+        dao = fake_mongo_near_duplicate_index_dao
+        assert dao.add_entries([entry("key-1", ["0:a", "1:b"]), entry("key-2", ["0:c", "1:d"])], retention_seconds=60) == ["key-1", "key-2"]
+        assert dao.add_entries([entry("key-1", ["0:a", "1:b"]), entry("key-3", ["0:a", "1:e"])], retention_seconds=60) == ["key-3"]
+
+        candidates = dao.find_candidates(["1:b", "0:a", "0:x"], limit=10)
+
+        assert sorted(candidate.alert_key for candidate in candidates) == ["key-1", "key-3"]
+        assert candidates[0].signature == (1, 2, 3, 4)
+        assert dao.find_candidates(["0:a"], limit=1)[0].alert_key in {"key-1", "key-3"}
+        assert dao.find_candidates([], limit=10) == []
+        assert "expires_at" in dao.collection.find_one({"_id": "key-1"})
+
+
+class TestNearDuplicateIndexDAOCosmos:
+    def test_add_entries(self, fake_cosmos_near_duplicate_index_dao):
+        container = fake_cosmos_near_duplicate_index_dao.container
+        container.create_item.side_effect = [None, exceptions.CosmosResourceExistsError(status_code=409, message="Conflict")]
+
+        added = fake_cosmos_near_duplicate_index_dao.add_entries([entry("key-1", ["0:a"]), entry("key-2", ["0:b"])], retention_seconds=60)
+
+        assert added == ["key-1"]
+        body = container.create_item.call_args_list[0].kwargs["body"]
+        assert (body["id"], body["ttl"], body["band_keys"]) == ("key-1", 60, ["0:a"])
+
+    def test_find_candidates(self, fake_cosmos_near_duplicate_index_dao):
+        container = fake_cosmos_near_duplicate_index_dao.container
+        container.query_items.return_value = [entry("key-1", ["0:a"]).to_dict()]
+
+        candidates = fake_cosmos_near_duplicate_index_dao.find_candidates(["0:a", "1:b"], limit=5)
+
+        assert [candidate.alert_key for candidate in candidates] == ["key-1"]
+        parameters = container.query_items.call_args.kwargs["parameters"]
+        assert {"name": "@band_keys", "value": ["0:a", "1:b"]} in parameters
@@ -0,0 +1,131 @@
+import threading
+
+import pytest
+
+from data_accessors.datastores.processing_queue import (ProcessingQueueConfig,
+                                                        ProcessingQueueProducerFile,
+                                                        ProcessingQueueProducerMemory,
+                                                        ProcessingQueuePublisher,
+                                                        create_processing_queue_producer)
+from models.alerts_table_document import AlertDocument
+from models.enums import AggregatorPlatform
+from models.processing_queue_message import ProcessingQueueMessage
+
+
+def alert(index: int) -> AlertDocument:
+    return AlertDocument(
+        aggregator_platform=AggregatorPlatform.FEEDLY,
+        publication_source_url=f"https://example.com/{index}",
+        publication_timestamp=1717574498000,
+        alert_data={"title": f"Article {index}", "content": "x" * 10_000}
+    )
+
+@pytest.fixture(scope="function")
+def memory_queue():
+    return ProcessingQueueProducerMemory()
+
+
+class TestProcessingQueueProducers:
+    @pytest.mark.parametrize("backend, producer_class", [("memory", ProcessingQueueProducerMemory), ("file", ProcessingQueueProducerFile)])
+    def test_create_producer(self, tmp_path, backend, producer_class):
+        config = ProcessingQueueConfig(backend=backend, file_path=str(tmp_path / "queue.jsonl"))
+        assert isinstance(create_processing_queue_producer(config), producer_class)
+
+    def test_azure_producer_requires_the_storage_account(self):
+        config = ProcessingQueueConfig(backend="azure", account_name="")
+        with pytest.raises(ValueError, match="PROCESSING_QUEUE_ACCOUNT_NAME"):
+            create_processing_queue_producer(config)
+
+    @pytest.mark.parametrize("is_local, backend", [("True", "file"), ("False", "azure")])
+    def test_default_backend(self, monkeypatch, is_local, backend):
+        monkeypatch.delenv("PROCESSING_QUEUE_BACKEND", raising=False)
+        monkeypatch.setenv("IS_LOCAL", is_local)
+        assert ProcessingQueueConfig().backend == backend
+
+    def test_file_queue_round_trip(self, tmp_path):
+        producer = ProcessingQueueProducerFile(str(tmp_path / "queue" / "messages.jsonl"))
+        for index in range(3):
+            producer.send_message(ProcessingQueueMessage("Feedly", [f"key-{index}"], enqueued_at=0).to_json())
+
+        assert producer.get_depth() == 3
+        assert [message.alert_keys for message in producer.receive_messages(2)] == [["key-0"], ["key-1"]]
+        assert producer.get_depth() == 1
+        assert [message.alert_keys for message in producer.receive_messages()] == [["key-2"]]
+        assert producer.receive_messages() == []
+
+
+class TestProcessingQueuePublisher:
+    def test_batches_references_to_the_alerts(self, memory_queue):
+        alerts = [alert(index) for index in range(5)]
+        publisher = ProcessingQueuePublisher(memory_queue, ProcessingQueueConfig(batch_size=2))
+
+        assert publisher.publish_alerts(alerts) == 3
+
+        messages = memory_queue.receive_messages()
+        assert [message.alert_keys for message in messages] == [
+            [alerts[0].alert_key, alerts[1].alert_key], [alerts[2].alert_key, alerts[3].alert_key], [alerts[4].alert_key]
+        ]
+        assert all(message.aggregator_platform == "Feedly" for message in messages)
+
+    def test_messages_stay_under_the_size_limit(self, memory_queue):
+        alerts = [alert(index) for index in range(100)]
+        config = ProcessingQueueConfig(batch_size=100, max_message_bytes=1024)
+
+        ProcessingQueuePublisher(memory_queue, config).publish_alerts(alerts)
+
+        contents = list(memory_queue._messages)
+        assert len(contents) > 1
+        assert all(len(content) <= 1024 for content in contents)
+        assert sum(len(ProcessingQueueMessage.from_json(content).alert_keys) for content in contents) == 100
+
+    def test_waits_for_a_full_queue_to_drain(self, memory_queue, mocker):
+        for _ in range(3):
+            memory_queue.send_message(ProcessingQueueMessage("Feedly", ["old"]).to_json())
+        sleep = mocker.Mock(side_effect=lambda _seconds: memory_queue.receive_messages(2))
+        publisher = ProcessingQueuePublisher(memory_queue, ProcessingQueueConfig(max_depth=3, backpressure_poll_seconds=1), sleep=sleep)
+
+        assert publisher.publish_alerts([alert(0)]) == 1
+
+        sleep.assert_called_once_with(1)
+        assert memory_queue.get_depth() == 2
+
+    def test_depth_is_only_read_when_the_queue_could_be_full(self, memory_queue, mocker):
+        get_depth = mocker.spy(memory_queue, "get_depth")
+        publisher = ProcessingQueuePublisher(memory_queue, ProcessingQueueConfig(batch_size=1, max_depth=3))
+
+        publisher.publish_alerts([alert(index) for index in range(3)])
+        assert get_depth.call_count == 1
+
+        memory_queue.receive_messages(3)
+        publisher.publish_alerts([alert(3)])
+        assert get_depth.call_count == 2
+
+    def test_a_run_waiting_for_the_queue_does_not_block_the_others(self, memory_queue):
+        """Test that a publisher shared by concurrent runs still sends another run's messages while one run waits."""
+        other_run_sent = []
+
+        def sleep(_seconds):
+            memory_queue.receive_messages() # Drained while the first run waits.
+            if not other_run_sent:
+                other_run = threading.Thread(target=lambda: other_run_sent.append(publisher.publish_alerts([alert(2)])))
+                other_run.start()
+                other_run.join(timeout=1)
+                other_run_sent.append(not other_run.is_alive())
+        config = ProcessingQueueConfig(batch_size=1, max_depth=1, backpressure_poll_seconds=1)
+        publisher = ProcessingQueuePublisher(memory_queue, config, sleep=sleep)
+        publisher.publish_alerts([alert(0)]) # The queue is full from now on.
+
+        assert publisher.publish_alerts([alert(1)]) == 1
+        assert other_run_sent == [1, True]
+
+    def test_gives_up_on_a_queue_that_stays_full(self, memory_queue):
+        memory_queue.send_message(ProcessingQueueMessage("Feedly", ["old"]).to_json())
+        clock = [0.0]
+        def sleep(seconds):
+            clock[0] += seconds
+        config = ProcessingQueueConfig(max_depth=1, backpressure_poll_seconds=5, backpressure_timeout_seconds=10)
+        publisher = ProcessingQueuePublisher(memory_queue, config, sleep=sleep, clock=lambda: clock[0])
+
+        with pytest.raises(TimeoutError):
+            publisher.publish_alerts([alert(0)])
+        assert memory_queue.get_depth() == 1
@@ -0,0 +1,81 @@
+import pytest
+from mongomock import MongoClient
+
+from config_managers.configs_manager import ConfigsManager
+from data_accessors.datastores.alerts import AlertsDAOMongo, MongoConfig
+from data_accessors.datastores.seen_url_cache import (BloomFilter, CachedAlertsDAO,
+                                                      SeenUrlCache, SeenUrlCacheConfig)
+
+
+@pytest.fixture(scope="function")
+def fake_alerts_dao(fake_config_manager: ConfigsManager): # fake_config_manager is a fixture from conftest.py
+    mongo_config = fake_config_manager.retrieve_config(MongoConfig)
+    return AlertsDAOMongo(mongo_config, MongoClient(mongo_config.host, mongo_config.port))
+
+@pytest.fixture(scope="function")
+def fake_seen_url_cache_config(tmp_path):
+    return SeenUrlCacheConfig(bloom_capacity=1000, bloom_file_path=str(tmp_path / "bloom.bin"))
+
+
+class TestBloomFilter:
+    def test_no_false_negatives_and_few_false_positives(self):
+        bloom_filter = BloomFilter(capacity=10_000, error_rate=0.01)
+        for i in range(10_000):
+            bloom_filter.add(f"https://example.com/{i}")
+        assert all(f"https://example.com/{i}" in bloom_filter for i in range(10_000))
+        false_positives = sum(f"https://example.org/{i}" in bloom_filter for i in range(10_000))
+        assert false_positives < 300
+
+    def test_save_and_load(self, tmp_path):
+        bloom_filter = BloomFilter(capacity=100, error_rate=0.01)
+        bloom_filter.add("https://example.com/1")
+        bloom_filter.save(str(tmp_path / "bloom.bin"))
+
+        loaded = BloomFilter.load(str(tmp_path / "bloom.bin"))
+
+        assert "https://example.com/1" in loaded
+        assert (loaded.size_bits, loaded.hash_count, loaded.count) == (bloom_filter.size_bits, bloom_filter.hash_count, 1)
+
+
+class TestCachedAlertsDAO:
+    def test_rebuilds_from_db_and_skips_db_checks(self, fake_alerts_dao, fake_alert_documents, fake_seen_url_cache_config, mocker):
+        """
+        Test that stored urls are only checked against the db when the Bloom filter says they are probably stored,
+        that new urls skip the check, and that urls seen by this instance skip the db altogether.
+        """
+        fake_alerts_dao.add_alerts_if_not_duplicate(fake_alert_documents[:2])
+        cached_dao = CachedAlertsDAO(fake_alerts_dao, SeenUrlCache(fake_seen_url_cache_config))
+        check_spy = mocker.spy(fake_alerts_dao, "add_alerts_if_not_duplicate")
+        insert_spy = mocker.spy(fake_alerts_dao, "add_alerts")
+
+        inserted_ids = cached_dao.add_alerts_if_not_duplicate(fake_alert_documents)
+
+        assert len(inserted_ids) == len(fake_alert_documents) - 2
+        assert [alert.alert_key for alert in check_spy.call_args.args[0]] == [
+            alert.alert_key for alert in fake_alert_documents[:2]
+        ]
+        assert len(insert_spy.call_args.args[0]) == len(fake_alert_documents) - 2
+
+        check_spy.reset_mock()
+        insert_spy.reset_mock()
+        assert cached_dao.add_alerts_if_not_duplicate(fake_alert_documents) == []
+        check_spy.assert_not_called()
+        insert_spy.assert_not_called()
+        stats = cached_dao.seen_url_cache.get_stats()
+        assert stats["lru_hits"] == len(fake_alert_documents)
+        assert stats["bloom_negatives"] == len(fake_alert_documents) - 2
+        assert stats["bloom_positives"] == 2
+
+    def test_persisted_bloom_filter_is_reused(self, fake_alerts_dao, fake_alert_documents, fake_seen_url_cache_config, mocker):
+        """Test that a new instance loads the persisted Bloom filter rather than rebuilding it from the db."""
+        fake_alerts_dao.add_alerts_if_not_duplicate(fake_alert_documents)
+        CachedAlertsDAO(fake_alerts_dao, SeenUrlCache(fake_seen_url_cache_config))
+        rebuild_spy = mocker.spy(fake_alerts_dao, "iter_alert_keys")
+
+        cold_cache = SeenUrlCache(fake_seen_url_cache_config)
+        cached_dao = CachedAlertsDAO(fake_alerts_dao, cold_cache)
+
+        rebuild_spy.assert_not_called()
+        assert cached_dao.add_alerts_if_not_duplicate(fake_alert_documents) == []
+        assert cold_cache.get_stats()["bloom_positives"] == len(fake_alert_documents)
+        assert cold_cache.get_stats()["bloom_false_positives"] == 0
@@ -0,0 +1,161 @@
+import base64
+import json
+from unittest.mock import MagicMock, Mock
+
+import pytest
+from azure.cosmos import exceptions
+from mongomock import MongoClient
+
+from config_managers.configs_manager import ConfigsManager
+from data_accessors.datastores.alerts import CosmosConfig, MongoConfig
+from data_accessors.datastores.triage_staging import TriageStagingDAOCosmos, TriageStagingDAOMongo
+from models.triage_table_entity import TriageStagingEntity, TriageStagingFilter
+
+
+def staging_entity(index: int, timestamp: str, platform: str = "Feedly") -> TriageStagingEntity:
+    return TriageStagingEntity(
+        id=f"key-{index:02d}",
+        publicationSourceUrl=f"https://example.com/{index}",
+        aggregatorPlatform=platform,
+        title=f"Article {index}",
+        category=["Malware"],
+        timestamp=timestamp
+    )
+
+@pytest.fixture(scope="function")
+def fake_mongo_triage_staging_dao(fake_config_manager: ConfigsManager): # fake_config_manager is a fixture from conftest.py
+    mongo_config = fake_config_manager.retrieve_config(MongoConfig)
+    return TriageStagingDAOMongo(mongo_config, MongoClient(mongo_config.host, mongo_config.port))
+
+@pytest.fixture(scope="function")
+def fake_cosmos_triage_staging_dao(fake_config_manager: ConfigsManager):
+    """Provides a TriageStagingDAOCosmos object whose container client is a Mock."""
+    return TriageStagingDAOCosmos(fake_config_manager.retrieve_config(CosmosConfig), Mock())
+
+
+class TestTriageStagingDAOMongo:
+    def test_add_staging_entities_if_not_exist(self, fake_mongo_triage_staging_dao):
+        first = staging_entity(1, "2024-05-01 10:00:00")
+        assert fake_mongo_triage_staging_dao.add_staging_entities_if_not_exist([first]) == ["key-01"]
+
+        inserted_ids = fake_mongo_triage_staging_dao.add_staging_entities_if_not_exist(
+            [staging_entity(2, "2024-05-01 11:00:00"), first]
+        )
+
+        assert inserted_ids == ["key-02"]
+        assert fake_mongo_triage_staging_dao.collection.count_documents({}) == 2
+        assert fake_mongo_triage_staging_dao.add_staging_entities_if_not_exist([]) == []
+
+    def test_pages_are_newest_first_and_cover_every_entity_once(self, fake_mongo_triage_staging_dao):
+        # Several entities share a timestamp, so the id breaks ties across page boundaries.
+        entities = [staging_entity(index, f"2024-05-01 1{index % 3}:00:00") for index in range(7)]
+        fake_mongo_triage_staging_dao.add_staging_entities_if_not_exist(entities)
+
+        pages, token = [], None
+        while True:
+            page = fake_mongo_triage_staging_dao.get_staging_entities_page(page_size=3, continuation_token=token)
+            pages.append(page.entities)
+            token = page.continuation_token
+            if token is None:
+                break
+
+        assert [len(page) for page in pages] == [3, 3, 1]
+        listed = [entity for page in pages for entity in page]
+        assert listed == sorted(entities, key=lambda entity: (entity.timestamp, entity.id), reverse=True)
+
+    def test_exact_last_page_has_no_continuation(self, fake_mongo_triage_staging_dao):
+        fake_mongo_triage_staging_dao.add_staging_entities_if_not_exist([staging_entity(index, "2024-05-01 10:00:00") for index in range(2)])
+
+        page = fake_mongo_triage_staging_dao.get_staging_entities_page(page_size=2)
+
+        assert len(page.entities) == 2
+        assert page.continuation_token is None
+
+    def test_version_is_incremented_when_entities_are_added(self, fake_mongo_triage_staging_dao):
+        assert fake_mongo_triage_staging_dao.get_version() == 0
+        fake_mongo_triage_staging_dao.add_staging_entities_if_not_exist([staging_entity(0, "2024-05-01 10:00:00")])
+        fake_mongo_triage_staging_dao.add_staging_entities_if_not_exist([staging_entity(0, "2024-05-01 10:00:00")]) # Already present.
+        fake_mongo_triage_staging_dao.add_staging_entity_if_not_exists(staging_entity(1, "2024-05-01 10:00:00"))
+
+        assert fake_mongo_triage_staging_dao.get_version() == 2
+
+    def test_filtered_pages(self, fake_mongo_triage_staging_dao):
+        entities = [staging_entity(index, f"2024-05-0{index + 1} 10:00:00") for index in range(5)]
+        entities[1].aggregatorPlatform = "Recorded Future"
+        fake_mongo_triage_staging_dao.add_staging_entities_if_not_exist(entities)
+        filters = TriageStagingFilter(platform="Feedly", published_after="2024-05-02 00:00:00")
+
+        first_page = fake_mongo_triage_staging_dao.get_staging_entities_page(2, filters=filters)
+        second_page = fake_mongo_triage_staging_dao.get_staging_entities_page(2, first_page.continuation_token, filters)
+
+        assert [entity.id for entity in first_page.entities + second_page.entities] == ["key-04", "key-03", "key-02"]
+        assert second_page.continuation_token is None
+
+    @pytest.mark.parametrize("decoded_token", [None, ["2024-06-05 10:00:00", {"$ne": None}], [{"$ne": None}, "id"]])
+    def test_invalid_continuation_token(self, fake_mongo_triage_staging_dao, decoded_token):
+        token = "not a token" if decoded_token is None else base64.urlsafe_b64encode(json.dumps(decoded_token).encode()).decode()
+        with pytest.raises(ValueError, match="Invalid continuation token"):
+            fake_mongo_triage_staging_dao.get_staging_entities_page(page_size=2, continuation_token=token)
+
+
+class TestTriageStagingDAOCosmos:
+    def test_entities_are_written_in_batches_per_platform(self, fake_cosmos_triage_staging_dao, monkeypatch):
+        monkeypatch.setattr(TriageStagingDAOCosmos, "BATCH_SIZE", 2)
+        entities = [staging_entity(index, "2024-05-01 10:00:00", platform="Feedly") for index in range(3)]
+        entities.append(staging_entity(3, "2024-05-01 10:00:00", platform="Recorded Future"))
+
+        inserted_ids = fake_cosmos_triage_staging_dao.add_staging_entities_if_not_exist(entities)
+
+        assert sorted(inserted_ids) == ["key-00", "key-01", "key-02", "key-03"]
+        batch_calls = fake_cosmos_triage_staging_dao.container.execute_item_batch.call_args_list
+        assert [(call.kwargs["partition_key"], len(call.kwargs["batch_operations"])) for call in batch_calls] == [
+            ("Feedly", 2), ("Feedly", 1), ("Recorded Future", 1)
+        ]
+        assert batch_calls[0].kwargs["batch_operations"][0] == ("create", (entities[0].to_dict(),))
+
+    def test_failed_batch_falls_back_to_single_creates(self, fake_cosmos_triage_staging_dao):
+        container = fake_cosmos_triage_staging_dao.container
+        container.execute_item_batch.side_effect = exceptions.CosmosBatchOperationError(error_index=1, headers={}, status_code=409, message="Conflict", operation_responses=[])
+        container.create_item.side_effect = [None, exceptions.CosmosResourceExistsError(status_code=409, message="Conflict")]
+
+        inserted_ids = fake_cosmos_triage_staging_dao.add_staging_entities_if_not_exist(
+            [staging_entity(0, "2024-05-01 10:00:00"), staging_entity(1, "2024-05-01 10:00:00")]
+        )
+
+        assert inserted_ids == ["key-00"]
+        assert container.create_item.call_count == 2
+
+    def test_get_staging_entities_page(self, fake_cosmos_triage_staging_dao):
+        entity = staging_entity(0, "2024-05-01 10:00:00")
+        pager = MagicMock()
+        pager.__next__.return_value = iter([{**entity.to_dict(), "_etag": "abc"}])
+        pager.continuation_token = "cosmos-token"
+        fake_cosmos_triage_staging_dao.container.query_items.return_value.by_page.return_value = pager
+
+        page = fake_cosmos_triage_staging_dao.get_staging_entities_page(page_size=10, continuation_token="previous-token")
+
+        assert page.entities == [entity]
+        assert page.continuation_token == "cosmos-token"
+        query_kwargs = fake_cosmos_triage_staging_dao.container.query_items.call_args.kwargs
+        assert "ORDER BY c.timestamp DESC" in query_kwargs["query"]
+        assert query_kwargs["max_item_count"] == 10
+        fake_cosmos_triage_staging_dao.container.query_items.return_value.by_page.assert_called_once_with("previous-token")
+
+    def test_filters_are_query_parameters(self, fake_cosmos_triage_staging_dao):
+        fake_cosmos_triage_staging_dao.container.query_items.return_value.by_page.return_value = MagicMock()
+
+        fake_cosmos_triage_staging_dao.get_staging_entities_page(10, filters=TriageStagingFilter(tag="CVE", published_before="2024-05-02 00:00:00"))
+
+        query_kwargs = fake_cosmos_triage_staging_dao.container.query_items.call_args.kwargs
+        assert "ARRAY_CONTAINS(c.category, @tag)" in query_kwargs["query"]
+        assert "c.timestamp < @published_before" in query_kwargs["query"]
+        assert "c.aggregatorPlatform != @meta_partition" in query_kwargs["query"] # The version item is never listed.
+        assert {"name": "@tag", "value": "CVE"} in query_kwargs["parameters"]
+
+    def test_version_item_is_created_on_first_write(self, fake_cosmos_triage_staging_dao):
+        container = fake_cosmos_triage_staging_dao.container
+        container.patch_item.side_effect = exceptions.CosmosResourceNotFoundError(status_code=404, message="Not found")
+
+        fake_cosmos_triage_staging_dao.add_staging_entities_if_not_exist([staging_entity(0, "2024-05-01 10:00:00")])
+
+        container.create_item.assert_called_once_with(body={"id": "version", "aggregatorPlatform": "_meta", "value": 1})
@@ -1,9 +1,13 @@
+import threading
+import time
+
 import pydantic_core._pydantic_core as _pydantic_core
 import pytest
 from pydantic import BaseModel
 
 from config_managers.configs_manager import ConfigsManager
 from data_accessors.fetchers import FetcherFactory
+from data_accessors.datastores.checkpoints import StreamCheckpointsDAOFile
 from data_accessors.fetchers.feedly import FeedlyConfig, FeedlyDAO
 
 
@@ -33,6 +37,7 @@ class TestFeedlyConfig:
         assert fake_feedly_config.article_count == 100
         assert fake_feedly_config.fetch_all == True
         assert fake_feedly_config.hours_ago == 24
+        assert fake_feedly_config.max_concurrency == 2
     
     def test_feedly_config_initialization_invalid_article_count(self, load_env_vars, monkeypatch):
         """
@@ -44,8 +49,9 @@ class TestFeedlyConfig:
         ConfigsManager.reset() # Singleton reset before and after to avoid state leakage.
         expected_error_message = "Input should be a valid integer, unable to parse string as an integer"
         monkeypatch.setenv("FEEDLY_ARTICLE_COUNT", "This is not an integer.")
+        config_manager = ConfigsManager() # Configs are loaded, and validated, on first retrieval.
         with pytest.raises(_pydantic_core.ValidationError) as exc_info:
-            config_manager = ConfigsManager()
+            config_manager.retrieve_config(FeedlyConfig)
         assert expected_error_message in str(exc_info.value)
         ConfigsManager.reset()
     
@@ -86,7 +92,7 @@ class TestFeedlyDao:
             'items': fake_feedly_data,
             'continuation': None
         }
-        mock_get = mocker.patch('data_accessors.fetchers.feedly.requests.get', return_value=mock_response)
+        mock_get = mocker.patch('data_accessors.fetchers.http_transport.requests.Session.request', return_value=mock_response)
 
         # Execute: call the fetch_alerts method with the mocked HTTP response.
         alerts = fake_feedly_dao.fetch_alerts()
@@ -99,12 +105,117 @@ class TestFeedlyDao:
         stream_count = len(fake_feedly_config.feeds)
         assert len(alerts) == len(fake_feedly_data) * stream_count
 
-        # Assert the number of times requests.get was called.
+        # Assert the number of requests sent.
         assert mock_get.call_count == stream_count
 
-        # Assert that raise_for_status was called once for each call to requests.get
+        # Assert that raise_for_status was called once for each request
         assert mock_response.raise_for_status.call_count == stream_count
 
+    def test_fetch_alerts_concurrently_keeps_stream_order(self, mocker, fake_feedly_dao, fake_feedly_config):
+        """Test that streams are fetched in parallel, while the output stays in the configured stream order."""
+        first_stream_id = fake_feedly_config.feeds[0]['stream_id']
+        in_flight, max_in_flight = [0], [0]
+        lock = threading.Lock()
+
+        def fake_get(method, url, **kwargs):
+            with lock:
+                in_flight[0] += 1
+                max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+            time.sleep(0.2 if first_stream_id in url else 0.05) # The first stream is the slowest.
+            with lock:
+                in_flight[0] -= 1
+            stream_id = url.split('streamId=')[1].split('&')[0]
+            return mocker.MagicMock(status_code=200, json=lambda: {
+                'items': [
+                    {'originId': f'{stream_id}/{i}', 'alternate': [{'href': f'https://example.com/{stream_id}/{i}'}], 'published': 1717574498000}
+                    for i in range(2)
+                ],
+                'continuation': None
+            })
+        mocker.patch('data_accessors.fetchers.http_transport.requests.Session.request', side_effect=fake_get)
+
+        alerts = fake_feedly_dao.fetch_alerts()
+
+        assert max_in_flight[0] == 2
+        expected_urls = [
+            f"https://example.com/{mapping['stream_id']}/{i}" for mapping in fake_feedly_config.feeds for i in range(2)
+        ]
+        assert [alert.publication_source_url for alert in alerts] == expected_urls
+
+    def test_fetch_alerts_incrementally_from_checkpoints(self, mocker, fake_feedly_config, tmp_path):
+        """
+        Test that the first run fetches from 'hours_ago', and that the next run only asks for articles newer
+        than the newest one already fetched, once the checkpoints have been committed.
+        """
+        fake_feedly_config.feeds = fake_feedly_config.feeds[:1]
+        fake_feedly_config.fetch_all = False
+        checkpoints = StreamCheckpointsDAOFile(str(tmp_path / "checkpoints.json"))
+        feedly_dao = FetcherFactory.create_connection(fake_feedly_config, checkpoints=checkpoints)
+        page = {
+            'items': [
+                {'originId': str(i), 'alternate': [{'href': f'https://example.com/{i}'}], 'published': published}
+                for i, published in enumerate([1717599567000, 1717574498000])
+            ],
+            'continuation': 'next-page'
+        }
+        mock_request = mocker.patch(
+            'data_accessors.fetchers.http_transport.requests.Session.request',
+            return_value=mocker.MagicMock(status_code=200, json=lambda: page)
+        )
+        mocker.patch('data_accessors.fetchers.feedly.time.time', return_value=1717600000)
+
+        feedly_dao.fetch_alerts()
+        assert mock_request.call_args.kwargs['params']['newerThan'] == (1717600000 - 24 * 3600) * 1000
+        assert 'continuation' not in mock_request.call_args.kwargs['params']
+
+        feedly_dao.fetch_alerts() # Not committed, so the same window is fetched again.
+        assert mock_request.call_args.kwargs['params']['newerThan'] == (1717600000 - 24 * 3600) * 1000
+
+        feedly_dao.commit_checkpoints()
+        feedly_dao.fetch_alerts() # The window was not fully fetched, so it is resumed from the continuation.
+        assert mock_request.call_args.kwargs['params']['newerThan'] == (1717600000 - 24 * 3600) * 1000
+        assert mock_request.call_args.kwargs['params']['continuation'] == 'next-page'
+
+        page['continuation'] = None
+        feedly_dao.fetch_alerts()
+        feedly_dao.commit_checkpoints()
+        feedly_dao.fetch_alerts() # The window was fully fetched, so only newer articles are asked for.
+        assert mock_request.call_args.kwargs['params']['newerThan'] == 1717599567000
+        assert 'continuation' not in mock_request.call_args.kwargs['params']
+
+    def test_only_stored_pages_move_the_checkpoints(self, mocker, fake_feedly_config, tmp_path):
+        """
+        Test that a stream's checkpoint only moves up to its last page marked stored, resuming from that page's
+        continuation, and that pages fetched but never stored, e.g. when the run stopped first, don't move it.
+        """
+        fake_feedly_config.feeds = fake_feedly_config.feeds[:2]
+        first_stream_id, second_stream_id = [mapping['stream_id'] for mapping in fake_feedly_config.feeds]
+        checkpoints = StreamCheckpointsDAOFile(str(tmp_path / "checkpoints.json"))
+        feedly_dao = FetcherFactory.create_connection(fake_feedly_config, checkpoints=checkpoints)
+
+        def fake_get(method, url, params=None, **kwargs):
+            if second_stream_id in url:
+                time.sleep(0.1) # So the first stream's first page is yielded first.
+                items, continuation = [{'originId': 'b/1', 'alternate': [{'href': 'https://b/1'}], 'published': 2000}], None
+            elif 'continuation' not in params:
+                items, continuation = [{'originId': 'a/1', 'alternate': [{'href': 'https://a/1'}], 'published': 1000}], 'page-2'
+            else:
+                items, continuation = [{'originId': 'a/2', 'alternate': [{'href': 'https://a/2'}], 'published': 3000}], None
+            return mocker.MagicMock(status_code=200, json=lambda: {'items': items, 'continuation': continuation})
+        mocker.patch('data_accessors.fetchers.http_transport.requests.Session.request', side_effect=fake_get)
+
+        raw_pages = feedly_dao.iter_raw_pages()
+        first_page = next(raw_pages)
+        time.sleep(0.3) # The other pages are fetched meanwhile, and wait to be yielded.
+        feedly_dao.mark_page_stored(first_page)
+        raw_pages.close()
+        feedly_dao.commit_checkpoints()
+
+        first_checkpoint = checkpoints.get_checkpoint(first_stream_id)
+        assert first_checkpoint.newest_published == 1000
+        assert first_checkpoint.continuation == 'page-2'
+        assert checkpoints.get_checkpoint(second_stream_id) is None
+
 def test_fetch_alerts_with_continuation(mocker, fake_feedly_dao):
     # Setup: create responses for two pages
     responses = [
@@ -118,8 +229,8 @@ def test_fetch_alerts_with_continuation(mocker, fake_feedly_dao):
         })
     ]
     
-    # Mock requests.get to return different responses in sequence
-    mock_get = mocker.patch('data_accessors.fetchers.feedly.requests.get', side_effect=responses)
+    # Mock the transport's session to return different responses in sequence
+    mock_get = mocker.patch('data_accessors.fetchers.http_transport.requests.Session.request', side_effect=responses)
 
     # Execute
     alerts = fake_feedly_dao.fetch_alerts()
@@ -136,8 +247,8 @@ def test_fetch_alerts_network_failure(mocker, fake_feedly_dao):
     mock_response = mocker.MagicMock()
     mock_response.raise_for_status.side_effect = Exception("Network failure")
 
-    # Patch requests.get to return the mock response
-    mock_get = mocker.patch('data_accessors.fetchers.feedly.requests.get', return_value=mock_response)
+    # Patch the transport's session to return the mock response
+    mock_get = mocker.patch('data_accessors.fetchers.http_transport.requests.Session.request', return_value=mock_response)
 
     # Execute: Try to fetch alerts and expect an exception to be raised
     with pytest.raises(Exception) as excinfo:
@@ -145,7 +256,8 @@ def test_fetch_alerts_network_failure(mocker, fake_feedly_dao):
 
     # Assertions: Check the content of the raised exception
     assert 'Network failure' in str(excinfo.value)
-    # Verify that raise_for_status was called once
-    mock_response.raise_for_status.assert_called_once()
-    # Optionally, verify that requests.get was called once
-    mock_get.assert_called_once()
\ No newline at end of file
+    # Verify that raise_for_status was called once per stream at most. The streams are fetched concurrently,
+    # so other streams' requests may already be in flight when the first one fails.
+    assert 1 <= mock_response.raise_for_status.call_count <= len(fake_feedly_dao.feeds)
+    # Optionally, verify that the request was sent once per stream at most, i.e. the failed request was not retried.
+    assert mock_get.call_count == mock_response.raise_for_status.call_count
\ No newline at end of file
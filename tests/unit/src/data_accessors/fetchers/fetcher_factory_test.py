@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from data_accessors.fetchers import FetcherFactory
+from data_accessors.fetchers.feedly import FeedlyConfig, FeedlyDAO
+from data_accessors.fetchers.recorded_future import RecordedFutureConfig, RecordedFutureDAO
+
+
+class TestFetcherFactory:
+    def test_load_classes(self):
+        assert FetcherFactory.load_classes("Feedly") == (FeedlyConfig, FeedlyDAO)
+        assert FetcherFactory.load_classes("Recorded Future") == (RecordedFutureConfig, RecordedFutureDAO)
+
+    def test_load_classes_of_unknown_source(self):
+        with pytest.raises(ValueError, match="Unknown data source"):
+            FetcherFactory.load_classes("Unknown")
+
+    def test_source_of_config_class(self):
+        assert FetcherFactory.source_of_config_class(FeedlyConfig) == "Feedly"
+        assert FetcherFactory.source_of_config_class(RecordedFutureConfig) == "Recorded Future"
+        assert FetcherFactory.source_of_config_class(str) is None
+
+    def test_fetcher_modules_are_imported_lazily(self):
+        """Test that loading the configs manager and the factory doesn't import any fetcher module, until its source is used."""
+        code = (
+            "import sys\n"
+            "from config_managers.configs_manager import ConfigsManager\n"
+            "from data_accessors.fetchers import FetcherFactory\n"
+            "assert 'data_accessors.fetchers.feedly' not in sys.modules\n"
+            "assert 'data_accessors.fetchers.recorded_future' not in sys.modules\n"
+            "FetcherFactory.load_classes('Recorded Future')\n"
+            "assert 'data_accessors.fetchers.recorded_future' in sys.modules\n"
+            "assert 'data_accessors.fetchers.feedly' not in sys.modules\n"
+        )
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+        subprocess.run([sys.executable, "-c", code], check=True, env=env)
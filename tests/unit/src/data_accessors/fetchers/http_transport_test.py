@@ -0,0 +1,98 @@
+import pytest
+import requests
+
+from data_accessors.fetchers.http_transport import HttpTransport, HttpTransportConfig
+
+
+@pytest.fixture(scope="function")
+def fake_transport():
+    """Provides an HttpTransport with no jitter in its backoff, so delays are predictable."""
+    return HttpTransport(HttpTransportConfig(max_retries=2, backoff_factor=0, max_backoff=30))
+
+@pytest.fixture(scope="function")
+def mock_sleep(mocker):
+    """Intercept the sleeps between retries, so the tests don't wait."""
+    return mocker.patch('data_accessors.fetchers.http_transport.time.sleep')
+
+
+class TestHttpTransport:
+    def test_session_defaults(self, fake_transport, mocker):
+        """Test that requests ask for compressed responses and carry connect/read timeouts."""
+        mock_request = mocker.patch.object(fake_transport.session, 'request', return_value=mocker.MagicMock(status_code=200))
+        fake_transport.get('https://feedly.com/v3/streams/contents')
+        assert fake_transport.session.headers['Accept-Encoding'] == 'gzip, deflate'
+        assert mock_request.call_args.kwargs['timeout'] == (5.0, 30.0)
+
+    def test_shared_transport_is_reused(self):
+        HttpTransport.reset_shared()
+        assert HttpTransport.shared() is HttpTransport.shared()
+        HttpTransport.reset_shared()
+
+    def test_retries_honour_retry_after(self, fake_transport, mock_sleep, mocker):
+        """Test that a 429 is retried after the delay the server asked for."""
+        rate_limited = mocker.MagicMock(status_code=429, headers={'Retry-After': '7'})
+        ok = mocker.MagicMock(status_code=200, headers={})
+        mocker.patch.object(fake_transport.session, 'request', side_effect=[rate_limited, ok])
+
+        response = fake_transport.get('https://feedly.com/v3/streams/contents')
+
+        assert response is ok
+        mock_sleep.assert_called_once_with(7.0)
+        stats = fake_transport.get_stats()['feedly.com']
+        assert stats['requests'] == 2
+        assert stats['retries'] == 1
+
+    def test_retries_exhausted_returns_last_response(self, fake_transport, mock_sleep, mocker):
+        """Test that once retries run out the last response is returned, so the caller can raise_for_status()."""
+        unavailable = mocker.MagicMock(status_code=503, headers={})
+        mocker.patch.object(fake_transport.session, 'request', return_value=unavailable)
+
+        response = fake_transport.get('https://feedly.com/v3/streams/contents')
+
+        assert response is unavailable
+        assert fake_transport.session.request.call_count == 3
+        assert mock_sleep.call_count == 2
+
+    def test_connection_errors_are_retried_then_raised(self, fake_transport, mock_sleep, mocker):
+        mocker.patch.object(fake_transport.session, 'request', side_effect=requests.ConnectionError("Connection reset"))
+
+        with pytest.raises(requests.ConnectionError):
+            fake_transport.get('https://feedly.com/v3/streams/contents')
+
+        assert fake_transport.session.request.call_count == 3
+        assert fake_transport.get_stats()['feedly.com']['failures'] == 3
+
+    def test_non_idempotent_requests_are_only_retried_if_asked(self, fake_transport, mock_sleep, mocker):
+        mocker.patch.object(fake_transport.session, 'request', side_effect=requests.Timeout("Read timed out"))
+
+        with pytest.raises(requests.Timeout):
+            fake_transport.request('POST', 'https://feedly.com/v3/markers')
+        assert fake_transport.session.request.call_count == 1
+
+        with pytest.raises(requests.Timeout):
+            fake_transport.request('POST', 'https://feedly.com/v3/markers', retry_non_idempotent=True)
+        assert fake_transport.session.request.call_count == 4
+
+    def test_exponential_backoff(self):
+        transport = HttpTransport(HttpTransportConfig(backoff_factor=1, max_backoff=5))
+        delays = [transport._retry_delay(attempt, None) for attempt in range(4)]
+        assert 1 <= delays[0] <= 2
+        assert 2 <= delays[1] <= 3
+        assert 4 <= delays[2] <= 5
+        assert delays[3] == 5
+
+    def test_malformed_retry_after_falls_back_to_backoff(self, mocker):
+        transport = HttpTransport(HttpTransportConfig(backoff_factor=1, max_backoff=5))
+        response = mocker.MagicMock(headers={'Retry-After': 'not a date'})
+        assert 1 <= transport._retry_delay(0, response) <= 2
+
+    def test_per_host_rate_limit(self, mock_sleep, mocker):
+        """Test that requests to the same host are spaced out, while other hosts are not delayed."""
+        transport = HttpTransport(HttpTransportConfig(min_request_interval=10))
+        mocker.patch('data_accessors.fetchers.http_transport.time.monotonic', return_value=100.0)
+
+        transport._wait_for_rate_limit('feedly.com')
+        transport._wait_for_rate_limit('api.recordedfuture.com')
+        mock_sleep.assert_not_called()
+        transport._wait_for_rate_limit('feedly.com')
+        mock_sleep.assert_called_once_with(10.0)
@@ -0,0 +1,175 @@
+import threading
+import time
+
+import pytest
+
+from config_managers.configs_manager import ConfigsManager
+from data_accessors.datastores.checkpoints import StreamCheckpointsDAOFile
+from data_accessors.fetchers import FetcherFactory
+from data_accessors.fetchers.recorded_future import RecordedFutureConfig, RecordedFutureDAO
+from models.enums import AggregatorPlatform
+
+NOW = 1717600000 # Unix timestamp in seconds.
+
+
+def fake_raw_alert(index: int) -> dict:
+    return {
+        'id': f'alert-{index}',
+        'title': f'Alert {index}',
+        'log': {'triggered': f'2024-06-05T{index // 3600 % 24:02d}:{index // 60 % 60:02d}:{index % 60:02d}.000Z'},
+    }
+
+
+@pytest.fixture(scope="function")
+def fake_recorded_future_config(fake_config_manager: ConfigsManager): # fake_config_manager is a fixture from conftest.py
+    """Provides a RecordedFutureConfig object configured for testing, with small pages."""
+    recorded_future_config = fake_config_manager.retrieve_config(RecordedFutureConfig)
+    recorded_future_config.page_size = 10
+    recorded_future_config.max_concurrency = 2
+    return recorded_future_config
+
+
+def fake_search(mocker, total: int | None, delays: dict[int, float] | None = None, with_counts: bool = True):
+    """Returns a fake of the alert search endpoint serving total alerts, and the offsets it was asked for."""
+    requested_offsets, in_flight, max_in_flight = [], [0], [0]
+    lock = threading.Lock()
+
+    def fake_request(method, url, params=None, **kwargs):
+        offset, limit = params['offset'], params['limit']
+        with lock:
+            requested_offsets.append(offset)
+            in_flight[0] += 1
+            max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+        time.sleep((delays or {}).get(offset, 0))
+        with lock:
+            in_flight[0] -= 1
+        response_dict = {'data': {'results': [fake_raw_alert(i) for i in range(offset, min(offset + limit, total))]}}
+        if with_counts:
+            response_dict['counts'] = {'returned': len(response_dict['data']['results']), 'total': total}
+        return mocker.MagicMock(status_code=200, content=b'{}', json=lambda: response_dict)
+    mocker.patch('data_accessors.fetchers.http_transport.requests.Session.request', side_effect=fake_request)
+    return requested_offsets, max_in_flight
+
+
+class TestRecordedFutureConfig:
+    def test_recorded_future_config_initialization(self, fake_config_manager):
+        recorded_future_config = fake_config_manager.retrieve_config(RecordedFutureConfig)
+        assert recorded_future_config.api_token == "cdcdcdcd"
+        assert recorded_future_config.search_url == "https://api.recordedfuture.com/v2/alert/search"
+
+    def test_create_connection_with_recorded_future_config(self, fake_recorded_future_config):
+        assert isinstance(FetcherFactory.create_connection(fake_recorded_future_config), RecordedFutureDAO)
+
+
+class TestRecordedFutureDao:
+    def test_fetch_alerts_pages_concurrently_in_order(self, mocker, fake_recorded_future_config):
+        """Test that, once the first page gives the total, the other pages are fetched concurrently by offset, and yielded in order."""
+        requested_offsets, max_in_flight = fake_search(mocker, total=45, delays={10: 0.2}) # The second page is the slowest.
+
+        pages = list(RecordedFutureDAO(fake_recorded_future_config).iter_alert_pages())
+
+        assert requested_offsets[0] == 0
+        assert sorted(requested_offsets) == [0, 10, 20, 30, 40]
+        assert max_in_flight[0] == 2
+        assert [len(page) for page in pages] == [10, 10, 10, 10, 5]
+        assert [alert.alert_data['id'] for page in pages for alert in page] == [f'alert-{i}' for i in range(45)]
+
+    def test_fetch_alerts_without_total_pages_until_short_page(self, mocker, fake_recorded_future_config):
+        requested_offsets, _max_in_flight = fake_search(mocker, total=25, with_counts=False)
+
+        alerts = RecordedFutureDAO(fake_recorded_future_config).fetch_alerts()
+
+        assert requested_offsets == [0, 10, 20]
+        assert len(alerts) == 25
+
+    def test_fetch_alerts_stops_at_max_alerts(self, mocker, fake_recorded_future_config):
+        fake_recorded_future_config.max_alerts = 20
+        requested_offsets, _max_in_flight = fake_search(mocker, total=45)
+
+        alerts = RecordedFutureDAO(fake_recorded_future_config).fetch_alerts()
+
+        assert sorted(requested_offsets) == [0, 10]
+        assert len(alerts) == 20
+
+    @pytest.mark.parametrize("with_counts", [True, False])
+    def test_fetch_alerts_does_not_fetch_past_max_alerts(self, mocker, fake_recorded_future_config, with_counts):
+        fake_recorded_future_config.max_alerts = 25
+        requested_offsets, _max_in_flight = fake_search(mocker, total=45, with_counts=with_counts)
+
+        alerts = RecordedFutureDAO(fake_recorded_future_config).fetch_alerts()
+
+        assert sorted(requested_offsets) == [0, 10, 20]
+        assert len(alerts) == 25
+
+    def test_deserialize_alerts(self, mocker, fake_recorded_future_config):
+        fake_search(mocker, total=1)
+
+        alert = RecordedFutureDAO(fake_recorded_future_config).fetch_alerts()[0]
+
+        assert alert.aggregator_platform == AggregatorPlatform.RECORDED_FUTURE
+        assert alert.publication_source_url == "https://app.recordedfuture.com/live/sc/notification/?id=alert-0"
+        assert alert.publication_timestamp == 1717545600000 # 2024-06-05T00:00:00Z
+        assert alert.alert_data['title'] == 'Alert 0'
+
+    def test_deserialize_alert_prefers_portal_url(self, fake_recorded_future_config):
+        raw_alert = {**fake_raw_alert(0), 'url': {'portal': 'https://app.recordedfuture.com/portal/alert-0'}}
+        alerts = RecordedFutureDAO(fake_recorded_future_config).deserialize_page([raw_alert])
+        assert alerts[0].publication_source_url == 'https://app.recordedfuture.com/portal/alert-0'
+
+    @pytest.mark.parametrize("raw_alert", [{}, {'id': 'alert-0'}, {'log': {'triggered': '2024-06-05T00:00:00.000Z'}}])
+    def test_deserialize_invalid_alert(self, fake_recorded_future_config, raw_alert):
+        with pytest.raises(ValueError):
+            RecordedFutureDAO(fake_recorded_future_config).deserialize_page([raw_alert])
+
+    def test_fetch_alerts_incrementally_from_checkpoint(self, mocker, fake_recorded_future_config, tmp_path):
+        """Test that the next run only fetches from the end of the last window, once the checkpoint has been committed."""
+        mock_request = mocker.patch(
+            'data_accessors.fetchers.http_transport.requests.Session.request',
+            return_value=mocker.MagicMock(status_code=200, content=b'{}', json=lambda: {'data': {'results': []}, 'counts': {'total': 0}})
+        )
+        clock = mocker.MagicMock(return_value=NOW)
+        recorded_future_dao = RecordedFutureDAO(
+            fake_recorded_future_config, checkpoints=StreamCheckpointsDAOFile(str(tmp_path / "checkpoints.json")), clock=clock
+        )
+
+        recorded_future_dao.fetch_alerts()
+        assert mock_request.call_args.kwargs['params']['triggered'] == '[2024-06-04T15:06:40.000Z,2024-06-05T15:06:40.000Z]'
+        assert mock_request.call_args.kwargs['params']['fields'] == 'all'
+
+        clock.return_value = NOW + 3600
+        recorded_future_dao.fetch_alerts() # Not committed, so fetched from 'hours_ago' again.
+        assert mock_request.call_args.kwargs['params']['triggered'] == '[2024-06-04T16:06:40.000Z,2024-06-05T16:06:40.000Z]'
+
+        recorded_future_dao.commit_checkpoints()
+        clock.return_value = NOW + 7200
+        recorded_future_dao.fetch_alerts()
+        assert mock_request.call_args.kwargs['params']['triggered'] == '[2024-06-05T16:06:40.000Z,2024-06-05T17:06:40.000Z]'
+
+    def test_checkpoint_follows_the_stored_pages(self, mocker, fake_recorded_future_config, tmp_path):
+        """Test that a run stopped part way through the window saves the newest alert stored, and a full run the end of the window."""
+        fake_search(mocker, total=45)
+        checkpoints = StreamCheckpointsDAOFile(str(tmp_path / "checkpoints.json"))
+        recorded_future_dao = RecordedFutureDAO(fake_recorded_future_config, checkpoints=checkpoints, clock=lambda: NOW)
+
+        raw_pages = recorded_future_dao.iter_raw_pages()
+        stored_pages = [next(raw_pages), next(raw_pages)]
+        next(raw_pages) # Fetched, but never stored.
+        for raw_page in stored_pages:
+            recorded_future_dao.mark_page_stored(raw_page)
+        raw_pages.close()
+        recorded_future_dao.commit_checkpoints()
+        assert checkpoints.get_checkpoint(RecordedFutureDAO.CHECKPOINT_STREAM_ID).newest_published == 1717545619000 # alert-19
+
+        recorded_future_dao.fetch_alerts()
+        recorded_future_dao.commit_checkpoints()
+        assert checkpoints.get_checkpoint(RecordedFutureDAO.CHECKPOINT_STREAM_ID).newest_published == NOW * 1000
+
+    def test_fetch_alerts_network_failure(self, mocker, fake_recorded_future_config):
+        mock_response = mocker.MagicMock()
+        mock_response.raise_for_status.side_effect = Exception("Network failure")
+        mocker.patch('data_accessors.fetchers.http_transport.requests.Session.request', return_value=mock_response)
+
+        with pytest.raises(Exception) as excinfo:
+            RecordedFutureDAO(fake_recorded_future_config).fetch_alerts()
+
+        assert 'Network failure' in str(excinfo.value)
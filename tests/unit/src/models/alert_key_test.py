@@ -0,0 +1,51 @@
+import pytest
+
+from models.alert_key import canonicalize_url, derive_alert_key
+
+
+class TestCanonicalizeUrl:
+    @pytest.mark.parametrize("url", [
+        "https://example.com/article",
+        "http://example.com/article",
+        "https://EXAMPLE.com/article/",
+        "https://www.example.com/article",
+        "https://example.com:443/article",
+        "https://example.com/article?utm_source=feedly&utm_medium=rss",
+        "https://example.com/article#comments",
+        "  https://example.com/article?fbclid=abc  ",
+    ])
+    def test_variants_have_the_same_canonical_form(self, url):
+        assert canonicalize_url(url) == "https://example.com/article"
+
+    def test_keeps_meaningful_query_params_sorted(self):
+        assert canonicalize_url("https://example.com/view?b=2&utm_campaign=x&a=1") == "https://example.com/view?a=1&b=2"
+
+    def test_keeps_the_case_of_the_path(self):
+        assert canonicalize_url("https://example.com/CVE-2024-1234") == "https://example.com/CVE-2024-1234"
+
+    def test_keeps_non_default_ports(self):
+        assert canonicalize_url("http://example.com:8080/a") == "https://example.com:8080/a"
+
+    def test_keeps_the_brackets_of_ipv6_hosts(self):
+        assert canonicalize_url("http://[::1]:8080/path/") == "https://[::1]:8080/path"
+        assert canonicalize_url("https://[2001:DB8::1]/") == "https://[2001:db8::1]"
+
+    @pytest.mark.parametrize("url", ["http://example.com:abc/", "http://[::1/path"])
+    def test_leaves_malformed_urls_alone(self, url):
+        assert canonicalize_url(f" {url} ") == url
+
+    def test_leaves_non_http_identifiers_alone(self):
+        assert canonicalize_url(" tag:example.com,2024:/Article/ ") == "tag:example.com,2024:/Article/"
+
+
+class TestDeriveAlertKey:
+    def test_variants_have_the_same_key(self):
+        assert derive_alert_key("http://www.example.com/article/?utm_source=x") == derive_alert_key("https://example.com/article")
+
+    def test_different_articles_have_different_keys(self):
+        assert derive_alert_key("https://example.com/a") != derive_alert_key("https://example.com/b")
+
+    def test_key_is_a_sha256_hex_digest(self):
+        alert_key = derive_alert_key("https://example.com/article")
+        assert len(alert_key) == 64
+        assert int(alert_key, 16) >= 0
@@ -0,0 +1,64 @@
+import datetime
+
+import pytest
+
+from models.alerts_table_document import AlertDocument, IndicatorsInfo, SummarizationInfo, TagsInfo
+from models.enums import AggregatorPlatform, SummarizationStatus, TaggingStatus
+
+
+@pytest.fixture(scope="function")
+def alert_document():
+    return AlertDocument(
+        aggregator_platform=AggregatorPlatform.FEEDLY,
+        publication_source_url="https://example.com/article",
+        publication_timestamp=1714857600000,
+        alert_data={"title": "Example", "origin": {"title": "Example Blog"}}
+    )
+
+
+class TestAlertDocument:
+    def test_is_slotted(self, alert_document):
+        for instance in (alert_document, alert_document.summary_data, alert_document.tags_data, IndicatorsInfo()):
+            assert not hasattr(instance, "__dict__")
+
+    def test_publication_datetime_is_formatted_lazily(self, alert_document):
+        assert alert_document._publication_datetime is None
+        expected = datetime.datetime.fromtimestamp(1714857600).strftime('%Y-%m-%d %H:%M:%S')
+        assert alert_document.publication_datetime == expected
+        assert alert_document._publication_datetime == expected
+
+    def test_to_dict_matches_the_stored_schema(self, alert_document):
+        alert_dict = alert_document.to_dict()
+        assert alert_dict == {
+            "aggregator_platform": AggregatorPlatform.FEEDLY,
+            "publication_source_url": "https://example.com/article",
+            "publication_datetime": alert_document.publication_datetime,
+            "alert_data": {"title": "Example", "origin": {"title": "Example Blog"}},
+            "summary_data": {"status": SummarizationStatus.NOT_STARTED, "summary_text": None},
+            "tags_data": {"status": TaggingStatus.NOT_TAGGED, "tags": None},
+            "indicators": {"ipv4": [], "domains": [], "urls": [], "md5": [], "sha1": [], "sha256": [], "cves": []},
+            "cluster_id": None,
+            "duplicate_of": None,
+            "alert_key": alert_document.alert_key,
+            "id": "",
+        }
+        assert "id" not in alert_document.to_dict(without_id=True)
+
+    def test_indicators_are_only_created_once_extracted(self, alert_document):
+        assert alert_document.indicators is None
+        alert_document.indicators = IndicatorsInfo(cves=["CVE-2024-3400"])
+        assert alert_document.to_dict()["indicators"]["cves"] == ["CVE-2024-3400"]
+
+    def test_to_dict_shares_the_raw_payload(self, alert_document):
+        assert alert_document.to_dict()["alert_data"] is alert_document.alert_data
+
+    def test_defaults_are_not_shared_between_instances(self, alert_document):
+        other = AlertDocument(
+            aggregator_platform=AggregatorPlatform.FEEDLY,
+            publication_source_url="https://example.com/other",
+            publication_timestamp=1714857600000,
+            alert_data={}
+        )
+        assert other.summary_data is not alert_document.summary_data
+        assert other.tags_data is not alert_document.tags_data
+        assert other.summary_data == SummarizationInfo() and other.tags_data == TagsInfo()
@@ -0,0 +1,11 @@
+from models.near_duplicate_entry import NearDuplicateEntry
+
+
+class TestNearDuplicateEntry:
+    def test_dict_round_trip(self):
+        entry = NearDuplicateEntry("key-2", "key-1", (0, 1, 2**32 - 1, 7), ["0:ab", "1:cd"], indexed_at=1717574498.5)
+
+        entry_dict = entry.to_dict()
+
+        assert isinstance(entry_dict["signature"], str)
+        assert NearDuplicateEntry.from_dict(entry_dict) == entry
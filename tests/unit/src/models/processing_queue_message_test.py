@@ -0,0 +1,16 @@
+import pytest
+
+from models.processing_queue_message import ProcessingQueueMessage
+
+
+class TestProcessingQueueMessage:
+    def test_json_round_trip(self):
+        message = ProcessingQueueMessage("Feedly", ["key-1", "key-2"], enqueued_at=1717574498)
+
+        assert message.to_json() == '{"p":"Feedly","k":["key-1","key-2"],"t":1717574498}'
+        assert ProcessingQueueMessage.from_json(message.to_json()) == message
+
+    @pytest.mark.parametrize("content", ["not json", '{"p": "Feedly"}', "[]"])
+    def test_invalid_message(self, content):
+        with pytest.raises(ValueError, match="Invalid processing queue message"):
+            ProcessingQueueMessage.from_json(content)
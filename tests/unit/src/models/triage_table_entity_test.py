@@ -0,0 +1,37 @@
+import pytest
+
+from models.alerts_table_document import AlertDocument, TagsInfo
+from models.enums import AggregatorPlatform, TaggingStatus
+from models.triage_table_entity import TriageStagingEntity
+
+
+@pytest.fixture(scope="function")
+def alert_document():
+    return AlertDocument(
+        aggregator_platform=AggregatorPlatform.FEEDLY,
+        publication_source_url="https://example.com/article",
+        publication_timestamp=1714857600000,
+        alert_data={"title": "Example", "keywords": ["Malware", "CVE"], "summary": {"content": "A long payload."}}
+    )
+
+
+class TestTriageStagingEntity:
+    def test_from_alert_projects_the_listed_fields(self, alert_document):
+        entity = TriageStagingEntity.from_alert(alert_document)
+
+        assert entity == TriageStagingEntity(
+            id=alert_document.alert_key,
+            publicationSourceUrl="https://example.com/article",
+            aggregatorPlatform="Feedly",
+            title="Example",
+            category=["Malware", "CVE"],
+            timestamp="2024-05-04 21:20:00" # In UTC, whatever the local time zone.
+        )
+
+    def test_from_alert_prefers_tags(self, alert_document):
+        alert_document.tags_data = TagsInfo(status=TaggingStatus.FULLY_TAGGED, tags=["Ransomware"])
+        assert TriageStagingEntity.from_alert(alert_document).category == ["Ransomware"]
+
+    def test_from_dict_ignores_database_fields(self, alert_document):
+        entity = TriageStagingEntity.from_alert(alert_document)
+        assert TriageStagingEntity.from_dict({**entity.to_dict(), "_id": entity.id, "_etag": "abc"}) == entity
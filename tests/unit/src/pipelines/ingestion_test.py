@@ -0,0 +1,342 @@
+import threading
+import time
+
+import pytest
+from mongomock import MongoClient
+
+from config_managers.configs_manager import ConfigsManager
+from data_accessors.datastores.alerts import AlertsDAOMongo, MongoConfig
+from data_accessors.datastores.checkpoints import StreamCheckpointsDAOFile
+from data_accessors.datastores.indicator_index import IndicatorIndexDAOMongo
+from data_accessors.datastores.near_duplicate_index import NearDuplicateIndexDAOMongo
+from data_accessors.datastores.processing_queue import (ProcessingQueueConfig,
+                                                        ProcessingQueueProducerMemory,
+                                                        ProcessingQueuePublisher)
+from data_accessors.datastores.triage_staging import TriageStagingDAOMongo
+from data_accessors.fetchers import FetcherFactory
+from data_accessors.fetchers.abstract import DataFetcher
+from data_accessors.fetchers.feedly import FeedlyConfig
+from pipelines.ingestion import IngestionConfig, ingest_alerts, ingest_sources
+from models.enums import TaggingStatus
+from processors.alert_tagger.tag_alert import TaxonomyTagger
+from processors.indicator_extractor.extract_indicators import IndicatorExtractor
+from processors.near_duplicate_detector.detect_near_duplicates import NearDuplicateDetector
+from telemetry.metrics import MetricsRegistry
+
+
+@pytest.fixture(scope="function")
+def fake_alerts_dao(fake_config_manager: ConfigsManager): # fake_config_manager is a fixture from conftest.py
+    mongo_config = fake_config_manager.retrieve_config(MongoConfig)
+    return AlertsDAOMongo(mongo_config, MongoClient(mongo_config.host, mongo_config.port))
+
+@pytest.fixture(scope="function")
+def fake_feedly_dao(fake_config_manager: ConfigsManager):
+    return FetcherFactory.create_connection(fake_config_manager.retrieve_config(FeedlyConfig))
+
+
+def fake_page(urls, continuation=None):
+    return {
+        'items': [{'originId': url, 'alternate': [{'href': url}], 'published': 1717574498000} for url in urls],
+        'continuation': continuation
+    }
+
+
+class FakeFetcher(DataFetcher):
+    """Yields the given pages of raw Feedly items, one every page_delay seconds, and records whether its checkpoints were committed."""
+
+    def __init__(self, feedly_dao, pages: list[list[str]], page_delay: float = 0, error: Exception | None = None):
+        self.feedly_dao = feedly_dao
+        self.pages = pages
+        self.page_delay = page_delay
+        self.error = error
+        self.fetched_pages = 0
+        self.committed = False
+
+    def fetch_alerts(self):
+        return [alert for page in self.iter_alert_pages() for alert in page]
+
+    def iter_raw_pages(self):
+        for urls in self.pages:
+            time.sleep(self.page_delay)
+            if self.error is not None:
+                raise self.error
+            self.fetched_pages += 1
+            yield fake_page(urls)['items']
+
+    def deserialize_page(self, raw_page):
+        return self.feedly_dao.deserialize_page(raw_page)
+
+    def commit_checkpoints(self):
+        self.committed = True
+
+
+class TestIngestAlerts:
+    def test_streams_pages_into_alerts_db(self, mocker, fake_feedly_dao, fake_alerts_dao):
+        """
+        Test the whole fetch -> deserialize -> dedup -> write path, with an article that appears in
+        both streams, and an article that is already in the db.
+        """
+        fake_alerts_dao.add_alerts_if_not_duplicate(fake_feedly_dao.deserialize_page(fake_page(['https://example.com/stored'])['items']))
+        pages = {
+            fake_feedly_dao.feeds[0]['stream_id']: [
+                fake_page(['https://example.com/1', 'https://example.com/shared'], continuation='page-2'),
+                fake_page(['https://example.com/2', 'https://example.com/stored']),
+            ],
+            fake_feedly_dao.feeds[1]['stream_id']: [
+                fake_page(['https://example.com/shared', 'https://example.com/3']),
+            ],
+        }
+
+        def fake_request(method, url, **kwargs):
+            stream_id = url.split('streamId=')[1].split('&')[0]
+            page = pages[stream_id].pop(0)
+            return mocker.MagicMock(status_code=200, json=lambda: page)
+        mocker.patch('data_accessors.fetchers.http_transport.requests.Session.request', side_effect=fake_request)
+
+        MetricsRegistry.reset()
+        result = ingest_alerts(fake_feedly_dao, fake_alerts_dao)
+
+        assert result.fetched_count == 6
+        assert len(result.inserted_ids) == 4
+        stored_urls = {doc['publication_source_url'] for doc in fake_alerts_dao.collection.find()}
+        assert stored_urls == {f'https://example.com/{name}' for name in ['1', '2', '3', 'shared', 'stored']}
+        summary = MetricsRegistry().summary()
+        MetricsRegistry.reset()
+        assert {f"ingestion.stage{{stage={stage}}}" for stage in ["fetch", "deserialize", "dedup", "write"]} <= set(summary["timings"])
+        assert summary["timings"]["ingestion.stage{stage=write}"]["count"] == 3
+        assert sum(value for key, value in summary["counters"].items() if key.startswith("feedly.pages")) == 3
+        assert summary["counters"]["ingestion.inserted"] == 4
+
+    def test_fetch_error_is_raised(self, mocker, fake_feedly_dao, fake_alerts_dao):
+        mock_response = mocker.MagicMock()
+        mock_response.raise_for_status.side_effect = Exception("Network failure")
+        mocker.patch('data_accessors.fetchers.http_transport.requests.Session.request', return_value=mock_response)
+
+        with pytest.raises(Exception, match="Network failure"):
+            ingest_alerts(fake_feedly_dao, fake_alerts_dao)
+
+    def test_new_alerts_are_staged_for_triage(self, mocker, fake_config_manager, fake_feedly_dao, fake_alerts_dao):
+        fake_alerts_dao.add_alerts_if_not_duplicate(fake_feedly_dao.deserialize_page(fake_page(['https://example.com/stored'])['items']))
+        page = fake_page(['https://example.com/1', 'https://example.com/stored'])
+        mocker.patch(
+            'data_accessors.fetchers.http_transport.requests.Session.request',
+            side_effect=lambda method, url, **kwargs: mocker.MagicMock(status_code=200, json=lambda: page)
+        )
+        triage_staging_dao = TriageStagingDAOMongo(fake_config_manager.retrieve_config(MongoConfig), fake_alerts_dao.client)
+
+        result = ingest_alerts(fake_feedly_dao, fake_alerts_dao, triage_staging_db=triage_staging_dao)
+
+        assert result.staged_ids == result.inserted_ids
+        staged_urls = {entity.publicationSourceUrl for entity in triage_staging_dao.get_staging_entities_page(10).entities}
+        assert staged_urls == {'https://example.com/1'}
+
+    def test_new_alerts_are_published_to_the_processing_queue(self, mocker, fake_feedly_dao, fake_alerts_dao):
+        fake_alerts_dao.add_alerts_if_not_duplicate(fake_feedly_dao.deserialize_page(fake_page(['https://example.com/stored'])['items']))
+        page = fake_page(['https://example.com/1', 'https://example.com/2', 'https://example.com/stored'])
+        mocker.patch(
+            'data_accessors.fetchers.http_transport.requests.Session.request',
+            side_effect=lambda method, url, **kwargs: mocker.MagicMock(status_code=200, json=lambda: page)
+        )
+        queue = ProcessingQueueProducerMemory()
+
+        result = ingest_alerts(fake_feedly_dao, fake_alerts_dao, processing_queue=ProcessingQueuePublisher(queue, ProcessingQueueConfig()))
+
+        assert sorted(result.queued_ids) == sorted(result.inserted_ids)
+        queued_keys = [key for message in queue.receive_messages() for key in message.alert_keys]
+        assert sorted(queued_keys) == sorted(result.inserted_ids)
+
+    def test_a_full_processing_queue_does_not_fail_the_run(self, mocker, fake_feedly_dao, fake_alerts_dao):
+        page = fake_page(['https://example.com/1'])
+        mocker.patch(
+            'data_accessors.fetchers.http_transport.requests.Session.request',
+            side_effect=lambda method, url, **kwargs: mocker.MagicMock(status_code=200, json=lambda: page)
+        )
+        queue = ProcessingQueueProducerMemory()
+        queue.send_message("full")
+        publisher = ProcessingQueuePublisher(queue, ProcessingQueueConfig(max_depth=1, backpressure_timeout_seconds=0))
+
+        result = ingest_alerts(fake_feedly_dao, fake_alerts_dao, processing_queue=publisher)
+
+        assert len(result.inserted_ids) == 1
+        assert result.queued_ids == []
+
+    def test_a_failing_processing_queue_does_not_fail_the_run(self, mocker, fake_feedly_dao, fake_alerts_dao):
+        page = fake_page(['https://example.com/1'])
+        mocker.patch(
+            'data_accessors.fetchers.http_transport.requests.Session.request',
+            side_effect=lambda method, url, **kwargs: mocker.MagicMock(status_code=200, json=lambda: page)
+        )
+        queue = ProcessingQueueProducerMemory()
+        mocker.patch.object(queue, 'send_message', side_effect=ConnectionError("Failed to resolve the queue's host"))
+
+        result = ingest_alerts(fake_feedly_dao, fake_alerts_dao, processing_queue=ProcessingQueuePublisher(queue, ProcessingQueueConfig()))
+
+        assert len(result.inserted_ids) == 1
+        assert result.queued_ids == []
+
+    def test_new_alerts_are_indexed_by_indicator(self, mocker, fake_config_manager, fake_feedly_dao, fake_alerts_dao):
+        fake_alerts_dao.add_alerts_if_not_duplicate(fake_feedly_dao.deserialize_page(fake_page(['https://example.com/stored'])['items']))
+        page = fake_page(['https://example.com/1', 'https://example.com/stored'])
+        for item in page['items']:
+            item['summary'] = {'content': '<p>Exploits CVE-2024-3400 from evil[.]com</p>'}
+        mocker.patch(
+            'data_accessors.fetchers.http_transport.requests.Session.request',
+            side_effect=lambda method, url, **kwargs: mocker.MagicMock(status_code=200, json=lambda: page)
+        )
+        indicator_index_dao = IndicatorIndexDAOMongo(fake_config_manager.retrieve_config(MongoConfig), fake_alerts_dao.client)
+
+        result = ingest_alerts(fake_feedly_dao, fake_alerts_dao, indicator_extractor=IndicatorExtractor(), indicator_index_db=indicator_index_dao)
+
+        assert result.indexed_indicators == 2
+        assert "extract" in result.stage_durations
+        stored = fake_alerts_dao.collection.find_one({'_id': result.inserted_ids[0]})
+        assert stored['indicators']['domains'] == ['evil.com']
+        # Only the new alert is indexed, the stored one already was when it was ingested.
+        assert indicator_index_dao.find_alert_keys('CVE-2024-3400') == result.inserted_ids
+
+    def test_new_alerts_are_tagged_before_they_are_staged(self, mocker, fake_config_manager, fake_feedly_dao, fake_alerts_dao):
+        page = fake_page(['https://example.com/1', 'https://example.com/2'])
+        page['items'][0]['title'] = 'Sandworm targets energy grid'
+        mocker.patch(
+            'data_accessors.fetchers.http_transport.requests.Session.request',
+            side_effect=lambda method, url, **kwargs: mocker.MagicMock(status_code=200, json=lambda: page)
+        )
+        triage_staging_dao = TriageStagingDAOMongo(fake_config_manager.retrieve_config(MongoConfig), fake_alerts_dao.client)
+        tagger = TaxonomyTagger({"threat_actors": [{"name": "Sandworm", "aliases": ["Voodoo Bear"]}]})
+
+        result = ingest_alerts(fake_feedly_dao, fake_alerts_dao, triage_staging_db=triage_staging_dao, alert_tagger=tagger)
+
+        tagged_key, untagged_key = result.inserted_ids
+        assert fake_alerts_dao.collection.find_one({'_id': tagged_key})['tags_data']['tags'] == ['Sandworm']
+        assert fake_alerts_dao.collection.find_one({'_id': untagged_key})['tags_data']['status'] == TaggingStatus.PARTIALLY_TAGGED
+        staged_categories = {entity.publicationSourceUrl: entity.category for entity in triage_staging_dao.get_staging_entities_page(10).entities}
+        assert staged_categories['https://example.com/1'] == ['Sandworm']
+        assert 'tag' in result.stage_durations
+
+    def test_time_budget_only_checkpoints_the_stored_pages(self, mocker, fake_config_manager, fake_alerts_dao, tmp_path):
+        """
+        Test that once the time budget stops a run part way through a stream, the stream resumes from its last stored
+        page, and that the pages still being fetched when the run stopped don't move the checkpoints.
+        """
+        feedly_config = fake_config_manager.retrieve_config(FeedlyConfig)
+        feedly_config.feeds = feedly_config.feeds[:2]
+        first_stream_id, second_stream_id = [mapping['stream_id'] for mapping in feedly_config.feeds]
+        checkpoints = StreamCheckpointsDAOFile(str(tmp_path / "checkpoints.json"))
+        feedly_dao = FetcherFactory.create_connection(feedly_config, checkpoints=checkpoints)
+
+        def fake_get(method, url, params=None, **kwargs):
+            if second_stream_id in url:
+                time.sleep(0.1)
+                page = fake_page(['https://b/1'])
+            elif 'continuation' not in params:
+                page = fake_page(['https://a/1'], continuation='page-2')
+            else:
+                time.sleep(0.3) # Still being fetched when the time budget runs out.
+                page = fake_page(['https://a/2'])
+            return mocker.MagicMock(status_code=200, json=lambda: page)
+        mocker.patch('data_accessors.fetchers.http_transport.requests.Session.request', side_effect=fake_get)
+
+        result = ingest_alerts(feedly_dao, fake_alerts_dao, time_budget_seconds=0.05)
+        feedly_dao.commit_checkpoints()
+
+        assert result.timed_out
+        assert sorted(result.inserted_ids) == sorted(alert.alert_key for alert in feedly_dao.deserialize_page(fake_page(['https://a/1', 'https://b/1'])['items']))
+        assert checkpoints.get_checkpoint(first_stream_id).continuation == 'page-2'
+        assert checkpoints.get_checkpoint(second_stream_id).continuation is None
+
+    def test_near_duplicates_are_stored_but_not_staged(self, mocker, fake_config_manager, fake_feedly_dao, fake_alerts_dao):
+        report = ' '.join(f'word{index}' for index in range(200))
+        page = fake_page(['https://vendor.example.com/report', 'https://news.example.com/syndicated'])
+        for item in page['items']:
+            item['content'] = {'content': f'<p>{report}</p>'}
+        mocker.patch(
+            'data_accessors.fetchers.http_transport.requests.Session.request',
+            side_effect=lambda method, url, **kwargs: mocker.MagicMock(status_code=200, json=lambda: page)
+        )
+        mongo_config = fake_config_manager.retrieve_config(MongoConfig)
+        triage_staging_dao = TriageStagingDAOMongo(mongo_config, fake_alerts_dao.client)
+        detector = NearDuplicateDetector(NearDuplicateIndexDAOMongo(mongo_config, fake_alerts_dao.client))
+
+        result = ingest_alerts(fake_feedly_dao, fake_alerts_dao, triage_staging_db=triage_staging_dao, near_duplicate_detector=detector)
+
+        original_key, copy_key = result.inserted_ids
+        assert result.near_duplicate_ids == [copy_key]
+        assert result.staged_ids == [original_key]
+        assert fake_alerts_dao.collection.find_one({'_id': copy_key})['duplicate_of'] == original_key
+        assert detector.index_db.collection.count_documents({}) == 2
+
+
+class TestIngestSources:
+    def test_sources_are_ingested_concurrently(self, fake_feedly_dao, fake_alerts_dao):
+        fetchers = {
+            "first": FakeFetcher(fake_feedly_dao, [['https://example.com/1'], ['https://example.com/2']], page_delay=0.2),
+            "second": FakeFetcher(fake_feedly_dao, [['https://example.com/3'], ['https://example.com/4']], page_delay=0.2),
+        }
+
+        start = time.monotonic()
+        results = ingest_sources(fetchers, fake_alerts_dao)
+
+        assert time.monotonic() - start < 0.7 # Sequentially, it would take 0.8 seconds.
+        assert list(results) == ["first", "second"]
+        assert [len(result.inserted_ids) for result in results.values()] == [2, 2]
+        assert all(fetcher.committed for fetcher in fetchers.values())
+
+    def test_a_failing_source_does_not_stop_the_others(self, fake_feedly_dao, fake_alerts_dao):
+        fetchers = {
+            "broken": FakeFetcher(fake_feedly_dao, [['https://example.com/1']], error=Exception("Network failure")),
+            "working": FakeFetcher(fake_feedly_dao, [['https://example.com/2']]),
+        }
+
+        MetricsRegistry.reset()
+        results = ingest_sources(fetchers, fake_alerts_dao)
+
+        assert results["broken"].error == "Network failure"
+        assert not fetchers["broken"].committed
+        assert results["working"].error is None
+        assert len(results["working"].inserted_ids) == 1
+        assert fetchers["working"].committed
+        assert MetricsRegistry().summary()["counters"]["ingestion.source_failures{reason=error,source=broken}"] == 1
+        MetricsRegistry.reset()
+
+    def test_a_source_stops_fetching_once_its_time_budget_is_spent(self, fake_feedly_dao, fake_alerts_dao):
+        pages = [[f'https://example.com/{index}'] for index in range(10)]
+        fetchers = {"slow": FakeFetcher(fake_feedly_dao, pages, page_delay=0.1), "fast": FakeFetcher(fake_feedly_dao, [['https://example.com/fast']])}
+
+        results = ingest_sources(fetchers, fake_alerts_dao, time_budgets={"slow": 0.25})
+
+        assert results["slow"].timed_out
+        assert results["slow"].error is None
+        assert fetchers["slow"].fetched_pages == 3
+        assert len(results["slow"].inserted_ids) == 3 # The pages fetched within the budget are still written.
+        assert fetchers["slow"].committed
+        assert not results["fast"].timed_out
+
+    def test_a_source_overrunning_its_grace_period_is_cancelled(self, fake_feedly_dao, fake_alerts_dao):
+        """Test that an overrunning source is stopped once its page in flight is fetched, and nothing is left running."""
+        fetchers = {
+            "stuck": FakeFetcher(fake_feedly_dao, [['https://example.com/1'], ['https://example.com/2']], page_delay=0.5),
+            "working": FakeFetcher(fake_feedly_dao, [['https://example.com/3']]),
+        }
+
+        start = time.monotonic()
+        results = ingest_sources(fetchers, fake_alerts_dao, time_budgets={"stuck": 0.1, "working": 0.1}, grace_seconds=0.1)
+
+        assert time.monotonic() - start < 0.9 # Only waited for its page in flight.
+        assert results["stuck"].timed_out
+        assert results["stuck"].error.startswith("Cancelled")
+        assert fetchers["stuck"].fetched_pages == 1
+        assert results["stuck"].inserted_ids == [] # Its page in flight was dropped, so is left for the next run.
+        assert len(results["working"].inserted_ids) == 1
+        assert not [thread for thread in threading.enumerate() if thread.name.startswith(('ingest-source', 'stage-'))]
+
+
+class TestIngestionConfig:
+    def test_sources_and_time_budgets(self):
+        config = IngestionConfig(sources="Feedly, Recorded Future,Feedly", time_budget_seconds=100, source_time_budgets={"Recorded Future": 50})
+        assert config.source_names() == ["Feedly", "Recorded Future"]
+        assert config.time_budget("Feedly") == 100
+        assert config.time_budget("Recorded Future") == 50
+
+    def test_unknown_source(self):
+        with pytest.raises(ValueError, match="Unknown data sources"):
+            IngestionConfig(sources="Feedly,Unknown")
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from pipelines.stages import merge_iterators, run_bounded_stages
+
+
+class TestRunBoundedStages:
+    def test_items_flow_through_stages_in_order(self):
+        results = run_bounded_stages(
+            range(10),
+            [
+                ("double", lambda item: item * 2),
+                ("drop_multiples_of_four", lambda item: None if item % 4 == 0 else item),
+            ]
+        )
+        assert results == [2, 6, 10, 14, 18]
+
+    def test_memory_stays_bounded(self):
+        """Test that a fast source is held back by a slow stage, rather than buffering everything."""
+        produced, consumed = [0], [0]
+        max_in_flight = [0]
+
+        def source():
+            for item in range(50):
+                produced[0] += 1
+                max_in_flight[0] = max(max_in_flight[0], produced[0] - consumed[0])
+                yield item
+
+        def slow_stage(item):
+            time.sleep(0.001)
+            consumed[0] += 1
+            return item
+
+        results = run_bounded_stages(source(), [("slow", slow_stage)], queue_size=2)
+
+        assert results == list(range(50))
+        assert max_in_flight[0] <= 4 # The queue, plus one item in each of the source and the stage.
+
+    def test_durations_are_recorded_per_item(self):
+        def slow_stage(item):
+            time.sleep(0.01)
+            return item
+
+        durations: dict[str, list[float]] = {}
+        run_bounded_stages(range(3), [("slow", slow_stage), ("fast", lambda item: item)], durations=durations, source_name="numbers")
+
+        assert set(durations) == {"numbers", "slow", "fast"}
+        assert all(len(item_durations) == 3 for item_durations in durations.values())
+        assert min(durations["slow"]) >= 0.01
+        assert max(durations["fast"]) < 0.01
+
+    def test_setting_stop_ends_the_pipeline_early(self):
+        stop = threading.Event()
+
+        def stop_after_two(item):
+            if item == 1:
+                stop.set()
+            return item
+
+        results = run_bounded_stages(range(1000), [("stop_after_two", stop_after_two)], stop=stop)
+
+        assert results == [0, 1]
+
+    def test_stage_error_stops_pipeline_and_is_raised(self):
+        source_closed = threading.Event()
+
+        def source():
+            try:
+                for item in range(1000):
+                    yield item
+            finally:
+                source_closed.set()
+
+        def failing_stage(item):
+            if item == 3:
+                raise ValueError("Bad item")
+            return item
+
+        with pytest.raises(ValueError, match="Bad item"):
+            run_bounded_stages(source(), [("failing", failing_stage), ("identity", lambda item: item)])
+        assert source_closed.is_set()
+
+
+class TestMergeIterators:
+    def test_items_of_each_iterator_stay_in_order(self):
+        def slow_range(start):
+            for item in range(start, start + 5):
+                time.sleep(0.001)
+                yield item
+
+        items = list(merge_iterators([lambda: slow_range(0), lambda: slow_range(100)], max_workers=2))
+
+        assert sorted(items) == list(range(5)) + list(range(100, 105))
+        assert [item for item in items if item < 100] == list(range(5))
+        assert [item for item in items if item >= 100] == list(range(100, 105))
+
+    def test_iterator_error_is_raised(self):
+        def failing():
+            yield 1
+            raise ConnectionError("Stream unavailable")
+
+        with pytest.raises(ConnectionError, match="Stream unavailable"):
+            list(merge_iterators([failing, lambda: iter(range(3))], max_workers=2))
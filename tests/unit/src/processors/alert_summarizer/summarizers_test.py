@@ -0,0 +1,26 @@
+from processors.alert_summarizer.summarizers import ExtractiveSummarizer
+
+TEXT = (
+    "Zyxel released an emergency update for its NAS devices. "
+    "The weather was pleasant in the afternoon. "
+    "The update fixes critical vulnerabilities in the NAS firmware, which attackers exploit. "
+    "Lunch was served at noon. "
+    "Owners of the NAS devices should apply the update now, as the vulnerabilities are exploited."
+)
+
+
+class TestExtractiveSummarizer:
+    def test_keeps_the_most_representative_sentences_in_order(self):
+        summary = ExtractiveSummarizer(max_sentences=2).summarize("Zyxel patches NAS vulnerabilities", TEXT)
+
+        assert "weather" not in summary and "Lunch" not in summary
+        sentences = [sentence for sentence in TEXT.split(". ") if sentence.rstrip(".") in summary]
+        assert len(sentences) == 2
+        assert summary.index(sentences[0]) < summary.index(sentences[1])
+
+    def test_short_text_is_its_own_summary(self):
+        assert ExtractiveSummarizer(max_sentences=3).summarize("Title", "One sentence. Two sentences.") == "One sentence. Two sentences."
+
+    def test_is_deterministic(self):
+        summarizer = ExtractiveSummarizer(max_sentences=2)
+        assert summarizer.summarize("NAS", TEXT) == summarizer.summarize("NAS", TEXT)
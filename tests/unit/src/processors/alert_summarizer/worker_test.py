@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+from mongomock import MongoClient
+
+from config_managers.configs_manager import ConfigsManager
+from data_accessors.datastores.alerts import AlertsDAOMongo, MongoConfig
+from models.alerts_table_document import AlertDocument
+from models.enums import AggregatorPlatform, SummarizationStatus
+from processors.alert_summarizer.summarizers import Summarizer
+from processors.alert_summarizer.worker import SummarizationConfig, SummarizationWorker, SummaryCache
+
+
+class CountingSummarizer(Summarizer):
+    def __init__(self, fail_on: str | None = None):
+        self.calls = 0
+        self.fail_on = fail_on
+        self._lock = threading.Lock()
+
+    def summarize(self, title: str, text: str) -> str:
+        with self._lock:
+            self.calls += 1
+        if self.fail_on is not None and self.fail_on in title:
+            raise RuntimeError("Summarizer unavailable")
+        return f"Summary of {title}"
+
+
+def alert(url: str, title: str, content: str) -> AlertDocument:
+    return AlertDocument(
+        aggregator_platform=AggregatorPlatform.FEEDLY,
+        publication_source_url=url,
+        publication_timestamp=1717574498000,
+        alert_data={"title": title, "content": {"content": f"<p>{content}</p>"}}
+    )
+
+@pytest.fixture(scope="function")
+def fake_alerts_dao(fake_config_manager: ConfigsManager): # fake_config_manager is a fixture from conftest.py
+    mongo_config = fake_config_manager.retrieve_config(MongoConfig)
+    alerts_dao = AlertsDAOMongo(mongo_config, MongoClient(mongo_config.host, mongo_config.port))
+    alerts_dao.add_alerts_if_not_duplicate([
+        alert("https://example.com/1", "Zyxel NAS", "Zyxel patches its NAS devices."),
+        alert("https://mirror.example.org/1", "Zyxel NAS", "Zyxel patches its NAS devices."), # Syndicated copy.
+        alert("https://example.com/2", "Ransomware", "A new ransomware strain."),
+    ])
+    return alerts_dao
+
+def summary_data(alerts_dao: AlertsDAOMongo) -> dict[str, dict]:
+    return {doc["publication_source_url"]: doc["summary_data"] for doc in alerts_dao.collection.find()}
+
+
+class TestSummarizationWorker:
+    def test_summarizes_every_alert_once_per_content(self, fake_alerts_dao):
+        summarizer = CountingSummarizer()
+        worker = SummarizationWorker(fake_alerts_dao, summarizer, SummarizationConfig(batch_size=10, max_workers=2))
+
+        stats = worker.run_batch()
+        worker.close()
+
+        assert summarizer.calls == 2
+        assert (stats.claimed, stats.completed, stats.failed, stats.cache_hits) == (3, 3, 0, 1)
+        assert stats.cache_hit_rate == pytest.approx(1 / 3)
+        stored = summary_data(fake_alerts_dao)
+        assert {data["status"] for data in stored.values()} == {SummarizationStatus.COMPLETED.value}
+        assert stored["https://mirror.example.org/1"]["summary_text"] == "Summary of Zyxel NAS"
+
+    def test_cache_is_shared_across_batches(self, fake_alerts_dao):
+        summarizer = CountingSummarizer()
+        cache = SummaryCache(max_size=10)
+        SummarizationWorker(fake_alerts_dao, summarizer, SummarizationConfig(batch_size=10), cache=cache).run()
+        fake_alerts_dao.add_alerts_if_not_duplicate([alert("https://other.example.net/1", "Zyxel NAS", "Zyxel patches its NAS devices.")])
+
+        stats = SummarizationWorker(fake_alerts_dao, summarizer, SummarizationConfig(batch_size=10), cache=cache).run_batch()
+
+        assert summarizer.calls == 2
+        assert stats.cache_hits == 1
+
+    def test_runs_batches_until_nothing_is_left(self, fake_alerts_dao):
+        batches = SummarizationWorker(fake_alerts_dao, CountingSummarizer(), SummarizationConfig(batch_size=2)).run()
+
+        assert [batch.claimed for batch in batches] == [2, 1]
+        assert all(batch.alerts_per_second > 0 for batch in batches)
+
+    def test_failures_are_marked_failed(self, fake_alerts_dao):
+        stats = SummarizationWorker(fake_alerts_dao, CountingSummarizer(fail_on="Ransomware"), SummarizationConfig(batch_size=10)).run_batch()
+
+        assert (stats.completed, stats.failed) == (2, 1)
+        failed = summary_data(fake_alerts_dao)["https://example.com/2"]
+        assert failed["status"] == SummarizationStatus.FAILED.value
+        assert failed["summary_text"] is None
+
+
+class TestSummaryCache:
+    def test_evicts_the_least_recently_used(self):
+        cache = SummaryCache(max_size=2)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        cache.get("a")
+        cache.put("c", "C")
+
+        assert cache.get("b") is None
+        assert (cache.get("a"), cache.get("c")) == ("A", "C")
@@ -0,0 +1,100 @@
+import pytest
+import yaml
+
+from models.alerts_table_document import AlertDocument
+from models.enums import AggregatorPlatform, TaggingStatus
+from processors.alert_tagger.tag_alert import TaxonomyTagger, TaxonomyTerm, TokenAutomaton, get_tagger, tokenize
+
+TAXONOMY = {
+    "threat_actors": [
+        {"name": "APT29", "aliases": ["Cozy Bear", "Midnight Blizzard"]},
+        {"name": "Sandworm"},
+    ],
+    "malware": [
+        {"name": "LockBit", "aliases": ["LockBit 3.0"]},
+        {"name": "Cobalt Strike"},
+    ],
+    "products": [
+        {"name": "Palo Alto PAN-OS", "aliases": ["PAN-OS"]},
+        {"name": "Apache Log4j", "aliases": ["Log4j", "Log4Shell"]},
+    ],
+}
+
+@pytest.fixture(scope="module")
+def tagger():
+    return TaxonomyTagger(TAXONOMY)
+
+
+class TestTokenAutomaton:
+    def test_finds_overlapping_patterns(self):
+        automaton = TokenAutomaton([(("a", "b", "c"), 0), (("b", "c"), 1), (("c",), 2), (("b", "d"), 3)])
+
+        assert list(automaton.iter_matches(["a", "b", "c", "b", "d"])) == [(2, 0), (2, 1), (2, 2), (4, 3)]
+
+    def test_only_whole_words_match(self):
+        automaton = TokenAutomaton([(tuple(tokenize("Cobalt Strike")), 0)])
+
+        assert list(automaton.iter_matches(tokenize("cobaltstrike cobalt strikes"))) == []
+        assert list(automaton.iter_matches(tokenize("Cobalt-Strike beacon"))) == [(1, 0)]
+
+
+class TestTaxonomyTagger:
+    def test_matches_names_and_aliases_in_order_of_appearance(self, tagger):
+        terms = tagger.match_text("Midnight Blizzard deployed LockBit 3.0 and Cobalt Strike. APT29 exploited PAN-OS.")
+
+        assert terms == [
+            TaxonomyTerm("threat_actors", "APT29"),
+            TaxonomyTerm("malware", "LockBit"),
+            TaxonomyTerm("malware", "Cobalt Strike"),
+            TaxonomyTerm("products", "Palo Alto PAN-OS"),
+        ]
+
+    def test_is_case_and_punctuation_insensitive(self, tagger):
+        assert [term.name for term in tagger.match_text("patch LOG4SHELL (log4j) now; sandworm-linked")] == ["Apache Log4j", "Sandworm"]
+
+    def test_patterns_do_not_span_title_and_content(self, tagger):
+        assert tagger.match_text("Advisory on Cobalt", "Strike teams") == []
+
+    def test_tag_alert_status(self, tagger):
+        alert = AlertDocument(
+            aggregator_platform=AggregatorPlatform.FEEDLY,
+            publication_source_url="https://example.com/1",
+            publication_timestamp=1717574498000,
+            alert_data={"title": "Sandworm targets grid", "summary": {"content": "<p>Using <b>Cobalt Strike</b>...</p>"}}
+        )
+
+        tags_info = tagger.tag_alert(alert)
+
+        assert tags_info.tags == ["Sandworm", "Cobalt Strike"]
+        assert tags_info.status == TaggingStatus.PARTIALLY_TAGGED # Only the summary was available.
+        alert.alert_data["content"] = {"content": "<p>APT29 too.</p>"}
+        assert tagger.tag_alert(alert).status == TaggingStatus.FULLY_TAGGED
+
+    def test_tag_alerts_applies_the_tags(self, tagger, fake_alert_documents): # fake_alert_documents is a fixture from conftest.py
+        results = tagger.tag_alerts(fake_alert_documents)
+
+        assert len(results) == len(fake_alert_documents)
+        assert all(alert.tags_data is result for alert, result in zip(fake_alert_documents, results))
+
+    def test_invalid_taxonomy(self):
+        with pytest.raises(ValueError, match="Invalid entry"):
+            TaxonomyTagger({"malware": ["LockBit"]})
+
+
+class TestGetTagger:
+    def test_compiles_once_until_the_file_changes(self, tmp_path):
+        taxonomy_path = tmp_path / "taxonomy.yaml"
+        taxonomy_path.write_text(yaml.safe_dump(TAXONOMY))
+
+        tagger = get_tagger(str(taxonomy_path))
+        assert get_tagger(str(taxonomy_path)) is tagger
+
+        taxonomy_path.write_text(yaml.safe_dump({**TAXONOMY, "sectors": [{"name": "Energy", "aliases": ["power grid"]}]}))
+        reloaded = get_tagger(str(taxonomy_path))
+        assert reloaded is not tagger
+        assert [term.name for term in reloaded.match_text("attacks on the power grid")] == ["Energy"]
+
+    def test_shipped_taxonomy_compiles(self):
+        tagger = get_tagger("alerts-ingestion-func-app/tag_taxonomy.yaml")
+        assert {term.category for term in tagger.terms} == {"threat_actors", "malware", "products", "sectors"}
+        assert "APT29" in [term.name for term in tagger.match_text("Attributed to Cozy Bear")]
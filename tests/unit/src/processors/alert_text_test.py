@@ -0,0 +1,26 @@
+from processors.alert_text import alert_link_targets, alert_text, has_full_content, html_link_targets, html_to_text
+
+
+class TestAlertText:
+    def test_html_to_text(self):
+        assert html_to_text("<div><h2>Zyxel &amp; NAS</h2>\n<p>Update   now.</p></div>") == "Zyxel & NAS Update now."
+
+    def test_uses_the_longest_content(self):
+        alert_data = {"summary": {"content": "<p>Short.</p>"}, "content": {"content": "<p>The longer content.</p>"}}
+        assert alert_text(alert_data) == "The longer content."
+
+    def test_no_content(self):
+        assert alert_text({"title": "Title only"}) == ""
+
+    def test_has_full_content(self):
+        assert has_full_content({"fullContent": "<p>Article</p>"})
+        assert has_full_content({"content": {"content": "<p>Article</p>"}})
+        assert not has_full_content({"summary": {"content": "<p>Article...</p>"}})
+
+    def test_html_link_targets(self):
+        content = """<p>See <a class="x" href="https://a.example.com/?q=1&amp;r=2">here</a>, <img src='/logo.png'> and <A HREF=http://b.example.com>b</A>.</p>"""
+        assert html_link_targets(content) == ["https://a.example.com/?q=1&r=2", "/logo.png", "http://b.example.com"]
+
+    def test_alert_link_targets_are_deduplicated(self):
+        alert_data = {"summary": {"content": '<a href="https://a.example.com">a</a>'}, "fullContent": '<a href="https://a.example.com">a</a>'}
+        assert alert_link_targets(alert_data) == ["https://a.example.com"]
@@ -0,0 +1,101 @@
+import pytest
+
+from models.alerts_table_document import AlertDocument, IndicatorsInfo
+from models.enums import AggregatorPlatform
+from processors.indicator_extractor.extract_indicators import IndicatorExtractor, normalize_indicator
+
+MD5 = "d41d8cd98f00b204e9800998ecf8427e"
+SHA1 = "da39a3ee5e6b4b0d3255bfef95601890afd80709"
+SHA256 = "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
+
+@pytest.fixture(scope="module")
+def extractor():
+    return IndicatorExtractor()
+
+
+class TestIndicatorExtractor:
+    def test_extracts_every_type(self, extractor):
+        indicators = extractor.extract(
+            f"The loader (MD5 {MD5.upper()}, SHA-1 {SHA1}, SHA-256 {SHA256}) exploits CVE-2024-3400, "
+            "and downloads https://malicious.example.com/stage2.bin from 203.0.113.50 and 8.8.4.4."
+        )
+
+        assert indicators == IndicatorsInfo(
+            ipv4=["8.8.4.4"],
+            domains=["malicious.example.com"],
+            urls=["https://malicious.example.com/stage2.bin"],
+            md5=[MD5], sha1=[SHA1], sha256=[SHA256],
+            cves=["CVE-2024-3400"]
+        )
+
+    def test_refangs_defanged_indicators(self, extractor):
+        indicators = extractor.extract("C2: hxxps://evil[.]com/gate.php, evil2(.)ru and 45.77.12[.]9, via hXXp[:]//bad{.}net[.]")
+
+        assert indicators.urls == ["https://evil.com/gate.php", "http://bad.net"]
+        assert indicators.domains == ["evil.com", "evil2.ru", "bad.net"]
+        assert indicators.ipv4 == ["45.77.12.9"]
+
+    def test_deduplicates_in_order_of_first_mention(self, extractor):
+        indicators = extractor.extract("cve-2021-44228 then EVIL.com", "evil.com and CVE-2021-44228 again, then CVE-2023-4966")
+
+        assert indicators.cves == ["CVE-2021-44228", "CVE-2023-4966"]
+        assert indicators.domains == ["evil.com"]
+
+    def test_skips_lookalikes(self, extractor):
+        indicators = extractor.extract(
+            "Update to 10.2.1.4.5 from 192.168.1.10 or 127.0.0.1, e.g. via setup.exe, README.md or node.js. "
+            f"Build {SHA256}ff, http://10.0.0.2/admin"
+        )
+
+        assert indicators == IndicatorsInfo()
+
+    def test_url_trailing_punctuation(self, extractor):
+        indicators = extractor.extract("See (https://en.example.org/wiki/Foo_(bar)). And https://example.net/a?b=C.")
+
+        assert indicators.urls == ["https://en.example.org/wiki/Foo_(bar)", "https://example.net/a?b=C"]
+
+    def test_caps_indicators_per_type(self):
+        hashes = [f"{index:032x}" for index in range(5)]
+
+        indicators = IndicatorExtractor(max_indicators_per_type=3).extract(" ".join(hashes))
+
+        assert indicators.md5 == hashes[:3]
+
+    def test_extract_alerts(self, extractor):
+        alert = AlertDocument(
+            aggregator_platform=AggregatorPlatform.FEEDLY,
+            publication_source_url="https://example.com/article",
+            publication_timestamp=1717574498000,
+            alert_data={"title": "Attacks exploit CVE-2024-3400", "summary": {"content": "<p>Beacons to <b>evil[.]com</b></p>"}}
+        )
+
+        results = extractor.extract_alerts([alert])
+
+        assert results == [IndicatorsInfo(domains=["evil.com"], cves=["CVE-2024-3400"])]
+        assert alert.indicators is results[0]
+        assert alert.to_dict()["indicators"]["domains"] == ["evil.com"]
+
+
+    def test_extracts_link_only_indicators(self, extractor):
+        alert = AlertDocument(
+            aggregator_platform=AggregatorPlatform.FEEDLY,
+            publication_source_url="https://example.com/article",
+            publication_timestamp=1717574498000,
+            alert_data={"title": "New loader", "content": {"content": '<p>The payload is hosted <a href="http://evil.example.com/payload.bin">here</a>.</p>'}}
+        )
+
+        indicators = extractor.extract_alert(alert)
+
+        assert indicators.urls == ["http://evil.example.com/payload.bin"]
+        assert indicators.domains == ["evil.example.com"]
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("cve-2024-3400", "CVE-2024-3400"),
+    (MD5.upper(), MD5),
+    ("Evil[.]COM", "evil.com"),
+    ("hxxps://Evil[.]COM/Path", "https://evil.com/Path"),
+    (" 45.77.12[.]9 ", "45.77.12.9"),
+])
+def test_normalize_indicator(value, expected):
+    assert normalize_indicator(value) == expected
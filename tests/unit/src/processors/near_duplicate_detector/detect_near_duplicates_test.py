@@ -0,0 +1,132 @@
+import random
+
+import pytest
+
+from models.alerts_table_document import AlertDocument
+from models.enums import AggregatorPlatform, SummarizationStatus
+from models.near_duplicate_entry import NearDuplicateEntry
+from processors.near_duplicate_detector.detect_near_duplicates import (MinHasher, NearDuplicateConfig,
+                                                                       NearDuplicateDetector,
+                                                                       estimate_similarity)
+
+VOCABULARY = [f"word{index}" for index in range(2000)]
+
+
+def article(rng: random.Random, word_count: int = 300) -> list[str]:
+    return rng.choices(VOCABULARY, k=word_count)
+
+
+def alert(index: int, words: list[str]) -> AlertDocument:
+    return AlertDocument(
+        aggregator_platform=AggregatorPlatform.FEEDLY,
+        publication_source_url=f"https://example.com/{index}",
+        publication_timestamp=1717574498000,
+        alert_data={"title": f"Article {index}", "content": {"content": f"<p>{' '.join(words)}</p>"}}
+    )
+
+
+class FakeNearDuplicateIndex:
+    """In-memory NearDuplicateIndexDAO, which answers lookups by scanning every entry."""
+
+    def __init__(self):
+        self.entries: dict[str, NearDuplicateEntry] = {}
+        self.lookups = 0
+
+    def find_candidates(self, band_keys, limit):
+        self.lookups += 1
+        band_keys = set(band_keys)
+        return [entry for entry in self.entries.values() if band_keys.intersection(entry.band_keys)][:limit]
+
+    def add_entries(self, entries, retention_seconds):
+        added = [entry for entry in entries if entry.alert_key not in self.entries]
+        self.entries.update((entry.alert_key, entry) for entry in added)
+        return [entry.alert_key for entry in added]
+
+
+class TestMinHasher:
+    def test_similarity_estimate(self):
+        rng = random.Random(0)
+        hasher = MinHasher()
+        words = article(rng, 600)
+        edited = words[:540] + article(rng, 60)
+        shingles, edited_shingles = hasher.shingles(words), hasher.shingles(edited)
+        jaccard = len(shingles & edited_shingles) / len(shingles | edited_shingles)
+
+        estimate = estimate_similarity(hasher.signature(words), hasher.signature(edited))
+
+        assert estimate == pytest.approx(jaccard, abs=0.1)
+        assert estimate_similarity(hasher.signature(words), hasher.signature(article(rng, 600))) < 0.1
+
+    def test_signatures_are_deterministic(self):
+        words = article(random.Random(0))
+        assert MinHasher(seed=7).signature(words) == MinHasher(seed=7).signature(words)
+        assert MinHasher(seed=7).signature(words) != MinHasher(seed=8).signature(words)
+
+    def test_band_keys(self):
+        hasher = MinHasher(permutation_count=8, band_count=4)
+        signature = hasher.signature(article(random.Random(0)))
+        other = signature[:2] + tuple(value + 1 for value in signature[2:])
+
+        keys, other_keys = hasher.band_keys(signature), hasher.band_keys(other)
+
+        assert len(keys) == 4 and keys[0].startswith("0:")
+        assert [key == other_key for key, other_key in zip(keys, other_keys)] == [True, False, False, False]
+
+
+class TestNearDuplicateConfig:
+    def test_band_count_must_divide_permutation_count(self):
+        with pytest.raises(ValueError, match="must divide"):
+            NearDuplicateConfig(permutation_count=128, band_count=10)
+
+
+class TestNearDuplicateDetector:
+    def test_assigns_clusters(self):
+        rng = random.Random(0)
+        words = article(rng)
+        syndicated = words[:5] + ["Reposted", "from", "the", "vendor", "blog"] + words[5:]
+        index = FakeNearDuplicateIndex()
+        first_run = NearDuplicateDetector(index)
+        original, unrelated = alert(1, words), alert(2, article(rng))
+
+        index.add_entries(first_run.assign_clusters([original, unrelated]), retention_seconds=60)
+        copy, short = alert(3, syndicated), alert(4, ["Too", "short"])
+        entries = NearDuplicateDetector(index).assign_clusters([copy, short])
+
+        assert (original.cluster_id, original.duplicate_of) == (original.alert_key, None)
+        assert (unrelated.cluster_id, unrelated.duplicate_of) == (unrelated.alert_key, None)
+        assert (copy.cluster_id, copy.duplicate_of) == (original.alert_key, original.alert_key)
+        assert copy.summary_data.status == SummarizationStatus.SKIPPED
+        assert (short.cluster_id, short.duplicate_of) == (None, None)
+        assert [entry.alert_key for entry in entries] == [copy.alert_key]
+        assert index.lookups == 2 # One per page.
+
+    def test_duplicates_within_a_run_before_indexing(self):
+        words = article(random.Random(0))
+        detector = NearDuplicateDetector(FakeNearDuplicateIndex())
+        original, copy = alert(1, words), alert(2, words)
+
+        detector.assign_clusters([original])
+        detector.assign_clusters([copy])
+
+        assert copy.duplicate_of == original.alert_key
+        assert copy.cluster_id == original.alert_key
+
+    def test_an_indexed_alert_is_not_its_own_duplicate(self):
+        index = FakeNearDuplicateIndex()
+        words = article(random.Random(0))
+        index.add_entries(NearDuplicateDetector(index).assign_clusters([alert(1, words)]), retention_seconds=60)
+
+        refetched = alert(1, words)
+        NearDuplicateDetector(index).assign_clusters([refetched])
+
+        assert refetched.duplicate_of is None
+
+    def test_clusters_chain_to_the_first_alert(self):
+        rng = random.Random(0)
+        words = article(rng)
+        detector = NearDuplicateDetector(FakeNearDuplicateIndex(), NearDuplicateConfig(similarity_threshold=0.7))
+        first, second, third = alert(1, words), alert(2, words[:280] + article(rng, 20)), alert(3, words[:270] + article(rng, 30))
+
+        detector.assign_clusters([first, second, third])
+
+        assert second.cluster_id == third.cluster_id == first.alert_key
@@ -0,0 +1,81 @@
+import json
+import logging
+
+import pytest
+
+from telemetry import metrics
+from telemetry.metrics import MetricsRegistry, percentile
+
+
+@pytest.fixture(scope="function")
+def registry():
+    MetricsRegistry.reset()
+    yield MetricsRegistry()
+    MetricsRegistry.reset()
+
+
+class TestMetricsRegistry:
+    def test_is_a_singleton(self, registry):
+        assert MetricsRegistry() is registry
+
+    def test_counters_are_summed_per_label(self, registry):
+        registry.increment("feedly.pages", stream="CERTs")
+        registry.increment("feedly.pages", stream="CERTs")
+        registry.increment("feedly.pages", stream="AI Feeds")
+        metrics.increment("cosmos.request_charge", 2.5, operation="create_alert")
+
+        assert registry.summary()["counters"] == {
+            "cosmos.request_charge{operation=create_alert}": 2.5,
+            "feedly.pages{stream=AI Feeds}": 1,
+            "feedly.pages{stream=CERTs}": 2,
+        }
+
+    def test_timings_are_summarized(self, registry):
+        for seconds in [0.001 * i for i in range(1, 101)]:
+            registry.observe("ingestion.stage", seconds, stage="write")
+
+        timing = registry.summary()["timings"]["ingestion.stage{stage=write}"]
+
+        assert timing["count"] == 100
+        assert timing["p50_ms"] == pytest.approx(51, abs=1)
+        assert timing["p99_ms"] == pytest.approx(99, abs=1)
+        assert timing["max_ms"] == pytest.approx(100)
+        assert timing["total_ms"] == pytest.approx(5050)
+
+    def test_span_as_context_manager_records_errors(self, registry):
+        with metrics.span("feedly.request", stream="CERTs"):
+            pass
+        with pytest.raises(ValueError):
+            with metrics.span("feedly.request", stream="CERTs"):
+                raise ValueError("Network failure")
+
+        summary = registry.summary()
+        assert summary["timings"]["feedly.request{stream=CERTs}"]["count"] == 2
+        assert summary["counters"] == {"feedly.request.errors{stream=CERTs}": 1}
+
+    def test_span_as_decorator_records_every_call(self, registry):
+        @metrics.span("summarizer.batch")
+        def summarize(text):
+            return text.upper()
+
+        assert summarize("a") == "A"
+        MetricsRegistry.reset() # Decorated functions record to the current registry.
+        assert summarize("b") == "B"
+
+        assert MetricsRegistry().summary()["timings"]["summarizer.batch"]["count"] == 1
+
+    def test_log_summary_emits_one_json_record_and_clears(self, registry, caplog):
+        registry.increment("ingestion.inserted", 3)
+
+        with caplog.at_level(logging.INFO):
+            record = registry.log_summary("ingestion_run", fetched=5)
+
+        assert record == {"event": "ingestion_run", "fetched": 5, "counters": {"ingestion.inserted": 3}, "timings": {}}
+        assert json.loads(caplog.records[-1].getMessage()) == record
+        assert registry.summary() == {"counters": {}, "timings": {}}
+
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3.0, 1.0, 2.0], 0.5) == 2.0
+    assert percentile([1.0, 2.0], 0.99) == 2.0
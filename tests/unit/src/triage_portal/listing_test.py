@@ -0,0 +1,153 @@
+import json
+
+import pytest
+from mongomock import MongoClient
+
+from config_managers.configs_manager import ConfigsManager
+from data_accessors.datastores.alerts import MongoConfig
+from data_accessors.datastores.triage_staging import TriageStagingDAOMongo
+from models.enums import TriageStatus
+from models.triage_table_entity import TriageStagingEntity, TriageStagingFilter
+from triage_portal.listing import AlertsListingService, ListingQuery, TriageListingConfig
+
+
+def staging_entity(index: int, **overrides) -> TriageStagingEntity:
+    entity = TriageStagingEntity(
+        id=f"key-{index:02d}",
+        publicationSourceUrl=f"https://example.com/{index}",
+        aggregatorPlatform="Feedly",
+        title=f"Article {index}",
+        category=["Malware"],
+        timestamp=f"2024-05-{index + 1:02d} 10:00:00"
+    )
+    for name, value in overrides.items():
+        setattr(entity, name, value)
+    return entity
+
+@pytest.fixture(scope="function")
+def fake_staging_dao(fake_config_manager: ConfigsManager): # fake_config_manager is a fixture from conftest.py
+    mongo_config = fake_config_manager.retrieve_config(MongoConfig)
+    staging_dao = TriageStagingDAOMongo(mongo_config, MongoClient(mongo_config.host, mongo_config.port))
+    staging_dao.add_staging_entities_if_not_exist([
+        staging_entity(0),
+        staging_entity(1, aggregatorPlatform="Recorded Future"),
+        staging_entity(2, category=["Ransomware", "CVE"]),
+        staging_entity(3, status=TriageStatus.DISMISSED.value),
+    ])
+    return staging_dao
+
+@pytest.fixture(scope="function")
+def clock():
+    return [0.0]
+
+@pytest.fixture(scope="function")
+def listing_service(fake_staging_dao, clock):
+    config = TriageListingConfig(default_page_size=2, max_page_size=3, cache_size=8, version_check_interval_seconds=10)
+    return AlertsListingService(fake_staging_dao, config, clock=lambda: clock[0])
+
+
+def listed_ids(response) -> list[str]:
+    return [item["id"] for item in json.loads(response.body)["items"]]
+
+
+class TestListingQuery:
+    def test_defaults(self):
+        query = ListingQuery.from_params({}, TriageListingConfig(default_page_size=50))
+        assert query == ListingQuery(page_size=50)
+
+    def test_filters_and_fields(self):
+        query = ListingQuery.from_params(
+            {"platform": "Feedly", "tag": "CVE", "status": "New", "publishedAfter": "2024-05-01", "publishedBefore": "2024-05-03T12:00:00", "fields": "title, timestamp"},
+            TriageListingConfig()
+        )
+        assert query.filters == TriageStagingFilter(
+            platform="Feedly", tag="CVE", status="New", published_after="2024-05-01 00:00:00", published_before="2024-05-03 12:00:00"
+        )
+        assert query.fields == ("id", "title", "timestamp")
+
+    @pytest.mark.parametrize("params, expected_error", [
+        ({"pageSize": "0"}, "Invalid 'pageSize'"),
+        ({"pageSize": "1000"}, "Invalid 'pageSize'"),
+        ({"pageSize": "ten"}, "Invalid 'pageSize'"),
+        ({"status": "Closed"}, "Invalid 'status'"),
+        ({"publishedAfter": "yesterday"}, "Invalid 'publishedAfter'"),
+        ({"fields": "title,rawPayload"}, "Unknown fields"),
+    ])
+    def test_invalid_params(self, params, expected_error):
+        with pytest.raises(ValueError, match=expected_error):
+            ListingQuery.from_params(params, TriageListingConfig())
+
+
+class TestAlertsListingService:
+    def test_pages_through_every_alert(self, listing_service):
+        first_page = listing_service.list_alerts({})
+        body = json.loads(first_page.body)
+        second_page = listing_service.list_alerts({"continuationToken": body["continuationToken"]})
+
+        assert first_page.status_code == 200
+        assert listed_ids(first_page) == ["key-03", "key-02"]
+        assert listed_ids(second_page) == ["key-01", "key-00"]
+        assert json.loads(second_page.body)["continuationToken"] is None
+
+    @pytest.mark.parametrize("params, expected_ids", [
+        ({"platform": "Recorded Future"}, ["key-01"]),
+        ({"tag": "CVE"}, ["key-02"]),
+        ({"status": "Dismissed"}, ["key-03"]),
+        ({"publishedAfter": "2024-05-02", "publishedBefore": "2024-05-04"}, ["key-02", "key-01"]),
+    ])
+    def test_filters(self, listing_service, params, expected_ids):
+        assert listed_ids(listing_service.list_alerts({**params, "pageSize": "3"})) == expected_ids
+
+    def test_projection(self, listing_service):
+        items = json.loads(listing_service.list_alerts({"fields": "title"}).body)["items"]
+        assert items == [{"id": "key-03", "title": "Article 3"}, {"id": "key-02", "title": "Article 2"}]
+
+    def test_invalid_request(self, listing_service):
+        response = listing_service.list_alerts({"pageSize": "-1"})
+        assert response.status_code == 400
+        assert "Invalid 'pageSize'" in json.loads(response.body)["error"]
+
+    def test_invalid_continuation_token(self, listing_service):
+        response = listing_service.list_alerts({"continuationToken": "not-a-token"})
+        assert response.status_code == 400
+        assert "Invalid continuation token" in json.loads(response.body)["error"]
+        assert listing_service.get_stats()["invalid"] == 1
+
+    def test_not_modified_until_new_alerts_are_staged(self, listing_service, fake_staging_dao, clock, mocker):
+        first = listing_service.list_alerts({})
+        etag = first.headers["ETag"]
+        get_page = mocker.spy(fake_staging_dao, "get_staging_entities_page")
+
+        not_modified = listing_service.list_alerts({}, if_none_match=etag)
+        assert not_modified.status_code == 304
+        assert not_modified.body == b""
+        assert not_modified.headers["ETag"] == etag
+        get_page.assert_not_called()
+
+        fake_staging_dao.add_staging_entities_if_not_exist([staging_entity(4)])
+        clock[0] = 10 # The version is read again.
+
+        modified = listing_service.list_alerts({}, if_none_match=etag)
+        assert modified.status_code == 200
+        assert modified.headers["ETag"] != etag
+        assert listed_ids(modified) == ["key-04", "key-03"]
+
+    def test_not_modified_with_a_weak_etag_in_a_list(self, listing_service):
+        etag = listing_service.list_alerts({}).headers["ETag"]
+        assert listing_service.list_alerts({}, if_none_match=f'"stale", W/{etag}').status_code == 304
+
+    def test_etag_depends_on_query(self, listing_service):
+        assert listing_service.list_alerts({}).headers["ETag"] != listing_service.list_alerts({"tag": "CVE"}).headers["ETag"]
+
+    def test_responses_are_cached_until_the_version_changes(self, listing_service, fake_staging_dao, clock, mocker):
+        get_page = mocker.spy(fake_staging_dao, "get_staging_entities_page")
+        first = listing_service.list_alerts({})
+        assert listing_service.list_alerts({}).body == first.body
+        assert get_page.call_count == 1
+        assert listing_service.get_stats()["cache_hits"] == 1
+
+        fake_staging_dao.add_staging_entities_if_not_exist([staging_entity(4)])
+        clock[0] = 10
+
+        assert listed_ids(listing_service.list_alerts({})) == ["key-04", "key-03"]
+        assert get_page.call_count == 2
@@ -0,0 +1,113 @@
+import gzip
+
+import pytest
+
+from triage_portal.static_assets import StaticAssetCache, StaticAssetsConfig, normalize_asset_path
+
+SCRIPT = b"console.log('triage portal');\n" * 100
+
+
+@pytest.fixture(scope="function")
+def frontend_dir(tmp_path):
+    (tmp_path / "index.html").write_bytes(b"<html><body>Triage</body></html>")
+    (tmp_path / "script.js").write_bytes(SCRIPT)
+    (tmp_path / "style.css").write_bytes(b"body { margin: 0; }")
+    (tmp_path / "package.json").write_bytes(b"{}")
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "lib.js").write_bytes(b"module.exports = {};")
+    (tmp_path.parent / "secret.txt").write_bytes(b"secret")
+    return tmp_path
+
+@pytest.fixture(scope="function")
+def asset_cache(frontend_dir):
+    return StaticAssetCache(StaticAssetsConfig(root_dir=str(frontend_dir), max_age_seconds=600, min_compress_bytes=512))
+
+
+class TestNormalizeAssetPath:
+    @pytest.mark.parametrize("route_path, expected_path", [
+        (None, "index.html"),
+        ("", "index.html"),
+        ("script.js", "script.js"),
+        ("./style.css", "style.css"),
+        ("docs/", "docs/index.html"),
+    ])
+    def test_valid_paths(self, route_path, expected_path):
+        assert normalize_asset_path(route_path) == expected_path
+
+    @pytest.mark.parametrize("route_path", ["../secret.txt", "a/../../secret.txt", "/etc/passwd", "..\\secret.txt", "C:/secret.txt", "index.html\x00"])
+    def test_traversal_is_rejected(self, route_path):
+        assert normalize_asset_path(route_path) is None
+
+
+class TestStaticAssetCache:
+    def test_serves_assets_with_their_media_type(self, asset_cache):
+        index = asset_cache.serve("")
+        style = asset_cache.serve("style.css")
+
+        assert index.status_code == 200
+        assert index.body == b"<html><body>Triage</body></html>"
+        assert index.headers["Content-Type"] == "text/html; charset=utf-8"
+        assert index.headers["Cache-Control"] == "no-cache"
+        assert style.headers["Content-Type"] == "text/css; charset=utf-8"
+        assert style.headers["Cache-Control"] == "public, max-age=600"
+
+    def test_reads_the_disk_once(self, asset_cache, frontend_dir, mocker):
+        asset_cache.serve("index.html")
+        load = mocker.spy(asset_cache, "load")
+        (frontend_dir / "index.html").write_bytes(b"changed")
+
+        assert asset_cache.serve("index.html").body == b"<html><body>Triage</body></html>"
+        asset_cache.serve("script.js")
+        load.assert_not_called()
+
+    def test_serves_the_precompressed_variant(self, asset_cache):
+        response = asset_cache.serve("script.js", {"Accept-Encoding": "gzip, deflate"})
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert gzip.decompress(response.body) == SCRIPT
+        assert asset_cache.serve("script.js", {"Accept-Encoding": "gzip, deflate"}).body is response.body
+
+    @pytest.mark.parametrize("accept_encoding", [None, "identity", "gzip;q=0"])
+    def test_serves_identity_unless_gzip_is_accepted(self, asset_cache, accept_encoding):
+        response = asset_cache.serve("script.js", {"Accept-Encoding": accept_encoding} if accept_encoding else {})
+        assert "Content-Encoding" not in response.headers
+        assert response.body == SCRIPT
+
+    def test_small_assets_are_not_compressed(self, asset_cache):
+        assert "Content-Encoding" not in asset_cache.serve("style.css", {"Accept-Encoding": "gzip"}).headers
+
+    def test_not_modified(self, asset_cache):
+        etag = asset_cache.serve("script.js").headers["ETag"]
+        response = asset_cache.serve("script.js", {"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["ETag"] == etag
+        assert asset_cache.serve("script.js", {"If-None-Match": '"stale"'}).status_code == 200
+
+    def test_etag_differs_per_content_coding(self, asset_cache):
+        identity_etag = asset_cache.serve("script.js").headers["ETag"]
+        gzip_etag = asset_cache.serve("script.js", {"Accept-Encoding": "gzip"}).headers["ETag"]
+
+        assert gzip_etag == identity_etag[:-1] + '-gz"'
+        # A cache revalidating either variant gets a 304, with the ETag of the variant it would be served.
+        response = asset_cache.serve("script.js", {"If-None-Match": f'"stale", {identity_etag}', "Accept-Encoding": "gzip"})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == gzip_etag
+        assert asset_cache.serve("script.js", {"If-None-Match": f"W/{gzip_etag}"}).status_code == 304
+
+    def test_etag_changes_with_the_content(self, asset_cache, frontend_dir):
+        etag = asset_cache.serve("script.js").headers["ETag"]
+        (frontend_dir / "script.js").write_bytes(SCRIPT + b"// v2\n")
+        asset_cache.load()
+        assert asset_cache.serve("script.js").headers["ETag"] != etag
+
+    @pytest.mark.parametrize("route_path, expected_status", [
+        ("missing.js", 404),
+        ("package.json", 404),
+        ("node_modules/lib.js", 404),
+        ("../secret.txt", 400),
+    ])
+    def test_unservable_paths(self, asset_cache, route_path, expected_status):
+        assert asset_cache.serve(route_path).status_code == expected_status
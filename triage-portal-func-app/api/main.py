@@ -1,14 +1,46 @@
-import json
+import logging
+import os
+import threading
+
 import azure.functions as func
+from azure.cosmos import CosmosClient
+from pymongo import MongoClient
+
+from config_managers.configs_manager import ConfigsManager
+from config_managers.credentials import get_credential
+from data_accessors.datastores.alerts import CosmosConfig, MongoConfig
+from data_accessors.datastores.triage_staging import TriageStagingDAOCosmos, TriageStagingDAOMongo
+from triage_portal.listing import AlertsListingService
+
+# Created by the first request on this host, and reused by later ones along with its response cache.
+_listing_service_lock = threading.Lock()
+_listing_service: AlertsListingService | None = None
+
+
+def _get_listing_service() -> AlertsListingService:
+    global _listing_service
+    with _listing_service_lock:
+        if _listing_service is None:
+            config_manager = ConfigsManager()
+            if os.getenv("IS_LOCAL") == "True": # CosmosDB local emulator won't run on Mac M1, so MongoDB is used for local development.
+                mongo_config: MongoConfig = config_manager.retrieve_config(MongoConfig)
+                staging_db = TriageStagingDAOMongo(mongo_config, MongoClient(mongo_config.host, mongo_config.port))
+            else:
+                cosmos_config: CosmosConfig = config_manager.retrieve_config(CosmosConfig)
+                staging_db = TriageStagingDAOCosmos(cosmos_config, CosmosClient(cosmos_config.url, credential=get_credential()))
+            _listing_service = AlertsListingService(staging_db)
+        return _listing_service
+
 
 def handle_request(req: func.HttpRequest) -> func.HttpResponse:
-    # Example API logic
-    data = {
-        "message": "Hello from the API backend!",
-        "status": "success"
-    }
+    """Lists the alerts staged for triage, see AlertsListingService.list_alerts for the query parameters."""
+    try:
+        response = _get_listing_service().list_alerts(req.params, req.headers.get("If-None-Match"))
+    except Exception as e:
+        logging.error("Error listing the alerts: %s", e)
+        raise e
     return func.HttpResponse(
-        json.dumps(data),
-        mimetype="application/json",
-        status_code=200
+        body=response.body,
+        status_code=response.status_code,
+        headers=response.headers
     )
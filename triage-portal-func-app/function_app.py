@@ -1,15 +1,15 @@
-import logging
 import azure.functions as func
-import os
 
-def main(req: func.HttpRequest) -> func.HttpResponse:
-    path = req.route_params.get('file', 'index.html')
-    file_path = os.path.join(os.getenv('HOME'), 'site', 'wwwroot', 'frontend', path)
-    
-    if not os.path.isfile(file_path):
-        return func.HttpResponse("File not found", status_code=404)
+from triage_portal.static_assets import StaticAssetCache
+
+# The frontend is read from disk once per host, by the first request, and served from memory after that.
+_asset_cache = StaticAssetCache()
 
-    with open(file_path, 'r') as f:
-        content = f.read()
 
-    return func.HttpResponse(content, mimetype="text/html")
\ No newline at end of file
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    response = _asset_cache.serve(req.route_params.get('file', ''), req.headers)
+    return func.HttpResponse(
+        body=response.body,
+        status_code=response.status_code,
+        headers=response.headers
+    )